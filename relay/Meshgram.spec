@@ -36,10 +36,15 @@ a = Analysis(
         (str(ROOT / "relay.py"), "."),
         # Helper-модули которые relay.py / gui.py импортируют
         (str(ROOT / "ai_helper.py"), "."),
+        (str(ROOT / "lora_codec.py"), "."),
+        (str(ROOT / "metrics.py"), "."),
+        (str(ROOT / "airtime.py"), "."),
         (str(ROOT / "i18n_gui.py"), "."),
         (str(ROOT / "paths.py"), "."),
         (str(ROOT / "settings.py"), "."),
         (str(ROOT / "db.py"), "."),
+        (str(ROOT / "feed_client.py"), "."),
+        (str(ROOT / "table_models.py"), "."),
         (str(ROOT / "dialogs.py"), "."),
         (str(ROOT / "icons.py"), "."),
         (str(ROOT / "theme.py"), "."),
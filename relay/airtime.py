@@ -0,0 +1,128 @@
+"""
+Эфирное время LoRa: оценка airtime одного пакета по модем-пресету
+Meshtastic и скользящий учёт duty cycle своих передач.
+
+В EU868 (и ряде других регионов) передатчику разрешено занимать эфир
+не больше N % времени — Meshtastic по умолчанию держит 10 % в час. Нода
+при превышении просто перестаёт передавать, поэтому relay считает бюджет
+сам и придерживает неважный трафик раньше, чем кончится эфир для важного.
+
+    ledger = DutyCycleLedger(limit_pct=10)
+    ledger.record(estimate(len(text.encode("utf-8")), "LONG_FAST"))
+    ledger.utilisation()      # 0.0 … 1.0+ — доля часового бюджета
+
+Только stdlib, без зависимостей от relay.py.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# Пресеты Meshtastic: (bandwidth кГц, spreading factor, coding rate 4/x).
+PRESETS: dict[str, tuple[float, int, int]] = {
+    "SHORT_TURBO":    (500, 7, 5),
+    "SHORT_FAST":     (250, 7, 5),
+    "SHORT_SLOW":     (250, 8, 5),
+    "MEDIUM_FAST":    (250, 9, 5),
+    "MEDIUM_SLOW":    (250, 10, 5),
+    "LONG_FAST":      (250, 11, 5),
+    "LONG_MODERATE":  (125, 11, 8),
+    "LONG_SLOW":      (125, 12, 8),
+    "VERY_LONG_SLOW": (62.5, 12, 8),
+}
+DEFAULT_PRESET = "LONG_FAST"
+
+PREAMBLE_SYMBOLS = 16        # преамбула Meshtastic
+# Заголовок MeshPacket (16 байт) + обёртка Data (portnum, длина) поверх
+# текста, байт.
+MESH_OVERHEAD = 20
+
+WINDOW_S = 3600              # окно duty cycle по ETSI EN 300 220 — час
+
+
+def airtime_s(payload_bytes: int, sf: int, bw_khz: float, cr: int = 5,
+              preamble: int = PREAMBLE_SYMBOLS) -> float:
+    """Время в эфире LoRa-кадра с `payload_bytes` байт полезной нагрузки
+    (Semtech AN1200.13): явный заголовок, CRC, low data rate optimize при
+    символе длиннее 16 мс. cr — знаменатель coding rate (5 = 4/5)."""
+    t_sym = (2 ** sf) / (bw_khz * 1000)
+    de = 1 if t_sym > 0.016 else 0
+    num = 8 * payload_bytes - 4 * sf + 28 + 16
+    n_payload = 8 + max(math.ceil(num / (4 * (sf - 2 * de))) * cr, 0)
+    return (preamble + 4.25 + n_payload) * t_sym
+
+
+def estimate(text_bytes: int, preset: str = DEFAULT_PRESET) -> float:
+    """Airtime одного sendText с текстом в `text_bytes` байт UTF-8.
+    Неизвестный пресет считается как DEFAULT_PRESET."""
+    bw, sf, cr = PRESETS.get(preset, PRESETS[DEFAULT_PRESET])
+    return airtime_s(text_bytes + MESH_OVERHEAD, sf, bw, cr)
+
+
+class DutyCycleLedger:
+    """Сколько эфира заняли свои передачи за последние `window_s` секунд.
+
+    record() зовётся из потока mesh-tx после каждого sendText, остальное —
+    из asyncio и GUI-выгрузки: всё под одним threading.Lock. limit_pct=0 —
+    лимита нет: учёт идёт, utilisation() всегда 0, ждать не приходится.
+    """
+
+    def __init__(self, limit_pct: float, window_s: float = WINDOW_S) -> None:
+        self.limit_pct = limit_pct
+        self.window_s = window_s
+        self.total_s = 0.0           # за всё время работы
+        self._lock = threading.Lock()
+        self._log: deque[tuple[float, float]] = deque()   # (когда, airtime)
+        self._used = 0.0
+
+    @property
+    def budget_s(self) -> float:
+        return self.window_s * self.limit_pct / 100
+
+    def record(self, seconds: float, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._log.append((now, seconds))
+            self._used += seconds
+            self.total_s += seconds
+
+    def used(self, now: Optional[float] = None) -> float:
+        """Эфир в текущем окне, сек."""
+        with self._lock:
+            self._expire(time.monotonic() if now is None else now)
+            return self._used
+
+    def utilisation(self, now: Optional[float] = None) -> float:
+        """Доля бюджета окна: 1.0 — лимит исчерпан."""
+        if self.limit_pct <= 0:
+            return 0.0
+        return self.used(now) / self.budget_s
+
+    def seconds_until(self, fraction: float, now: Optional[float] = None) -> float:
+        """Через сколько секунд занятость окна опустится ниже `fraction`
+        бюджета (0 — уже ниже или лимита нет)."""
+        if self.limit_pct <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        target = fraction * self.budget_s
+        with self._lock:
+            self._expire(now)
+            used = self._used
+            if used < target:
+                return 0.0
+            for ts, seconds in self._log:
+                used -= seconds
+                if used < target:
+                    return max(0.0, ts + self.window_s - now)
+        return 0.0
+
+    def _expire(self, now: float) -> None:
+        # Под self._lock.
+        cutoff = now - self.window_s
+        while self._log and self._log[0][0] <= cutoff:
+            self._used -= self._log.popleft()[1]
+        if not self._log:
+            self._used = 0.0     # не копим ошибку округления
@@ -0,0 +1,122 @@
+"""
+Бенчмарк сжатия LoRa-пакетов (lora_codec + _pack_for_pocket).
+
+Прогоняет корпус «похожих на живые» сообщений (TG-переписка ru/en,
+ответы AI, простыни) через упаковку в пакеты по MAX_PACKET_BYTES — обычную
+и со сжатием — и печатает сколько пакетов сэкономлено.
+
+Запуск из relay/:
+    python benchmarks/bench_compression.py
+    python benchmarks/bench_compression.py --max-bytes 160 --compact
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import logging
+import sys
+from pathlib import Path
+
+_RELAY_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_RELAY_DIR))
+
+CORPUS = [
+    # короткие — должны остаться как есть (1 пакет)
+    "Привет! Как дела?",
+    "ok, on my way",
+    "Буду через 20 минут, жди у входа",
+    # обычная TG-переписка
+    "Привет! Сегодня вечером будем дома, примерно через два часа. Связь в "
+    "лесу плохая, батарея почти села, поэтому если не отвечу — не переживай, "
+    "всё хорошо. Позвони завтра утром, когда сможешь.",
+    "Слушай, мы тут подумали — может быть завтра встретимся у Сергея? Он "
+    "говорит что дома будет после шести, можно взять еды и посидеть. Напиши "
+    "как сможешь, нам нужно знать до обеда, чтобы всё успеть купить.",
+    "Мама просила передать, что у бабушки всё нормально, давление в порядке, "
+    "врач приходил вчера и сказал что можно уже выходить на улицу. Она очень "
+    "ждёт когда ты приедешь, спрашивает каждый день. Позвони ей когда будет связь.",
+    "Hey, just wanted to let you know that the road to the lake is closed "
+    "because of the storm. Take the north route instead, it adds about 30 "
+    "minutes but it's safe. Call me when you get to the village, ok?",
+    "Погода на завтра: утром +3, днём до +9, ветер северо-западный 5-7 м/с, "
+    "после обеда дождь. Ночью заморозки до -2. Если пойдёте на перевал — "
+    "берите тёплые вещи и дождевики, тропа будет скользкая.",
+    # ответы AI — длинные, литературный русский
+    "Чтобы развести костёр в сырую погоду, найдите сухую растопку под елями "
+    "или в дуплах, расщепите толстые ветки — внутри они сухие. Сложите "
+    "шалашом: в центре растопка, вокруг тонкие ветки, потом толще. Разжигайте "
+    "с наветренной стороны и не накрывайте огонь сразу крупными дровами, "
+    "иначе он задохнётся. Береста горит даже влажной — это лучший розжиг.",
+    "Признаки переохлаждения: сильная дрожь, онемение пальцев, спутанность "
+    "речи, сонливость. Что делать: укрыть от ветра, снять мокрую одежду, "
+    "укутать в сухое, дать тёплое сладкое питьё (не алкоголь). Не растирать "
+    "кожу снегом. Если человек без сознания или дрожь прекратилась, а ему "
+    "всё ещё холодно — это опасно, нужна срочная помощь.",
+    "The safest way to cross a shallow river is to unbuckle your backpack "
+    "hip belt, face upstream, and move sideways using a pole for balance. "
+    "Cross at the widest point where the current is slowest, and never tie "
+    "yourself to a rope fixed on both banks.",
+    # смешанное с эмодзи / ссылками
+    "Фото загрузил в облако 👍 ссылка https://example.com/s/abc123 — там "
+    "всё за выходные, и видео с водопада тоже. Посмотри когда будет "
+    "нормальный интернет, по LoRa ссылку не открыть конечно 😅",
+]
+
+
+def _load_relay():
+    logging.disable(logging.CRITICAL)
+    spec = importlib.util.spec_from_file_location(
+        "relay", str(_RELAY_DIR / "relay.py")
+    )
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class _User:
+    username = "vasya"
+    first_name = None
+    id = 1
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--max-bytes", type=int, default=None,
+                    help="размер пакета (по умолчанию MAX_PACKET_BYTES из настроек)")
+    ap.add_argument("--compact", action="store_true",
+                    help="компактные заголовки (COMPACT_HEADERS)")
+    args = ap.parse_args()
+
+    relay = _load_relay()
+    if args.max_bytes:
+        relay.MAX_PACKET_BYTES = args.max_bytes
+    relay.MESH_COMPRESSION = True
+
+    def pack(part, i, total):
+        return relay._format_lora_packet(
+            3, _User(), part, chunk_idx=i, chunks_total=total,
+            compact=args.compact,
+        )
+
+    total_plain = total_packed = total_bytes = 0
+    print(f"max_packet_bytes={relay.MAX_PACKET_BYTES} compact={args.compact}")
+    print(f"{'bytes':>6} {'plain':>6} {'packed':>7}  text")
+    for text in CORPUS:
+        plain = relay._pack_lora_payloads(text, pack, relay.MAX_PACKET_BYTES)
+        packed = relay._pack_for_pocket(text, pack)
+        n_bytes = len(text.encode("utf-8"))
+        total_plain += len(plain)
+        total_packed += len(packed)
+        total_bytes += n_bytes
+        mark = " *" if len(packed) < len(plain) else ""
+        print(f"{n_bytes:>6} {len(plain):>6} {len(packed):>7}{mark:2} {text[:40]!r}")
+
+    saved = total_plain - total_packed
+    print("-" * 60)
+    print(f"messages={len(CORPUS)} bytes={total_bytes} "
+          f"frames plain={total_plain} compressed={total_packed} "
+          f"saved={saved} ({saved / max(1, total_plain):.0%})")
+
+
+if __name__ == "__main__":
+    main()
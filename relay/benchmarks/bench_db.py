@@ -0,0 +1,150 @@
+"""
+Микробенчмарк SQLite-доступа relay.py: задержка одного вызова горячих
+db-хелперов «как было» (голый sqlite3.connect, запросы строкой по месту,
+upsert юзера двумя запросами) и «как стало» (_db_connect с PRAGMA'ами,
+именованные запросы _SQL). Для сравнения — GUI-стиль: новое соединение
+на каждый вызов.
+
+Обе relay-схемы работают на файловой БД во временной папке, каждая запись
+коммитится сразу (group commit выключен — меряем только statement-слой).
+
+Запуск из relay/:
+    python benchmarks/bench_db.py
+    python benchmarks/bench_db.py --calls 20000
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import logging
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_RELAY_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_RELAY_DIR))
+
+
+def _load_relay():
+    logging.disable(logging.CRITICAL)
+    spec = importlib.util.spec_from_file_location(
+        "relay", str(_RELAY_DIR / "relay.py")
+    )
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+# ---------- «как было»: запросы строкой, как в relay.py до _SQL ----------
+def _old_upsert(db, uid, now):
+    cur = db.execute("SELECT 1 FROM users WHERE tg_user_id = ?", (uid,))
+    if cur.fetchone() is None:
+        db.execute(
+            "INSERT INTO users (tg_user_id, tg_username, first_name, banned, first_seen, last_seen) "
+            "VALUES (?, ?, ?, 0, ?, ?)",
+            (uid, "user", None, now, now),
+        )
+    else:
+        db.execute(
+            "UPDATE users SET tg_username = COALESCE(?, tg_username), "
+            "first_name = COALESCE(?, first_name), last_seen = ? WHERE tg_user_id = ?",
+            ("user", None, now, uid),
+        )
+    db.commit()
+
+
+def _old_is_banned(db, uid):
+    row = db.execute("SELECT banned FROM users WHERE tg_user_id = ?", (uid,)).fetchone()
+    return bool(row["banned"]) if row else False
+
+
+def _old_messages_log(db, uid, now):
+    db.execute(
+        "INSERT INTO messages_recent (direction, slot_n, tg_user_id, text, ts) "
+        "VALUES (?, ?, ?, ?, ?)",
+        ("in", 1, uid, "привет", now),
+    )
+    db.commit()
+
+
+def _gui_is_banned(path, uid):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=2.0)
+    conn.row_factory = sqlite3.Row
+    try:
+        return _old_is_banned(conn, uid)
+    finally:
+        conn.close()
+
+
+def _bench(fn, calls: int, repeats: int = 3) -> float:
+    """Средняя задержка вызова, мкс — лучший из `repeats` прогонов
+    (шум планировщика/диска только добавляет)."""
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for i in range(calls):
+            fn(i)
+        best = min(best, time.perf_counter() - t0)
+    return best / calls * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--calls", type=int, default=5000, help="вызовов на замер")
+    ap.add_argument("--users", type=int, default=200, help="разных tg_user_id")
+    args = ap.parse_args()
+
+    relay = _load_relay()
+    relay._db_committer = None
+    users = args.users
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = Path(tmp) / "old.db"
+        new_path = Path(tmp) / "new.db"
+
+        old = sqlite3.connect(old_path, check_same_thread=False)
+        old.row_factory = sqlite3.Row
+        old.execute("PRAGMA journal_mode=WAL;")
+        old.execute("PRAGMA synchronous=NORMAL;")
+        old.executescript(relay._DB_SCHEMA)
+
+        relay._db = relay._db_connect(new_path)
+        relay._db.executescript(relay._DB_SCHEMA)
+
+        def locked(fn):
+            # Старые хелперы тоже брали _db_lock — сравниваем равное с равным.
+            def call(i):
+                with relay._db_lock:
+                    return fn(i)
+            return call
+
+        rows = [
+            ("user_upsert",
+             locked(lambda i: _old_upsert(old, i % users, int(time.time()))),
+             lambda i: relay.user_upsert(i % users, "user", None)),
+            ("user_is_banned",
+             locked(lambda i: _old_is_banned(old, i % users)),
+             lambda i: relay.user_is_banned(i % users)),
+            ("messages_log",
+             locked(lambda i: _old_messages_log(old, i % users, int(time.time()))),
+             lambda i: relay.messages_log("in", slot_n=1, tg_user_id=i % users,
+                                          text="привет")),
+        ]
+        print(f"calls={args.calls} users={users}  (мкс на вызов)")
+        print(f"{'op':<16} {'before':>9} {'after':>9} {'speedup':>8}")
+        for name, before, after in rows:
+            b = _bench(before, args.calls)
+            a = _bench(after, args.calls)
+            print(f"{name:<16} {b:>9.1f} {a:>9.1f} {b / a:>7.2f}x")
+
+        gui = _bench(lambda i: _gui_is_banned(new_path, i % users), args.calls // 5)
+        print(f"{'gui conn/call':<16} {gui:>9.1f}  (db.py: новое ro-соединение на вызов)")
+
+        old.close()
+        relay._db.close()
+
+
+if __name__ == "__main__":
+    main()
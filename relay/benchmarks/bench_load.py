@@ -0,0 +1,467 @@
+"""
+Нагрузочный стенд relay.py целиком, без ноды и без Telegram: сквозной
+прогон _build_app → polling → handle_text → TX-очередь → «радио» → ACK →
+статус юзеру, плюс ответы с кармана через on_mesh_receive.
+
+- FakeSerialInterface подменяет meshtastic SerialInterface: sendText
+  блокирует поток на время USB-записи, пакеты занимают общий эфир на своё
+  LoRa-airtime (airtime.estimate по --preset), ACK / NAK приходят с задержкой и потерями
+  из отдельного потока — как у meshtastic-python. Доставленные сообщения
+  карман с вероятностью --reply-rate отвечает «@N …».
+- FakeBotAPI — локальный HTTP-сервер с теми методами Bot API, которые
+  зовёт PTB (getMe, getUpdates long-poll, sendMessage, editMessageText, …),
+  с искусственной задержкой ответа --tg-latency.
+- N юзеров шлют по M сообщений параллельно, с паузой --think между ними.
+
+Отчёт: сообщений/с, p50/p95/p99 задержек (TG → эфир, TG → ACK, ответ
+кармана → TG), SQL-операций и commit'ов на сообщение, разбивка по этапам
+из traces (см. trace_report.py).
+
+Запуск из relay/:
+    python benchmarks/bench_load.py
+    python benchmarks/bench_load.py --users 50 --messages 10 --loss 0.1
+    python benchmarks/bench_load.py --preset LONG_FAST --duty-cycle 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import heapq
+import importlib.util
+import itertools
+import json
+import logging
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import parse_qsl
+
+_RELAY_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_RELAY_DIR))
+
+import airtime  # noqa: E402
+import trace_report  # noqa: E402
+
+BOT_TOKEN = "123456:load-test"
+OWNER_ID = 1
+POCKET_NODE_ID = "!0000beef"
+HOME_NODE_NUM = 0x1000
+FIRST_USER_ID = 1000
+
+_RE_MSG_TOKEN = re.compile(r"\bm\d{6}\b")
+_RE_REPLY_TOKEN = re.compile(r"\br\d{6}\b")
+
+
+def _load_relay():
+    logging.disable(logging.CRITICAL)
+    spec = importlib.util.spec_from_file_location(
+        "relay", str(_RELAY_DIR / "relay.py")
+    )
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+# ---------- часы событий ----------
+class Recorder:
+    """Моменты (time.monotonic) по токенам сообщений: m000001 — сообщение
+    юзера, r000001 — ответ кармана. Пишется из потоков стенда и loop'а."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.enqueued: dict[str, float] = {}
+        self.on_air: dict[str, float] = {}
+        self.acked: dict[str, float] = {}
+        self.nak = 0
+        self.reply_sent: dict[str, float] = {}
+        self.reply_delivered: dict[str, float] = {}
+
+    def first(self, table: dict, keys, t: float) -> None:
+        with self._lock:
+            for k in keys:
+                table.setdefault(k, t)
+
+
+def _spread(a: dict, b: dict) -> list[float]:
+    """Задержки b − a в мс по общим токенам."""
+    return [(b[k] - a[k]) * 1000 for k in b if k in a]
+
+
+# ---------- радио ----------
+class _Scheduler(threading.Thread):
+    """Один фоновый поток с таймерами — как reader-поток meshtastic-python:
+    все onResponse и входящие пакеты приходят из него."""
+
+    def __init__(self) -> None:
+        super().__init__(name="fake-radio", daemon=True)
+        self._cond = threading.Condition()
+        self._heap: list = []
+        self._seq = itertools.count()
+
+    def at(self, when: float, fn, *args) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._seq), fn, args))
+            self._cond.notify()
+
+    def run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                _, _, fn, args = heapq.heappop(self._heap)
+            try:
+                fn(*args)
+            except Exception:
+                logging.getLogger("bench").exception("fake radio callback failed")
+
+
+class FakeSerialInterface:
+    """Заглушка meshtastic.serial_interface.SerialInterface: ровно то, что
+    трогает relay.py (sendText, myInfo, nodes, close)."""
+
+    def __init__(self, devPath=None, *, args, relay, rec: Recorder) -> None:
+        self.devPath = devPath
+        self.args = args
+        self.relay = relay
+        self.rec = rec
+        self.myInfo = SimpleNamespace(my_node_num=HOME_NODE_NUM)
+        self.nodes = {POCKET_NODE_ID: {"num": 0xBEEF, "lastHeard": time.time(),
+                                       "user": {"longName": "pocket"}}}
+        self.packets = 0
+        self.airtime_s = 0.0
+        self._air_lock = threading.Lock()
+        self._air_free = 0.0
+        self._rng = random.Random(args.seed)
+        self._packet_ids = itertools.count(0x10000)
+        self._sched = _Scheduler()
+        self._sched.start()
+
+    def _occupy_air(self, nbytes: int, not_before: float) -> tuple[float, float]:
+        air = airtime.estimate(nbytes, self.args.preset)
+        with self._air_lock:
+            start = max(not_before, self._air_free)
+            self._air_free = start + air
+            self.airtime_s += air
+        return start, start + air
+
+    def sendText(self, text, destinationId=None, wantAck=False, onResponse=None,
+                 hopLimit=None, **_kw):
+        time.sleep(self.args.usb_ms / 1000)          # USB-запись держит поток
+        now = time.monotonic()
+        self.packets += 1
+        self.rec.first(self.rec.on_air, _RE_MSG_TOKEN.findall(text), now)
+        _, landed = self._occupy_air(len(text.encode("utf-8")), now)
+        delivered = self._rng.random() >= self.args.loss
+        if wantAck and onResponse is not None:
+            reason = "NONE" if delivered else "MAX_RETRANSMIT"
+            ack_at = landed + self.args.ack_ms / 1000 * (1 if delivered else 3)
+            self._sched.at(ack_at, self._ack, onResponse, text, reason)
+        if delivered:
+            self._schedule_replies(text, landed)
+        return SimpleNamespace(id=self.packets)
+
+    def _ack(self, on_response, text: str, reason: str) -> None:
+        if reason == "NONE":
+            self.rec.first(self.rec.acked, _RE_MSG_TOKEN.findall(text), time.monotonic())
+        else:
+            self.rec.nak += 1
+        on_response({"decoded": {"routing": {"errorReason": reason}}})
+
+    def _schedule_replies(self, text: str, landed: float) -> None:
+        # Кадр может быть склейкой _TxBatcher — по записи на строку.
+        for line in text.split("\n"):
+            hdr = self.relay.parse_packet_header(line)
+            tokens = _RE_MSG_TOKEN.findall(line)
+            if hdr is None or not tokens or self._rng.random() >= self.args.reply_rate:
+                continue
+            token = "r" + tokens[0][1:]
+            reply = f"@{hdr['slot_n']} ок {token}"
+            # Эфир под ответ не резервируем: он в будущем и перекрыл бы
+            # отправки, которые реально успеют раньше.
+            heard = (landed + self.args.reply_ms / 1000
+                     + airtime.estimate(len(reply.encode("utf-8")), self.args.preset))
+            self._sched.at(heard, self._receive, reply, token)
+
+    def _receive(self, text: str, token: str) -> None:
+        from pubsub import pub
+        self.rec.first(self.rec.reply_sent, [token], time.monotonic())
+        pub.sendMessage("meshtastic.receive", packet={
+            "id": next(self._packet_ids),
+            "fromId": POCKET_NODE_ID, "from": 0xBEEF, "rxSnr": 5.0, "rxRssi": -90,
+            "decoded": {"portnum": "TEXT_MESSAGE_APP", "text": text},
+        }, interface=self)
+
+    def close(self) -> None:
+        pass
+
+
+# ---------- Telegram ----------
+class FakeBotAPI:
+    """Минимальный Bot API поверх asyncio: HTTP/1.1 keep-alive, тело —
+    form-urlencoded (так шлёт PTB). Незнакомые методы отвечают True."""
+
+    def __init__(self, latency_s: float, rec: Recorder) -> None:
+        self.latency_s = latency_s
+        self.rec = rec
+        self.calls: Counter = Counter()
+        self._updates: list[dict] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._cond: asyncio.Condition | None = None
+        self._server: asyncio.base_events.Server | None = None
+
+    async def start(self) -> str:
+        self._cond = asyncio.Condition()
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/bot"
+
+    async def stop(self) -> None:
+        self._server.close()
+
+    async def push_text(self, user_id: int, text: str) -> None:
+        """Входящее сообщение юзера — ляжет в ответ ближайшего getUpdates."""
+        user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}",
+                "username": f"u{user_id}"}
+        update = {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids), "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": user["first_name"]},
+                "from": user, "text": text,
+            },
+        }
+        async with self._cond:
+            self._updates.append(update)
+            self._cond.notify_all()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                body = await reader.readexactly(length) if length else b""
+                method = request.split()[1].decode().rsplit("/", 1)[-1]
+                params = dict(parse_qsl(body.decode("utf-8")))
+                result = await self._call(method, params)
+                payload = json.dumps({"ok": True, "result": result}).encode("utf-8")
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1")
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _message(self, chat_id, text: str) -> dict:
+        return {
+            "message_id": next(self._message_ids), "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+            "from": {"id": 42, "is_bot": True, "first_name": "relay"},
+            "text": text,
+        }
+
+    async def _call(self, method: str, params: dict):
+        self.calls[method] += 1
+        if method == "getUpdates":
+            return await self._get_updates(int(params.get("offset") or 0),
+                                           float(params.get("timeout") or 0))
+        await asyncio.sleep(self.latency_s)
+        if method == "getMe":
+            return {"id": 42, "is_bot": True, "first_name": "relay",
+                    "username": "relay_load_bot"}
+        if method == "sendMessage":
+            text = params.get("text", "")
+            self.rec.first(self.rec.reply_delivered, _RE_REPLY_TOKEN.findall(text),
+                           time.monotonic())
+            return self._message(params["chat_id"], text)
+        if method == "editMessageText":
+            return self._message(params.get("chat_id") or 0, params.get("text", ""))
+        return True
+
+    async def _get_updates(self, offset: int, timeout: float) -> list[dict]:
+        async with self._cond:
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            if not self._updates and timeout:
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            return list(self._updates)
+
+
+# ---------- прогон ----------
+class _SqlCounter:
+    """set_trace_callback на relay._db: всё, что реально ушло в SQLite."""
+
+    def __init__(self) -> None:
+        self.ops = 0
+        self.commits = 0
+
+    def __call__(self, statement: str) -> None:
+        head = statement.lstrip()[:6].upper()
+        if head.startswith("COMMIT"):
+            self.commits += 1
+        elif not head.startswith("BEGIN"):
+            self.ops += 1
+
+
+async def _user(api: FakeBotAPI, rec: Recorder, uid: int, tokens, args, rng) -> None:
+    for _ in range(args.messages):
+        token = f"m{next(tokens):06d}"
+        rec.enqueued[token] = time.monotonic()
+        await api.push_text(uid, f"привет, это нагрузка {token}")
+        await asyncio.sleep(rng.expovariate(1 / args.think) if args.think else 0)
+
+
+async def _drain(rec: Recorder, iface: FakeSerialInterface, total: int, args) -> bool:
+    deadline = time.monotonic() + args.drain
+    while time.monotonic() < deadline:
+        settled = len(rec.acked) + rec.nak >= total if args.mode == "reliable" \
+            else len(rec.on_air) >= total
+        if settled and len(rec.reply_delivered) >= len(rec.reply_sent) \
+                and not iface._sched._heap:
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def run(args) -> dict:
+    relay = _load_relay()
+    rec = Recorder()
+    with tempfile.TemporaryDirectory() as tmp:
+        relay.DB_PATH = Path(tmp) / "relay.db"
+        relay.BOT_TOKEN = BOT_TOKEN
+        relay.OWNER_ID = OWNER_ID
+        relay.POCKET_NODE_ID = POCKET_NODE_ID
+        relay.WHITELIST_ENABLED = False
+        relay.LIVE_FEED_PORT = relay.METRICS_PORT = 0
+        relay.MESH_WANT_ACK = args.mode == "reliable"
+        relay.LORA_PRESET = args.preset
+        relay.DUTY_CYCLE_PCT = relay._airtime.limit_pct = args.duty_cycle
+        relay.meshtastic.serial_interface.SerialInterface = functools.partial(
+            FakeSerialInterface, args=args, relay=relay, rec=rec,
+        )
+
+        relay.db_init()
+        sql = _SqlCounter()
+        relay._db.set_trace_callback(sql)
+        relay._mesh_iface = iface = relay._connect_mesh()
+
+        api = FakeBotAPI(args.tg_latency_ms / 1000, rec)
+        app = relay._build_app(base_url=await api.start())
+        # run_polling() без сигналов и блокировки: тот же порядок, что в PTB.
+        await app.initialize()
+        await relay.on_post_init(app)
+        await app.updater.start_polling(poll_interval=0, timeout=1)
+        await app.start()
+
+        total = args.users * args.messages
+        tokens = itertools.count(1)
+        rng = random.Random(args.seed)
+        t0 = time.monotonic()
+        await asyncio.gather(*(
+            _user(api, rec, FIRST_USER_ID + i, tokens, args, rng) for i in range(args.users)
+        ))
+        drained = await _drain(rec, iface, total, args)
+        wall = time.monotonic() - t0
+
+        await app.updater.stop()
+        await app.stop()
+        await app.shutdown()
+        await api.stop()
+        relay._db_flush()
+        relay._db.set_trace_callback(None)
+        traces = relay._db.execute("SELECT kind, status, stages FROM traces").fetchall()
+        relay._db_committer.stop()
+        relay._db.close()
+
+    last_air = max(rec.on_air.values(), default=t0)
+    return {
+        "drained": drained, "wall": wall, "total": total,
+        "on_air": len(rec.on_air), "acked": len(rec.acked), "nak": rec.nak,
+        "throughput": len(rec.on_air) / max(last_air - t0, 1e-9),
+        "lat_air": _spread(rec.enqueued, rec.on_air),
+        "lat_ack": _spread(rec.enqueued, rec.acked),
+        "lat_reply": _spread(rec.reply_sent, rec.reply_delivered),
+        "replies": len(rec.reply_delivered),
+        "packets": iface.packets, "airtime": iface.airtime_s,
+        "sql": sql, "tg_calls": api.calls,
+        "traces": trace_report.summarize([tuple(r) for r in traces]),
+    }
+
+
+def _quantiles(name: str, values: list[float]) -> str:
+    if not values:
+        return f"  {name:<14} {'—':>6}"
+    qs = " ".join(f"{trace_report.percentile(values, q):>8.0f}" for q in trace_report.QUANTILES)
+    return f"  {name:<14} {len(values):>6} {qs}"
+
+
+def report(r: dict, args) -> str:
+    msgs = r["total"] + r["replies"]
+    lines = [
+        f"users={args.users} messages={args.messages} mode={args.mode} "
+        f"{args.preset} duty={args.duty_cycle}% loss={args.loss:g} tg={args.tg_latency_ms:g}ms",
+        f"wall {r['wall']:.1f}s{'' if r['drained'] else '  (drain timeout!)'}; "
+        f"on air {r['on_air']}/{r['total']}, ack {r['acked']}, nak {r['nak']}, "
+        f"replies {r['replies']}",
+        f"throughput      {r['throughput']:.1f} msg/s (TG → эфир)",
+        f"radio           {r['packets']} packets, airtime {r['airtime']:.1f}s",
+        f"sqlite          {r['sql'].ops / max(msgs, 1):.1f} ops/msg, "
+        f"{r['sql'].commits / max(msgs, 1):.2f} commits/msg",
+        "tg api          " + " ".join(f"{k}={v}" for k, v in r["tg_calls"].most_common()),
+        "",
+        f"  {'latency, ms':<14} {'n':>6} " + " ".join(
+            f"{f'p{int(q * 100)}':>8}" for q in trace_report.QUANTILES),
+        _quantiles("tg → air", r["lat_air"]),
+        _quantiles("tg → ack", r["lat_ack"]),
+        _quantiles("reply → tg", r["lat_reply"]),
+        "",
+        "traces (мс от приёма):",
+        trace_report.render(r["traces"]),
+    ]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    ap.add_argument("--users", type=int, default=20, help="параллельных юзеров")
+    ap.add_argument("--messages", type=int, default=5, help="сообщений на юзера")
+    ap.add_argument("--think", type=float, default=0.2, help="средняя пауза юзера, с")
+    ap.add_argument("--mode", choices=("reliable", "fast"), default="reliable")
+    ap.add_argument("--preset", choices=list(airtime.PRESETS), default="SHORT_FAST",
+                    help="модем-пресет эфира")
+    ap.add_argument("--duty-cycle", type=int, default=0, help="лимит relay, %% за час")
+    ap.add_argument("--usb-ms", type=float, default=20, help="блокировка sendText, мс")
+    ap.add_argument("--ack-ms", type=float, default=300, help="ACK после приёма, мс")
+    ap.add_argument("--loss", type=float, default=0.0, help="доля потерянных пакетов")
+    ap.add_argument("--reply-rate", type=float, default=0.3, help="доля сообщений с ответом")
+    ap.add_argument("--reply-ms", type=float, default=500, help="карман отвечает через, мс")
+    ap.add_argument("--tg-latency-ms", type=float, default=50, help="ответ Bot API, мс")
+    ap.add_argument("--drain", type=float, default=60, help="ждать хвост не дольше, с")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    print(report(asyncio.run(run(args)), args))
+
+
+if __name__ == "__main__":
+    main()
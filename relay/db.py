@@ -1,7 +1,9 @@
 """
 Read/write helpers для GUI-стороны. Используется gui.py и dialogs.py.
-relay.py владеет тем же SQLite-файлом в runtime — эти функции открывают
-кратковременные соединения, поэтому конкурентный доступ безопасен.
+relay.py владеет тем же SQLite-файлом в runtime. Запись — кратковременные
+соединения; чтение — через маленький пул долгоживущих read-only
+соединений (_ReadPool): дашборд опрашивает БД каждые POLL_MS, и открывать
+файл + парсить схему на каждый тик дорого. В WAL читатели не мешают relay.
 
 DB_PATH через paths.APP_DATA_DIR — критично для PyInstaller-сборки:
 - В source-mode: рядом с db.py = relay/relay.db ✓
@@ -12,8 +14,11 @@ DB_PATH через paths.APP_DATA_DIR — критично для PyInstaller-с
 """
 from __future__ import annotations
 
+import os
 import sqlite3
+import threading
 import time
+from contextlib import contextmanager
 from pathlib import Path
 
 import paths as _paths
@@ -24,13 +29,117 @@ DB_PATH: Path = _paths.APP_DATA_DIR / "relay.db"
 # ---------------------------------------------------------------------------
 def _connect(readonly: bool = False) -> sqlite3.Connection:
     if readonly:
-        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=2.0)
+        # check_same_thread=False — соединение живёт в _ReadPool.
+        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=2.0,
+                               check_same_thread=False)
+        # lower()/LIKE в SQLite складывают регистр только у ASCII.
+        conn.create_function("casefold", 1, _casefold, deterministic=True)
     else:
         conn = sqlite3.connect(DB_PATH, timeout=5.0)
     conn.row_factory = sqlite3.Row
     return conn
 
 
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+def _file_id() -> tuple[int, int] | None:
+    """(st_dev, st_ino) файла БД — меняется, если relay.db подменили
+    (восстановление из бэкапа, удалили и создали заново)."""
+    try:
+        st = os.stat(DB_PATH)
+    except OSError:
+        return None
+    return (st.st_dev, st.st_ino)
+
+
+class _ReadPool:
+    """Пул read-only соединений к relay.db, переживающих тики дашборда.
+
+    Соединение берётся `with _pool.connection() as conn:` и возвращается
+    в пул; если файл БД сменился (другой inode) — весь пул закрывается и
+    открывается заново, прозрачно для вызывающего. Соединение, на котором
+    вылетело исключение, в пул не возвращается.
+    """
+
+    def __init__(self, size: int = 2) -> None:
+        self.size = size
+        self._idle: list[sqlite3.Connection] = []
+        self._file: tuple[int, int] | None = None
+        self._lock = threading.Lock()
+        self.columns: dict[tuple[str, str], bool] = {}   # кэш PRAGMA table_info
+        self.opened = 0
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        try:
+            yield conn
+        except BaseException:
+            conn.close()
+            raise
+        self._checkin(conn)
+
+    def _checkout(self) -> sqlite3.Connection:
+        file_id = _file_id()
+        with self._lock:
+            if file_id != self._file:
+                self._close_idle()
+                self.columns.clear()
+                self._file = file_id
+            if self._idle:
+                return self._idle.pop()
+        self.opened += 1
+        return _connect(readonly=True)
+
+    def _checkin(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if len(self._idle) < self.size and _file_id() == self._file:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _close_idle(self) -> None:
+        for conn in self._idle:
+            conn.close()
+        self._idle.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_idle()
+            self._file = None
+            self.columns.clear()
+
+
+_pool = _ReadPool()
+
+
+def _has_column(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    """PRAGMA table_info один раз на файл. Кэшируем только «есть» — колонку
+    может добавить миграция relay.py, пока GUI запущен."""
+    if _pool.columns.get((table, column)):
+        return True
+    cols = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column in cols:
+        _pool.columns[(table, column)] = True
+        return True
+    return False
+
+
+def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+    """Как _has_column, только для таблиц (users_fts создаёт relay.py)."""
+    if _pool.columns.get((name, "")):
+        return True
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+    ).fetchone()
+    if row is not None:
+        _pool.columns[(name, "")] = True
+        return True
+    return False
+
+
 def bootstrap() -> None:
     """Create an empty relay.db with just enough tables for GUI-only edits."""
     conn = _connect()
@@ -66,22 +175,95 @@ def bootstrap() -> None:
 
 
 # ---------- users ----------
+_USER_COLS = (
+    "u.tg_user_id, u.tg_username, u.first_name, "
+    "u.banned, u.whitelisted, u.first_seen, u.last_seen, u.entry_tag, "
+    "EXISTS(SELECT 1 FROM favorites f WHERE f.tg_user_id = u.tg_user_id) AS is_fav"
+)
+USER_FILTERS = {
+    "all": "",
+    "wl":  "u.whitelisted = 1",
+    "fav": "u.tg_user_id IN (SELECT tg_user_id FROM favorites)",
+    "ban": "u.banned = 1",
+}
+FTS_MIN_QUERY = 3     # trigram-индекс ищет подстроки от 3 символов
+
+
+def _users_where(conn: sqlite3.Connection, flt: str,
+                 query: str) -> tuple[list[str], list]:
+    """WHERE для окна «Пользователи»: фильтр-пилюля + строка поиска.
+
+    Поиск — подстрока в tg_username / first_name / ID, без регистра. От
+    FTS_MIN_QUERY символов — через users_fts (если relay.py его создал),
+    короче — сканом с casefold(); цифры дополнительно ищутся в ID."""
+    where, params = [], []
+    if USER_FILTERS.get(flt):
+        where.append(USER_FILTERS[flt])
+    q = query.strip().lstrip("@").casefold()
+    if not q:
+        return where, params
+    if len(q) >= FTS_MIN_QUERY and _has_table(conn, "users_fts"):
+        cond = "u.tg_user_id IN (SELECT rowid FROM users_fts WHERE users_fts MATCH ?)"
+        params.append('"' + q.replace('"', '""') + '"')
+    else:
+        cond = ("instr(casefold(COALESCE(u.tg_username, '') || ' ' || "
+                "COALESCE(u.first_name, '')), ?) > 0")
+        params.append(q)
+    if q.isdigit():
+        cond = f"({cond} OR instr(CAST(u.tg_user_id AS TEXT), ?) > 0)"
+        params.append(q)
+    where.append(cond)
+    return where, params
+
+
+def count_users(flt: str = "all", query: str = "") -> int:
+    if not DB_PATH.exists():
+        return 0
+    try:
+        with _pool.connection() as conn:
+            where, params = _users_where(conn, flt, query)
+            sql = "SELECT COUNT(*) FROM users u"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            return int(conn.execute(sql, params).fetchone()[0])
+    except sqlite3.Error:
+        return 0
+
+
+def list_users_page(flt: str = "all", query: str = "", limit: int = 200,
+                    after: tuple[int, int] | None = None) -> list[dict]:
+    """Страница пользователей, свежие сверху (last_seen DESC, ID DESC).
+
+    after = (last_seen, tg_user_id) последней загруженной строки — keyset
+    вместо OFFSET: следующая страница идёт по idx_users_last_seen с места,
+    а не перечитывает уже показанные строки."""
+    if not DB_PATH.exists():
+        return []
+    try:
+        with _pool.connection() as conn:
+            where, params = _users_where(conn, flt, query)
+            if after is not None:
+                where.append("(u.last_seen, u.tg_user_id) < (?, ?)")
+                params.extend(after)
+            sql = f"SELECT {_USER_COLS} FROM users u"
+            if where:
+                sql += " WHERE " + " AND ".join(where)
+            sql += " ORDER BY u.last_seen DESC, u.tg_user_id DESC LIMIT ?"
+            params.append(limit)
+            return [dict(r) for r in conn.execute(sql, params).fetchall()]
+    except sqlite3.Error:
+        return []
+
+
 def list_users() -> list[dict]:
     if not DB_PATH.exists():
         return []
     try:
-        conn = _connect(readonly=True)
-        try:
+        with _pool.connection() as conn:
             cur = conn.execute(
-                "SELECT u.tg_user_id, u.tg_username, u.first_name, "
-                "u.banned, u.whitelisted, u.first_seen, u.last_seen, "
-                "u.entry_tag, "
-                "EXISTS(SELECT 1 FROM favorites f WHERE f.tg_user_id = u.tg_user_id) AS is_fav "
-                "FROM users u ORDER BY u.last_seen DESC"
+                f"SELECT {_USER_COLS} FROM users u ORDER BY u.last_seen DESC"
             )
             return [dict(r) for r in cur.fetchall()]
-        finally:
-            conn.close()
     except sqlite3.Error:
         return []
 
@@ -169,14 +351,11 @@ def list_categories() -> list[dict]:
     if not DB_PATH.exists():
         return []
     try:
-        conn = _connect(readonly=True)
-        try:
+        with _pool.connection() as conn:
             cur = conn.execute(
                 "SELECT id, name, tag, created_at FROM categories ORDER BY name"
             )
             return [dict(r) for r in cur.fetchall()]
-        finally:
-            conn.close()
     except sqlite3.Error:
         return []
 
@@ -214,16 +393,13 @@ def active_slots_count() -> int | None:
     if not DB_PATH.exists():
         return None
     try:
-        conn = _connect(readonly=True)
-        try:
+        with _pool.connection() as conn:
             cur = conn.execute(
                 "SELECT COUNT(*) FROM slots WHERE expires_at >= ?",
                 (int(time.time()),),
             )
             row = cur.fetchone()
             return int(row[0]) if row else 0
-        finally:
-            conn.close()
     except sqlite3.Error:
         return None
 
@@ -232,12 +408,9 @@ def list_active_slots() -> list[dict]:
     if not DB_PATH.exists():
         return []
     try:
-        conn = _connect(readonly=True)
-        try:
-            # Tolerate older schemas that lack last_message: pull "*" then guard.
-            cur = conn.execute("PRAGMA table_info(slots)")
-            cols = {row["name"] for row in cur.fetchall()}
-            has_msg = "last_message" in cols
+        with _pool.connection() as conn:
+            # Tolerate older schemas that lack last_message.
+            has_msg = _has_column(conn, "slots", "last_message")
             select_msg = "s.last_message AS last_message" if has_msg else "NULL AS last_message"
             cur = conn.execute(
                 f"SELECT s.slot_n, s.tg_user_id, s.created_at, s.expires_at, "
@@ -249,8 +422,6 @@ def list_active_slots() -> list[dict]:
                 (int(time.time()),),
             )
             return [dict(r) for r in cur.fetchall()]
-        finally:
-            conn.close()
     except sqlite3.Error:
         return []
 
@@ -260,8 +431,7 @@ def gps_summary() -> dict:
     if not DB_PATH.exists():
         return out
     try:
-        conn = _connect(readonly=True)
-        try:
+        with _pool.connection() as conn:
             cur = conn.execute(
                 "SELECT lat, lon, fix_time, received_at FROM gps_position WHERE id = 1"
             )
@@ -275,8 +445,6 @@ def gps_summary() -> dict:
             row = cur.fetchone()
             if row:
                 out["fav_count"] = int(row[0])
-        finally:
-            conn.close()
     except sqlite3.Error:
         pass
     return out
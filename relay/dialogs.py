@@ -10,13 +10,11 @@ Dialogs — port of designer's modal screens.
 from __future__ import annotations
 
 import sys
-import time
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from PyQt6.QtCore import QByteArray, QRegularExpression, QSize, Qt, pyqtSignal
-from PyQt6.QtGui import QColor, QFont, QPainter, QPixmap, QRegularExpressionValidator
+from PyQt6.QtCore import QByteArray, QRegularExpression, QSize, Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QPainter, QPixmap, QRegularExpressionValidator
 from PyQt6.QtSvg import QSvgRenderer
 from PyQt6.QtWidgets import (
     QAbstractItemView,
@@ -37,14 +35,12 @@ from PyQt6.QtWidgets import (
     QListWidgetItem,
     QMessageBox,
     QPlainTextEdit,
-    QProgressBar,
     QPushButton,
     QRadioButton,
     QScrollArea,
     QSpinBox,
     QStackedWidget,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QVBoxLayout,
     QWidget,
 )
@@ -54,8 +50,9 @@ import i18n_gui
 import settings as settings_mod
 from i18n_gui import t as _t
 from icons import make_icon
+from table_models import ProgressDelegate, SlotsModel, UsersModel
 from theme import PALETTE
-from widgets import Badge, GlowDot, ToolBtn, ToolSep
+from widgets import GlowDot, ToolBtn, ToolSep
 
 
 # ===========================================================================
@@ -300,6 +297,35 @@ class SettingsDialog(QDialog):
         ))
         v.addWidget(gb_dn)
 
+        gb_wh = QGroupBox("ПОЛУЧЕНИЕ АПДЕЙТОВ")
+        f_wh = QFormLayout(gb_wh)
+        f_wh.setVerticalSpacing(8)
+        self.cb_tg_mode = QComboBox()
+        self.cb_tg_mode.addItem("Long polling (по умолчанию)", "polling")
+        self.cb_tg_mode.addItem("Webhook (за reverse proxy)", "webhook")
+        self.cb_tg_mode.currentIndexChanged.connect(self._mark_touched)
+        f_wh.addRow("Режим:", self.cb_tg_mode)
+        self.ed_webhook_url = QLineEdit()
+        self.ed_webhook_url.setPlaceholderText("https://relay.example.com/tg/<секрет>")
+        self.ed_webhook_url.textChanged.connect(self._mark_touched)
+        f_wh.addRow("Webhook URL:", self.ed_webhook_url)
+        self.sp_webhook_port = self._spin(1, 65535)
+        f_wh.addRow("Локальный порт:", self.sp_webhook_port)
+        self.ed_webhook_secret = QLineEdit()
+        self.ed_webhook_secret.setEchoMode(QLineEdit.EchoMode.Password)
+        self.ed_webhook_secret.setValidator(
+            QRegularExpressionValidator(QRegularExpression(r"[A-Za-z0-9_-]{0,256}")))
+        self.ed_webhook_secret.textChanged.connect(self._mark_touched)
+        f_wh.addRow("Secret token:", self.ed_webhook_secret)
+        f_wh.addRow("", _hint(
+            "Webhook: Telegram сам шлёт апдейты на URL, без long-poll "
+            "запросов. Нужен сервер с доменом и HTTPS — TLS снимает Caddy и "
+            "проксирует на 127.0.0.1:порт (см. deploy/INSTALL_LINUX.md). "
+            "Secret token Telegram кладёт в заголовок каждого запроса — "
+            "чужие POST'ы отбрасываются. Дома за NAT оставь polling."
+        ))
+        v.addWidget(gb_wh)
+
         return self._section_wrap(box)
 
     def _build_pocket(self) -> QWidget:
@@ -425,10 +451,31 @@ class SettingsDialog(QDialog):
         f1 = QFormLayout(gb1)
         f1.setVerticalSpacing(8)
         self.sp_max_text = self._spin(20, 230)
+        self.sp_max_bytes = self._spin(40, 233)
+        self.sp_tx_queue = self._spin(1, 1000)
+        self.sp_dispatch = self._spin(1, 64)
         self.sp_slot_ttl = self._spin(1, 168)
         self.sp_slot_sticky = self._spin(1, 168)
         self.sp_user_pref = self._spin(3, 30)
         f1.addRow("Лимит символов в сообщении:", self.sp_max_text)
+        f1.addRow("Лимит пакета, байт:", self.sp_max_bytes)
+        f1.addRow("", _hint(
+            "Эфир считает байты, не символы: кириллица занимает 2 байта. "
+            "Длинные сообщения режутся на пакеты до этого лимита (вместе с "
+            "заголовком [@N имя ЧЧ:ММ i/N]). Потолок Meshtastic — 233."
+        ))
+        f1.addRow("Очередь на ноду, пакетов:", self.sp_tx_queue)
+        f1.addRow("", _hint(
+            "Сколько пакетов может ждать отправки в каждой полосе приоритета "
+            "(SOS → сообщения → повторы → AI → служебные). Сверх лимита "
+            "сообщение сразу уходит в retry, а не висит в памяти."
+        ))
+        f1.addRow("Параллельных событий с ноды:", self.sp_dispatch)
+        f1.addRow("", _hint(
+            "Сколько ответов / ACK'ов / AI-запросов с кармана обрабатываются "
+            "одновременно. Внутри одного слота порядок сохраняется; долгий "
+            "AI-ответ не задерживает остальные."
+        ))
         f1.addRow("TTL слота (до ответа), ч:", self.sp_slot_ttl)
         f1.addRow("Sticky TTL (после ответа), ч:", self.sp_slot_sticky)
         f1.addRow("Длина username в префиксе:", self.sp_user_pref)
@@ -662,6 +709,81 @@ class SettingsDialog(QDialog):
         ))
         v.addWidget(gb2)
 
+        gb3 = QGroupBox("ФОРМАТ ПАКЕТОВ")
+        v3 = QVBoxLayout(gb3)
+        self.cb_compact_headers = QCheckBox(
+            "Компактные заголовки: «3>vasya: текст» вместо «[@3 vasya 16:15] текст»"
+        )
+        self.cb_compact_headers.toggled.connect(self._mark_touched)
+        v3.addWidget(self.cb_compact_headers)
+        v3.addWidget(_hint(
+            "Без времени (pocket сам показывает время приёма), части длинного "
+            "сообщения — «3a> / 3b> / 3C>», заглавная буква = последняя часть. "
+            "Экономит 8–15 байт на пакет. Ответить можно как «@3 текст», "
+            "так и «3> текст»."
+        ))
+        self.cb_mesh_compression = QCheckBox(
+            "Сжимать длинные сообщения (маркер «~z1», нужен декодер на pocket)"
+        )
+        self.cb_mesh_compression.toggled.connect(self._mark_touched)
+        v3.addWidget(self.cb_mesh_compression)
+        v3.addWidget(_hint(
+            "Многопакетные сообщения сжимаются словарём под русский/английский "
+            "чат — обычно в 1.5–2 раза меньше пакетов. Сжатый вариант уходит, "
+            "только если пакетов реально меньше. Стоковая прошивка Meshtastic "
+            "покажет «~z1…» как есть — включай, если на pocket-стороне есть "
+            "клиент, который это раскодирует."
+        ))
+        row = QHBoxLayout()
+        row.addWidget(QLabel("Склейка коротких сообщений, окно (мс):"))
+        self.sp_batch_window = self._spin(0, 2000)
+        self.sp_batch_window.setSingleStep(100)
+        row.addWidget(self.sp_batch_window)
+        row.addStretch(1)
+        v3.addLayout(row)
+        v3.addWidget(_hint(
+            "Если за это окно пришло несколько коротких сообщений от разных "
+            "людей — уйдут одним пакетом, каждое с новой строки. Меньше "
+            "эфирного времени в пиках. 0 — выкл; разумно 300–800 мс. "
+            "Срочные (#SOS) не ждут."
+        ))
+        v.addWidget(gb3)
+
+        gb4 = QGroupBox("ЭФИР · DUTY CYCLE")
+        f4 = QFormLayout(gb4)
+        self.cb_lora_preset = QComboBox()
+        for preset in settings_mod.LORA_PRESETS:
+            self.cb_lora_preset.addItem(preset, preset)
+        self.cb_lora_preset.currentIndexChanged.connect(self._mark_touched)
+        f4.addRow("Пресет модема:", self.cb_lora_preset)
+        self.sp_duty_cycle = self._spin(0, 100)
+        self.sp_duty_cycle.setSuffix(" %")
+        f4.addRow("Лимит за час:", self.sp_duty_cycle)
+        f4.addRow("", _hint(
+            "Пресет — как в приложении Meshtastic на домашней ноде: по нему "
+            "оценивается время в эфире каждого пакета. В EU868 нода может "
+            "передавать не больше 10 % времени в час — там ставь 10. Ближе к "
+            "лимиту relay "
+            "сначала придерживает служебные ответы и AI (с 70 %), потом "
+            "повторы (с 85 %); сообщения юзеров — до 100 %, SOS — всегда. "
+            "0 (по умолчанию) — без лимита, эфир только считается (!ping, "
+            "статус ноды)."
+        ))
+        v.addWidget(gb4)
+
+        gb5 = QGroupBox("ДУБЛИ ВХОДЯЩИХ")
+        f5 = QFormLayout(gb5)
+        self.sp_rx_dedup_text = self._spin(0, 3600)
+        self.sp_rx_dedup_text.setSuffix(" с")
+        f5.addRow("Одинаковый текст, окно:", self.sp_rx_dedup_text)
+        f5.addRow("", _hint(
+            "Повтор пакета с тем же id (прошивка переслала после потерянного "
+            "ACK, соседняя нода ретранслировала) отбрасывается всегда — юзер "
+            "не получит ответ дважды. Окно > 0 — ещё и одинаковый текст от "
+            "той же ноды, отправленный заново. 0 — только по id."
+        ))
+        v.addWidget(gb5)
+
         return self._section_wrap(box)
 
     # ─── Logs ──────────────────────────────────────────────────────────
@@ -670,7 +792,7 @@ class SettingsDialog(QDialog):
         v = QVBoxLayout(box)
         v.setSpacing(12)
         v.addWidget(_heading("Логи",
-                             "Файл relay.log с ротацией"))
+                             "Файл relay.log с ротацией, живой статус для окна"))
 
         gb = QGroupBox("ФАЙЛ ЛОГОВ")
         f = QFormLayout(gb)
@@ -694,6 +816,33 @@ class SettingsDialog(QDialog):
         ))
         v.addWidget(gb)
 
+        gb2 = QGroupBox("ЖИВОЙ СТАТУС ДЛЯ GUI")
+        f2 = QFormLayout(gb2)
+        f2.setVerticalSpacing(8)
+        self.sp_live_feed = self._spin(0, 65535)
+        f2.addRow("Порт (127.0.0.1):", self.sp_live_feed)
+        f2.addRow("", _hint(
+            "Релей сам присылает окну слоты, ACK'и, пакеты, очереди и GPS — "
+            "статус обновляется за доли секунды без опроса базы. Слушает "
+            "только локальный адрес, но без пароля: тексты, ники и GPS увидит "
+            "любой процесс на этой машине — включай, если ты на ней один "
+            "(например 47211). 0 — выкл (окно читает relay.db по таймеру)."
+        ))
+        v.addWidget(gb2)
+
+        gb3 = QGroupBox("МЕТРИКИ (PROMETHEUS)")
+        f3 = QFormLayout(gb3)
+        f3.setVerticalSpacing(8)
+        self.sp_metrics = self._spin(0, 65535)
+        f3.addRow("Порт (127.0.0.1):", self.sp_metrics)
+        f3.addRow("", _hint(
+            "http://127.0.0.1:<порт>/metrics — пакеты TX/RX, ACK/NAK, retry, "
+            "задержки отправки и ACK, глубина очередей. Для Prometheus / "
+            "Grafana или просто браузера. Краткая сводка есть и в !ping. "
+            "0 — выкл."
+        ))
+        v.addWidget(gb3)
+
         return self._section_wrap(box)
 
     # ─── AI helper ─────────────────────────────────────────────────────
@@ -919,6 +1068,11 @@ class SettingsDialog(QDialog):
         self.ed_token.setText(s.get("bot_token") or "")
         self.ed_owner.setText(str(s.get("owner_id") or ""))
         self.ed_display_name.setText(s.get("display_name") or "Михаил")
+        idx = self.cb_tg_mode.findData(str(s.get("tg_mode") or "polling").lower())
+        self.cb_tg_mode.setCurrentIndex(max(idx, 0))
+        self.ed_webhook_url.setText(s.get("webhook_url") or "")
+        self.sp_webhook_port.setValue(int(s.get("webhook_port") or 8443))
+        self.ed_webhook_secret.setText(s.get("webhook_secret") or "")
         self.ed_pocket.setText(s.get("pocket_node_id") or "")
         # Device model
         target_model = (s.get("node_model") or "generic")
@@ -939,6 +1093,9 @@ class SettingsDialog(QDialog):
         for tg_id in (s.get("sos_recipients") or []):
             self._sos_append(int(tg_id))
         self.sp_max_text.setValue(int(s.get("max_text_length") or 170))
+        self.sp_max_bytes.setValue(int(s.get("max_packet_bytes") or 200))
+        self.sp_tx_queue.setValue(int(s.get("mesh_tx_queue_limit") or 64))
+        self.sp_dispatch.setValue(int(s.get("mesh_dispatch_concurrency") or 8))
         self.sp_slot_ttl.setValue(int(s.get("slot_ttl_hours") or 20))
         self.sp_slot_sticky.setValue(int(s.get("slot_sticky_hours") or 10))
         self.sp_user_pref.setValue(int(s.get("max_username_in_prefix") or 10))
@@ -952,11 +1109,22 @@ class SettingsDialog(QDialog):
         delivery = (s.get("mesh_delivery_mode") or "reliable").lower()
         self.cb_delivery_fast.setChecked(delivery == "fast")
         self.cb_delivery_reliable.setChecked(delivery != "fast")
+        self.cb_compact_headers.setChecked(bool(s.get("compact_headers", False)))
+        self.cb_mesh_compression.setChecked(bool(s.get("mesh_compression", False)))
+        self.sp_batch_window.setValue(int(s.get("mesh_batch_window_ms") or 0))
+        preset = str(s.get("lora_preset") or "LONG_FAST").upper()
+        idx = self.cb_lora_preset.findData(preset)
+        self.cb_lora_preset.setCurrentIndex(idx if idx >= 0 else
+                                            self.cb_lora_preset.findData("LONG_FAST"))
+        self.sp_duty_cycle.setValue(int(s.get("duty_cycle_pct") or 0))
+        self.sp_rx_dedup_text.setValue(int(s.get("mesh_rx_dedup_text_sec") or 0))
 
         # Logs
         self.cb_log_enabled.setChecked(bool(s.get("log_file_enabled", True)))
         self.sp_log_max_mb.setValue(int(s.get("log_file_max_mb") or 5))
         self.sp_log_keep.setValue(int(s.get("log_file_keep") or 5))
+        self.sp_live_feed.setValue(int(s.get("live_feed_port") or 0))
+        self.sp_metrics.setValue(int(s.get("metrics_port") or 0))
 
         # AI
         self.cb_ai_enabled.setChecked(bool(s.get("ai_enabled", False)))
@@ -990,8 +1158,15 @@ class SettingsDialog(QDialog):
             "pocket_node_id":         self.ed_pocket.text().strip(),
             "last_com_port":          self._data.get("last_com_port", ""),
             "display_name":           self.ed_display_name.text().strip() or "Михаил",
+            "tg_mode":                self.cb_tg_mode.currentData() or "polling",
+            "webhook_url":            self.ed_webhook_url.text().strip(),
+            "webhook_port":           self.sp_webhook_port.value(),
+            "webhook_secret":         self.ed_webhook_secret.text().strip(),
             "node_model":             self.cb_node_model.currentData() or "generic",
             "max_text_length":        self.sp_max_text.value(),
+            "max_packet_bytes":       self.sp_max_bytes.value(),
+            "mesh_tx_queue_limit":    self.sp_tx_queue.value(),
+            "mesh_dispatch_concurrency": self.sp_dispatch.value(),
             "slot_ttl_hours":         self.sp_slot_ttl.value(),
             "slot_sticky_hours":      self.sp_slot_sticky.value(),
             "max_username_in_prefix": self.sp_user_pref.value(),
@@ -1013,10 +1188,18 @@ class SettingsDialog(QDialog):
             "mesh_hop_limit":         self.sp_hop_limit.value(),
             "mesh_delivery_mode":     ("fast" if self.cb_delivery_fast.isChecked()
                                        else "reliable"),
+            "compact_headers":        self.cb_compact_headers.isChecked(),
+            "mesh_compression":       self.cb_mesh_compression.isChecked(),
+            "mesh_batch_window_ms":   self.sp_batch_window.value(),
+            "lora_preset":            self.cb_lora_preset.currentData() or "LONG_FAST",
+            "duty_cycle_pct":         self.sp_duty_cycle.value(),
+            "mesh_rx_dedup_text_sec": self.sp_rx_dedup_text.value(),
             # Logs
             "log_file_enabled":       self.cb_log_enabled.isChecked(),
             "log_file_max_mb":        self.sp_log_max_mb.value(),
             "log_file_keep":          self.sp_log_keep.value(),
+            "live_feed_port":         self.sp_live_feed.value(),
+            "metrics_port":           self.sp_metrics.value(),
             # AI
             "ai_enabled":             self.cb_ai_enabled.isChecked(),
             "ai_trigger_tag":         (self.ed_ai_trigger.text().strip().lower() or "ai"),
@@ -1178,9 +1361,14 @@ class SettingsDialog(QDialog):
 # UsersDialog
 # ===========================================================================
 class UsersDialog(QDialog):
-    """Top filter pills + search + table of all known users."""
+    """Top filter pills + search + table of all known users.
+
+    Таблица — QTableView над UsersModel: фильтр и поиск выполняет SQLite,
+    строки подгружаются страницами при прокрутке, «Обновить» применяет
+    только разницу."""
 
     COL_NAME, COL_TG, COL_CAT, COL_WL, COL_FAV, COL_BAN, COL_LAST = range(7)
+    SEARCH_DEBOUNCE_MS = 150
 
     def __init__(self, parent: Optional[QWidget] = None) -> None:
         super().__init__(parent)
@@ -1188,8 +1376,12 @@ class UsersDialog(QDialog):
         self.resize(940, 580)
         self._filter = "all"
         self._query = ""
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._requery)
         self._build_ui()
-        self._refresh()
+        self._requery()
 
     def _build_ui(self) -> None:
         root = QVBoxLayout(self)
@@ -1239,16 +1431,10 @@ class UsersDialog(QDialog):
         root.addWidget(filt)
 
         # Table
-        self.table = QTableWidget(0, 7)
-        self.table.setHorizontalHeaderLabels([
-            "Пользователь",
-            "TG ID",
-            "Категория",
-            "Белый список",
-            "Избранный",
-            "Бан",
-            "Последняя активность",
-        ])
+        self.model = UsersModel(self)
+        self.model.rowsInserted.connect(self._update_count)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         h = self.table.horizontalHeader()
         # Name and TG-id are content-sized; flag columns get fixed width
         # so labels don't wrap; last col stretches to fill the rest.
@@ -1293,83 +1479,28 @@ class UsersDialog(QDialog):
             btn.setChecked(k == fid)
             btn.setProperty("role", "primary" if k == fid else "ghost")
             btn.style().unpolish(btn); btn.style().polish(btn)
-        self._refresh()
+        self._requery()
 
     def _on_search(self, text: str) -> None:
-        self._query = text.lower()
-        self._refresh()
+        # Запрос в БД — по паузе в наборе, а не на каждую клавишу.
+        self._query = text
+        self._search_timer.start()
+
+    def _requery(self) -> None:
+        self._search_timer.stop()
+        self.model.set_query(self._filter, self._query)
+        self._update_count()
 
     def _refresh(self) -> None:
-        users = db.list_users()
-        # filter
-        def matches(u: dict) -> bool:
-            if self._filter == "wl"  and not u.get("whitelisted"): return False
-            if self._filter == "fav" and not u.get("is_fav"):       return False
-            if self._filter == "ban" and not u.get("banned"):       return False
-            if self._query:
-                blob = " ".join([
-                    str(u.get("tg_user_id", "")),
-                    u.get("tg_username") or "",
-                    u.get("first_name") or "",
-                ]).lower()
-                if self._query not in blob:
-                    return False
-            return True
-
-        rows = [u for u in users if matches(u)]
-        self.table.setRowCount(len(rows))
-        for r, u in enumerate(rows):
-            self._fill_row(r, u)
-        self._count_lbl.setText(f"показано {len(rows)} / {len(users)}")
-
-    def _fill_row(self, r: int, u: dict) -> None:
-        tg_id = u["tg_user_id"]
-        name = u.get("first_name") or "—"
-        uname = u.get("tg_username") or ""
-        last = datetime.fromtimestamp(u["last_seen"]).strftime("%Y-%m-%d %H:%M")
-        cat = u.get("entry_tag") or ""
-
-        # Name cell — two-line
-        nm = QTableWidgetItem()
-        nm.setData(Qt.ItemDataRole.UserRole, tg_id)
-        nm.setText(f"{name}\n@{uname}" if uname else name)
-        nm.setForeground(QColor(PALETTE["t1"] if not u.get("banned") else PALETTE["t3"]))
-        self.table.setItem(r, self.COL_NAME, nm)
-
-        tg = QTableWidgetItem(str(tg_id))
-        tg.setFont(QFont("Consolas", 9))
-        tg.setForeground(QColor(PALETTE["t2"]))
-        self.table.setItem(r, self.COL_TG, tg)
-
-        if cat:
-            cat_w = Badge("cat", text=cat)
-            wrap = QWidget(); wl = QHBoxLayout(wrap); wl.setContentsMargins(8, 0, 8, 0); wl.addWidget(cat_w); wl.addStretch(1)
-            self.table.setCellWidget(r, self.COL_CAT, wrap)
-        else:
-            self.table.setItem(r, self.COL_CAT, QTableWidgetItem("—"))
-
-        # checkboxes for WL/FAV/BAN
-        self._set_check(r, self.COL_WL, bool(u.get("whitelisted")),
-                        lambda v, tid=tg_id: db.set_flag(tid, "whitelisted", v))
-        self._set_check(r, self.COL_FAV, bool(u.get("is_fav")),
-                        lambda v, tid=tg_id: db.set_fav(tid, v))
-        self._set_check(r, self.COL_BAN, bool(u.get("banned")),
-                        lambda v, tid=tg_id: db.set_flag(tid, "banned", v))
-
-        last_w = QTableWidgetItem(last)
-        last_w.setForeground(QColor(PALETTE["t3"]))
-        self.table.setItem(r, self.COL_LAST, last_w)
-
-    def _set_check(self, row: int, col: int, checked: bool, on_toggle) -> None:
-        cb = QCheckBox()
-        cb.setChecked(checked)
-        cb.toggled.connect(on_toggle)
-        wrap = QWidget()
-        lay = QHBoxLayout(wrap)
-        lay.setContentsMargins(0, 0, 0, 0)
-        lay.addWidget(cb)
-        lay.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.table.setCellWidget(row, col, wrap)
+        self.model.refresh()
+        self._update_count()
+
+    def _update_count(self, *_) -> None:
+        self._count_lbl.setText(
+            f"показано {self.model.matched} / {self.model.total}"
+            + (f" · загружено {self.model.rowCount()}"
+               if self.model.rowCount() < self.model.matched else "")
+        )
 
     def _add_manual(self) -> None:
         text, ok = QInputDialog.getText(
@@ -1392,12 +1523,18 @@ class UsersDialog(QDialog):
 # SlotsDialog — read-only view of active @N slots
 # ===========================================================================
 class SlotsDialog(QDialog):
+    REFRESH_MS = 5000
+
     def __init__(self, parent: Optional[QWidget] = None) -> None:
         super().__init__(parent)
         self.setWindowTitle("Активные слоты @N")
         self.resize(820, 500)
         self._build_ui()
         self._refresh()
+        # Таймер TTL: обновление — это разница строк, а не пересборка.
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._refresh)
+        self._timer.start(self.REFRESH_MS)
 
     def _build_ui(self) -> None:
         root = QVBoxLayout(self)
@@ -1422,10 +1559,11 @@ class SlotsDialog(QDialog):
         hl.addWidget(bre)
         root.addWidget(head)
 
-        self.table = QTableWidget(0, 6)
-        self.table.setHorizontalHeaderLabels(
-            ["Слот", "Пользователь", "Сообщение", "Закреплён", "Прогресс", "Истекает через"]
-        )
+        self.model = SlotsModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setItemDelegateForColumn(SlotsModel.COL_PROGRESS, ProgressDelegate(self.table))
+        self.table.verticalHeader().setDefaultSectionSize(28)
         h = self.table.horizontalHeader()
         h.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         h.setSectionResizeMode(1, QHeaderView.ResizeMode.Interactive)
@@ -1459,75 +1597,10 @@ class SlotsDialog(QDialog):
         root.addWidget(foot)
 
     def _refresh(self) -> None:
-        slots = db.list_active_slots()
-        self.table.setRowCount(len(slots))
-        now = int(time.time())
-        for r, s in enumerate(slots):
-            slot_n = s["slot_n"]
-            name = s.get("tg_username") or s.get("first_name") or str(s["tg_user_id"])
-            tag = s.get("entry_tag")
-            label = f"{tag}:{name}" if tag else name
-            sticky = bool(s.get("was_replied"))
-            last_msg = (s.get("last_message") or "").strip() or "—"
-            remaining = max(0, s["expires_at"] - now)
-            total = s["expires_at"] - s["created_at"] or remaining
-            pct = int(100 * remaining / total) if total > 0 else 0
-            hh = remaining // 3600
-            mm = (remaining % 3600) // 60
-
-            # @N
-            slot_w = QTableWidgetItem(f"@{slot_n}")
-            slot_w.setFont(QFont("Consolas", 10, QFont.Weight.Bold))
-            slot_w.setForeground(QColor(PALETTE["accent"]))
-            slot_w.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.table.setItem(r, 0, slot_w)
-
-            # Пользователь
-            name_w = QTableWidgetItem(label)
-            name_w.setFont(QFont("Consolas", 9))
-            self.table.setItem(r, 1, name_w)
-
-            # Сообщение (last_message, italic)
-            msg_w = QTableWidgetItem(last_msg)
-            msg_w.setForeground(QColor(PALETTE["t2"]))
-            f = QFont(); f.setItalic(True); f.setPointSize(10)
-            msg_w.setFont(f)
-            msg_w.setToolTip(last_msg)
-            self.table.setItem(r, 2, msg_w)
-
-            # Закреплён ★
-            sticky_w = QTableWidgetItem("★ да" if sticky else "—")
-            sticky_w.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            sticky_w.setForeground(QColor(PALETTE["warn"] if sticky else PALETTE["t4"]))
-            f = QFont()
-            if sticky:
-                f.setBold(True)
-            sticky_w.setFont(f)
-            self.table.setItem(r, 3, sticky_w)
-
-            # Прогресс
-            prog = QProgressBar()
-            prog.setTextVisible(False)
-            prog.setRange(0, 100)
-            prog.setValue(pct)
-            prog.setFixedHeight(8)
-            wrap = QWidget()
-            wl = QHBoxLayout(wrap)
-            wl.setContentsMargins(8, 0, 8, 0)
-            wl.addWidget(prog)
-            self.table.setCellWidget(r, 4, wrap)
-
-            # Истекает через
-            tone = "err" if pct < 10 else "warn" if pct < 20 else "t2"
-            time_w = QTableWidgetItem(f"{hh:02d}ч {mm:02d}мин")
-            time_w.setFont(QFont("Consolas", 9))
-            time_w.setForeground(QColor(PALETTE[tone]))
-            self.table.setItem(r, 5, time_w)
-
-            self.table.setRowHeight(r, 28)
-
+        self.model.refresh()
         self._info.setText(
-            f"всего активных слотов: {len(slots)} · обновляется вручную (нажми «Обновить»)"
+            f"всего активных слотов: {self.model.rowCount()} · "
+            f"обновляется каждые {self.REFRESH_MS // 1000} с"
         )
 
 
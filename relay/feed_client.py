@@ -0,0 +1,119 @@
+"""
+Подписчик на push-канал состояния relay (relay.py → _LiveFeed).
+
+relay.py слушает 127.0.0.1:LIVE_FEED_PORT и шлёт JSON-строки событий:
+hello / slots (снимок), slot / slot_free, ack, rx / tx, pocket, gps и раз
+в секунду stats (очереди + pocket last-heard, он же heartbeat). GUI держит
+одно соединение через QTcpSocket — без потоков, всё в event loop'е Qt — и
+переподключается сам, пока релей запущен.
+"""
+from __future__ import annotations
+
+import json
+import time
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtNetwork import QAbstractSocket, QTcpSocket
+
+
+class LiveFeedClient(QObject):
+    """`received(dict)` — каждое событие; `liveChanged(bool)` — канал поднялся /
+    упал. `is_live()` = подключены и stats приходил недавно: по нему GUI
+    решает, брать ли данные из канала или по-старому опрашивать relay.db."""
+
+    received = pyqtSignal(dict)
+    liveChanged = pyqtSignal(bool)
+
+    RECONNECT_MS = 1500
+    STALE_S = 5.0        # stats шлётся раз в секунду; 5 с тишины — канал мёртв
+
+    def __init__(self, port: int, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.port = port
+        self._sock = QTcpSocket(self)
+        self._sock.readyRead.connect(self._on_ready_read)
+        self._sock.connected.connect(self._on_connected)
+        self._sock.disconnected.connect(self._on_disconnected)
+        self._sock.errorOccurred.connect(self._on_error)
+        self._buf = b""
+        self._wanted = False
+        self._last_event = 0.0
+        self._live = False
+        self._retry = QTimer(self)
+        self._retry.setSingleShot(True)
+        self._retry.timeout.connect(self._connect)
+
+    # --- управление ------------------------------------------------------
+    def start(self) -> None:
+        """Релей запущен — подключаемся (и переподключаемся до stop())."""
+        if not self.port:
+            return
+        self._wanted = True
+        self._retry.start(300)   # дать relay'ю поднять сокет
+
+    def stop(self) -> None:
+        self._wanted = False
+        self._retry.stop()
+        self._sock.abort()
+        self._buf = b""
+        self._set_live(False)
+
+    def is_live(self) -> bool:
+        if self._live and time.monotonic() - self._last_event > self.STALE_S:
+            self._set_live(False)
+        return self._live
+
+    # --- сокет -----------------------------------------------------------
+    def _connect(self) -> None:
+        if not self._wanted:
+            return
+        if self._sock.state() != QAbstractSocket.SocketState.UnconnectedState:
+            return
+        self._sock.connectToHost("127.0.0.1", self.port)
+
+    def _schedule_reconnect(self) -> None:
+        if self._wanted:
+            self._retry.start(self.RECONNECT_MS)
+
+    def _on_connected(self) -> None:
+        self._buf = b""
+
+    def _on_disconnected(self) -> None:
+        self._set_live(False)
+        self._schedule_reconnect()
+
+    def _on_error(self, _err) -> None:
+        # ConnectionRefused до старта relay'я — штатно, просто ждём.
+        if self._sock.state() == QAbstractSocket.SocketState.UnconnectedState:
+            self._set_live(False)
+            self._schedule_reconnect()
+
+    def _on_ready_read(self) -> None:
+        self._buf += bytes(self._sock.readAll())
+        *lines, self._buf = self._buf.split(b"\n")
+        for line in lines:
+            evt = decode_line(line)
+            if evt is None:
+                continue
+            self._last_event = time.monotonic()
+            self._set_live(True)
+            self.received.emit(evt)
+
+    def _set_live(self, live: bool) -> None:
+        if live != self._live:
+            self._live = live
+            self.liveChanged.emit(live)
+
+
+def decode_line(line: bytes) -> dict | None:
+    """Одна строка канала → событие. Битые / пустые строки — None."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        evt = json.loads(line.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError):
+        return None
+    if not isinstance(evt, dict) or "kind" not in evt:
+        return None
+    return evt
@@ -9,6 +9,8 @@ Meshgram Relay — main PyQt6 window.
     statusbar: StatusCell-ячейки с GlowDot
 
 Процесс relay.py запускается как QProcess; стандартные потоки идут в LogConsole.
+Живой статус (слоты, карман, очереди, GPS) relay присылает сам через
+LiveFeedClient; пока канала нет — опрашиваем relay.db по таймеру.
 """
 from __future__ import annotations
 
@@ -66,6 +68,7 @@ from dialogs import (
     SlotsDialog,
     UsersDialog,
 )
+from feed_client import LiveFeedClient
 from i18n_gui import t as _t
 from icons import make_icon
 from theme import PALETTE, apply_theme
@@ -110,6 +113,16 @@ class Relay(QMainWindow):
         app_icon = self._load_app_icon()
         self.setWindowIcon(app_icon)
 
+        # Состояние из live feed'а relay'я (см. _on_feed_event).
+        self._feed_slots: dict[int, dict] = {}
+        self._feed_stats: dict = {}
+        self._feed_gps: dict = {}
+        self._feed_hello: dict = {}
+        self._feed_counts = {"rx": 0, "tx": 0, "ack": 0, "nak": 0}
+        self._feed = LiveFeedClient(int(self._cfg.get("live_feed_port") or 0), self)
+        self._feed.received.connect(self._on_feed_event)
+        self._feed.liveChanged.connect(lambda _live: self._refresh_status())
+
         self._build_menu()
         self._build_central()
         self._build_statusbar()
@@ -372,7 +385,7 @@ class Relay(QMainWindow):
         self.btn_pause.setProperty("role", "ghost")
         self.btn_pause.setCheckable(True)
         self.btn_pause.setFixedWidth(28)
-        self.btn_pause.setToolTip("Пауза автопрокрутки лога")
+        self.btn_pause.setToolTip("Пауза лога (строки копятся и появятся после)")
         self.btn_pause.toggled.connect(self._on_pause_toggle)
         tb.addWidget(self.btn_pause)
 
@@ -532,47 +545,19 @@ class Relay(QMainWindow):
             self.sc_bot.setLabel("Бот: остановлен")
             self.sc_bot.setTone("off", live=False)
 
-        # Нода — пока без отдельного сигнала живой связи (внутренние данные
-        # в подпроцессе); ориентируемся на то, что бот запущен и порт указан.
+        # Канал relay → GUI жив: слоты / GPS / карман берём из него, relay.db
+        # не трогаем. Иначе — опрос БД, как раньше.
+        live = running and self._feed.is_live()
+
         port = self.port_combo.currentData() or ""
-        if running and port:
-            self.sc_node.setLabel(f"Нода: {port}")
-            self.sc_node.setTone("ok", live=True)
-        elif port:
-            self.sc_node.setLabel(f"Нода: {port}")
-            self.sc_node.setTone("off", live=False)
-        else:
-            self.sc_node.setLabel("Нода: порт не выбран")
-            self.sc_node.setTone("warn", live=False)
+        self._update_node_cell(running, port, live)
 
         # Слоты
-        n = db.active_slots_count()
-        if n is None:
-            self.sc_slots.setLabel("Слоты: —")
-            self.sc_slots.setTone("off", live=False)
-        else:
-            self.sc_slots.setLabel(f"Слоты: {n}")
-            self.sc_slots.setTone("info" if n > 0 else "off", live=n > 0)
+        n = self._active_slots_count(live)
+        self._update_slots_cell(n)
 
         # GPS — показываем только если включено
-        if self._cfg.get("gps_enabled"):
-            self.sc_gps.show()
-            info = db.gps_summary()
-            if not info["have_fix"]:
-                self.sc_gps.setLabel("GPS β: нет фикса")
-                self.sc_gps.setTone("warn", live=False)
-            else:
-                age = info["age_min"] or 0
-                if age <= int(self._cfg.get("gps_fix_fresh_min") or 5):
-                    tone = "ok"
-                elif age <= int(self._cfg.get("gps_fix_stale_min") or 30):
-                    tone = "warn"
-                else:
-                    tone = "err"
-                self.sc_gps.setLabel(f"GPS β: {age} мин назад")
-                self.sc_gps.setTone(tone, live=False)
-        else:
-            self.sc_gps.hide()
+        self._update_gps_cell(live)
 
         # SOS — только если включено
         if self._cfg.get("sos_enabled"):
@@ -602,13 +587,14 @@ class Relay(QMainWindow):
             slots=n if n is not None else 0,
             wl=bool(self._cfg.get("whitelist_enabled")),
             running=running,
+            uptime=self._feed_uptime() if live else "—",
         )
 
         # Active slots compact list
-        self._refresh_slots_list()
+        self._refresh_slots_list(live)
 
         # Log line count
-        line_count = self.console.document().blockCount()
+        line_count = self.console.line_count()
         self._log_count_lbl.setText(f"{line_count} строк")
 
         # Start button enabled iff config valid
@@ -617,8 +603,163 @@ class Relay(QMainWindow):
         self.btn_restart.setEnabled(running)
         self.port_combo.setEnabled(not running)
 
-    def _refresh_slots_list(self) -> None:
-        slots = db.list_active_slots()[:8]
+    def _update_node_cell(self, running: bool, port: str, live: bool) -> None:
+        # Без канала relay'я отдельного сигнала живой связи нет — ориентируемся
+        # на то, что бот запущен и порт указан. С каналом — на last-heard
+        # кармана и состояние USB-интерфейса.
+        if running and port and live:
+            st = self._feed_stats
+            heard = st.get("pocket_last_heard")
+            c = self._feed_counts
+            self.sc_node.setToolTip(
+                f"RX {c['rx']} · TX {c['tx']} · ACK {c['ack']} / NAK {c['nak']}\n"
+                f"Очередь TX: {sum((st.get('tx_queue') or {}).values())} · "
+                f"retry: {st.get('retry_pending', 0)}\n"
+                + self._airtime_text(st)
+            )
+            if not st.get("mesh_connected", True):
+                self.sc_node.setLabel(f"Нода: {port} · USB нет")
+                self.sc_node.setTone("err", live=False)
+                return
+            if not heard:
+                self.sc_node.setLabel(f"Нода: {port} · карман не слышно")
+                self.sc_node.setTone("warn", live=True)
+                return
+            age_min = max(0, int((time.time() - heard) / 60))
+            if age_min <= int(self._cfg.get("pocket_fresh_min") or 10):
+                tone = "ok"
+            elif age_min <= int(self._cfg.get("pocket_stale_min") or 60):
+                tone = "warn"
+            else:
+                tone = "err"
+            label = f"Нода: {port} · карман {age_min} мин"
+            # Эфир близко к лимиту duty cycle — часть TX уже придерживается.
+            air_pct = st.get("airtime_pct") or 0
+            if air_pct >= 70:
+                label += f" · эфир {air_pct:.0f}%"
+                if tone == "ok":
+                    tone = "warn"
+            self.sc_node.setLabel(label)
+            self.sc_node.setTone(tone, live=True)
+        elif running and port:
+            self.sc_node.setLabel(f"Нода: {port}")
+            self.sc_node.setTone("ok", live=True)
+        elif port:
+            self.sc_node.setLabel(f"Нода: {port}")
+            self.sc_node.setTone("off", live=False)
+        else:
+            self.sc_node.setLabel("Нода: порт не выбран")
+            self.sc_node.setTone("warn", live=False)
+
+    def _active_slots_count(self, live: bool) -> Optional[int]:
+        if not live:
+            return db.active_slots_count()
+        now = int(time.time())
+        return sum(1 for s in self._feed_slots.values() if s["expires_at"] >= now)
+
+    def _update_slots_cell(self, n: Optional[int]) -> None:
+        if n is None:
+            self.sc_slots.setLabel("Слоты: —")
+            self.sc_slots.setTone("off", live=False)
+        else:
+            self.sc_slots.setLabel(f"Слоты: {n}")
+            self.sc_slots.setTone("info" if n > 0 else "off", live=n > 0)
+
+    def _update_gps_cell(self, live: bool) -> None:
+        if not self._cfg.get("gps_enabled"):
+            self.sc_gps.hide()
+            return
+        self.sc_gps.show()
+        if live:
+            ts = self._feed_gps.get("fix_time") or self._feed_gps.get("received_at")
+            info = {"have_fix": bool(ts),
+                    "age_min": max(0, int((time.time() - ts) / 60)) if ts else None}
+        else:
+            info = db.gps_summary()
+        if not info["have_fix"]:
+            self.sc_gps.setLabel("GPS β: нет фикса")
+            self.sc_gps.setTone("warn", live=False)
+        else:
+            age = info["age_min"] or 0
+            if age <= int(self._cfg.get("gps_fix_fresh_min") or 5):
+                tone = "ok"
+            elif age <= int(self._cfg.get("gps_fix_stale_min") or 30):
+                tone = "warn"
+            else:
+                tone = "err"
+            self.sc_gps.setLabel(f"GPS β: {age} мин назад")
+            self.sc_gps.setTone(tone, live=False)
+
+    def _feed_uptime(self) -> str:
+        started = self._feed_hello.get("started_at")
+        if not started:
+            return "—"
+        s = max(0, int(time.time() - started))
+        if s < 3600:
+            return f"{s // 60}m"
+        if s < 86400:
+            return f"{s // 3600}h{(s % 3600) // 60:02d}m"
+        return f"{s // 86400}d{(s % 86400) // 3600}h"
+
+    @staticmethod
+    def _airtime_text(st: dict) -> str:
+        used = st.get("airtime_used_s") or 0
+        budget = st.get("airtime_budget_s") or 0
+        if not budget:
+            return f"Эфир: {used:.0f} с за час (без лимита)"
+        return (f"Эфир: {st.get('airtime_pct') or 0:.0f}% бюджета "
+                f"({used:.0f} / {budget:.0f} с за час)")
+
+    # =====================================================================
+    # Live feed от relay'я
+    # =====================================================================
+    def _on_feed_event(self, evt: dict) -> None:
+        kind = evt.get("kind")
+        if kind == "slots":
+            self._feed_slots = {s["slot_n"]: s for s in evt.get("slots") or []}
+        elif kind == "slot":
+            slot = evt.get("slot") or {}
+            if "slot_n" in slot:
+                self._feed_slots[slot["slot_n"]] = slot
+        elif kind == "slot_free":
+            self._feed_slots.pop(evt.get("slot_n"), None)
+        elif kind == "stats":
+            self._feed_stats = evt
+        elif kind == "pocket":
+            self._feed_stats["pocket_last_heard"] = evt.get("last_heard")
+        elif kind == "gps":
+            self._feed_gps = evt
+        elif kind == "hello":
+            self._feed_hello = evt
+        elif kind in ("rx", "tx"):
+            self._feed_counts[kind] += 1
+            return
+        elif kind == "ack":
+            self._feed_counts["ack" if evt.get("delivered") else "nak"] += 1
+            return
+        else:
+            return
+        # Точечно обновляем то, что затронуло событие, — без полного
+        # _refresh_status и без БД.
+        running = self.process is not None
+        if kind in ("slots", "slot", "slot_free"):
+            n = self._active_slots_count(True)
+            self._update_slots_cell(n)
+            self.node_panel.set_slots(n)
+            self._refresh_slots_list(True)
+        elif kind in ("stats", "pocket"):
+            self._update_node_cell(running, self.port_combo.currentData() or "", True)
+        elif kind == "gps":
+            self._update_gps_cell(True)
+
+    def _refresh_slots_list(self, live: bool = False) -> None:
+        if live:
+            now = int(time.time())
+            slots = sorted((s for s in self._feed_slots.values()
+                            if s["expires_at"] >= now),
+                           key=lambda s: s["expires_at"])[:8]
+        else:
+            slots = db.list_active_slots()[:8]
         self.slots_list.clear()
         if not slots:
             it = QListWidgetItem("слотов нет")
@@ -647,14 +788,13 @@ class Relay(QMainWindow):
             self.slots_list.addItem(it)
 
     # =====================================================================
-    # Pause / autoscroll toggle
+    # Pause log rendering
     # =====================================================================
     def _toggle_pause(self) -> None:
         self.btn_pause.toggle()
 
     def _on_pause_toggle(self, checked: bool) -> None:
-        # LogConsole always autoscrolls when not paused; we just stop autoscroll.
-        # (We don't have an explicit pause flag in LogConsole; keep behaviour simple.)
+        self.console.set_paused(checked)
         self._a_pause.setChecked(checked)
         self.btn_pause.setIcon(make_icon("play" if checked else "pause", color=PALETTE["t2"]))
 
@@ -748,6 +888,8 @@ class Relay(QMainWindow):
             self.console.append_raw(f"{self._ts()}✗ Не удалось запустить процесс\n")
             self.process = None
             return
+        self._feed.port = int(cfg.get("live_feed_port") or 0)
+        self._feed.start()
         self._refresh_status()
 
     def _stop(self) -> None:
@@ -782,6 +924,9 @@ class Relay(QMainWindow):
         tag = "✓" if exit_code == 0 else "✗"
         self.console.append_raw(f"{self._ts()}{tag} Процесс завершён (код {exit_code})\n\n")
         self.process = None
+        self._feed.stop()
+        self._feed_slots.clear()
+        self._feed_stats = {}
         self._refresh_status()
         # Авто-рестарт при ненормальном завершении. Это покрывает crash из
         # mesh_watchdog (USB unplug → relay делает os._exit(1)) и любые
@@ -105,7 +105,7 @@ _STRINGS: Dict[str, Dict[str, str]] = {
         "act.restart":         "Перезапустить",
         "act.quit":            "Выйти",
         "act.clear_log":       "Очистить лог",
-        "act.pause_scroll":    "Приостановить автопрокрутку",
+        "act.pause_scroll":    "Приостановить лог",
         "act.slots":           "Активные слоты @N…",
         "act.settings":        "Настройки…",
         "act.users":           "Пользователи…",
@@ -205,7 +205,7 @@ _STRINGS: Dict[str, Dict[str, str]] = {
         "act.restart":         "Restart",
         "act.quit":            "Quit",
         "act.clear_log":       "Clear log",
-        "act.pause_scroll":    "Pause auto-scroll",
+        "act.pause_scroll":    "Pause log",
         "act.slots":           "Active slots @N…",
         "act.settings":        "Settings…",
         "act.users":           "Users…",
@@ -0,0 +1,104 @@
+"""
+Сжатие длинных сообщений для LoRa (опционально, MESH_COMPRESSION=true).
+
+Идея: длинный текст (ответ AI, простыня от TG-юзера) сжимается raw-deflate
+со статическим словарём, заточенным под русско-английский чат, и кодируется
+в печатный ASCII (base85), чтобы пройти как обычный TEXT_MESSAGE_APP.
+Словарь один и тот же на обеих сторонах, в эфир не передаётся — поэтому
+даже 150–300-байтные сообщения сжимаются заметно (обычный zlib без словаря
+на таких длинах почти ничего не даёт).
+
+Формат тела сообщения:  "~z1" + base85(deflate(utf8(text), zdict=_DICT))
+  ~z  — маркер, по которому pocket-сторона понимает что тело сжато;
+  1   — версия словаря (при смене _DICT поднимаем, старые клиенты увидят
+        незнакомую версию и покажут как есть).
+
+Тело режется на LoRa-пакеты обычным способом (заголовок «[@N … i/N]»
+остаётся читаемым), декодер склеивает тела частей БЕЗ разделителя
+(в base85 нет пробелов) и зовёт decompress_text.
+Решение «сжимать или нет» принимает relay.py: сжатый вариант уходит только
+если он реально уменьшает число пакетов.
+
+Только stdlib (zlib, base64) — никаких зависимостей.
+"""
+from __future__ import annotations
+
+import base64
+import zlib
+
+MARKER = "~z"
+VERSION = "1"
+PREFIX = MARKER + VERSION
+
+# Статический словарь. zlib смотрит назад максимум на 32 КБ и кодирует
+# ссылки на ближние позиции короче, поэтому самое частое — В КОНЦЕ.
+# Собран из частотных слов/оборотов переписки (ru + en), с пробелами
+# вокруг — так совпадения длиннее.
+_DICT_TEXT = (
+    # en — реже встречается в нашем трафике, идёт первым
+    " the and you that have for not with this but from they will would "
+    "there their what about which when make can like time just know take "
+    "people into year your good some could them see other than then now "
+    "look only come over think also back after use two how our work first "
+    "well way even new want because any these give day most us is are was "
+    "were been has had do does did doing please thanks thank you ok okay "
+    "yes no hi hello hey sorry see you later tomorrow today tonight where "
+    "are you on my way call me when you can let me know I'll be there "
+    "I am I'm it's don't can't won't what's that's message reply answer "
+    "battery signal node mesh relay weather road help urgent emergency "
+    # ru — частотные служебные слова и обороты
+    " что это как так вот она они мне меня тебя тебе его её нас вас уже "
+    "ещё если когда только может можно нужно надо будет было была были "
+    "есть нет да ну ладно хорошо отлично спасибо пожалуйста извини "
+    "привет здравствуй добрый день доброе утро добрый вечер пока "
+    "сегодня завтра вчера сейчас потом скоро позже утром вечером ночью "
+    "минут часов через около примерно где ты где вы куда откуда когда "
+    "будешь приезжай приеду приедем встретимся встреча дома на работе "
+    "в городе в лесу на дороге связь сигнал батарея заряд погода дождь "
+    "холодно тепло как дела как ты всё хорошо всё нормально всё в порядке "
+    "позвони напиши ответь перезвони когда сможешь дай знать жду ответа "
+    "не могу не знаю не понял понял поняла конечно наверное может быть "
+    "потому что поэтому чтобы который которая которые очень много мало "
+    "сообщение ответ вопрос помощь помоги срочно нужна помощь "
+    " и в не на я с он что по это к а но из у за от о же бы то все "
+    " ты мы вы ли до для так вот"
+)
+_DICT: bytes = _DICT_TEXT.encode("utf-8")
+
+# Ограничение распаковки: защита от «zip-бомбы» в эфире.
+_MAX_PLAIN_BYTES = 64 * 1024
+
+
+def _deflate(data: bytes) -> bytes:
+    c = zlib.compressobj(level=9, wbits=-15, memLevel=9, zdict=_DICT)
+    return c.compress(data) + c.flush()
+
+
+def _inflate(data: bytes) -> bytes:
+    d = zlib.decompressobj(wbits=-15, zdict=_DICT)
+    out = d.decompress(data, _MAX_PLAIN_BYTES)
+    if d.unconsumed_tail:
+        raise ValueError("compressed payload too large")
+    return out + d.flush()
+
+
+def compress_text(text: str) -> str:
+    """Текст → "~z1<base85>" (только ASCII, безопасно для TEXT_MESSAGE_APP)."""
+    packed = _deflate(text.encode("utf-8"))
+    return PREFIX + base64.b85encode(packed).decode("ascii")
+
+
+def is_compressed(body: str) -> bool:
+    return body.startswith(MARKER)
+
+
+def decompress_text(body: str) -> str:
+    """Обратно к исходному тексту. ValueError если это не наш формат /
+    незнакомая версия словаря / битые данные."""
+    if not body.startswith(PREFIX):
+        raise ValueError("not a compressed payload (or unknown dictionary version)")
+    try:
+        raw = base64.b85decode(body[len(PREFIX):].encode("ascii"))
+        return _inflate(raw).decode("utf-8")
+    except (ValueError, zlib.error, UnicodeError) as e:
+        raise ValueError(f"corrupted compressed payload: {e}") from e
@@ -0,0 +1,262 @@
+"""
+Метрики relay: счётчики, gauge'и и гистограммы в одном реестре + отдача
+в текстовом формате Prometheus (exposition format 0.0.4).
+
+relay.py заводит метрики на уровне модуля и дёргает inc() / observe() из
+любых потоков (meshtastic-callback, mesh-tx, db-commit, event loop) —
+каждая метрика под своим коротким локом. Gauge'и по большей части
+вычисляемые: функция зовётся в момент выгрузки, на горячем пути ничего.
+
+    REGISTRY = metrics.Registry()
+    rx = REGISTRY.counter("relay_mesh_rx_total", "...", ("portnum",))
+    rx.inc(portnum="TEXT_MESSAGE_APP")
+
+Выгрузка — `await metrics.serve(REGISTRY, port)`: крошечный HTTP/1.0 на
+127.0.0.1, GET /metrics. Только stdlib.
+"""
+from __future__ import annotations
+
+import asyncio
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Секунды: от единиц мс (SQLite, обработка события) до минуты (LoRa RTT
+# через несколько хопов).
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels {sorted(labels)} != {list(self.labelnames)}")
+        return tuple(labels[n] for n in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """set() — обычное значение; fn — вычисляется при выгрузке. fn может
+    вернуть число или dict {значение_метки: число} (одна метка)."""
+
+    TYPE = "gauge"
+
+    def __init__(self, *args, fn: Optional[Callable] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.fn = fn
+        self._values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def collect(self) -> list[tuple[tuple, float]]:
+        if self.fn is None:
+            with self._lock:
+                return sorted(self._values.items())
+        value = self.fn()
+        if isinstance(value, dict):
+            return sorted(((k,), v) for k, v in value.items())
+        return [((), value)]
+
+    def render(self) -> list[str]:
+        try:
+            items = self.collect()
+        except Exception:
+            items = []     # недоступный источник не роняет всю выгрузку
+        return self._header() + [
+            f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items
+        ]
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # ключ меток → [счётчики по корзинам (+Inf последней), sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            s[0][i] += 1
+            s[1] += value
+            s[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels) -> int:
+        s = self._series.get(self._key(labels))
+        return s[2] if s else 0
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Оценка квантиля по корзинам (линейно внутри корзины, как
+        histogram_quantile в Prometheus). None — наблюдений нет."""
+        with self._lock:
+            s = self._series.get(self._key(labels))
+            if not s or not s[2]:
+                return None
+            counts, total = list(s[0]), s[2]
+        rank = q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lo = self.buckets[i - 1] if i else 0.0
+                return lo + (self.buckets[i] - lo) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._series.items())
+        out = self._header()
+        for key, (counts, total_sum, total) in series:
+            cum = 0
+            for bound, c in zip(self.buckets + (math.inf,), counts):
+                cum += c
+                le = f'le="{_fmt(bound)}"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cum}")
+            lbl = _labels(self.labelnames, key)
+            out.append(f"{self.name}_sum{lbl} {_fmt(total_sum)}")
+            out.append(f"{self.name}_count{lbl} {total}")
+        return out
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+              fn: Optional[Callable] = None) -> Gauge:
+        return self._add(Gauge(name, help_text, labelnames, fn=fn))
+
+    def histogram(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets=buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for m in self._metrics.values():
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+# ---------- HTTP-выгрузка ----------
+async def _handle(registry: Registry, reader: asyncio.StreamReader,
+                  writer: asyncio.StreamWriter) -> None:
+    try:
+        request = await asyncio.wait_for(reader.readline(), 5)
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass   # заголовки не нужны
+        parts = request.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] in ("GET", "HEAD") and parts[1].split("?")[0] in ("/", "/metrics"):
+            body = registry.render().encode("utf-8")
+            head = f"HTTP/1.0 200 OK\r\nContent-Type: {CONTENT_TYPE}\r\n"
+        else:
+            body = b"not found\n"
+            head = "HTTP/1.0 404 Not Found\r\nContent-Type: text/plain\r\n"
+        writer.write(f"{head}Content-Length: {len(body)}\r\n\r\n".encode("latin-1"))
+        if parts and parts[0] != "HEAD":
+            writer.write(body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(registry: Registry, port: int, host: str = "127.0.0.1") -> asyncio.base_events.Server:
+    """Поднять /metrics. port=0 — взять свободный (тесты)."""
+    return await asyncio.start_server(
+        lambda r, w: _handle(registry, r, w), host, port,
+    )
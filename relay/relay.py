@@ -37,15 +37,23 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import heapq
+import importlib.util
+import itertools
+import json
 import logging
-import queue
+import math
 import re
 import sqlite3
 import sys
 import threading
 import time
+import unicodedata
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlparse
 
 # ── Encoding fix для Windows ─────────────────────────────────────────────────
 # По дефолту Python в Windows console использует cp1251 для stdout/stderr,
@@ -96,6 +104,9 @@ POLLING_STABLE_RESET_SEC:    int = 60
 import sys as _sys
 _sys.path.insert(0, str(Path(__file__).parent))
 import ai_helper
+import airtime
+import lora_codec
+import metrics
 import paths as _paths
 import settings as _settings_mod
 
@@ -110,6 +121,13 @@ DISPLAY_NAME: str     = (_S.get("display_name") or "Михаил").strip()
 MESHTASTIC_PORT: Optional[str] = (_S.get("last_com_port") or None)
 
 MAX_TEXT_LENGTH: int        = int(_S["max_text_length"])
+# Лимит эфира — в байтах UTF-8, не в символах: кириллица = 2 байта/символ.
+# Meshtastic режет payload на DATA_PAYLOAD_LEN (233 байта); 200 — с запасом.
+MAX_PACKET_BYTES: int       = int(_S.get("max_packet_bytes") or 200)
+# Ёмкость каждой полосы приоритета в _mesh_tx (см. _MeshTxQueue).
+MESH_TX_QUEUE_LIMIT: int    = int(_S.get("mesh_tx_queue_limit") or 64)
+# Сколько mesh-событий обрабатываются параллельно (см. _KeyedDispatcher).
+MESH_DISPATCH_CONCURRENCY: int = int(_S.get("mesh_dispatch_concurrency") or 8)
 SLOT_TTL_HOURS: int         = int(_S["slot_ttl_hours"])
 SLOT_STICKY_HOURS: int      = int(_S["slot_sticky_hours"])
 MAX_USERNAME_IN_PREFIX: int = int(_S["max_username_in_prefix"])
@@ -151,6 +169,38 @@ if MESH_DELIVERY_MODE not in ("reliable", "fast"):
     MESH_DELIVERY_MODE = "reliable"
 MESH_WANT_ACK: bool = (MESH_DELIVERY_MODE == "reliable")
 
+# Компактный заголовок пакетов в pocket: «3>vasya: текст» вместо
+# «[@3 vasya 16:15] текст», у частей — однобайтовый индекс «3a> / 3b> / 3C>».
+# Экономит 8–15 байт на пакет; время приёма pocket и так показывает сам.
+COMPACT_HEADERS: bool = bool(_S.get("compact_headers", False))
+
+# Сжатие многопакетных сообщений (lora_codec: deflate + статический словарь
+# + base85, маркер «~z1»). Opt-in: pocket-стороне нужен декодер. Сжатый
+# вариант уходит только если он реально даёт меньше пакетов.
+MESH_COMPRESSION: bool = bool(_S.get("mesh_compression", False))
+
+# Окно склейки коротких сообщений в один пакет (мс), 0 = выкл. См. _TxBatcher.
+MESH_BATCH_WINDOW_MS: int = int(_S.get("mesh_batch_window_ms") or 0)
+
+# Модем-пресет ноды (для оценки airtime) и лимит duty cycle, % за час.
+# 0 = без лимита: эфир считается, но TX-очередь ничего не придерживает.
+LORA_PRESET: str = str(_S.get("lora_preset") or airtime.DEFAULT_PRESET).upper()
+if LORA_PRESET not in airtime.PRESETS:
+    LORA_PRESET = airtime.DEFAULT_PRESET
+DUTY_CYCLE_PCT: int = int(_S.get("duty_cycle_pct") or 0)
+
+# Повтор того же текста от той же ноды за это окно (сек) считается дублем
+# (см. _RxDedup); 0 = только по id пакета.
+MESH_RX_DEDUP_TEXT_SEC: int = int(_S.get("mesh_rx_dedup_text_sec") or 0)
+
+# Как бот получает апдейты: "polling" (getUpdates) или "webhook" — Telegram
+# POST'ит их на WEBHOOK_URL, Caddy снимает TLS и проксирует на
+# 127.0.0.1:WEBHOOK_PORT. См. _effective_tg_mode / _run_polling_with_retry.
+TG_MODE: str        = str(_S.get("tg_mode") or "polling").lower()
+WEBHOOK_URL: str    = str(_S.get("webhook_url") or "")
+WEBHOOK_PORT: int   = int(_S.get("webhook_port") or 8443)
+WEBHOOK_SECRET: str = str(_S.get("webhook_secret") or "")
+
 # AI helper. Активируется через AI_ENABLED=true и работает с любым
 # OpenAI-совместимым endpoint'ом (LM Studio, Ollama, vLLM, OpenAI cloud).
 AI_ENABLED: bool         = bool(_S.get("ai_enabled", False))
@@ -191,6 +241,14 @@ LOG_FILE_ENABLED: bool = bool(_S["log_file_enabled"])
 LOG_FILE_MAX_MB:  int  = int(_S["log_file_max_mb"])
 LOG_FILE_KEEP:    int  = int(_S["log_file_keep"])
 
+# Порт push-канала состояния для GUI (см. _LiveFeed). Только 127.0.0.1;
+# 0 = выкл, GUI тогда опрашивает relay.db как раньше.
+LIVE_FEED_PORT: int = int(_S.get("live_feed_port") or 0)
+
+# Prometheus-метрики на http://127.0.0.1:METRICS_PORT/metrics; 0 = выкл
+# (счётчики всё равно ведутся — краткая сводка в !ping).
+METRICS_PORT: int = int(_S.get("metrics_port") or 0)
+
 # ============================================================
 
 _LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
@@ -242,15 +300,805 @@ _pocket_last_heard: Optional[float] = None  # unix seconds
 _db_lock = threading.Lock()
 _db: Optional[sqlite3.Connection] = None
 
-# Mesh -> asyncio queue. The meshtastic callback is in its own thread
-# and must not touch the event loop directly.
-_mesh_queue: "queue.Queue[dict]" = queue.Queue()
-
 # In-memory rate limit for /where: {tg_user_id: last_request_unix_ts}.
 # Cleared on restart; that is acceptable for spam control.
 _where_last_call: dict[int, float] = {}
 
 
+# ============================================================
+# Metrics (metrics.py; выгрузка — metrics_worker, сводка — !ping)
+# ============================================================
+_metrics = metrics.Registry()
+_m_packets = _metrics.counter(
+    "relay_mesh_packets_total",
+    "LoRa packets: TX by queue lane, RX by portnum.", ("direction", "kind"))
+_m_rx_duplicates = _metrics.counter(
+    "relay_mesh_rx_duplicates_total", "Inbound text packets dropped as duplicates.")
+_m_tx_deferred = _metrics.counter(
+    "relay_mesh_tx_deferred_total", "Times a TX lane waited for duty cycle.", ("lane",))
+_m_tx_errors = _metrics.counter(
+    "relay_mesh_tx_errors_total", "Failed writes to the node by lane.", ("lane",))
+_m_acks = _metrics.counter(
+    "relay_mesh_acks_total", "Routing responses to wantAck packets.", ("result",))
+_m_retries = _metrics.counter(
+    "relay_retries_total", "retry_queue attempts by outcome.", ("result",))
+_m_tg_messages = _metrics.counter(
+    "relay_tg_messages_total", "Telegram messages relayed to the pocket.")
+_m_chunks = _metrics.counter(
+    "relay_tx_chunks_total", "LoRa packets those messages were packed into.")
+_m_sos = _metrics.counter(
+    "relay_sos_deliveries_total", "SOS fan-out per recipient.", ("result",))
+_m_ai = _metrics.counter(
+    "relay_ai_calls_total", "LLM requests from the pocket.", ("result",))
+_m_tg_to_mesh = _metrics.histogram(
+    "relay_tg_to_mesh_seconds",
+    "Telegram message received -> last packet written to the node.")
+_m_ack_rtt = _metrics.histogram(
+    "relay_ack_rtt_seconds", "Packet written -> routing ACK/NAK.")
+_m_mesh_event = _metrics.histogram(
+    "relay_mesh_event_seconds", "_handle_mesh_event duration.", ("kind",))
+_m_db_commit = _metrics.histogram(
+    "relay_db_commit_seconds", "SQLite commit latency (group or durable).")
+_metrics.gauge("relay_mesh_event_queue_depth", "Mesh events waiting for dispatch.",
+               fn=lambda: _mesh_queue.depth())
+_metrics.gauge("relay_mesh_tx_queue_depth", "Packets waiting in the TX queue.",
+               ("lane",), fn=lambda: _mesh_tx.depth())
+_metrics.gauge("relay_slots_active", "Active @N slots.",
+               fn=lambda: slot_count_active())
+_metrics.gauge("relay_retry_backlog", "Rows scheduled in retry_queue.",
+               fn=lambda: len(_retry_deadlines))
+_metrics.gauge("relay_airtime_window_seconds",
+               "Estimated own LoRa airtime in the duty-cycle window.",
+               fn=lambda: _airtime.used())
+_metrics.gauge("relay_airtime_utilisation",
+               "Share of the duty-cycle budget used (1 = limit reached).",
+               fn=lambda: _airtime.utilisation())
+
+
+# ============================================================
+# Tracing: задержка одного сообщения по этапам
+# ============================================================
+class _Tracer:
+    """Трасса = одно сообщение: id + отметки этапов в мс от приёма.
+
+    TG → pocket (kind "tg"): received → slot → db → queued → sent → ack →
+    status. Ответ pocket → TG (kind "pocket"): received → parsed → slot →
+    tg_sent → db → owner. mark() можно звать из любого потока (ACK
+    приходит в потоке meshtastic); повторная отметка этапа перезаписывает
+    его (у многопакетных sent / ack — последняя часть). finish() кладёт
+    трассу одной строкой в traces. Незакрытые (ACK так и не пришёл)
+    через MAX_AGE_S пишутся со статусом "timeout".
+    """
+
+    MAX_OPEN = 1024
+    MAX_AGE_S = 600
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # id → (kind, t0 monotonic, t0 unix, {этап: мс})
+        self._open: OrderedDict[int, tuple[str, float, float, dict]] = OrderedDict()
+
+    def start(self, kind: str, t0: Optional[float] = None) -> int:
+        """Новая трасса. t0 — time.monotonic() момента приёма (если
+        сообщение ждало в очереди до начала обработки)."""
+        now = time.monotonic()
+        t0 = now if t0 is None else t0
+        with self._lock:
+            tid = next(self._ids)
+            self._open[tid] = (kind, t0, time.time() - (now - t0), {"received": 0})
+            stale = self._pop_stale(now)
+        self._store(stale, "timeout")
+        return tid
+
+    def mark(self, tid: Optional[int], stage: str) -> None:
+        if tid is None:
+            return
+        with self._lock:
+            tr = self._open.get(tid)
+            if tr is not None:
+                tr[3][stage] = round((time.monotonic() - tr[1]) * 1000)
+
+    def finish(self, tid: Optional[int], status: str = "ok") -> None:
+        if tid is None:
+            return
+        with self._lock:
+            tr = self._open.pop(tid, None)
+        if tr is not None:
+            self._store([tr], status)
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._open.clear()
+
+    def _pop_stale(self, now: float) -> list:
+        # Под self._lock. OrderedDict — по порядку start(), старые в начале.
+        out = []
+        while self._open:
+            tid, tr = next(iter(self._open.items()))
+            if len(self._open) <= self.MAX_OPEN and now - tr[1] < self.MAX_AGE_S:
+                break
+            del self._open[tid]
+            out.append(tr)
+        return out
+
+    @staticmethod
+    def _store(traces: list, status: str) -> None:
+        for kind, _t0, started_at, stages in traces:
+            try:
+                trace_store(kind, started_at, status, stages)
+            except Exception:
+                log.exception("trace store failed")
+
+
+_tracer = _Tracer()
+
+
+# ============================================================
+# Deadline scheduler (in-memory heap, asyncio wake-up)
+# ============================================================
+class _DeadlineQueue:
+    """Min-heap of (due_ts, key) — «кого и когда разбудить».
+
+    Воркер спит ровно до ближайшего дедлайна (или пока `schedule()` не
+    разбудит его раньше), вместо того чтобы раз в N секунд опрашивать БД.
+    Устаревшие записи в heap не удаляются сразу: актуальный due хранится
+    в `_due[key]`, а при извлечении всё, что с ним не совпало, молча
+    выкидывается (lazy invalidation).
+
+    `schedule()` / `cancel()` потокобезопасны и работают до `bind()` —
+    тесты и db-хелперы дёргают их без event loop'а, будить тогда некого.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, object]] = []
+        self._due: dict[object, float] = {}
+        self._seq = 0   # tie-break — ключи не обязаны быть сравнимыми
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Привязать к event loop'у воркера. Вызывается из самого воркера."""
+        self._loop = loop
+        self._wake = asyncio.Event()
+
+    def schedule(self, key, due: float) -> None:
+        with self._lock:
+            self._due[key] = due
+            self._seq += 1
+            heapq.heappush(self._heap, (due, self._seq, key))
+        self._notify()
+
+    def cancel(self, key) -> None:
+        with self._lock:
+            self._due.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+            self._due.clear()
+
+    def due_of(self, key) -> Optional[float]:
+        with self._lock:
+            return self._due.get(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._due)
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            self._drop_stale_head()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> list:
+        """Снять все ключи с due <= now (в порядке дедлайнов)."""
+        out = []
+        with self._lock:
+            while True:
+                self._drop_stale_head()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, _, key = heapq.heappop(self._heap)
+                del self._due[key]
+                out.append(key)
+        return out
+
+    async def wait(self) -> None:
+        """Спать до ближайшего дедлайна или до `schedule()` с другого места."""
+        if self._wake is None:
+            raise RuntimeError("_DeadlineQueue.wait() before bind()")
+        self._wake.clear()
+        nxt = self.next_due()
+        timeout = None if nxt is None else nxt - time.time()
+        if timeout is not None and timeout <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _drop_stale_head(self) -> None:
+        # Вызывается под self._lock.
+        while self._heap:
+            due, _, key = self._heap[0]
+            if self._due.get(key) == due:
+                return
+            heapq.heappop(self._heap)
+
+    def _notify(self) -> None:
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or loop.is_closed():
+            return
+        # call_soon_threadsafe — schedule() зовут и из meshtastic-потока.
+        loop.call_soon_threadsafe(wake.set)
+
+
+# ============================================================
+# Mesh TX pacing (пауза между частями по ACK RTT / NAK)
+# ============================================================
+class _PacingController:
+    """Адаптивная пауза между LoRa-пакетами одной отправки.
+
+    Маленький congestion control по мотивам TCP: сглаженный RTT
+    (SRTT/RTTVAR, RFC 6298) по routing-ACK'ам и окно `window` — сколько
+    пакетов «на RTT» пропускает канал. ACK → окно растёт (+1/window),
+    NAK → окно вдвое. Пауза = SRTT / window в пределах [min_gap, max_gap].
+
+    Чистый прямой линк (hop=1, ACK за ~1 с, без NAK'ов) быстро уходит к
+    min_gap; загруженный multi-hop (RTT 5–10 с, NAK'и) — к секундам.
+    Пока ACK'ов не было (старт / fast-режим) — initial_gap, как раньше.
+
+    observe() зовётся из meshtastic-потока (on_ack), gap() — из asyncio:
+    всё под своим threading.Lock.
+    """
+
+    _ALPHA = 1 / 8   # вес нового RTT-замера в SRTT
+    _BETA = 1 / 4    # вес отклонения в RTTVAR
+
+    def __init__(self, *, initial_gap: float = 0.4, min_gap: float = 0.15,
+                 max_gap: float = 5.0, max_window: float = 8.0) -> None:
+        self.initial_gap = initial_gap
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.max_window = max_window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._srtt: Optional[float] = None
+            self._rttvar = 0.0
+            self._window = 1.0
+            self._acks = 0
+            self._naks = 0
+
+    def observe(self, rtt: Optional[float], delivered: bool) -> None:
+        """Итог одного пакета: ACK с замеренным RTT или NAK.
+
+        RTT NAK'а в SRTT не идёт — это таймаут прошивки, а не время
+        доставки (как алгоритм Карна у TCP)."""
+        with self._lock:
+            if not delivered:
+                self._naks += 1
+                self._window = max(1.0, self._window / 2)
+                return
+            self._acks += 1
+            if rtt is not None and rtt >= 0:
+                if self._srtt is None:
+                    self._srtt = rtt
+                    self._rttvar = rtt / 2
+                else:
+                    self._rttvar += self._BETA * (abs(self._srtt - rtt) - self._rttvar)
+                    self._srtt += self._ALPHA * (rtt - self._srtt)
+            self._window = min(self.max_window, self._window + 1 / self._window)
+
+    def gap(self) -> float:
+        """Сколько ждать перед следующим пакетом той же отправки, сек."""
+        with self._lock:
+            return self._gap_locked()
+
+    def _gap_locked(self) -> float:
+        if self._srtt is None:
+            return self.initial_gap
+        return min(self.max_gap, max(self.min_gap, self._srtt / self._window))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "srtt": self._srtt,
+                "rttvar": self._rttvar,
+                "window": self._window,
+                "gap": self._gap_locked(),
+                "acks": self._acks,
+                "naks": self._naks,
+            }
+
+    def describe(self) -> str:
+        """Коротко для логов и `!ping`: «rtt=1.8s±0.3 win=4.0 gap=0.45s nak=2/31»."""
+        st = self.snapshot()
+        rtt = "?" if st["srtt"] is None else f"{st['srtt']:.1f}s±{st['rttvar']:.1f}"
+        total = st["acks"] + st["naks"]
+        return (f"rtt={rtt} win={st['window']:.1f} gap={st['gap']:.2f}s "
+                f"nak={st['naks']}/{total}")
+
+
+_pacing = _PacingController()
+
+
+# ============================================================
+# Airtime / duty cycle
+# ============================================================
+_airtime = airtime.DutyCycleLedger(DUTY_CYCLE_PCT)
+
+# Потолок занятости часового бюджета для каждой полосы TX-очереди: выше —
+# полоса ждёт, пока старые передачи не выйдут из окна. Неважное (служебные
+# ответы, AI, retry) встаёт первым, чтобы на сообщения юзеров эфир остался.
+# SOS не ограничивается никогда.
+_AIRTIME_CEILING: dict[str, Optional[float]] = {
+    "sos": None, "user": 1.0, "retry": 0.85, "ai": 0.7, "status": 0.7,
+}
+
+
+def _airtime_gate(lane: str) -> float:
+    """Гейт _MeshTxQueue: сколько секунд полосе `lane` ещё ждать (0 — можно)."""
+    ceiling = _AIRTIME_CEILING.get(lane)
+    if ceiling is None:
+        return 0.0
+    return _airtime.seconds_until(ceiling)
+
+
+def _airtime_describe() -> str:
+    """«air=12%» для !ping: доля часового бюджета (без лимита — секунды)."""
+    if DUTY_CYCLE_PCT <= 0:
+        return f"air={_airtime.used():.0f}s"
+    return f"air={_airtime.utilisation() * 100:.0f}%"
+
+
+# ============================================================
+# Mesh TX queue (один владелец serial-интерфейса, полосы приоритета)
+# ============================================================
+class MeshTxQueueFull(RuntimeError):
+    """Полоса TX-очереди переполнена — пакет не принят."""
+
+
+class _MeshTxQueue:
+    """Единственный путь пакетов в ноду: одна asyncio-задача и один поток.
+
+    Раньше каждый send_dm_to_pocket_async шёл своим asyncio.to_thread и
+    толкался на _mesh_send_lock в произвольном порядке — SOS мог ждать за
+    пачкой AI-чанков. Теперь вызовы встают в полосы приоритета:
+
+        sos > user > retry > ai > status
+
+    Воркер всегда берёт из самой приоритетной непустой полосы, внутри полосы —
+    round-robin по `flow` (слот / AI-чат), чтобы одна длинная отправка не
+    заслоняла соседей. USB-write идёт в единственном потоке «mesh-tx» (без
+    thread-pool churn). Каждая полоса ограничена `lane_limit` — сверх лимита
+    MeshTxQueueFull сразу, вызывающий обрабатывает как обычный сбой отправки.
+
+    `gate(lane) -> сек` — необязательный гейт (duty cycle): полоса с
+    ненулевым ответом пропускается, следующая по приоритету идёт вперёд;
+    если закрыто всё, что есть в очереди, воркер спит до ближайшего
+    открытия или нового submit().
+
+    Воркер стартует лениво на первом submit() в текущем event loop'е.
+    """
+
+    LANES = ("sos", "user", "retry", "ai", "status")
+
+    def __init__(self, lane_limit: int = 64, gate=None) -> None:
+        self.lane_limit = lane_limit
+        self.gate = gate
+        self._gate_wait: Optional[float] = None
+        self.deferred: dict[str, int] = dict.fromkeys(self.LANES, 0)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lanes: dict[str, OrderedDict] = {}
+        self._depth: dict[str, int] = {}
+        self.sent: dict[str, int] = dict.fromkeys(self.LANES, 0)
+        self._reset_lanes()
+
+    def _reset_lanes(self) -> None:
+        self._lanes = {lane: OrderedDict() for lane in self.LANES}
+        self._depth = dict.fromkeys(self.LANES, 0)
+
+    def _ensure_worker(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Новый loop (рестарт polling'а, тесты): futures старого мертвы.
+            self._reset_lanes()
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1,
+                                                thread_name_prefix="mesh-tx")
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run(), name="mesh-tx")
+        return loop
+
+    async def submit(self, fn, *args, lane: str = "status", flow=None):
+        """Поставить `fn(*args)` в полосу `lane` и дождаться результата.
+
+        Исключение из fn пробрасывается вызывающему как есть."""
+        if lane not in self._lanes:
+            raise ValueError(f"unknown TX lane: {lane}")
+        loop = self._ensure_worker()
+        if self._depth[lane] >= self.lane_limit:
+            raise MeshTxQueueFull(f"mesh TX lane '{lane}' is full ({self.lane_limit})")
+        fut = loop.create_future()
+        self._lanes[lane].setdefault(flow, deque()).append((fut, fn, args))
+        self._depth[lane] += 1
+        self._wake.set()
+        return await fut
+
+    def depth(self) -> dict[str, int]:
+        return dict(self._depth)
+
+    def _pop(self):
+        self._gate_wait = None
+        for lane in self.LANES:
+            flows = self._lanes[lane]
+            if not flows:
+                continue
+            wait = self.gate(lane) if self.gate is not None else 0.0
+            if wait > 0:
+                # Полоса придержана гейтом — запоминаем, когда откроется.
+                self._gate_wait = wait if self._gate_wait is None else min(self._gate_wait, wait)
+                continue
+            flow, items = next(iter(flows.items()))
+            item = items.popleft()
+            if items:
+                flows.move_to_end(flow)   # round-robin: следующий — другой flow
+            else:
+                del flows[flow]
+            self._depth[lane] -= 1
+            return lane, item
+        return None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            nxt = self._pop()
+            if nxt is None:
+                self._wake.clear()
+                if self._gate_wait is None:
+                    await self._wake.wait()
+                    continue
+                for lane in self.LANES:
+                    if self._depth[lane]:
+                        self.deferred[lane] += 1
+                        _m_tx_deferred.inc(lane=lane)
+                log.info("mesh TX deferred by duty cycle (%s), next in %.0fs",
+                         _airtime_describe(), self._gate_wait)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self._gate_wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            lane, (fut, fn, args) = nxt
+            if fut.done():
+                continue   # вызывающего отменили, пока ждал в очереди
+            try:
+                result = await loop.run_in_executor(self._executor, fn, *args)
+            except Exception as e:
+                _m_tx_errors.inc(lane=lane)
+                if not fut.done():
+                    fut.set_exception(e)
+            else:
+                self.sent[lane] += 1
+                _m_packets.inc(direction="tx", kind=lane)
+                if not fut.done():
+                    fut.set_result(result)
+
+
+_mesh_tx = _MeshTxQueue(MESH_TX_QUEUE_LIMIT, gate=_airtime_gate)
+
+
+# ============================================================
+# Mesh -> asyncio event bridge
+# ============================================================
+class _MeshEventBridge:
+    """Мост «поток meshtastic → asyncio» для RX-пакетов и ACK'ов.
+
+    Колбэки meshtastic живут в своём потоке и не должны трогать event loop
+    напрямую: put() делает loop.call_soon_threadsafe(...) в ограниченную
+    asyncio.Queue, mesh_dispatcher ждёт get() без всяких executor-потоков.
+
+    До bind() (нода подключается раньше, чем стартует polling) события
+    копятся в небольшом буфере и переезжают в очередь при bind(). Очередь
+    полна → событие отбрасывается и считается в `dropped` (лучше потерять
+    одно, чем съесть всю память при зависшем диспетчере).
+
+    Метрики (stats()): глубина, пик глубины, отброшено, время ожидания
+    в очереди (EWMA и максимум, мс).
+    """
+
+    def __init__(self, maxsize: int = 1000) -> None:
+        self.maxsize = maxsize
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._q: Optional[asyncio.Queue] = None
+        self._early: deque = deque()
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.wait_avg_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Привязать к loop'у диспетчера. Вызывается из самого диспетчера."""
+        with self._lock:
+            self._loop = loop
+            self._q = asyncio.Queue(self.maxsize)
+            early, self._early = list(self._early), deque()
+        for item in early:
+            self._enqueue(item)
+
+    def put(self, evt: dict) -> None:
+        """Потокобезопасно: из meshtastic-потока или из самого loop'а."""
+        item = (time.monotonic(), evt)
+        with self._lock:
+            loop = self._loop
+            if loop is None:
+                if len(self._early) >= self.maxsize:
+                    self.dropped += 1
+                    return
+                self._early.append(item)
+                return
+        try:
+            loop.call_soon_threadsafe(self._enqueue, item)
+        except RuntimeError:
+            self.dropped += 1   # loop уже закрыт (shutdown)
+
+    def _enqueue(self, item) -> None:
+        # Только в потоке loop'а.
+        try:
+            self._q.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            log.warning("mesh event queue full (%d) — dropped %s",
+                        self.maxsize, item[1].get("kind"))
+            return
+        self.max_depth = max(self.max_depth, self._q.qsize())
+
+    async def get(self) -> dict:
+        ts, evt = await self._q.get()
+        self._account(ts)
+        return evt
+
+    def get_nowait(self) -> dict:
+        """Для sync-кода и тестов: забрать событие без ожидания."""
+        with self._lock:
+            if self._q is None:
+                if not self._early:
+                    raise IndexError("mesh event queue is empty")
+                ts, evt = self._early.popleft()
+                self._account(ts)
+                return evt
+        ts, evt = self._q.get_nowait()
+        self._account(ts)
+        return evt
+
+    def _account(self, enqueued_at: float) -> None:
+        wait_ms = (time.monotonic() - enqueued_at) * 1000
+        self.delivered += 1
+        self.wait_avg_ms += (wait_ms - self.wait_avg_ms) / 8
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def depth(self) -> int:
+        if self._q is not None:
+            return self._q.qsize()
+        return len(self._early)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "wait_avg_ms": round(self.wait_avg_ms, 2),
+            "wait_max_ms": round(self.wait_max_ms, 2),
+        }
+
+
+# Mesh -> asyncio queue. The meshtastic callback is in its own thread
+# and must not touch the event loop directly — see _MeshEventBridge.
+_mesh_queue = _MeshEventBridge()
+
+
+class _KeyedDispatcher:
+    """Параллельная обработка событий с порядком внутри ключа.
+
+    Каждому ключу — своя FIFO и своя задача-«осушитель»: события одного
+    ключа (слот @N, AI-чат, поток ACK'ов одного TG-чата) идут строго по
+    очереди, разные ключи — параллельно. Общий семафор ограничивает число
+    одновременно выполняемых обработчиков (`concurrency`).
+
+    submit() ждёт, если в работе/очереди уже `max_pending` событий —
+    обратное давление на _mesh_queue, а не бесконечный рост в памяти.
+
+    Ключи из `unbounded` идут мимо семафора (SOS): занятые обработчики
+    других ключей их не задерживают.
+    """
+
+    def __init__(self, concurrency: int, max_pending: int = 256,
+                 unbounded: tuple = ()) -> None:
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max_pending
+        self.unbounded = frozenset(unbounded)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._room: Optional[asyncio.Event] = None
+        self._queues: dict[object, deque] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._pending = 0
+
+    def _ensure_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.concurrency)
+            self._room = asyncio.Event()
+            self._room.set()
+            self._queues.clear()
+            self._tasks.clear()
+            self._pending = 0
+
+    async def submit(self, key, fn, *args) -> None:
+        """Поставить `await fn(*args)` в очередь ключа `key`."""
+        self._ensure_loop()
+        while self._pending >= self.max_pending:
+            self._room.clear()
+            await self._room.wait()
+        self._pending += 1
+        q = self._queues.get(key)
+        if q is not None:
+            q.append((fn, args))   # осушитель ключа уже работает — подхватит
+            return
+        self._queues[key] = deque([(fn, args)])
+        task = asyncio.create_task(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain(self, key) -> None:
+        q = self._queues[key]
+        try:
+            while q:
+                fn, args = q[0]
+                try:
+                    if key in self.unbounded:
+                        await fn(*args)
+                    else:
+                        async with self._sem:
+                            await fn(*args)
+                except Exception:
+                    log.exception("mesh event handler failed (key=%s)", key)
+                finally:
+                    q.popleft()
+                    self._pending -= 1
+                    self._room.set()
+        finally:
+            # Между проверкой `while q` и этим del нет await — новый submit
+            # не может «потеряться» в удаляемой очереди.
+            self._queues.pop(key, None)
+
+    def pending(self) -> int:
+        return self._pending
+
+    async def join(self) -> None:
+        """Дождаться, пока все поставленные события отработают."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+_mesh_workers = _KeyedDispatcher(MESH_DISPATCH_CONCURRENCY, unbounded=(("sos",),))
+
+
+# ============================================================
+# Live feed: push-состояние relay → GUI (localhost, JSON lines)
+# ============================================================
+class _LiveFeed:
+    """Локальный push-канал состояния для GUI: TCP на 127.0.0.1, одна
+    JSON-строка на событие (`{"kind": ..., "ts": ..., ...}`).
+
+    GUI подписывается вместо того, чтобы раз в POLL_MS перечитывать
+    relay.db и парсить stdout. Новый подписчик сначала получает снимок
+    (`snapshot()` → hello / slots / gps / stats), дальше — инкрементальные
+    события. `publish()` потокобезопасен (его зовут и из meshtastic-потока)
+    и ничего не стоит, пока никто не подписан. У каждого подписчика своя
+    ограниченная очередь: медленный GUI теряет старые события (`dropped`),
+    а не тормозит relay.
+    """
+
+    def __init__(self, port: int, *, queue_limit: int = 512) -> None:
+        self.port = port
+        self.queue_limit = queue_limit
+        self.snapshot = lambda: []          # подменяется в on_post_init
+        self._clients: set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.published = 0
+        self.dropped = 0
+
+    def active(self) -> bool:
+        return bool(self._clients)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(
+            self._serve, "127.0.0.1", self.port,
+        )
+        if not self.port:
+            # Порт 0 — тесты: берём тот, что выдала ОС.
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    @staticmethod
+    def encode(kind: str, **fields) -> bytes:
+        evt = {"kind": kind, "ts": round(time.time(), 3), **fields}
+        return (json.dumps(evt, ensure_ascii=False, separators=(",", ":"),
+                           default=str) + "\n").encode("utf-8")
+
+    def publish(self, kind: str, **fields) -> None:
+        loop = self._loop
+        if not self._clients or loop is None or loop.is_closed():
+            return
+        line = self.encode(kind, **fields)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(line)
+        else:
+            loop.call_soon_threadsafe(self._fanout, line)
+
+    def _fanout(self, line: bytes) -> None:
+        self.published += 1
+        for q in self._clients:
+            if q.full():
+                q.get_nowait()
+                self.dropped += 1
+            q.put_nowait(line)
+
+    async def _serve(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        q: asyncio.Queue = asyncio.Queue(self.queue_limit)
+        try:
+            for kind, fields in self.snapshot():
+                q.put_nowait(self.encode(kind, **fields))
+        except Exception:
+            log.exception("live feed snapshot failed")
+        self._clients.add(q)
+        log.info("Live feed: GUI subscribed (%d)", len(self._clients))
+        try:
+            while True:
+                line = await q.get()
+                writer.write(line)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(q)
+            writer.close()
+
+
+_live_feed = _LiveFeed(LIVE_FEED_PORT)
+
+
 # ============================================================
 # SQLite layer
 # ============================================================
@@ -266,6 +1114,8 @@ CREATE TABLE IF NOT EXISTS users (
     last_seen   INTEGER NOT NULL
 );
 
+CREATE INDEX IF NOT EXISTS idx_users_last_seen ON users(last_seen);
+
 CREATE TABLE IF NOT EXISTS slots (
     slot_n       INTEGER PRIMARY KEY,
     tg_user_id   INTEGER NOT NULL,
@@ -316,12 +1166,40 @@ CREATE TABLE IF NOT EXISTS retry_queue (
     attempts       INTEGER NOT NULL DEFAULT 0,
     next_try_at    INTEGER NOT NULL,
     deadline       INTEGER NOT NULL,
-    is_sos         INTEGER NOT NULL DEFAULT 0
+    is_sos         INTEGER NOT NULL DEFAULT 0,
+    tx_id          INTEGER,                -- NULL = одиночный пакет
+    chunk_idx      INTEGER                 -- номер части в send_tx_chunks
 );
 
 CREATE INDEX IF NOT EXISTS idx_retry_next ON retry_queue(next_try_at);
 CREATE INDEX IF NOT EXISTS idx_retry_slot ON retry_queue(slot_n);
 
+-- Многопакетная отправка: длинное сообщение → N LoRa-пакетов, у каждого
+-- свой ACK. retry_queue досылает только недошедшие части (tx_id+chunk_idx),
+-- юзер видит «доставлено 3/5». Строки живут до полной доставки / deadline.
+CREATE TABLE IF NOT EXISTS send_tx (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    tg_user_id     INTEGER NOT NULL,
+    tg_chat_id     INTEGER NOT NULL,
+    status_msg_id  INTEGER,                -- NULL пока placeholder не создан
+    slot_n         INTEGER NOT NULL,
+    chunks_total   INTEGER NOT NULL,
+    deadline       INTEGER NOT NULL,
+    is_sos         INTEGER NOT NULL DEFAULT 0,
+    created_at     INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS send_tx_chunks (
+    tx_id          INTEGER NOT NULL,
+    chunk_idx      INTEGER NOT NULL,
+    payload        TEXT NOT NULL,
+    state          TEXT NOT NULL DEFAULT 'pending',  -- pending | sent | acked | failed
+    attempts       INTEGER NOT NULL DEFAULT 0,       -- сколько раз ушла в retry
+    PRIMARY KEY (tx_id, chunk_idx)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sendtx_slot ON send_tx(slot_n);
+
 -- AI helper: чаты с локальной/облачной LLM, инициируются с pocket
 -- командой «@ai <вопрос>», продолжаются как «@aiN <вопрос>».
 CREATE TABLE IF NOT EXISTS ai_conversations (
@@ -356,6 +1234,17 @@ CREATE TABLE IF NOT EXISTS messages_recent (
 );
 
 CREATE INDEX IF NOT EXISTS idx_msgrec_ts ON messages_recent(ts);
+
+-- Трассы задержки по этапам (_Tracer, отчёт — trace_report.py).
+CREATE TABLE IF NOT EXISTS traces (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind        TEXT NOT NULL,             -- "tg" (TG → pocket) | "pocket" (ответ → TG)
+    started_at  REAL NOT NULL,             -- unix, момент приёма сообщения
+    status      TEXT NOT NULL,             -- ok | nak | failed | timeout
+    stages      TEXT NOT NULL              -- JSON {этап: мс от started_at}
+);
+
+CREATE INDEX IF NOT EXISTS idx_traces_started ON traces(started_at);
 """
 
 
@@ -374,20 +1263,143 @@ def _now() -> int:
     return int(time.time())
 
 
+# Group commit: helpers выполняют SQL сразу (тот же _db видит свои же
+# изменения — read-your-writes), а commit() с его записью WAL на диск
+# откладывается и делается пачкой в потоке «db-commit»: раз в
+# _DB_COMMIT_INTERVAL_S или сразу после _DB_COMMIT_MAX_OPS записей.
+# Одно сообщение от юзера = 4–5 write'ов → один commit вместо пяти.
+_DB_COMMIT_INTERVAL_S = 0.05
+_DB_COMMIT_MAX_OPS = 200
+
+
+class _GroupCommitter:
+    """Поток, коммитящий накопленные записи в _db пачками.
+
+    note_write() зовётся под _db_lock после каждой пишущей операции;
+    durable=True — закоммитить прямо сейчас (барьер: retry-строка или слот,
+    на который pocket будет отвечать, должны пережить падение процесса).
+    """
+
+    def __init__(self, interval_s: float, max_ops: int) -> None:
+        self.interval_s = interval_s
+        self.max_ops = max_ops
+        self._dirty = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.commits = 0
+        self.writes = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="db-commit",
+                                        daemon=True)
+        self._thread.start()
+
+    def note_write(self, durable: bool = False) -> None:
+        # Под _db_lock.
+        self._dirty += 1
+        self.writes += 1
+        if durable or self._dirty >= self.max_ops:
+            self._commit_locked()
+        elif self._dirty == 1:
+            self._wake.set()
+
+    def _commit_locked(self) -> None:
+        if self._dirty:
+            with _m_db_commit.time():
+                _db.commit()
+            self._dirty = 0
+            self.commits += 1
+
+    def flush(self) -> None:
+        with _db_lock:
+            self._commit_locked()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self._stop.wait(self.interval_s)   # stop() будит досрочно
+            try:
+                self.flush()
+            except Exception:
+                log.exception("db group commit failed")
+        try:
+            self.flush()
+        except Exception:
+            log.exception("db final commit failed")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+# None до db_init() (и в тестах) — тогда каждая запись коммитится сразу.
+_db_committer: Optional[_GroupCommitter] = None
+
+
+def _db_commit(*, durable: bool = False) -> None:
+    """Вместо _db.commit() в helpers. Вызывать под _db_lock."""
+    if _db_committer is None:
+        with _m_db_commit.time():
+            _db.commit()
+    else:
+        _db_committer.note_write(durable)
+
+
+def _db_flush() -> None:
+    """Барьер: всё записанное к этому моменту — на диске. Перед выходом
+    процесса и там, где другой процесс (GUI) должен увидеть изменения сразу."""
+    if _db_committer is not None:
+        _db_committer.flush()
+
+
+# Один долгоживущий connection на процесс (group commit требует, чтобы
+# все записи шли через него — read-your-writes до commit'а). Настраивается
+# один раз при открытии:
+# - WAL: одновременные read'ы не блокируют пишущего, и наоборот. Под нашу
+#   нагрузку (один Михаил, retry_worker, expiry_worker, GUI пишет
+#   users/banlist) — снимает риск "database is locked".
+# - synchronous=NORMAL — стандартный безопасный компромисс для WAL.
+# - mmap / cache / temp_store — БД маленькая, держим её в памяти целиком.
+_DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=67108864",     # 64 MiB
+    "PRAGMA cache_size=-8192",       # 8 MiB (отрицательное = KiB)
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+# sqlite3 держит LRU скомпилированных statement'ов по тексту SQL. Размер
+# с запасом на все _SQL + динамические запросы — именованные запросы
+# компилируются один раз за жизнь процесса.
+_DB_STATEMENT_CACHE = 256
+
+
+def _db_connect(path) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False,
+                           cached_statements=_DB_STATEMENT_CACHE)
+    conn.row_factory = sqlite3.Row
+    for pragma in _DB_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
 def db_init() -> None:
-    global _db
-    _db = sqlite3.connect(DB_PATH, check_same_thread=False)
-    _db.row_factory = sqlite3.Row
-    with _db_lock:
-        # WAL: одновременные read'ы не блокируют пишущего, и наоборот.
-        # Под нашу нагрузку (один Михаил, retry_worker, expiry_worker, GUI
-        # пишет users/banlist) — снимает риск "database is locked".
-        # synchronous=NORMAL — стандартный безопасный компромисс для WAL.
-        _db.execute("PRAGMA journal_mode=WAL;")
-        _db.execute("PRAGMA synchronous=NORMAL;")
+    global _db, _db_committer
+    _db = _db_connect(DB_PATH)
+    with _db_lock:
         _db.executescript(_DB_SCHEMA)
         _migrate_if_needed()
+        _users_fts_init()
         _db.commit()
+    slot_registry_load()
+    _db_committer = _GroupCommitter(_DB_COMMIT_INTERVAL_S, _DB_COMMIT_MAX_OPS)
+    _db_committer.start()
 
 
 def _migrate_if_needed() -> None:
@@ -413,45 +1425,142 @@ def _migrate_if_needed() -> None:
     cols = {row["name"] for row in cur.fetchall()}
     if "is_sos" not in cols:
         _db.execute("ALTER TABLE retry_queue ADD COLUMN is_sos INTEGER NOT NULL DEFAULT 0")
+    # retry_queue.tx_id / chunk_idx — дослать одну часть многопакетной отправки
+    if "tx_id" not in cols:
+        _db.execute("ALTER TABLE retry_queue ADD COLUMN tx_id INTEGER")
+    if "chunk_idx" not in cols:
+        _db.execute("ALTER TABLE retry_queue ADD COLUMN chunk_idx INTEGER")
+
+
+
+# Поиск в окне «Пользователи» (db.py) — по индексу users_fts, а не LIKE по
+# всей таблице. external content: текст живёт в users, FTS держит только
+# индекс, триггеры синхронизируют. trigram — подстрока в любом месте
+# имени, без учёта регистра (в т.ч. кириллица). UPDATE с тем же именем
+# (user_upsert на каждое сообщение) индекс не трогает — WHEN.
+_DB_USERS_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+    tg_username, first_name,
+    content='users', content_rowid='tg_user_id', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN
+    INSERT INTO users_fts (rowid, tg_username, first_name)
+    VALUES (new.tg_user_id, new.tg_username, new.first_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN
+    INSERT INTO users_fts (users_fts, rowid, tg_username, first_name)
+    VALUES ('delete', old.tg_user_id, old.tg_username, old.first_name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF tg_username, first_name ON users
+WHEN old.tg_username IS NOT new.tg_username OR old.first_name IS NOT new.first_name
+BEGIN
+    INSERT INTO users_fts (users_fts, rowid, tg_username, first_name)
+    VALUES ('delete', old.tg_user_id, old.tg_username, old.first_name);
+    INSERT INTO users_fts (rowid, tg_username, first_name)
+    VALUES (new.tg_user_id, new.tg_username, new.first_name);
+END;
+"""
+
+
+def _users_fts_init(conn: Optional[sqlite3.Connection] = None) -> bool:
+    """Создать users_fts + триггеры; на свежесозданном индексе — rebuild
+    из существующих users. Без FTS5/trigram в сборке SQLite (< 3.34) —
+    False, GUI ищет по-старому через LIKE."""
+    conn = conn or _db
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+    ).fetchone() is not None
+    try:
+        conn.executescript(_DB_USERS_FTS)
+    except sqlite3.OperationalError as e:
+        log.warning("users_fts недоступен (%s) — поиск пользователей без индекса", e)
+        return False
+    if not existed:
+        conn.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+    return True
+
+# ---------- named statements ----------
+# Запросы горячего пути (каждое входящее сообщение / ACK) — по имени.
+# Текст постоянный, поэтому statement cache отдаёт уже подготовленный
+# statement; новые запросы сюда, а не строкой по месту.
+_SQL: dict[str, str] = {
+    "user_upsert":
+        "INSERT INTO users (tg_user_id, tg_username, first_name, banned, first_seen, last_seen) "
+        "VALUES (?, ?, ?, 0, ?, ?) "
+        "ON CONFLICT(tg_user_id) DO UPDATE SET "
+        "tg_username = COALESCE(excluded.tg_username, tg_username), "
+        "first_name = COALESCE(excluded.first_name, first_name), "
+        "last_seen = excluded.last_seen",
+    "user_flags":
+        "SELECT banned, whitelisted FROM users WHERE tg_user_id = ?",
+    "user_names":
+        "SELECT tg_username, first_name FROM users WHERE tg_user_id = ?",
+    "slot_insert":
+        "INSERT INTO slots (slot_n, tg_user_id, created_at, expires_at, was_replied) "
+        "VALUES (?, ?, ?, ?, 0)",
+    "slot_touch":
+        "UPDATE slots SET expires_at = ? WHERE slot_n = ?",
+    "slot_set_last_message":
+        "UPDATE slots SET last_message = ? WHERE slot_n = ?",
+    "slot_mark_replied":
+        "UPDATE slots SET was_replied = 1, expires_at = ? WHERE slot_n = ?",
+    "slot_delete":
+        "DELETE FROM slots WHERE slot_n = ?",
+    "message_insert":
+        "INSERT INTO messages_recent (direction, slot_n, tg_user_id, text, ts) "
+        "VALUES (?, ?, ?, ?, ?)",
+    "retry_get":
+        "SELECT * FROM retry_queue WHERE id = ?",
+    "retry_delete":
+        "DELETE FROM retry_queue WHERE id = ?",
+    "tx_chunk_get":
+        "SELECT * FROM send_tx_chunks WHERE tx_id = ? AND chunk_idx = ?",
+    "tx_chunk_set_state":
+        "UPDATE send_tx_chunks SET state = ? "
+        "WHERE tx_id = ? AND chunk_idx = ? AND state NOT IN (?, 'acked')",
+    "ai_touch":
+        "UPDATE ai_conversations SET last_used_at = ? WHERE slot_n_ai = ?",
+    "ai_message_insert":
+        "INSERT INTO ai_messages (slot_n_ai, role, content, ts) VALUES (?, ?, ?, ?)",
+    "ai_history":
+        "SELECT role, content FROM ai_messages "
+        "WHERE slot_n_ai = ? ORDER BY ts DESC, id DESC LIMIT ?",
+    "trace_insert":
+        "INSERT INTO traces (kind, started_at, status, stages) VALUES (?, ?, ?, ?)",
+}
+
+
+def _sql(name: str, params=()) -> sqlite3.Cursor:
+    """Выполнить именованный запрос из _SQL. Вызывать под _db_lock."""
+    return _db.execute(_SQL[name], params)
 
 
 # ---------- users ----------
 def user_upsert(tg_user_id: int, tg_username: Optional[str], first_name: Optional[str]) -> None:
     now = _now()
     with _db_lock:
-        cur = _db.execute("SELECT 1 FROM users WHERE tg_user_id = ?", (tg_user_id,))
-        if cur.fetchone() is None:
-            _db.execute(
-                "INSERT INTO users (tg_user_id, tg_username, first_name, banned, first_seen, last_seen) "
-                "VALUES (?, ?, ?, 0, ?, ?)",
-                (tg_user_id, tg_username, first_name, now, now),
-            )
-        else:
-            _db.execute(
-                "UPDATE users SET tg_username = COALESCE(?, tg_username), "
-                "first_name = COALESCE(?, first_name), last_seen = ? WHERE tg_user_id = ?",
-                (tg_username, first_name, now, tg_user_id),
-            )
-        _db.commit()
+        _sql("user_upsert", (tg_user_id, tg_username, first_name, now, now))
+        _db_commit()
 
 
 def user_is_banned(tg_user_id: int) -> bool:
     with _db_lock:
-        cur = _db.execute("SELECT banned FROM users WHERE tg_user_id = ?", (tg_user_id,))
-        row = cur.fetchone()
+        row = _sql("user_flags", (tg_user_id,)).fetchone()
     return bool(row["banned"]) if row else False
 
 
 def user_set_banned(tg_user_id: int, banned: bool) -> None:
     with _db_lock:
         _db.execute("UPDATE users SET banned = ? WHERE tg_user_id = ?", (1 if banned else 0, tg_user_id))
-        _db.commit()
+        _db_commit()
 
 
 def user_display(tg_user_id: int) -> str:
     with _db_lock:
-        cur = _db.execute("SELECT tg_username, first_name FROM users WHERE tg_user_id = ?", (tg_user_id,))
-        row = cur.fetchone()
+        row = _sql("user_names", (tg_user_id,)).fetchone()
     if not row:
         return str(tg_user_id)
     return row["tg_username"] or row["first_name"] or str(tg_user_id)
@@ -472,15 +1581,12 @@ def user_set_whitelisted(tg_user_id: int, allowed: bool) -> None:
             "UPDATE users SET whitelisted = ? WHERE tg_user_id = ?",
             (1 if allowed else 0, tg_user_id),
         )
-        _db.commit()
+        _db_commit()
 
 
 def user_is_whitelisted(tg_user_id: int) -> bool:
     with _db_lock:
-        cur = _db.execute(
-            "SELECT whitelisted FROM users WHERE tg_user_id = ?", (tg_user_id,)
-        )
-        row = cur.fetchone()
+        row = _sql("user_flags", (tg_user_id,)).fetchone()
     return bool(row["whitelisted"]) if row else False
 
 
@@ -505,44 +1611,167 @@ def user_list_all() -> list[dict]:
         return [dict(row) for row in cur.fetchall()]
 
 
+# ---------- expiry schedule ----------
+# Единое расписание expiry_worker'а: ключи ("slot", n), ("ai", n), ("tx", id)
+# плюс периодические ("purge",) / ("resync",). Воркер спит до ближайшего
+# дедлайна вместо минутного опроса; продление TTL перепланирует ключ.
+_expiry_deadlines = _DeadlineQueue()
+
+_SLOT_RESYNC_S = 300          # сверка реестра слотов с таблицей (правки GUI)
+_HISTORY_PURGE_S = 86400      # messages_recent — раз в сутки
+
+
 # ---------- slots ----------
+class _SlotRegistry:
+    """In-memory таблица слотов — авторитетная копия `slots`.
+
+    Горячий путь каждого входящего сообщения (allocate_or_reuse / lookup /
+    was_replied) обходится без SQL: user→slot и slot→запись в dict'ах,
+    свободные номера — min-heap, истечения — ключи ("slot", n) в общем
+    `_expiry_deadlines` (момент, когда слот становится просроченным). Таблица
+    `slots` пишется write-through теми же функциями slot_*, так что GUI
+    и рестарт видят то же состояние; `load()` поднимает реестр из БД.
+
+    Min-heap свободных номеров хранит только «дыры» ниже `_next`; номер,
+    который успели занять снова, выкидывается при извлечении (lazy
+    invalidation, как в `_DeadlineQueue`). Все методы зовутся под `_db_lock`.
+    """
+
+    def __init__(self, expiry: _DeadlineQueue) -> None:
+        self.by_slot: dict[int, dict] = {}
+        self.by_user: dict[int, int] = {}
+        self.expiry = expiry
+        self._free: list[int] = []
+        self._next = 1   # все номера >= _next свободны
+
+    def clear(self) -> None:
+        for n in self.by_slot:
+            self.expiry.cancel(("slot", n))
+        self.by_slot.clear()
+        self.by_user.clear()
+        self._free.clear()
+        self._next = 1
+
+    def load(self, rows) -> None:
+        self.clear()
+        # ORDER BY expires_at: у юзера с «просроченным, но ещё не удалённым»
+        # слотом by_user должен указывать на самый свежий.
+        for row in sorted(rows, key=lambda r: r["expires_at"]):
+            self.put(dict(row))
+        self._free = [n for n in range(1, self._next) if n not in self.by_slot]
+        heapq.heapify(self._free)
+
+    def take_free(self) -> int:
+        while self._free:
+            n = heapq.heappop(self._free)
+            if n not in self.by_slot:
+                return n
+        n = self._next
+        self._next += 1
+        return n
+
+    def put(self, rec: dict) -> None:
+        n = rec["slot_n"]
+        self.by_slot[n] = rec
+        self.by_user[rec["tg_user_id"]] = n
+        self._next = max(self._next, n + 1)
+        self._schedule(n)
+
+    def get(self, n: Optional[int]) -> Optional[dict]:
+        return self.by_slot.get(n)
+
+    def active_for_user(self, tg_user_id: int, now: int) -> Optional[dict]:
+        rec = self.by_slot.get(self.by_user.get(tg_user_id))
+        if rec is None or rec["expires_at"] < now:
+            return None
+        return rec
+
+    def set_expires(self, n: int, expires_at: int) -> None:
+        self.by_slot[n]["expires_at"] = expires_at
+        self._schedule(n)
+
+    def _schedule(self, n: int) -> None:
+        # Просрочен = expires_at < now, т.е. с секунды expires_at + 1.
+        self.expiry.schedule(("slot", n), self.by_slot[n]["expires_at"] + 1)
+
+    def remove(self, n: int) -> Optional[dict]:
+        rec = self.by_slot.pop(n, None)
+        if rec is None:
+            return None
+        if self.by_user.get(rec["tg_user_id"]) == n:
+            del self.by_user[rec["tg_user_id"]]
+        self.expiry.cancel(("slot", n))
+        heapq.heappush(self._free, n)
+        return rec
+
+    def slots_of_user(self, tg_user_id: int) -> list[int]:
+        return [n for n, rec in self.by_slot.items()
+                if rec["tg_user_id"] == tg_user_id]
+
+    def pop_expired(self, now: int) -> list[int]:
+        """Снять все слоты с expires_at < now. Полный проход — для сверки;
+        штатно слоты снимает expiry_worker по одному (slot_expire)."""
+        freed = sorted(n for n, rec in self.by_slot.items()
+                       if rec["expires_at"] < now)
+        for n in freed:
+            self.remove(n)
+        return freed
+
+    def active(self, now: int) -> list[dict]:
+        return [self.by_slot[n] for n in sorted(self.by_slot)
+                if self.by_slot[n]["expires_at"] >= now]
+
+
+_slots = _SlotRegistry(_expiry_deadlines)
+
+_SLOT_COLUMNS = "slot_n, tg_user_id, created_at, expires_at, was_replied, last_message"
+
+
+def slot_registry_load() -> None:
+    """(Пере)загрузить `_slots` из таблицы. Вызывается из db_init и раз в
+    _SLOT_RESYNC_S из expiry_worker — GUI (db.delete_user) удаляет слоты
+    из своего процесса, и реестр должен это увидеть."""
+    with _db_lock:
+        cur = _db.execute(f"SELECT {_SLOT_COLUMNS} FROM slots")
+        _slots.load(cur.fetchall())
+
+
 def slot_allocate_or_reuse(tg_user_id: int) -> tuple[int, bool]:
     """Return (slot_n, reused). Sticky: if the user still has an active slot,
     refresh its TTL and reuse the same N; only when they have no slot do we
     pick a new lowest-free N.
     """
-    now = _now()
     with _db_lock:
-        # Existing non-expired slot?
-        cur = _db.execute(
-            "SELECT slot_n, was_replied FROM slots "
-            "WHERE tg_user_id = ? AND expires_at >= ? "
-            "ORDER BY expires_at DESC LIMIT 1",
-            (tg_user_id, now),
-        )
-        row = cur.fetchone()
-        if row is not None:
-            ttl_h = SLOT_STICKY_HOURS if row["was_replied"] else SLOT_TTL_HOURS
-            _db.execute(
-                "UPDATE slots SET expires_at = ? WHERE slot_n = ?",
-                (now + ttl_h * 3600, row["slot_n"]),
-            )
-            _db.commit()
-            return int(row["slot_n"]), True
-
-        # New slot — lowest free integer >= 1.
-        cur = _db.execute("SELECT slot_n FROM slots ORDER BY slot_n")
-        taken = {r["slot_n"] for r in cur.fetchall()}
-        n = 1
-        while n in taken:
-            n += 1
-        _db.execute(
-            "INSERT INTO slots (slot_n, tg_user_id, created_at, expires_at, was_replied) "
-            "VALUES (?, ?, ?, ?, 0)",
-            (n, tg_user_id, now, now + SLOT_TTL_HOURS * 3600),
-        )
-        _db.commit()
-        return n, False
+        n, reused = _slot_allocate_locked(tg_user_id, _now())
+    _feed_slot(n)
+    return n, reused
+
+
+def _slot_allocate_locked(tg_user_id: int, now: int) -> tuple[int, bool]:
+    rec = _slots.active_for_user(tg_user_id, now)
+    if rec is not None:
+        n = rec["slot_n"]
+        ttl_h = SLOT_STICKY_HOURS if rec["was_replied"] else SLOT_TTL_HOURS
+        expires_at = now + ttl_h * 3600
+        cur = _sql("slot_touch", (expires_at, n))
+        if cur.rowcount:
+            _slots.set_expires(n, expires_at)
+            _db_commit(durable=True)
+            return n, True
+        # Строку удалили мимо реестра (GUI) — выдаём новый слот.
+        _slots.remove(n)
+
+    # New slot — lowest free integer >= 1.
+    n = _slots.take_free()
+    rec = {
+        "slot_n": n, "tg_user_id": tg_user_id, "created_at": now,
+        "expires_at": now + SLOT_TTL_HOURS * 3600,
+        "was_replied": 0, "last_message": None,
+    }
+    _sql("slot_insert", (n, tg_user_id, now, rec["expires_at"]))
+    _slots.put(rec)
+    _db_commit(durable=True)
+    return n, False
 
 
 # Back-compat shim — old tests / admin paths still call slot_allocate.
@@ -554,74 +1783,133 @@ def slot_allocate(tg_user_id: int) -> int:
 def slot_lookup(n: int) -> Optional[int]:
     """Return tg_user_id of the slot, or None if missing or expired."""
     with _db_lock:
-        cur = _db.execute(
-            "SELECT tg_user_id, expires_at FROM slots WHERE slot_n = ?", (n,)
-        )
-        row = cur.fetchone()
-    if not row:
-        return None
-    if row["expires_at"] < _now():
-        return None
-    return row["tg_user_id"]
+        rec = _slots.get(n)
+        if rec is None or rec["expires_at"] < _now():
+            return None
+        return rec["tg_user_id"]
 
 
 def slot_set_last_message(n: int, text: str) -> None:
     """Store the most recent user message text on a slot (for UI display)."""
+    text = text[:200]  # cap length so UI stays predictable
     with _db_lock:
-        _db.execute(
-            "UPDATE slots SET last_message = ? WHERE slot_n = ?",
-            (text[:200], n),  # cap length so UI stays predictable
-        )
-        _db.commit()
+        _sql("slot_set_last_message", (text, n))
+        rec = _slots.get(n)
+        if rec is not None:
+            rec["last_message"] = text
+        _db_commit()
+    _feed_slot(n)
 
 
 def slot_mark_replied(n: int) -> None:
     """Mark slot as replied and extend TTL to sticky window (TASK-4)."""
-    now = _now()
+    expires_at = _now() + SLOT_STICKY_HOURS * 3600
     with _db_lock:
-        _db.execute(
-            "UPDATE slots SET was_replied = 1, expires_at = ? WHERE slot_n = ?",
-            (now + SLOT_STICKY_HOURS * 3600, n),
-        )
-        _db.commit()
+        _sql("slot_mark_replied", (expires_at, n))
+        rec = _slots.get(n)
+        if rec is not None:
+            rec["was_replied"] = 1
+            _slots.set_expires(n, expires_at)
+        _db_commit()
+    _feed_slot(n)
 
 
 def slot_free(n: int) -> None:
     with _db_lock:
-        _db.execute("DELETE FROM slots WHERE slot_n = ?", (n,))
-        _db.commit()
+        _sql("slot_delete", (n,))
+        _slots.remove(n)
+        _db_commit()
+    _feed_slot(n)
 
 
 def slot_free_all_for_user(tg_user_id: int) -> None:
     with _db_lock:
         _db.execute("DELETE FROM slots WHERE tg_user_id = ?", (tg_user_id,))
-        _db.commit()
+        freed = _slots.slots_of_user(tg_user_id)
+        for n in freed:
+            _slots.remove(n)
+        _db_commit()
+    for n in freed:
+        _feed_slot(n)
 
 
 def slot_expire_old() -> list[int]:
     """Delete expired slots. Returns list of slot_n freed."""
     now = _now()
     with _db_lock:
-        cur = _db.execute("SELECT slot_n FROM slots WHERE expires_at < ?", (now,))
-        freed = [row["slot_n"] for row in cur.fetchall()]
+        freed = _slots.pop_expired(now)
         if freed:
             _db.execute("DELETE FROM slots WHERE expires_at < ?", (now,))
-            _db.commit()
+            _db_commit()
+    for n in freed:
+        _feed_slot(n)
     return freed
 
 
+def slot_expire(n: int) -> bool:
+    """Удалить слот n, если он уже просрочен (дедлайн из _expiry_deadlines).
+    Returns True если удалили."""
+    now = _now()
+    with _db_lock:
+        rec = _slots.get(n)
+        if rec is None or rec["expires_at"] >= now:
+            return False
+        _slots.remove(n)
+        _db.execute("DELETE FROM slots WHERE slot_n = ? AND expires_at < ?", (n, now))
+        _db_commit()
+    _feed_slot(n)
+    return True
+
+
+def slot_count_active() -> int:
+    with _db_lock:
+        return len(_slots.active(_now()))
+
+
 def slot_list_active() -> list[dict]:
     now = _now()
     with _db_lock:
-        cur = _db.execute(
-            "SELECT s.slot_n, s.tg_user_id, s.created_at, s.expires_at, "
-            "s.was_replied, s.last_message, "
-            "u.tg_username, u.first_name, u.entry_tag "
-            "FROM slots s LEFT JOIN users u USING (tg_user_id) "
-            "WHERE s.expires_at >= ? ORDER BY s.slot_n",
-            (now,),
-        )
-        return [dict(row) for row in cur.fetchall()]
+        return _slot_rows(_slots.active(now))
+
+
+def slot_row(n: int) -> Optional[dict]:
+    """Один активный слот в формате slot_list_active, или None."""
+    with _db_lock:
+        rec = _slots.get(n)
+        if rec is None or rec["expires_at"] < _now():
+            return None
+        return _slot_rows([rec])[0]
+
+
+def _slot_rows(recs: list[dict]) -> list[dict]:
+    """Записи реестра + имена из users. Вызывать под _db_lock."""
+    rows = [dict(rec) for rec in recs]
+    if not rows:
+        return []
+    uids = sorted({r["tg_user_id"] for r in rows})
+    cur = _db.execute(
+        "SELECT tg_user_id, tg_username, first_name, entry_tag FROM users "
+        f"WHERE tg_user_id IN ({','.join('?' * len(uids))})",
+        uids,
+    )
+    users = {row["tg_user_id"]: dict(row) for row in cur.fetchall()}
+    for r in rows:
+        u = users.get(r["tg_user_id"], {})
+        r["tg_username"] = u.get("tg_username")
+        r["first_name"] = u.get("first_name")
+        r["entry_tag"] = u.get("entry_tag")
+    return rows
+
+
+def _feed_slot(n: int) -> None:
+    """Сообщить GUI о смене слота n (slot / slot_free). Без подписчиков — no-op."""
+    if not _live_feed.active():
+        return
+    row = slot_row(n)
+    if row is None:
+        _live_feed.publish("slot_free", slot_n=n)
+    else:
+        _live_feed.publish("slot", slot=row)
 
 
 # ---------- messages_recent (для !history / !last с pocket-ноды) ----------
@@ -634,12 +1922,8 @@ def messages_log(direction: str, *, slot_n: Optional[int],
     if not text:
         return
     with _db_lock:
-        _db.execute(
-            "INSERT INTO messages_recent (direction, slot_n, tg_user_id, text, ts) "
-            "VALUES (?, ?, ?, ?, ?)",
-            (direction, slot_n, tg_user_id, text[:200], _now()),
-        )
-        _db.commit()
+        _sql("message_insert", (direction, slot_n, tg_user_id, text[:200], _now()))
+        _db_commit()
 
 
 def messages_recent_get(hours: int, limit: int) -> list[dict]:
@@ -662,6 +1946,21 @@ def messages_recent_get(hours: int, limit: int) -> list[dict]:
     return rows
 
 
+def trace_store(kind: str, started_at: float, status: str, stages: dict) -> None:
+    with _db_lock:
+        _sql("trace_insert", (kind, started_at, status,
+                              json.dumps(stages, separators=(",", ":"))))
+        _db_commit()
+
+
+def traces_purge_old(retention_days: int) -> int:
+    cutoff = _now() - retention_days * 86400
+    with _db_lock:
+        cur = _db.execute("DELETE FROM traces WHERE started_at < ?", (cutoff,))
+        _db_commit()
+    return cur.rowcount
+
+
 def messages_purge_old(retention_days: int) -> int:
     """Удалить записи старше retention_days. Возвращает количество удалённых.
     Вызывается из expiry_worker раз в сутки."""
@@ -670,7 +1969,7 @@ def messages_purge_old(retention_days: int) -> int:
         cur = _db.execute(
             "DELETE FROM messages_recent WHERE ts < ?", (cutoff,),
         )
-        _db.commit()
+        _db_commit()
         return cur.rowcount or 0
 
 
@@ -681,7 +1980,7 @@ def user_set_entry_tag(tg_user_id: int, tag: Optional[str]) -> None:
             "UPDATE users SET entry_tag = ? WHERE tg_user_id = ?",
             (tag, tg_user_id),
         )
-        _db.commit()
+        _db_commit()
 
 
 def user_get_entry_tag(tg_user_id: int) -> Optional[str]:
@@ -706,14 +2005,14 @@ def cat_add(name: str, tag: str) -> bool:
             "INSERT INTO categories (name, tag, created_at) VALUES (?, ?, ?)",
             (name.strip(), tag, _now()),
         )
-        _db.commit()
+        _db_commit()
         return True
 
 
 def cat_remove(tag: str) -> bool:
     with _db_lock:
         cur = _db.execute("DELETE FROM categories WHERE tag = ?", (tag.strip().lower(),))
-        _db.commit()
+        _db_commit()
         return cur.rowcount > 0
 
 
@@ -738,30 +2037,37 @@ def cat_by_tag(tag: str) -> Optional[dict]:
 # ---------- retry_queue (TASK-2: delivery retries) ----------
 def retry_enqueue(tg_user_id: int, tg_chat_id: int, status_msg_id: int,
                   slot_n: int, payload: str, deadline: int,
-                  initial_delay_s: int, *, is_sos: bool = False) -> int:
+                  initial_delay_s: int, *, is_sos: bool = False,
+                  tx_id: Optional[int] = None,
+                  chunk_idx: Optional[int] = None) -> int:
     """Положить сообщение в retry-очередь.
 
     `is_sos=True` → fast-retry с шагами 5/15/30/60/120 секунд (вместо
     стандартных 2-15 минут). Используется для срочных сообщений
     (текст содержит «#SOS», «срочно», «urgent» и т.п.).
+
+    `tx_id` + `chunk_idx` → строка досылает одну часть многопакетной
+    отправки (send_tx), а не всё сообщение.
     """
+    next_try_at = _now() + initial_delay_s
     with _db_lock:
         cur = _db.execute(
             "INSERT INTO retry_queue "
             "(tg_user_id, tg_chat_id, status_msg_id, slot_n, payload, "
-            " attempts, next_try_at, deadline, is_sos) "
-            "VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)",
+            " attempts, next_try_at, deadline, is_sos, tx_id, chunk_idx) "
+            "VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?)",
             (tg_user_id, tg_chat_id, status_msg_id, slot_n, payload,
-             _now() + initial_delay_s, deadline, 1 if is_sos else 0),
+             next_try_at, deadline, 1 if is_sos else 0, tx_id, chunk_idx),
         )
-        _db.commit()
-        return int(cur.lastrowid)
+        _db_commit(durable=True)
+        retry_id = int(cur.lastrowid)
+    _retry_deadlines.schedule(retry_id, _retry_wake_at(next_try_at, deadline))
+    return retry_id
 
 
 def retry_get(retry_id: int) -> Optional[dict]:
     with _db_lock:
-        cur = _db.execute("SELECT * FROM retry_queue WHERE id = ?", (retry_id,))
-        row = cur.fetchone()
+        row = _sql("retry_get", (retry_id,)).fetchone()
     return dict(row) if row else None
 
 
@@ -785,26 +2091,225 @@ def retry_expired() -> list[dict]:
         return [dict(row) for row in cur.fetchall()]
 
 
-def retry_reschedule(retry_id: int, next_try_at: int) -> None:
+def retry_reschedule(retry_id: int, next_try_at: int, attempt: bool = True) -> None:
+    """attempt=False — перенос без попытки (эфир закрыт): backoff не растёт."""
     with _db_lock:
         _db.execute(
-            "UPDATE retry_queue SET attempts = attempts + 1, next_try_at = ? "
+            "UPDATE retry_queue SET attempts = attempts + ?, next_try_at = ? "
             "WHERE id = ?",
-            (next_try_at, retry_id),
+            (int(attempt), next_try_at, retry_id),
         )
-        _db.commit()
+        _db_commit()
+        cur = _db.execute("SELECT deadline FROM retry_queue WHERE id = ?", (retry_id,))
+        row = cur.fetchone()
+    if row is not None:
+        _retry_deadlines.schedule(retry_id, _retry_wake_at(next_try_at, row["deadline"]))
 
 
 def retry_delete(retry_id: int) -> None:
     with _db_lock:
-        _db.execute("DELETE FROM retry_queue WHERE id = ?", (retry_id,))
-        _db.commit()
+        _sql("retry_delete", (retry_id,))
+        _db_commit()
+    _retry_deadlines.cancel(retry_id)
 
 
 def retry_delete_for_slot(slot_n: int) -> None:
     with _db_lock:
+        cur = _db.execute("SELECT id FROM retry_queue WHERE slot_n = ?", (slot_n,))
+        ids = [r["id"] for r in cur.fetchall()]
         _db.execute("DELETE FROM retry_queue WHERE slot_n = ?", (slot_n,))
-        _db.commit()
+        _db_commit()
+    for retry_id in ids:
+        _retry_deadlines.cancel(retry_id)
+
+
+def retry_delay_s(attempts: int, is_sos: bool) -> int:
+    """Пауза перед следующей попыткой после `attempts` неудачных.
+
+    SOS: 5 → 15 → 30 → 60 → 120 → 120 ... сек. Обычные: экспонента от
+    RETRY_INITIAL_DELAY_MIN до RETRY_MAX_INTERVAL_MIN."""
+    if is_sos:
+        return _RETRY_SOS_BACKOFF_SEC[min(attempts, len(_RETRY_SOS_BACKOFF_SEC) - 1)]
+    base = RETRY_INITIAL_DELAY_MIN * 60
+    return int(min(base * (2 ** attempts), RETRY_MAX_INTERVAL_MIN * 60))
+
+
+# In-memory расписание retry_queue: {retry_id: когда разбудить retry_worker}.
+# Таблица остаётся источником истины (переживает рестарт), heap — только
+# индекс «кто следующий», пересобирается из таблицы при старте воркера.
+_retry_deadlines = _DeadlineQueue()
+
+
+def _retry_wake_at(next_try_at: int, deadline: int) -> int:
+    """Когда воркеру смотреть на строку: в момент next_try_at, либо сразу
+    после deadline (строка истекла раньше следующей попытки)."""
+    return next_try_at if next_try_at <= deadline else deadline + 1
+
+
+def retry_load_schedule() -> int:
+    """Пересобрать _retry_deadlines из retry_queue. Возвращает число строк."""
+    with _db_lock:
+        cur = _db.execute("SELECT id, next_try_at, deadline FROM retry_queue")
+        rows = cur.fetchall()
+    _retry_deadlines.clear()
+    for r in rows:
+        _retry_deadlines.schedule(r["id"], _retry_wake_at(r["next_try_at"], r["deadline"]))
+    return len(rows)
+
+
+# ---------- send_tx (многопакетная отправка с ACK по частям) ----------
+def tx_create(tg_user_id: int, tg_chat_id: int, slot_n: int,
+              payloads: list[str], deadline: int, *,
+              is_sos: bool = False) -> int:
+    """Завести транзакцию на len(payloads) частей, все в состоянии pending."""
+    with _db_lock:
+        cur = _db.execute(
+            "INSERT INTO send_tx "
+            "(tg_user_id, tg_chat_id, slot_n, chunks_total, deadline, is_sos, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (tg_user_id, tg_chat_id, slot_n, len(payloads), deadline,
+             1 if is_sos else 0, _now()),
+        )
+        tx_id = int(cur.lastrowid)
+        _db.executemany(
+            "INSERT INTO send_tx_chunks (tx_id, chunk_idx, payload) VALUES (?, ?, ?)",
+            [(tx_id, i, p) for i, p in enumerate(payloads)],
+        )
+        _db_commit(durable=True)
+    _expiry_deadlines.schedule(("tx", tx_id), deadline + 1)
+    return tx_id
+
+
+def tx_get(tx_id: int) -> Optional[dict]:
+    """Строка send_tx + счётчики частей: acked / failed."""
+    with _db_lock:
+        cur = _db.execute(
+            "SELECT t.*, "
+            " (SELECT COUNT(*) FROM send_tx_chunks c "
+            "   WHERE c.tx_id = t.id AND c.state = 'acked')  AS acked, "
+            " (SELECT COUNT(*) FROM send_tx_chunks c "
+            "   WHERE c.tx_id = t.id AND c.state = 'failed') AS failed "
+            "FROM send_tx t WHERE t.id = ?",
+            (tx_id,),
+        )
+        row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def tx_chunk_get(tx_id: int, chunk_idx: int) -> Optional[dict]:
+    with _db_lock:
+        row = _sql("tx_chunk_get", (tx_id, chunk_idx)).fetchone()
+    return dict(row) if row else None
+
+
+def tx_set_status_msg(tx_id: int, status_msg_id: int) -> None:
+    with _db_lock:
+        _db.execute("UPDATE send_tx SET status_msg_id = ? WHERE id = ?",
+                    (status_msg_id, tx_id))
+        _db.execute("UPDATE retry_queue SET status_msg_id = ? WHERE tx_id = ?",
+                    (status_msg_id, tx_id))
+        _db_commit()
+
+
+def tx_chunk_set_state(tx_id: int, chunk_idx: int, state: str) -> bool:
+    """Поменять состояние части. True если что-то изменилось.
+
+    'acked' — финальное: поздний «sent» от send-цикла или повторный NAK
+    его не откатывают."""
+    with _db_lock:
+        cur = _sql("tx_chunk_set_state", (state, tx_id, chunk_idx, state))
+        _db_commit()
+        return cur.rowcount > 0
+
+
+def tx_chunk_queue_retry(tx_id: int, chunk_idx: int) -> Optional[int]:
+    """Поставить часть в retry_queue (если её там ещё нет). Пауза растёт
+    с каждым NAK'ом этой части — как backoff у одиночных сообщений.
+    Возвращает retry_id (новый или уже существующий), None если tx нет."""
+    tx = tx_get(tx_id)
+    chunk = tx_chunk_get(tx_id, chunk_idx)
+    if tx is None or chunk is None:
+        return None
+    with _db_lock:
+        cur = _db.execute(
+            "SELECT id FROM retry_queue WHERE tx_id = ? AND chunk_idx = ?",
+            (tx_id, chunk_idx),
+        )
+        row = cur.fetchone()
+        if row is not None:
+            return int(row["id"])
+        _db.execute(
+            "UPDATE send_tx_chunks SET attempts = attempts + 1 "
+            "WHERE tx_id = ? AND chunk_idx = ?",
+            (tx_id, chunk_idx),
+        )
+        _db_commit()
+    return retry_enqueue(
+        tx["tg_user_id"], tx["tg_chat_id"], tx["status_msg_id"] or 0,
+        tx["slot_n"], chunk["payload"], tx["deadline"],
+        retry_delay_s(chunk["attempts"], bool(tx["is_sos"])),
+        is_sos=bool(tx["is_sos"]), tx_id=tx_id, chunk_idx=chunk_idx,
+    )
+
+
+def tx_chunk_drop_retry(tx_id: int, chunk_idx: int) -> None:
+    """Часть доставлена — её строка в retry_queue больше не нужна."""
+    with _db_lock:
+        cur = _db.execute(
+            "SELECT id FROM retry_queue WHERE tx_id = ? AND chunk_idx = ?",
+            (tx_id, chunk_idx),
+        )
+        ids = [r["id"] for r in cur.fetchall()]
+        _db.execute("DELETE FROM retry_queue WHERE tx_id = ? AND chunk_idx = ?",
+                    (tx_id, chunk_idx))
+        _db_commit()
+    for retry_id in ids:
+        _retry_deadlines.cancel(retry_id)
+
+
+def tx_retry_rows(tx_id: int) -> list[dict]:
+    with _db_lock:
+        cur = _db.execute(
+            "SELECT * FROM retry_queue WHERE tx_id = ? ORDER BY chunk_idx",
+            (tx_id,),
+        )
+        return [dict(row) for row in cur.fetchall()]
+
+
+def _tx_delete_where(where: str, params: tuple) -> list[int]:
+    with _db_lock:
+        cur = _db.execute(f"SELECT id FROM send_tx WHERE {where}", params)
+        tx_ids = [r["id"] for r in cur.fetchall()]
+        if not tx_ids:
+            return []
+        marks = ",".join("?" * len(tx_ids))
+        cur = _db.execute(
+            f"SELECT id FROM retry_queue WHERE tx_id IN ({marks})", tx_ids,
+        )
+        retry_ids = [r["id"] for r in cur.fetchall()]
+        _db.execute(f"DELETE FROM retry_queue WHERE tx_id IN ({marks})", tx_ids)
+        _db.execute(f"DELETE FROM send_tx_chunks WHERE tx_id IN ({marks})", tx_ids)
+        _db.execute(f"DELETE FROM send_tx WHERE id IN ({marks})", tx_ids)
+        _db_commit()
+    for retry_id in retry_ids:
+        _retry_deadlines.cancel(retry_id)
+    for tx_id in tx_ids:
+        _expiry_deadlines.cancel(("tx", tx_id))
+    return tx_ids
+
+
+def tx_delete(tx_id: int) -> None:
+    """Удалить транзакцию вместе с частями и их retry-строками."""
+    _tx_delete_where("id = ?", (tx_id,))
+
+
+def tx_delete_for_slot(slot_n: int) -> None:
+    _tx_delete_where("slot_n = ?", (slot_n,))
+
+
+def tx_expire_old() -> list[int]:
+    """Транзакции после deadline (ACK так и не пришёл) — удалить."""
+    return _tx_delete_where("deadline < ?", (_now(),))
 
 
 # ---------- AI conversations (TASK: AI helper) ----------
@@ -822,31 +2327,34 @@ def ai_alloc_slot() -> int:
             "VALUES (?, ?, ?)",
             (slot, n, n),
         )
-        _db.commit()
+        _db_commit()
+    _ai_schedule_expiry(slot, n)
     return slot
 
 
+def _ai_schedule_expiry(slot_n_ai: int, last_used_at: int) -> None:
+    # ai_expire_slot / ai_expire_old удаляют при last_used_at < now - TTL.
+    _expiry_deadlines.schedule(("ai", slot_n_ai),
+                               last_used_at + AI_TTL_HOURS * 3600 + 1)
+
+
 def ai_touch_slot(slot_n_ai: int) -> bool:
     """Обновить last_used_at. Returns True если slot существует."""
     n = _now()
     with _db_lock:
-        cur = _db.execute(
-            "UPDATE ai_conversations SET last_used_at = ? WHERE slot_n_ai = ?",
-            (n, slot_n_ai),
-        )
-        _db.commit()
-        return cur.rowcount > 0
+        cur = _sql("ai_touch", (n, slot_n_ai))
+        _db_commit()
+        found = cur.rowcount > 0
+    if found:
+        _ai_schedule_expiry(slot_n_ai, n)
+    return found
 
 
 def ai_save_message(slot_n_ai: int, role: str, content: str) -> None:
     """Записать одно сообщение в историю чата. role: 'user' | 'assistant'."""
     with _db_lock:
-        _db.execute(
-            "INSERT INTO ai_messages (slot_n_ai, role, content, ts) "
-            "VALUES (?, ?, ?, ?)",
-            (slot_n_ai, role, content, _now()),
-        )
-        _db.commit()
+        _sql("ai_message_insert", (slot_n_ai, role, content, _now()))
+        _db_commit()
 
 
 def ai_get_history(slot_n_ai: int, max_messages: int) -> list[dict]:
@@ -857,12 +2365,7 @@ def ai_get_history(slot_n_ai: int, max_messages: int) -> list[dict]:
     неопределён → LLM получает перемешанные роли.
     """
     with _db_lock:
-        cur = _db.execute(
-            "SELECT role, content FROM ai_messages "
-            "WHERE slot_n_ai = ? ORDER BY ts DESC, id DESC LIMIT ?",
-            (slot_n_ai, max_messages),
-        )
-        rows = cur.fetchall()
+        rows = _sql("ai_history", (slot_n_ai, max_messages)).fetchall()
     # Развернём обратно: сначала старые, потом новые
     return [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
 
@@ -886,10 +2389,27 @@ def ai_expire_old(ttl_hours: int) -> list[int]:
                 f"DELETE FROM ai_conversations WHERE slot_n_ai IN ({placeholders})",
                 freed,
             )
-            _db.commit()
+            _db_commit()
+    for slot in freed:
+        _expiry_deadlines.cancel(("ai", slot))
     return freed
 
 
+def ai_expire_slot(slot_n_ai: int, ttl_hours: int) -> bool:
+    """Удалить один чат, если он неактивен дольше ttl_hours. True если удалили."""
+    cutoff = _now() - ttl_hours * 3600
+    with _db_lock:
+        cur = _db.execute(
+            "DELETE FROM ai_conversations WHERE slot_n_ai = ? AND last_used_at < ?",
+            (slot_n_ai, cutoff),
+        )
+        if cur.rowcount == 0:
+            return False
+        _db.execute("DELETE FROM ai_messages WHERE slot_n_ai = ?", (slot_n_ai,))
+        _db_commit()
+    return True
+
+
 def ai_slot_exists(slot_n_ai: int) -> bool:
     with _db_lock:
         cur = _db.execute(
@@ -908,20 +2428,20 @@ def fav_add(tg_user_id: int, note: Optional[str] = None) -> bool:
             if note is not None:
                 _db.execute("UPDATE favorites SET note = ? WHERE tg_user_id = ?",
                             (note, tg_user_id))
-                _db.commit()
+                _db_commit()
             return False
         _db.execute(
             "INSERT INTO favorites (tg_user_id, added_at, note) VALUES (?, ?, ?)",
             (tg_user_id, _now(), note),
         )
-        _db.commit()
+        _db_commit()
         return True
 
 
 def fav_remove(tg_user_id: int) -> bool:
     with _db_lock:
         cur = _db.execute("DELETE FROM favorites WHERE tg_user_id = ?", (tg_user_id,))
-        _db.commit()
+        _db_commit()
         return cur.rowcount > 0
 
 
@@ -953,7 +2473,9 @@ def gps_save(lat: float, lon: float, alt: Optional[float], fix_time: Optional[in
             "fix_time=excluded.fix_time, received_at=excluded.received_at",
             (lat, lon, alt, fix_time, _now()),
         )
-        _db.commit()
+        _db_commit()
+    _live_feed.publish("gps", lat=lat, lon=lon, alt=alt, fix_time=fix_time,
+                       received_at=_now())
 
 
 def gps_get_latest() -> Optional[dict]:
@@ -1034,10 +2556,73 @@ def _on_mesh_connection_lost(*args, **kwargs) -> None:
     log.error("Mesh connection lost — exiting for supervisor restart")
     # os._exit чтобы избежать атексит-хуков которые могут попробовать писать
     # в уже мёртвый USB и зависнуть. Код 1 → supervisor видит crash → restart.
+    # БД — не USB: отложенные group-commit'ом записи дописываем.
+    try:
+        _db_flush()
+    except Exception:
+        pass
     import os as _os
     _os._exit(1)
 
 
+class _RxDedup:
+    """Кэш уже принятых текстовых пакетов: LRU с TTL, проверка прямо в
+    RX-потоке meshtastic — дубль не доходит ни до диспетчера, ни до БД,
+    ни до Telegram.
+
+    Дубли бывают, когда pocket не получил наш ACK и прошивка перешлёт тот
+    же пакет (тот же id), или его повторно ретранслировали соседние ноды.
+    Ключ — (отправитель, id пакета); с text_ttl_s > 0 ещё и (отправитель,
+    хэш текста) — ловит повтор, отправленный заново уже с новым id.
+    Повторное попадание срок записи не продлевает: сообщение, честно
+    отправленное ещё раз после окна, пройдёт.
+    """
+
+    def __init__(self, max_size: int = 2048, ttl_s: float = 900.0,
+                 text_ttl_s: float = 0.0) -> None:
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.text_ttl_s = text_ttl_s
+        self._lock = threading.Lock()
+        self._seen: OrderedDict[tuple, float] = OrderedDict()   # ключ → истекает
+
+    def is_duplicate(self, packet: dict, text: str, now: Optional[float] = None) -> bool:
+        """Пакет уже был? Новый — запоминается."""
+        now = time.monotonic() if now is None else now
+        sender = packet.get("fromId") or packet.get("from")
+        keys = []
+        if packet.get("id"):
+            keys.append((("id", sender, packet["id"]), self.ttl_s))
+        if self.text_ttl_s > 0:
+            keys.append((("text", sender, hash(text)), self.text_ttl_s))
+        dup = False
+        with self._lock:
+            for key, ttl in keys:
+                expires = self._seen.get(key)
+                if expires is not None and expires > now:
+                    dup = True
+                    continue
+                self._seen[key] = now + ttl
+                self._seen.move_to_end(key)
+            # Старые — в начале: чистим истёкшие и всё сверх max_size.
+            while self._seen:
+                key, expires = next(iter(self._seen.items()))
+                if expires > now and len(self._seen) <= self.max_size:
+                    break
+                del self._seen[key]
+        return dup
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._seen.clear()
+
+
+_rx_dedup = _RxDedup(text_ttl_s=MESH_RX_DEDUP_TEXT_SEC)
+
+
 def on_mesh_receive(packet, interface) -> None:
     """Meshtastic bg-thread callback. Keep it fast and non-blocking."""
     try:
@@ -1050,6 +2635,10 @@ def on_mesh_receive(packet, interface) -> None:
         # Any packet from pocket counts as a freshness signal.
         if from_id == POCKET_NODE_ID:
             _pocket_last_heard = time.time()
+            _live_feed.publish("pocket", last_heard=_pocket_last_heard)
+        _live_feed.publish("rx", from_id=from_id, portnum=portnum,
+                           snr=packet.get("rxSnr"), rssi=packet.get("rxRssi"))
+        _m_packets.inc(direction="rx", kind=portnum or "?")
 
         # GPS position from the pocket node (BETA).
         if portnum == "POSITION_APP" and from_id == POCKET_NODE_ID:
@@ -1084,12 +2673,18 @@ def on_mesh_receive(packet, interface) -> None:
         if not text:
             return
 
+        if _rx_dedup.is_duplicate(packet, text):
+            _m_rx_duplicates.inc()
+            log.info("Mesh RX duplicate from %s dropped (id=%s)", from_id, packet.get("id"))
+            return
+
         _mesh_queue.put({
             "kind": "mesh_rx",
             "from_id": from_id or "?",
             "text": text,
             "snr": packet.get("rxSnr"),
             "rssi": packet.get("rxRssi"),
+            "rx_at": time.monotonic(),
         })
         log.info("Mesh RX from %s: %s", from_id, text)
     except Exception:
@@ -1097,14 +2692,36 @@ def on_mesh_receive(packet, interface) -> None:
 
 
 # Lock на исходящие LoRa-вызовы. Радио всё равно физически передаёт только
-# один пакет в моменте — лок просто матчит реальность и убирает любые гонки
-# на _mesh_iface (USB-write) при конкурентных вызовах из разных asyncio-
-# обработчиков и retry_worker'а. threading.Lock работает и для sync-, и
-# для async-callers (последние используют send_dm_to_pocket_async, который
-# гоняет sendText через asyncio.to_thread).
+# один пакет в моменте. Async-код и так сериализован через _mesh_tx (один
+# поток), лок страхует sync-вызовы send_dm_to_pocket мимо очереди.
 _mesh_send_lock = threading.Lock()
 
 
+def _ack_outcome(packet) -> tuple[bool, Optional[str]]:
+    """Routing-ответ прошивки → (delivered, errorReason)."""
+    decoded = packet.get("decoded") or {}
+    routing = decoded.get("routing") or {}
+    err = routing.get("errorReason") or routing.get("error_reason")
+    return (err is None or err == "NONE"), err
+
+
+def _paced_ack_cb(on_ack, sent_at: float):
+    """Обернуть on_ack: сначала кормим _pacing замером RTT / NAK'ом."""
+    def _cb(packet):
+        try:
+            delivered, _ = _ack_outcome(packet)
+            rtt = time.monotonic() - sent_at
+            _pacing.observe(rtt, delivered)
+            _m_ack_rtt.observe(rtt)
+            _m_acks.inc(result="ack" if delivered else "nak")
+            if not delivered:
+                log.info("NAK from pocket — pacing %s", _pacing.describe())
+        except Exception:
+            log.exception("pacing observe failed")
+        on_ack(packet)
+    return _cb
+
+
 def send_dm_to_pocket(text: str, on_ack=None) -> None:
     """Send a DM to the pocket node. If `on_ack` is given, it will be called
     once when the routing-ACK / NAK arrives (or library timeout fires).
@@ -1117,35 +2734,195 @@ def send_dm_to_pocket(text: str, on_ack=None) -> None:
     `MESH_DELIVERY_MODE`: при `"fast"` идёт fire-and-forget (wantAck=False,
     on_ack игнорируется). При `"reliable"` (default) — стандартный wantAck.
     """
+    if _mesh_iface is None:
+        raise RuntimeError("Mesh interface not connected")
+    if MESH_WANT_ACK:
+        # RTT считаем от момента отдачи пакета в ноду до routing-ACK'а.
+        if on_ack is not None:
+            on_ack = _paced_ack_cb(on_ack, time.monotonic())
+        _mesh_send_text(
+            text,
+            destinationId=POCKET_NODE_ID,
+            wantAck=True,
+            onResponse=on_ack,
+            hopLimit=MESH_HOP_LIMIT,
+        )
+    else:
+        # Fast mode: fire-and-forget. Никаких ACK / retry / статусов
+        # доставки. Подходит для срочных коротких пакетов когда «лишь бы
+        # быстрее, а не наверняка».
+        _mesh_send_text(
+            text,
+            destinationId=POCKET_NODE_ID,
+            wantAck=False,
+            hopLimit=MESH_HOP_LIMIT,
+        )
+    _live_feed.publish("tx", bytes=len(text.encode("utf-8")), want_ack=MESH_WANT_ACK)
+
+
+def _mesh_send_text(text: str, **kwargs) -> None:
+    """Единственный вызов sendText: под _mesh_send_lock и с записью оценки
+    airtime в _airtime — и для pocket, и для /dm на чужую ноду, и для
+    /broadcast."""
     if _mesh_iface is None:
         raise RuntimeError("Mesh interface not connected")
     with _mesh_send_lock:
-        if MESH_WANT_ACK:
-            _mesh_iface.sendText(
-                text,
-                destinationId=POCKET_NODE_ID,
-                wantAck=True,
-                onResponse=on_ack,
-                hopLimit=MESH_HOP_LIMIT,
-            )
-        else:
-            # Fast mode: fire-and-forget. Никаких ACK / retry / статусов
-            # доставки. Подходит для срочных коротких пакетов когда «лишь бы
-            # быстрее, а не наверняка».
-            _mesh_iface.sendText(
-                text,
-                destinationId=POCKET_NODE_ID,
-                wantAck=False,
-                hopLimit=MESH_HOP_LIMIT,
-            )
+        _mesh_iface.sendText(text, **kwargs)
+    _airtime.record(airtime.estimate(len(text.encode("utf-8")), LORA_PRESET))
+
+
+async def send_dm_to_pocket_async(text: str, on_ack=None, *,
+                                  lane: str = "status", flow=None) -> None:
+    """Async-friendly обёртка над send_dm_to_pocket через _mesh_tx: USB-write
+    идёт в потоке «mesh-tx», event loop не блокируется, порядок задаёт
+    полоса `lane` (sos > user > retry > ai > status). `flow` — ключ
+    справедливости внутри полосы (обычно номер слота).
+    MeshTxQueueFull — если полоса переполнена.
+
+    Полосы ai / status при закрытом duty cycle гейте не ждут: пакет
+    остаётся в TX-очереди, а вызывающий (обработчик _mesh_workers) сразу
+    освобождает слот семафора — иначе восемь ответов !ping на пороге
+    лимита заморозили бы ответы слотов, ACK'и и SOS на минуты. Ошибку
+    такой отложенной отправки только логируем."""
+    if lane in _DETACH_WHEN_GATED and _airtime_gate(lane) > 0:
+        task = asyncio.create_task(
+            _mesh_tx.submit(send_dm_to_pocket, text, on_ack, lane=lane, flow=flow))
+        _detached_sends.add(task)
+        task.add_done_callback(_detached_send_done)
+        return
+    await _mesh_tx.submit(send_dm_to_pocket, text, on_ack, lane=lane, flow=flow)
+
+
+# Полосы, которые при закрытом эфире уходят в TX-очередь без ожидания
+# (служебные ответы, AI): их отправку никто не ретраит.
+_DETACH_WHEN_GATED = ("ai", "status")
+_detached_sends: set[asyncio.Task] = set()
+
+
+def _detached_send_done(task: asyncio.Task) -> None:
+    _detached_sends.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.warning("deferred mesh send failed: %s", task.exception())
+
+
+class _TxBatcher:
+    """Склейка коротких однопакетных сообщений в один LoRa-фрейм.
+
+    Первое сообщение открывает окно `window_s`; всё, что пришло за окно,
+    уходит одним пакетом через `SEP` (pocket видит каждую запись с новой
+    строки, заголовки «[@N …]» остаются). Не влезает в `max_bytes` —
+    текущая пачка уходит сразу, новое сообщение открывает следующую.
 
+    ACK один на фрейм — раздаётся on_ack'ам всех сообщений пачки, так что
+    «✓ Доставлено» получает каждый отправивший. Ошибка отправки тоже
+    пробрасывается каждому: дальше у каждого свой retry со своим payload.
+    window_s <= 0 — сквозная отправка без задержки.
 
-async def send_dm_to_pocket_async(text: str, on_ack=None) -> None:
-    """Async-friendly обёртка над send_dm_to_pocket. USB-write уносится в
-    thread-pool, asyncio event loop не блокируется на время передачи.
-    Сериализация конкурентных вызовов гарантируется внутренним
-    `_mesh_send_lock` (один пакет в моменте — как и физическое радио)."""
-    await asyncio.to_thread(send_dm_to_pocket, text, on_ack)
+    `flow` (слот) уходит в TX-очередь: сквозная отправка — со слотом
+    отправителя, склеенный фрейм — со своим flow на пачку, чтобы
+    round-robin полосы user не схлопывался в FIFO.
+    """
+
+    SEP = "\n"
+
+    def __init__(self, window_s: float, max_bytes: int, send) -> None:
+        self.window_s = window_s
+        self.max_bytes = max_bytes
+        self._send = send            # async (text, on_ack, flow) -> None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: list[tuple[str, object, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.frames = 0              # сколько фреймов ушло через батчер
+        self.messages = 0            # сколько сообщений в них уложено
+        self._batch_ids = itertools.count(1)
+
+    async def send(self, text: str, on_ack=None, flow=None) -> None:
+        if self.window_s <= 0:
+            await self._send(text, on_ack, flow)
+            return
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._pending, self._timer = loop, [], None
+        if self._pending and _utf8_len(self._joined() + self.SEP + text) > self.max_bytes:
+            self.flush()
+        fut = loop.create_future()
+        self._pending.append((text, on_ack, fut))
+        if len(self._pending) == 1:
+            self._timer = loop.call_later(self.window_s, self.flush)
+        await fut
+
+    def _joined(self) -> str:
+        return self.SEP.join(t for t, _, _ in self._pending)
+
+    def flush(self) -> None:
+        """Отправить накопленное сейчас, не дожидаясь окна."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self._loop.create_task(self._send_batch(batch))
+
+    async def _send_batch(self, batch: list) -> None:
+        text = self.SEP.join(t for t, _, _ in batch)
+        acks = [cb for _, cb, _ in batch if cb is not None]
+
+        def _fanout(packet):
+            for cb in acks:
+                try:
+                    cb(packet)
+                except Exception:
+                    log.exception("batched ack fan-out failed")
+
+        try:
+            await self._send(text, _fanout if acks else None,
+                             ("batch", next(self._batch_ids)))
+        except Exception as e:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.frames += 1
+        self.messages += len(batch)
+        if len(batch) > 1:
+            log.info("Batched %d messages into one frame (%d bytes)",
+                     len(batch), _utf8_len(text))
+        for _, _, fut in batch:
+            if not fut.done():
+                fut.set_result(None)
+
+
+_tx_batcher = _TxBatcher(
+    MESH_BATCH_WINDOW_MS / 1000, MAX_PACKET_BYTES,
+    lambda text, on_ack, flow: send_dm_to_pocket_async(text, on_ack, lane="user", flow=flow),
+)
+
+
+def _make_ack_cb(slot_n: Optional[int], chat_id: int, *,
+                 tx_id: Optional[int] = None,
+                 chunk_idx: Optional[int] = None,
+                 trace_id: Optional[int] = None):
+    """on_ack для send_dm_to_pocket: routing-ACK / NAK → событие "ack" в
+    _mesh_queue (реальная работа — в asyncio-диспетчере). Для части
+    многопакетной отправки в событие кладутся tx_id и chunk_idx;
+    trace_id — трасса _tracer, этап "ack" отмечается прямо здесь."""
+    def _on_ack(packet):
+        try:
+            delivered, err = _ack_outcome(packet)
+            _tracer.mark(trace_id, "ack")
+            _mesh_queue.put({
+                "kind": "ack",
+                "delivered": delivered,
+                "error": err,
+                "slot_n": slot_n,
+                "chat_id": chat_id,
+                "tx_id": tx_id,
+                "chunk_idx": chunk_idx,
+                "trace_id": trace_id,
+            })
+        except Exception:
+            log.exception("ack callback failed")
+    return _on_ack
 
 
 def list_nodes_except_self() -> list[dict]:
@@ -1198,6 +2975,17 @@ def pocket_freshness_hint() -> str:
 _RE_SOS            = re.compile(r"^#SOS\b\s*(.*)$", re.IGNORECASE | re.DOTALL)
 _RE_STANDALONE_CMD = re.compile(r"^!(\w+)(?:\s+(.*))?$", re.DOTALL)
 _RE_SLOT_PREFIX    = re.compile(r"^@(\d+)\s*(.*)$", re.DOTALL)
+# Компактный токен «3> текст» — тот, что pocket видит в COMPACT_HEADERS-
+# пакетах. Только при включённом COMPACT_HEADERS: иначе «5> …» — обычный текст.
+_RE_SLOT_TOKEN     = re.compile(r"^(\d+)>\s*(.*)$", re.DOTALL)
+
+# Обратный разбор заголовков, которые строит _format_lora_packet.
+_RE_PACKET_CLASSIC = re.compile(
+    r"^\[@(\d+) (.+?) (\d{2}:\d{2})(?: (\d+)/(\d+))?\] ?(.*)$", re.DOTALL,
+)
+_RE_PACKET_COMPACT = re.compile(
+    r"^(\d+)([a-zA-Z]?)>(?:(\S[^\n]*?): )?(.*)$", re.DOTALL,
+)
 
 
 def parse_mesh_text(text: str) -> dict:
@@ -1230,7 +3018,7 @@ def parse_mesh_text(text: str) -> dict:
     if m:
         return {"kind": "standalone_cmd", "cmd": m.group(1).lower(), "args": (m.group(2) or "").strip()}
 
-    m = _RE_SLOT_PREFIX.match(text)
+    m = _RE_SLOT_PREFIX.match(text) or (COMPACT_HEADERS and _RE_SLOT_TOKEN.match(text))
     if m:
         n = int(m.group(1))
         rest = m.group(2).strip()
@@ -1242,6 +3030,188 @@ def parse_mesh_text(text: str) -> dict:
     return {"kind": "raw", "text": text}
 
 
+def parse_packet_header(text: str) -> Optional[dict]:
+    """Разобрать заголовок relay→pocket пакета (обратно к _format_lora_packet).
+
+    Понимает оба формата — классический «[@3 vasya 16:15 1/3] …» и
+    компактный «3a>vasya: …». Возвращает None если это не наш пакет, иначе:
+      {"slot_n": int, "sender": str|None, "time": str|None,
+       "chunk_idx": int, "chunks_total": int|None, "final": bool,
+       "text": str, "compact": bool}
+    `chunks_total` у компактной средней части неизвестен (None) — N
+    становится известен по заглавному индексу последней части.
+    """
+    m = _RE_PACKET_CLASSIC.match(text)
+    if m:
+        total = int(m.group(5)) if m.group(5) else 1
+        idx = int(m.group(4)) - 1 if m.group(4) else 0
+        return {
+            "slot_n": int(m.group(1)), "sender": m.group(2), "time": m.group(3),
+            "chunk_idx": idx, "chunks_total": total, "final": idx == total - 1,
+            "text": m.group(6), "compact": False,
+        }
+    m = _RE_PACKET_COMPACT.match(text)
+    if m:
+        idx_ch = m.group(2)
+        sender = m.group(3)
+        if not idx_ch:
+            if sender is None:
+                return None   # «3>текст» без имени — это не наш формат
+            return {
+                "slot_n": int(m.group(1)), "sender": sender, "time": None,
+                "chunk_idx": 0, "chunks_total": 1, "final": True,
+                "text": m.group(4), "compact": True,
+            }
+        idx = _COMPACT_CHUNK_IDX.index(idx_ch.lower())
+        final = idx_ch.isupper()
+        body = m.group(4)
+        if idx == 0:
+            if sender is None:
+                return None
+        else:
+            # У продолжений имени нет: «3b> текст» — всё после «> » это текст.
+            sender = None
+            body = text[text.index(">") + 1:]
+            if body.startswith(" "):
+                body = body[1:]
+        return {
+            "slot_n": int(m.group(1)), "sender": sender, "time": None,
+            "chunk_idx": idx, "chunks_total": idx + 1 if final else None,
+            "final": final, "text": body, "compact": True,
+        }
+    return None
+
+
+# ============================================================
+# Telegram fan-out: одно и то же многим чатам (SOS, рассылки)
+# ============================================================
+class _RateLimiter:
+    """Token bucket для asyncio: `rate` в секунду, всплеск до `burst`.
+
+    reserve() не блокирует — бронирует токен (баланс может уйти в минус)
+    и возвращает, сколько ждать. Всё в одном event loop'е, без локов."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._at = time.monotonic()
+
+    def reserve(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        self._tokens = min(self.burst, self._tokens + (now - self._at) * self.rate)
+        self._at = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def idle(self, now: float) -> bool:
+        """Бакет полон — его можно выбросить без потери состояния."""
+        return self._tokens + (now - self._at) * self.rate >= self.burst
+
+    async def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class _TgFanout:
+    """Рассылка в несколько TG-чатов параллельно, в рамках лимитов Bot API.
+
+    Получатели обрабатываются одновременно (не больше `concurrency`),
+    вызовы одного получателя (текст + геопозиция) — тоже параллельно.
+    Каждый вызов проходит общий лимитер (~30 сообщений/с на бота) и
+    лимитер своего чата (~1/с, всплеск до 3). RetryAfter — ждём сколько
+    сказано и повторяем только этот вызов этого получателя; сетевые
+    сбои — короткий повтор; остальное (бот заблокирован, чат не найден)
+    — сразу ошибка получателя. Лимитеры общие для всех рассылок.
+    """
+
+    CONCURRENCY = 8
+    GLOBAL_RATE = 25.0          # запас под лимит Telegram ~30/с
+    CHAT_RATE, CHAT_BURST = 1.0, 3.0
+    MAX_ATTEMPTS = 4
+    MAX_RETRY_AFTER_S = 60
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._global = _RateLimiter(self.GLOBAL_RATE, self.GLOBAL_RATE)
+        self._chats: dict[int, _RateLimiter] = {}
+
+    def _ensure_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._sem = asyncio.Semaphore(self.CONCURRENCY)
+
+    def _chat_limiter(self, chat_id: int) -> _RateLimiter:
+        lim = self._chats.get(chat_id)
+        if lim is None:
+            if len(self._chats) >= 1024:
+                now = time.monotonic()
+                self._chats = {c: b for c, b in self._chats.items() if not b.idle(now)}
+            lim = self._chats[chat_id] = _RateLimiter(self.CHAT_RATE, self.CHAT_BURST)
+        return lim
+
+    async def send(self, chat_ids, build) -> list[dict]:
+        """`build(chat_id)` → список фабрик корутин (по одной на вызов Bot
+        API; фабрика, а не корутина — чтобы было что повторить).
+
+        Возвращает по получателю в исходном порядке:
+          {"chat_id": int, "ok": bool, "error": str|None, "ms": int}
+        """
+        self._ensure_loop()
+        return list(await asyncio.gather(*(self._deliver(c, build(c)) for c in chat_ids)))
+
+    async def _deliver(self, chat_id: int, calls) -> dict:
+        t0 = time.monotonic()
+        async with self._sem:
+            results = await asyncio.gather(
+                *(self._call(chat_id, make) for make in calls), return_exceptions=True,
+            )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        for e in errors:
+            log.warning("fan-out to %s failed: %r", chat_id, e)
+        error = None
+        if errors:
+            error = f"{type(errors[0]).__name__}: {errors[0]}".rstrip(": ")
+        return {"chat_id": chat_id, "ok": not errors, "error": error,
+                "ms": round((time.monotonic() - t0) * 1000)}
+
+    async def _call(self, chat_id: int, make):
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            await self._chat_limiter(chat_id).acquire()
+            await self._global.acquire()
+            try:
+                return await make()
+            except RetryAfter as e:
+                wait = e.retry_after
+                wait = wait.total_seconds() if hasattr(wait, "total_seconds") else float(wait)
+                if attempt == self.MAX_ATTEMPTS or wait > self.MAX_RETRY_AFTER_S:
+                    raise
+                log.info("fan-out to %s: RetryAfter %.0fs", chat_id, wait)
+                await asyncio.sleep(wait)
+            except (NetworkError, TimedOut):
+                # RetryAfter — не NetworkError, сюда не попадает.
+                if attempt == self.MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(0.5 * attempt)
+
+
+_tg_fanout = _TgFanout()
+
+
+def _fanout_who(chat_id: int) -> str:
+    name = user_display(chat_id)
+    return str(chat_id) if name == str(chat_id) else f"{name} ({chat_id})"
+
+
+def _fanout_summary(results: list[dict]) -> tuple[int, list[dict]]:
+    """(сколько доставлено, список неудач)."""
+    failed = [r for r in results if not r["ok"]]
+    return len(results) - len(failed), failed
+
+
 # ============================================================
 # Mesh event dispatcher (runs in asyncio loop)
 # ============================================================
@@ -1262,27 +3232,76 @@ async def _dm_user(app: Application, tg_user_id: int, text: str) -> bool:
 
 
 def _slot_was_replied(slot_n: int) -> bool:
-    """Sync DB query — used by ACK handler to skip redundant receipts after
+    """Sync registry lookup — used by ACK handler to skip redundant receipts after
     Mikhail has already replied to this slot."""
     if slot_n is None:
         return False
     with _db_lock:
-        cur = _db.execute("SELECT was_replied FROM slots WHERE slot_n = ?",
-                          (slot_n,))
-        row = cur.fetchone()
-    return bool(row["was_replied"]) if row else False
+        rec = _slots.get(slot_n)
+        return bool(rec["was_replied"]) if rec else False
+
+
+def _tx_progress_text(tx: dict) -> str:
+    """Статус многопакетной отправки для TG-юзера: «доставлено 3/5»."""
+    total = tx["chunks_total"]
+    acked = tx["acked"]
+    if acked >= total:
+        return f"✓ Доставлено: {DISPLAY_NAME} ({total}/{total} частей)."
+    text = f"📨 Длинное сообщение ({total} частей): доставлено {acked}/{total}."
+    if tx["failed"]:
+        text += f" Недошедшие части ({tx['failed']}) дошлю автоматически."
+    return text
+
+
+async def _handle_tx_ack(app: Application, evt: dict) -> None:
+    """ACK / NAK одной части send_tx. ACK — часть доставлена, её retry-строка
+    не нужна. NAK — ставим в retry_queue ТОЛЬКО эту часть. Статус юзера
+    правим на «доставлено N/M», полностью доставленную tx удаляем."""
+    tx_id = evt["tx_id"]
+    idx = evt.get("chunk_idx")
+    if tx_get(tx_id) is None:
+        return  # уже доставлена целиком / истекла / Михаил ответил
+    if evt.get("delivered"):
+        changed = tx_chunk_set_state(tx_id, idx, "acked")
+        tx_chunk_drop_retry(tx_id, idx)
+    else:
+        changed = tx_chunk_set_state(tx_id, idx, "failed")
+        tx_chunk_queue_retry(tx_id, idx)
+        log.info("tx=%s chunk %s NAK (%s) — queued for retry",
+                 tx_id, idx, evt.get("error"))
+    tx = tx_get(tx_id)
+    if tx is None:
+        return
+    done = tx["acked"] >= tx["chunks_total"]
+    if changed and tx["status_msg_id"]:
+        await _show_status_by_id(app, tx["tg_chat_id"], tx["status_msg_id"],
+                                 _tx_progress_text(tx))
+    if done:
+        tx_delete(tx_id)
+        log.info("tx=%s delivered (%d chunks)", tx_id, tx["chunks_total"])
+        _tracer.mark(evt.get("trace_id"), "status")
+        _tracer.finish(evt.get("trace_id"), "ok")
 
 
 async def _handle_ack_event(app: Application, evt: dict) -> None:
     """Got a routing-ACK / NAK from the pocket. Tell the original user."""
+    _live_feed.publish("ack", slot_n=evt.get("slot_n"),
+                       delivered=bool(evt.get("delivered")), error=evt.get("error"),
+                       tx_id=evt.get("tx_id"), chunk_idx=evt.get("chunk_idx"))
+    if evt.get("tx_id") is not None:
+        await _handle_tx_ack(app, evt)
+        return
+    trace_id = evt.get("trace_id")
+    delivered = bool(evt.get("delivered"))
     chat_id = evt.get("chat_id")
     if not chat_id:
+        _tracer.finish(trace_id, "ok" if delivered else "nak")
         return
-    delivered = bool(evt.get("delivered"))
 
     # If Mikhail already replied for this slot, the reply itself proved
     # delivery — don't spam the user with an extra "received" tick.
     if delivered and _slot_was_replied(evt.get("slot_n")):
+        _tracer.finish(trace_id, "ok")
         return
 
     if delivered:
@@ -1300,6 +3319,8 @@ async def _handle_ack_event(app: Application, evt: dict) -> None:
         await app.bot.send_message(chat_id=chat_id, text=text)
     except Exception:
         log.exception("ack notify to user %s failed", chat_id)
+    _tracer.mark(trace_id, "status")
+    _tracer.finish(trace_id, "ok" if delivered else "nak")
 
 
 async def _show_status(update: Update, status_msg, text: str, *,
@@ -1346,9 +3367,7 @@ def _reply_status_payload() -> str:
         left_h = max(0, (s["expires_at"] - now) // 3600)
         parts.append(f"@{s['slot_n']} {name} {left_h}h")
     msg = " | ".join(parts)
-    if len(msg) > MAX_TEXT_LENGTH:
-        msg = msg[: MAX_TEXT_LENGTH - 3] + "..."
-    return msg
+    return _truncate_packet(msg)
 
 
 # Старт-таймстамп для !ping uptime. _RELAY_STARTED_AT инициализируется
@@ -1358,7 +3377,7 @@ _RELAY_STARTED_AT: float = time.time()
 
 def _reply_ping_payload() -> str:
     """Короткий ответ на `!ping` — бот жив + сколько слотов активно + uptime."""
-    slots_n = len(slot_list_active())
+    slots_n = slot_count_active()
     uptime_s = int(time.time() - _RELAY_STARTED_AT)
     if uptime_s < 60:
         up = f"{uptime_s}s"
@@ -1368,7 +3387,20 @@ def _reply_ping_payload() -> str:
         up = f"{uptime_s // 3600}h{(uptime_s % 3600) // 60}m"
     else:
         up = f"{uptime_s // 86400}d{(uptime_s % 86400) // 3600}h"
-    return f"pong slots={slots_n} up={up}"
+    return (f"pong slots={slots_n} up={up} {_pacing.describe()} "
+            f"{_metrics_ping_summary()} {_airtime_describe()}")
+
+
+def _metrics_ping_summary() -> str:
+    """Сводка _metrics для !ping (RTT / NAK уже есть в _pacing.describe()):
+    пакеты TX/RX, успешные retry, медиана TG→нода."""
+    tx = sum(_m_packets.value(direction="tx", kind=lane) for lane in _MeshTxQueue.LANES)
+    rx = _m_packets.total() - tx
+    out = f"tx={int(tx)} rx={int(rx)} re={int(_m_retries.value(result='sent'))}"
+    send = _m_tg_to_mesh.quantile(0.5)
+    if send is not None:
+        out += f" snd~{send:.1f}s"
+    return out
 
 
 def _parse_history_args(args: str) -> tuple[int, int]:
@@ -1422,9 +3454,7 @@ def _reply_history_payload(args: str) -> str:
         else:
             parts.append(f"{ts_str} {slot_str}→: {text[:30]}")
     msg = " | ".join(parts)
-    if len(msg) > MAX_TEXT_LENGTH:
-        msg = msg[: MAX_TEXT_LENGTH - 3] + "..."
-    return msg
+    return _truncate_packet(msg)
 
 
 def _reply_gps_payload() -> str:
@@ -1437,9 +3467,7 @@ def _reply_gps_payload() -> str:
     age = gps_age_minutes()
     age_s = f"{age}m" if age is not None else "?"
     msg = f"{pos['lat']:.5f},{pos['lon']:.5f} {age_s}"
-    if len(msg) > MAX_TEXT_LENGTH:
-        msg = msg[: MAX_TEXT_LENGTH - 3] + "..."
-    return msg
+    return _truncate_packet(msg)
 
 
 def _reply_favlist_payload() -> str:
@@ -1453,15 +3481,13 @@ def _reply_favlist_payload() -> str:
         name = (f.get("tg_username") or f.get("first_name") or str(f["tg_user_id"]))[:10]
         parts.append(name)
     msg = "fav: " + ", ".join(parts)
-    if len(msg) > MAX_TEXT_LENGTH:
-        msg = msg[: MAX_TEXT_LENGTH - 3] + "..."
-    return msg
+    return _truncate_packet(msg)
 
 
 async def _handle_sos(app: Application, sos_text: str) -> None:
     """#SOS triggered from pocket: fan-out to recipients with optional GPS."""
     if not SOS_ENABLED:
-        await send_dm_to_pocket_async("SOS off (включи в настройках)")
+        await send_dm_to_pocket_async("SOS off (включи в настройках)", lane="sos")
         await _notify_owner(
             app,
             f"⚠️ #SOS получен, но SOS_ENABLED=False. Сообщение: «{sos_text}»",
@@ -1469,7 +3495,7 @@ async def _handle_sos(app: Application, sos_text: str) -> None:
         return
 
     if not SOS_RECIPIENTS:
-        await send_dm_to_pocket_async("SOS: список пуст")
+        await send_dm_to_pocket_async("SOS: список пуст", lane="sos")
         await _notify_owner(
             app,
             "⚠️ #SOS получен, но recipients пуст. Заполни через настройки.",
@@ -1497,28 +3523,37 @@ async def _handle_sos(app: Application, sos_text: str) -> None:
     elif SOS_INCLUDE_COORDS:
         body += "\n\n📍 Координаты сейчас недоступны."
 
-    delivered = 0
-    for tg_id in SOS_RECIPIENTS:
-        try:
-            await app.bot.send_message(chat_id=tg_id, text=body, parse_mode="Markdown")
-            if have_loc:
-                await app.bot.send_location(
-                    chat_id=tg_id,
-                    latitude=pos["lat"],
-                    longitude=pos["lon"],
-                )
-            delivered += 1
-        except Exception:
-            log.exception("SOS to %s failed", tg_id)
-
-    log.warning("SOS triggered. delivered=%d/%d", delivered, len(SOS_RECIPIENTS))
-    await send_dm_to_pocket_async(f"SOS отправлен {delivered}/{len(SOS_RECIPIENTS)}")
-    await _notify_owner(
-        app,
-        f"🆘 SOS triggered.\nДоставлено: {delivered}/{len(SOS_RECIPIENTS)}.\n"
+    def calls(tg_id):
+        out = [lambda: app.bot.send_message(chat_id=tg_id, text=body, parse_mode="Markdown")]
+        if have_loc:
+            out.append(lambda: app.bot.send_location(
+                chat_id=tg_id, latitude=pos["lat"], longitude=pos["lon"],
+            ))
+        return out
+
+    # Все получатели разом (в рамках лимитов Bot API), а не по одному.
+    results = await _tg_fanout.send(SOS_RECIPIENTS, calls)
+    delivered, failed = _fanout_summary(results)
+    _m_sos.inc(delivered, result="ok")
+    _m_sos.inc(len(failed), result="failed")
+    total = len(results)
+
+    log.warning("SOS triggered. delivered=%d/%d, slowest %d ms", delivered, total,
+                max((r["ms"] for r in results), default=0))
+    pocket = f"SOS отправлен {delivered}/{total}"
+    if failed:
+        pocket += " нет: " + ",".join(str(r["chat_id"]) for r in failed)
+    await send_dm_to_pocket_async(_truncate_packet(pocket), lane="sos")
+    report = (
+        f"🆘 SOS triggered.\nДоставлено: {delivered}/{total}.\n"
         f"Текст: «{sos_text or '—'}»\n"
-        f"Координаты: {'да' if have_loc else 'нет'}.",
+        f"Координаты: {'да' if have_loc else 'нет'}."
     )
+    if failed:
+        report += "\n\nНе доставлено:\n" + "\n".join(
+            f"• {_fanout_who(r['chat_id'])}: {r['error']}" for r in failed
+        )
+    await _notify_owner(app, report)
 
 
 async def _handle_ai(query: str, *, slot_n_ai: Optional[int]) -> None:
@@ -1571,36 +3606,48 @@ async def _handle_ai(query: str, *, slot_n_ai: Optional[int]) -> None:
             timeout_sec=AI_TIMEOUT_SEC,
         )
     except Exception as exc:
+        _m_ai.inc(result="error")
         log.exception("AI request failed")
         await send_dm_to_pocket_async(
             f"@{AI_TRIGGER_TAG}{slot} ошибка: {type(exc).__name__}. Проверь LM Studio."
         )
         return
 
+    _m_ai.inc(result="ok")
     # Сохраняем ответ в историю (не системный — system промпт не пишем).
     ai_save_message(slot, "assistant", answer)
 
     # Шлём обратно в pocket. С префиксом @aiN — в стиле наших обычных слотов.
-    # Длинный ответ режется на чанки тем же _chunk_text как в handle_text.
-    full = f"@{AI_TRIGGER_TAG}{slot} {answer}"
-    if len(full) <= MAX_TEXT_LENGTH:
-        await send_dm_to_pocket_async(full)
-        return
-    # Multi-chunk: первый чанк с префиксом и i/N, остальные — продолжение
-    chunk_room = max(40, MAX_TEXT_LENGTH - 25)
-    parts = _chunk_text(answer, chunk_room)
-    for i, part in enumerate(parts):
-        prefix = f"@{AI_TRIGGER_TAG}{slot} {i + 1}/{len(parts)}"
-        out = f"{prefix} {part}"
+    # Длинный ответ пакуется по байтам тем же _pack_for_pocket, что и в
+    # handle_text: каждая часть заполняется до MAX_PACKET_BYTES.
+    def _ai_packet(part: str, i: int, total: int) -> str:
+        if total == 1:
+            return f"@{AI_TRIGGER_TAG}{slot} {part}"
+        return f"@{AI_TRIGGER_TAG}{slot} {i + 1}/{total} {part}"
+
+    parts = _pack_for_pocket(answer, _ai_packet)
+    if len(parts) == 1:
+        await send_dm_to_pocket_async(parts[0], lane="ai", flow=slot)
+        return
+    # Multi-chunk: каждый чанк с префиксом и i/N, пауза — от _pacing.
+    # AI-части без on_ack, но gap учитывает ACK'и остальных отправок.
+    for i, out in enumerate(parts):
         try:
-            await send_dm_to_pocket_async(out)
-            await asyncio.sleep(0.4)
+            if i:
+                await asyncio.sleep(_pacing.gap())
+            await send_dm_to_pocket_async(out, lane="ai", flow=slot)
         except Exception:
             log.exception("AI chunk send failed (best-effort, continuing)")
 
 
 async def _handle_mesh_event(app: Application, evt: dict) -> None:
     kind = evt.get("kind")
+    with _m_mesh_event.time(kind=kind if kind in ("ack", "mesh_rx") else "other"):
+        await _dispatch_mesh_event(app, evt)
+
+
+async def _dispatch_mesh_event(app: Application, evt: dict) -> None:
+    kind = evt.get("kind")
 
     # Routing-ACK / NAK arrived for a sent packet — surface it to the user.
     if kind == "ack":
@@ -1647,6 +3694,8 @@ async def _handle_mesh_event(app: Application, evt: dict) -> None:
                 "@N текст=ответ. @N !ban=бан. !status. !ping. "
                 "!history [Nh] [M]. !help."
             )
+            if COMPACT_HEADERS:
+                help_msg += " N> текст = тоже ответ."
             if GPS_ENABLED:
                 help_msg += " GPS(beta): @N !fav/!unfav, !gps, !favlist."
             if SOS_ENABLED:
@@ -1722,24 +3771,34 @@ async def _handle_mesh_event(app: Application, evt: dict) -> None:
         if not reply_text:
             await send_dm_to_pocket_async(f"@{n} пустой ответ")
             return
+        trace_id = _tracer.start("pocket", evt.get("rx_at"))
+        _tracer.mark(trace_id, "parsed")
         tg_uid = slot_lookup(n)
         if tg_uid is None:
+            _tracer.finish(trace_id, "failed")
             await _notify_owner(
                 app,
                 f"⚠️ Ответ на @{n}, но слот не активен.\nТекст: {reply_text}",
             )
             await send_dm_to_pocket_async(f"@{n} уже неактуален")
             return
+        _tracer.mark(trace_id, "slot")
         ok = await _dm_user_reply(app, tg_uid, reply_text)
         if ok:
+            _tracer.mark(trace_id, "tg_sent")
             # Sticky behaviour (TASK-4): keep slot alive for 10h more,
             # mark as replied so subsequent user messages reuse it at the
             # shorter sticky TTL.
             slot_mark_replied(n)
             retry_delete_for_slot(n)
+            tx_delete_for_slot(n)
             messages_log("out", slot_n=n, tg_user_id=tg_uid, text=reply_text)
+            _tracer.mark(trace_id, "db")
             await _notify_owner(app, f"✅ @{n} → {user_display(tg_uid)}: {reply_text}")
+            _tracer.mark(trace_id, "owner")
+            _tracer.finish(trace_id, "ok")
         else:
+            _tracer.finish(trace_id, "failed")
             await send_dm_to_pocket_async(f"@{n} не доставлено")
         return
 
@@ -1747,14 +3806,41 @@ async def _handle_mesh_event(app: Application, evt: dict) -> None:
     await _notify_owner(app, f"🎒 С кармана (не распознано): {text}")
 
 
+def _mesh_event_key(evt: dict):
+    """Ключ порядка для _KeyedDispatcher: события с одним ключом
+    обрабатываются строго по очереди, с разными — параллельно."""
+    if evt.get("kind") == "ack":
+        return ("chat", evt.get("chat_id"))
+    from_id = evt.get("from_id")
+    if from_id != POCKET_NODE_ID:
+        return ("node", from_id)
+    parsed = parse_mesh_text(evt.get("text") or "")
+    kind = parsed["kind"]
+    if kind in ("slot_reply", "slot_cmd"):
+        return ("slot", parsed["n"])
+    if kind == "ai_followup":
+        return ("ai", parsed["n"])
+    if kind == "ai_new":
+        return ("ai_new", id(evt))   # каждый новый AI-чат независим
+    if kind == "sos":
+        return ("sos",)
+    return ("pocket",)               # !status / !ping / нераспознанное
+
+
 async def mesh_dispatcher(app: Application) -> None:
-    loop = asyncio.get_running_loop()
+    _mesh_queue.bind(asyncio.get_running_loop())
+    last_report = time.monotonic()
     while True:
-        evt = await loop.run_in_executor(None, _mesh_queue.get)
+        evt = await _mesh_queue.get()
         try:
-            await _handle_mesh_event(app, evt)
+            await _mesh_workers.submit(_mesh_event_key(evt), _handle_mesh_event, app, evt)
         except Exception:
             log.exception("Error in mesh dispatcher")
+        # Раз в 10 минут — метрики моста в лог (глубина / ожидание / потери).
+        if time.monotonic() - last_report >= 600:
+            last_report = time.monotonic()
+            log.info("mesh events: %s, in flight: %d",
+                     _mesh_queue.stats(), _mesh_workers.pending())
 
 
 async def mesh_watchdog(app: Application) -> None:
@@ -1786,6 +3872,10 @@ async def mesh_watchdog(app: Application) -> None:
                     log.error(
                         "mesh_watchdog: mesh-iface dead 90+ seconds — exiting",
                     )
+                    try:
+                        _db_flush()
+                    except Exception:
+                        pass
                     import os as _os
                     _os._exit(1)
             else:
@@ -1796,33 +3886,90 @@ async def mesh_watchdog(app: Application) -> None:
             log.exception("mesh_watchdog iteration failed")
 
 
+def expiry_load_schedule() -> int:
+    """Пересобрать _expiry_deadlines из БД: слоты (через реестр), AI-чаты,
+    send_tx, плюс периодические purge/resync. Возвращает число ключей."""
+    _expiry_deadlines.clear()
+    slot_registry_load()
+    with _db_lock:
+        ai_rows = _db.execute(
+            "SELECT slot_n_ai, last_used_at FROM ai_conversations"
+        ).fetchall()
+        tx_rows = _db.execute("SELECT id, deadline FROM send_tx").fetchall()
+    for r in ai_rows:
+        _ai_schedule_expiry(r["slot_n_ai"], r["last_used_at"])
+    for r in tx_rows:
+        _expiry_deadlines.schedule(("tx", r["id"]), r["deadline"] + 1)
+    now = time.time()
+    _expiry_deadlines.schedule(("purge",), now + _HISTORY_PURGE_S)
+    _expiry_deadlines.schedule(("resync",), now + _SLOT_RESYNC_S)
+    return len(_expiry_deadlines)
+
+
+def _expiry_fire(key: tuple) -> None:
+    """Обработать один сработавший дедлайн из _expiry_deadlines."""
+    kind = key[0]
+    if kind == "slot":
+        n = key[1]
+        if slot_expire(n):
+            log.info("Expired slot: %s", n)
+            # Retry rows for now-expired slots are orphaned — clean them.
+            retry_delete_for_slot(n)
+            tx_delete_for_slot(n)
+    elif kind == "ai":
+        # AI conversations: чистим неактивные старше AI_TTL_HOURS
+        if AI_ENABLED and ai_expire_slot(key[1], AI_TTL_HOURS):
+            log.info("Expired AI conversation: %s", key[1])
+    elif kind == "tx":
+        expired_tx = tx_expire_old()
+        if expired_tx:
+            log.info("Expired send transactions: %s", expired_tx)
+    elif kind == "purge":
+        _expiry_deadlines.schedule(("purge",), time.time() + _HISTORY_PURGE_S)
+        purged = messages_purge_old(HISTORY_RETENTION_DAYS)
+        if purged:
+            log.info("Purged %d old messages_recent rows", purged)
+        traces_purge_old(HISTORY_RETENTION_DAYS)
+    elif kind == "resync":
+        _expiry_deadlines.schedule(("resync",), time.time() + _SLOT_RESYNC_S)
+        # Сверка реестра с таблицей — ловит удаления из GUI-процесса.
+        slot_registry_load()
+
+
 async def expiry_worker(app: Application) -> None:
-    # messages_recent purge — раз в сутки. Счётчик чтоб не делать каждую
-    # минуту (60 итераций * 60 = 3600 секунд = 1 час → 24 часа = 1440 итераций).
-    purge_counter = 0
+    """Event-driven: спит до ближайшего истечения слота / AI-чата / send_tx
+    из `_expiry_deadlines`. mark_replied / touch / allocate перепланируют
+    ключ, так что слот освобождается ровно по TTL, а не до минуты позже."""
+    _expiry_deadlines.bind(asyncio.get_running_loop())
+    try:
+        expiry_load_schedule()
+        # Всё, что истекло пока relay лежал, — снять сразу.
+        freed = slot_expire_old()
+        for n in freed:
+            retry_delete_for_slot(n)
+            tx_delete_for_slot(n)
+        if freed:
+            log.info("Expired slots: %s", freed)
+    except Exception:
+        log.exception("expiry_worker: failed to load schedule")
+
     while True:
         try:
-            freed = slot_expire_old()
-            if freed:
-                log.info("Expired slots: %s", freed)
-                # Retry rows for now-expired slots are orphaned — clean them.
-                for n in freed:
-                    retry_delete_for_slot(n)
-            # AI conversations: чистим неактивные старше AI_TTL_HOURS
-            if AI_ENABLED:
-                ai_freed = ai_expire_old(AI_TTL_HOURS)
-                if ai_freed:
-                    log.info("Expired AI conversations: %s", ai_freed)
-            # messages_recent — раз в сутки (1440 минут)
-            purge_counter += 1
-            if purge_counter >= 1440:
-                purge_counter = 0
-                purged = messages_purge_old(HISTORY_RETENTION_DAYS)
-                if purged:
-                    log.info("Purged %d old messages_recent rows", purged)
+            await _expiry_deadlines.wait()
+            for key in _expiry_deadlines.pop_due(time.time()):
+                try:
+                    _expiry_fire(key)
+                except Exception:
+                    # Ключ уже снят pop_due; ("ai", n) и ("tx", …) resync не
+                    # восстанавливает — без перепланирования не истекли бы
+                    # до рестарта.
+                    log.exception("expiry_worker: %s failed — again in 5s", key)
+                    _expiry_deadlines.schedule(key, time.time() + 5)
+        except asyncio.CancelledError:
+            return
         except Exception:
-            log.exception("expiry_worker failed")
-        await asyncio.sleep(60)
+            log.exception("expiry_worker iteration failed")
+            await asyncio.sleep(5)
 
 
 async def _show_status_by_id(app: Application, chat_id: int,
@@ -1842,70 +3989,116 @@ async def _show_status_by_id(app: Application, chat_id: int,
 
 
 async def retry_worker(app: Application) -> None:
-    """TASK-2: background retries with exponential backoff, capped."""
+    """TASK-2: background retries with exponential backoff, capped.
+
+    Event-driven: спим ровно до ближайшего next_try_at / deadline из
+    `_retry_deadlines`, retry_enqueue / retry_reschedule будят раньше.
+    Пустая очередь = ноль запросов к БД, SOS fast-retry — без опоздания
+    на интервал опроса.
+    """
+    _retry_deadlines.bind(asyncio.get_running_loop())
+    try:
+        pending = retry_load_schedule()
+        if pending:
+            log.info("retry_worker: %d row(s) restored from retry_queue", pending)
+    except Exception:
+        log.exception("retry_worker: failed to load retry_queue")
+
     while True:
         try:
-            # Give up on anything past its deadline.
-            for row in retry_expired():
-                await _show_status_by_id(
-                    app, row["tg_chat_id"], row["status_msg_id"],
-                    f"⌛ Связь с {DISPLAY_NAME} не восстановилась — сообщение не доставлено.",
-                )
-                retry_delete(row["id"])
-
-            # Try due rows.
-            for row in retry_due():
-                # Capture for the ack callback (closes over loop-local row).
-                chat_id = row["tg_chat_id"]
-                slot_n = row["slot_n"]
-                def _on_ack(packet, _slot=slot_n, _chat=chat_id):
-                    try:
-                        decoded = packet.get("decoded") or {}
-                        routing = decoded.get("routing") or {}
-                        err = routing.get("errorReason") or routing.get("error_reason")
-                        delivered = err is None or err == "NONE"
-                        _mesh_queue.put({
-                            "kind": "ack",
-                            "delivered": delivered,
-                            "error": err,
-                            "slot_n": _slot,
-                            "chat_id": _chat,
-                        })
-                    except Exception:
-                        log.exception("retry-ack cb failed")
-
+            await _retry_deadlines.wait()
+            for retry_id in _retry_deadlines.pop_due(time.time()):
                 try:
-                    await send_dm_to_pocket_async(row["payload"], on_ack=_on_ack)
+                    row = retry_get(retry_id)
+                    if row is None:
+                        continue  # уже доставлено / удалено вручную
+                    await _retry_process_row(app, row)
                 except Exception:
-                    log.info("retry_id=%s still failing (attempt %d, sos=%s)",
-                             row["id"], row["attempts"] + 1, row["is_sos"])
-                    if row["is_sos"]:
-                        # SOS fast-retry: 5 → 15 → 30 → 60 → 120 → 120 ... сек
-                        attempt = row["attempts"]
-                        if attempt < len(_RETRY_SOS_BACKOFF_SEC):
-                            delay = _RETRY_SOS_BACKOFF_SEC[attempt]
-                        else:
-                            delay = _RETRY_SOS_BACKOFF_SEC[-1]
-                    else:
-                        base = RETRY_INITIAL_DELAY_MIN * 60
-                        delay = min(base * (2 ** row["attempts"]),
-                                    RETRY_MAX_INTERVAL_MIN * 60)
-                    retry_reschedule(row["id"], _now() + int(delay))
-                    continue
+                    # pop_due уже снял весь батч: без перепланирования строка
+                    # (и остальные ключи батча) пропала бы до рестарта.
+                    log.exception("retry_worker: retry_id=%s failed — again in 5s", retry_id)
+                    _retry_deadlines.schedule(retry_id, time.time() + 5)
+        except asyncio.CancelledError:
+            return
+        except Exception:
+            log.exception("retry_worker iteration failed")
+            # Не крутимся в горячем цикле если БД/TG сломались надолго.
+            await asyncio.sleep(5)
+
+
+async def _retry_send_row(row: dict) -> None:
+    """Отправить payload строки retry_queue с правильным ACK-callback'ом
+    (для части send_tx — с tx_id/chunk_idx). Исключение = не ушло."""
+    await send_dm_to_pocket_async(
+        row["payload"],
+        on_ack=_make_ack_cb(row["slot_n"], row["tg_chat_id"],
+                            tx_id=row.get("tx_id"), chunk_idx=row.get("chunk_idx")),
+        lane="sos" if row["is_sos"] else "retry", flow=row["slot_n"],
+    )
+    if row.get("tx_id") is not None:
+        # Дальше судьбу части решит ACK/NAK (_handle_tx_ack).
+        tx_chunk_set_state(row["tx_id"], row["chunk_idx"], "sent")
+
 
+async def _retry_process_row(app: Application, row: dict) -> None:
+    now = _now()
+    tx_id = row.get("tx_id")
+    # Give up on anything past its deadline.
+    if row["deadline"] < now:
+        _m_retries.inc(result="expired")
+        if tx_id is not None:
+            tx = tx_get(tx_id)
+            if tx is not None:
                 await _show_status_by_id(
-                    app, chat_id, row["status_msg_id"],
-                    "📨 Сообщение отправлено. Ответ обычно в течение 2–5 минут.",
+                    app, row["tg_chat_id"], row["status_msg_id"],
+                    f"⌛ Связь с {DISPLAY_NAME} не восстановилась — доставлено "
+                    f"{tx['acked']}/{tx['chunks_total']} частей.",
                 )
-                retry_delete(row["id"])
-                log.info("retry_id=%s delivered", row["id"])
-        except Exception:
-            log.exception("retry_worker iteration failed")
+            tx_delete(tx_id)   # заодно снимает остальные части этой tx
+            return
+        await _show_status_by_id(
+            app, row["tg_chat_id"], row["status_msg_id"],
+            f"⌛ Связь с {DISPLAY_NAME} не восстановилась — сообщение не доставлено.",
+        )
+        retry_delete(row["id"])
+        return
+
+    if row["next_try_at"] > now:
+        # Разбудили раньше времени (строку перепланировали) — ждём дальше.
+        _retry_deadlines.schedule(row["id"], _retry_wake_at(row["next_try_at"], row["deadline"]))
+        return
+
+    if not row["is_sos"]:
+        # Полоса retry закрыта duty cycle'ом. Ждать её здесь — значит держать
+        # весь retry_worker, а с ним и SOS-строки за этой. Переносим строку
+        # на момент открытия, попыткой это не считается.
+        wait = _airtime_gate("retry")
+        if wait > 0:
+            _m_retries.inc(result="deferred")
+            retry_reschedule(row["id"], now + max(1, math.ceil(wait)), attempt=False)
+            return
+
+    try:
+        await _retry_send_row(row)
+    except Exception:
+        _m_retries.inc(result="failed")
+        log.info("retry_id=%s still failing (attempt %d, sos=%s)",
+                 row["id"], row["attempts"] + 1, row["is_sos"])
+        delay = retry_delay_s(row["attempts"], bool(row["is_sos"]))
+        retry_reschedule(row["id"], _now() + delay)
+        return
 
-        # Раньше было 60 — но при SOS fast-retry интервалы 5-15 сек,
-        # и проверять due-rows раз в минуту не годится. Один SELECT в БД
-        # каждые 5 сек — не нагружает.
-        await asyncio.sleep(5)
+    _m_retries.inc(result="sent")
+    retry_delete(row["id"])
+    if tx_id is not None:
+        # Статус обновит ACK этой части («доставлено N/M»).
+        log.info("retry_id=%s resent tx=%s chunk %s", row["id"], tx_id, row["chunk_idx"])
+        return
+    await _show_status_by_id(
+        app, row["tg_chat_id"], row["status_msg_id"],
+        "📨 Сообщение отправлено. Ответ обычно в течение 2–5 минут.",
+    )
+    log.info("retry_id=%s delivered", row["id"])
 
 
 async def cmd_retry_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1930,40 +4123,38 @@ async def cmd_retry_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         return
 
     await q.answer("Пробую сейчас…")
-    chat_id_for_ack = row["tg_chat_id"]
-    slot_n_for_ack = row["slot_n"]
-    def _on_ack(packet, _slot=slot_n_for_ack, _chat=chat_id_for_ack):
+    # Для многопакетной отправки кнопка досылает все недошедшие части.
+    rows = tx_retry_rows(row["tx_id"]) if row.get("tx_id") is not None else [row]
+    failed = False
+    for r in rows:
         try:
-            decoded = packet.get("decoded") or {}
-            routing = decoded.get("routing") or {}
-            err = routing.get("errorReason") or routing.get("error_reason")
-            delivered = err is None or err == "NONE"
-            _mesh_queue.put({
-                "kind": "ack",
-                "delivered": delivered,
-                "error": err,
-                "slot_n": _slot,
-                "chat_id": _chat,
-            })
+            await _retry_send_row(r)
         except Exception:
-            log.exception("manual-retry ack cb failed")
+            log.exception("manual retry failed for retry_id=%s", r["id"])
+            failed = True
+            break
+        retry_delete(r["id"])
 
-    try:
-        await send_dm_to_pocket_async(row["payload"], on_ack=_on_ack)
-    except Exception:
-        log.exception("manual retry failed for retry_id=%s", retry_id)
+    if failed:
+        remaining = [r for r in rows if retry_get(r["id"]) is not None]
         try:
             await q.edit_message_text(
                 f"⏳ Пока не получилось. {DISPLAY_NAME} пока вне связи — "
                 "попробую ещё автоматически.",
-                reply_markup=_retry_inline_markup(retry_id),
+                reply_markup=_retry_inline_markup(remaining[0]["id"]),
             )
         except Exception as e:
             log.warning("retry-edit on manual retry failed: %s", e)
-        retry_reschedule(retry_id, _now() + RETRY_INITIAL_DELAY_MIN * 60)
+        for r in remaining:
+            retry_reschedule(r["id"], _now() + RETRY_INITIAL_DELAY_MIN * 60)
         return
 
-    success = "📨 Сообщение отправлено. Ответ обычно в течение 2–5 минут."
+    if row.get("tx_id") is not None:
+        tx = tx_get(row["tx_id"])
+        success = (_tx_progress_text(tx) if tx is not None
+                   else "📨 Сообщение отправлено. Ответ обычно в течение 2–5 минут.")
+    else:
+        success = "📨 Сообщение отправлено. Ответ обычно в течение 2–5 минут."
     try:
         await q.edit_message_text(success)
     except Exception as e:
@@ -1972,7 +4163,6 @@ async def cmd_retry_cb(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             await context.bot.send_message(chat_id=row["tg_chat_id"], text=success)
         except Exception:
             log.exception("fallback send_message also failed")
-    retry_delete(retry_id)
 
 
 # ============================================================
@@ -2042,46 +4232,200 @@ def _sender_tag(user) -> str:
 
 
 def _format_lora_packet(slot_n: int, user, text: str, entry_tag: Optional[str] = None,
-                        chunk_idx: int = 0, chunks_total: int = 1) -> str:
+                        chunk_idx: int = 0, chunks_total: int = 1,
+                        compact: Optional[bool] = None) -> str:
     """Mikhail-facing packet format.
 
     Без tag, один пакет:    "[@3 vasya 16:15] text"
     С tag:                  "[@3 work:vasya 16:15] text"
     Multi-chunk (1/N):      "[@3 vasya 16:15 1/3] beginning..."
     Multi-chunk (2/N):      "[@3 vasya 16:15 2/3] continuation..."
+
+    `compact` (по умолчанию COMPACT_HEADERS) — см. `_format_compact_packet`.
     """
-    ts = datetime.now().strftime("%H:%M")
     sender = _sender_tag(user)
     if entry_tag:
         sender = f"{entry_tag[:6]}:{sender}"
+    if compact is None:
+        compact = COMPACT_HEADERS
+    if compact and chunks_total <= len(_COMPACT_CHUNK_IDX):
+        return _format_compact_packet(slot_n, sender, text, chunk_idx, chunks_total)
+    ts = datetime.now().strftime("%H:%M")
     if chunks_total > 1:
         return f"[@{slot_n} {sender} {ts} {chunk_idx + 1}/{chunks_total}] {text}"
     return f"[@{slot_n} {sender} {ts}] {text}"
 
 
-def _chunk_text(text: str, max_chars: int) -> list[str]:
-    """Разбивает длинный текст на части по `max_chars`. Стараемся резать
-    по пробелу — слова не рубятся пополам если возможно. Минимум 1 чанк.
+# Однобайтовый индекс части для компактного формата: a..z — «будет ещё»,
+# заглавная — последняя часть (так pocket видит N, не тратя байты на «/N»).
+_COMPACT_CHUNK_IDX = "abcdefghijklmnopqrstuvwxyz"
+
+
+def _format_compact_packet(slot_n: int, sender: str, text: str,
+                           chunk_idx: int = 0, chunks_total: int = 1) -> str:
+    """Компактный формат для pocket (COMPACT_HEADERS):
+
+    Один пакет:             "3>vasya: text"
+    Multi-chunk (первая):   "3a>vasya: beginning..."
+    Multi-chunk (середина): "3b> continuation..."
+    Multi-chunk (последняя):"3C> end"
+
+    Без времени (pocket сам показывает время приёма), имя — только в первой
+    части. Ответ с pocket'а можно писать тем же токеном: «3> ок».
+    """
+    if chunks_total <= 1:
+        return f"{slot_n}>{sender}: {text}"
+    idx = _COMPACT_CHUNK_IDX[chunk_idx]
+    if chunk_idx == chunks_total - 1:
+        idx = idx.upper()
+    if chunk_idx == 0:
+        return f"{slot_n}{idx}>{sender}: {text}"
+    return f"{slot_n}{idx}> {text}"
+
+
+def _utf8_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+_ZWJ = "\u200d"
+
+
+def _is_regional_indicator(ch: str) -> bool:
+    return "\U0001F1E6" <= ch <= "\U0001F1FF"
+
+
+def _extends_cluster(ch: str) -> bool:
+    """Символ «приклеен» к предыдущему: combining-диакритика (й = и + ◌̆),
+    variation selector (❤️), emoji-модификатор тона кожи, ZWJ, теги флагов."""
+    return (
+        unicodedata.combining(ch) != 0
+        or unicodedata.category(ch) in ("Mn", "Me")
+        or ch == _ZWJ
+        or "\ufe00" <= ch <= "\ufe0f"
+        or "\U0001F3FB" <= ch <= "\U0001F3FF"
+        or "\U000E0020" <= ch <= "\U000E007F"
+    )
+
+
+def _is_safe_cut(text: str, i: int) -> bool:
+    """Можно ли резать между text[i-1] и text[i], не разрывая графему.
+    Приближение к UAX #29 без внешних зависимостей: combining-марки,
+    ZWJ-последовательности (👨‍👩‍👧) и пары regional indicator (флаги)."""
+    if i <= 0 or i >= len(text):
+        return True
+    if _extends_cluster(text[i]) or text[i - 1] == _ZWJ:
+        return False
+    if _is_regional_indicator(text[i]) and _is_regional_indicator(text[i - 1]):
+        run = 0
+        j = i - 1
+        while j >= 0 and _is_regional_indicator(text[j]):
+            run += 1
+            j -= 1
+        return run % 2 == 0
+    return True
+
+
+def _cut_to_bytes(text: str, max_bytes: int) -> str:
+    """Самый длинный префикс, влезающий в max_bytes, по границе графемы."""
+    used = 0
+    limit = 0
+    for ch in text:
+        used += _utf8_len(ch)
+        if used > max_bytes:
+            break
+        limit += 1
+    while limit > 0 and not _is_safe_cut(text, limit):
+        limit -= 1
+    return text[:limit]
+
+
+def _chunk_text_bytes(text: str, max_bytes: int) -> list[str]:
+    """Разбивает длинный текст на части не больше `max_bytes` байт UTF-8
+    (минимум 1 чанк). Режем по пробелу если он не слишком близко к началу
+    окна, иначе — по границе графемы.
+    Многобайтный символ / эмодзи-последовательность никогда не рвётся.
     """
     text = (text or "").strip()
-    if len(text) <= max_chars:
+    if _utf8_len(text) <= max_bytes:
         return [text]
     chunks: list[str] = []
     remaining = text
     while remaining:
-        if len(remaining) <= max_chars:
+        if _utf8_len(remaining) <= max_bytes:
             chunks.append(remaining)
             break
-        # Пытаемся резать по последнему пробелу в окне max_chars
-        window = remaining[:max_chars]
+        window = _cut_to_bytes(remaining, max_bytes)
+        if not window:
+            # Одна графема больше бюджета (бюджет крошечный) — шлём её
+            # целиком, иначе зациклимся.
+            end = 1
+            while end < len(remaining) and not _is_safe_cut(remaining, end):
+                end += 1
+            window = remaining[:end]
         cut = window.rfind(" ")
-        if cut < max_chars // 2:  # пробел слишком близко к началу — режем по символам
-            cut = max_chars
+        if cut < len(window) // 2:  # пробел слишком близко к началу — режем по графеме
+            cut = len(window)
         chunks.append(remaining[:cut].rstrip())
         remaining = remaining[cut:].lstrip()
     return chunks
 
 
+def _pack_lora_payloads(text: str, make_packet, max_bytes: int) -> list[str]:
+    """Упаковать `text` в минимум LoRa-пакетов по max_bytes каждый.
+
+    `make_packet(part, idx, total) -> str` строит готовый пакет с заголовком
+    (`_format_lora_packet`, «@aiN i/N» и т.п.) — его длина в байтах входит
+    в бюджет. Число частей N влияет на длину «i/N», поэтому подбираем N
+    итеративно: считаем заголовок для предполагаемого N, режем, и если
+    частей вышло больше — повторяем с новым N.
+    """
+    text = (text or "").strip()
+    single = make_packet(text, 0, 1)
+    if _utf8_len(single) <= max_bytes:
+        return [single]
+    total = 2
+    while True:
+        overhead = max(_utf8_len(make_packet("", i, total)) for i in (0, total - 1))
+        room = max(16, max_bytes - overhead)
+        parts = _chunk_text_bytes(text, room)
+        if len(parts) <= total:
+            n = len(parts)
+            return [make_packet(p, i, n) for i, p in enumerate(parts)]
+        total = len(parts)
+
+
+def _pack_for_pocket(text: str, make_packet) -> list[str]:
+    """`_pack_lora_payloads` по MAX_PACKET_BYTES + опциональное сжатие.
+
+    При MESH_COMPRESSION многопакетное сообщение пробуем упаковать ещё и
+    сжатым («~z1…», тела частей склеиваются без разделителя). Берём сжатый
+    вариант только если пакетов стало меньше — иначе обычный текст, его
+    pocket прочтёт и без декодера."""
+    plain = _pack_lora_payloads(text, make_packet, MAX_PACKET_BYTES)
+    if not MESH_COMPRESSION or len(plain) <= 1:
+        return plain
+    try:
+        body = lora_codec.compress_text((text or "").strip())
+    except Exception:
+        log.exception("compression failed — sending plain text")
+        return plain
+    packed = _pack_lora_payloads(body, make_packet, MAX_PACKET_BYTES)
+    if len(packed) < len(plain):
+        log.info("Compressed %d → %d packets", len(plain), len(packed))
+        return packed
+    return plain
+
+
+def _truncate_packet(msg: str) -> str:
+    """Обрезать служебный ответ в pocket до одного пакета: MAX_TEXT_LENGTH
+    символов и MAX_PACKET_BYTES байт, с пометкой `...`."""
+    if len(msg) > MAX_TEXT_LENGTH:
+        msg = msg[: MAX_TEXT_LENGTH - 3] + "..."
+    if _utf8_len(msg) > MAX_PACKET_BYTES:
+        msg = _cut_to_bytes(msg, MAX_PACKET_BYTES - 3) + "..."
+    return msg
+
+
 # ----- Reply keyboard for public users (TASK-8) -----
 _KEYBOARD_WHERE = f"📍 Где {DISPLAY_NAME}"
 _KEYBOARD_HELP  = "ℹ️ Помощь"
@@ -2186,8 +4530,16 @@ async def cmd_dm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if len(text) > MAX_TEXT_LENGTH:
         await update.message.reply_text(f"Слишком длинно ({len(text)}/{MAX_TEXT_LENGTH}).")
         return
+    if _utf8_len(text) > MAX_PACKET_BYTES:
+        await update.message.reply_text(
+            f"Слишком длинно ({_utf8_len(text)}/{MAX_PACKET_BYTES} байт)."
+        )
+        return
     try:
-        _mesh_iface.sendText(text, destinationId=dest, wantAck=True)
+        await _mesh_tx.submit(
+            lambda: _mesh_send_text(text, destinationId=dest, wantAck=True),
+            lane="user",
+        )
         await update.message.reply_text(f"✅ DM → {dest}:\n{text}")
     except Exception as e:
         log.exception("DM send failed")
@@ -2206,8 +4558,13 @@ async def cmd_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if len(text) > MAX_TEXT_LENGTH:
         await update.message.reply_text(f"Слишком длинно ({len(text)}/{MAX_TEXT_LENGTH}).")
         return
+    if _utf8_len(text) > MAX_PACKET_BYTES:
+        await update.message.reply_text(
+            f"Слишком длинно ({_utf8_len(text)}/{MAX_PACKET_BYTES} байт)."
+        )
+        return
     try:
-        _mesh_iface.sendText(text)
+        await _mesh_tx.submit(lambda: _mesh_send_text(text), lane="user")
         await update.message.reply_text(f"📡 В эфир:\n{text}")
     except Exception as e:
         log.exception("broadcast failed")
@@ -2514,6 +4871,7 @@ async def cmd_gps(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    received_at = time.monotonic()
     u = update.effective_user
     if u is None or update.message is None:
         return
@@ -2536,13 +4894,13 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             await update.message.reply_text("Сеть не подключена.")
             return
         payload = f"[admin] {text}"
-        if len(payload) > MAX_TEXT_LENGTH:
+        if _utf8_len(payload) > MAX_PACKET_BYTES:
             await update.message.reply_text(
-                f"Слишком длинно ({len(payload)}/{MAX_TEXT_LENGTH})."
+                f"Слишком длинно ({_utf8_len(payload)}/{MAX_PACKET_BYTES} байт)."
             )
             return
         try:
-            await send_dm_to_pocket_async(payload)
+            await send_dm_to_pocket_async(payload, lane="user")
             await update.message.reply_text(f"🧪 → карман:\n{payload}")
         except Exception as e:
             log.exception("admin echo send failed")
@@ -2573,33 +4931,34 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         )
         return
 
+    # Трасса задержки (_tracer): закрывается ACK'ом / NAK'ом, в fast-режиме —
+    # сразу после отправки.
+    trace_id = _tracer.start("tg", received_at)
+
     # Allocate / reuse sticky slot (TASK-4).
     n, reused = slot_allocate_or_reuse(u.id)
+    _tracer.mark(trace_id, "slot")
     slot_set_last_message(n, text)
     messages_log("in", slot_n=n, tg_user_id=u.id, text=text)
     tag = user_get_entry_tag(u.id)
-    single_payload = _format_lora_packet(n, u, text, entry_tag=tag)
-
-    # UTF-8 chunking: если итоговый пакет с префиксом больше MAX_TEXT_LENGTH —
-    # разбиваем на части `[@N user time 1/3] ... 2/3] ... 3/3]`, отправляем
-    # подряд. Сейчас best-effort: если какой-то чанк упал, продолжаем
-    # остальные, юзеру говорим что разбито на N частей. Retry-очередь не
-    # используется для multi-chunk (она хранит один payload).
-    chunked_payloads: list[str] = []
-    if len(single_payload) <= MAX_TEXT_LENGTH:
-        payload = single_payload
-    else:
-        # Резерв на «X/Y» в префиксе плюс пробел — ~6 символов сверху обычного
-        chunk_room = max(40, MAX_TEXT_LENGTH - 30)
-        text_chunks = _chunk_text(text, chunk_room)
-        chunked_payloads = [
-            _format_lora_packet(
-                n, u, ct, entry_tag=tag,
-                chunk_idx=i, chunks_total=len(text_chunks),
-            )
-            for i, ct in enumerate(text_chunks)
-        ]
-        payload = chunked_payloads[0]   # на retry/ACK кладём первый чанк
+    _tracer.mark(trace_id, "db")
+
+    # Упаковка по байтам: если пакет с префиксом не влезает в
+    # MAX_PACKET_BYTES — разбиваем на части `[@N user time 1/3] ... 2/3] ...`,
+    # заполняя каждую до байтового лимита (заголовок входит в бюджет).
+    # В reliable-режиме части уходят транзакцией send_tx (ACK по каждой,
+    # retry только недошедших) — см. _send_tx_chunks. В fast-режиме ACK нет,
+    # части уходят подряд best-effort.
+    packets = _pack_for_pocket(
+        text,
+        lambda part, i, total: _format_lora_packet(
+            n, u, part, entry_tag=tag, chunk_idx=i, chunks_total=total,
+        ),
+    )
+    chunked_payloads: list[str] = packets if len(packets) > 1 else []
+    payload = packets[0]   # на retry/ACK кладём первый чанк
+    _m_tg_messages.inc()
+    _m_chunks.inc(len(packets))
 
     # Параллельно: TG-статус (HTTP к Telegram, ~500–1000 мс) и LoRa-передача
     # (USB+эфир, обычно сравнимо). Раньше это шло последовательно, экономим
@@ -2616,41 +4975,54 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         )
     )
 
-    # ACK / delivery-receipt callback — fires from the meshtastic bg thread
-    # when the routing-ACK from the pocket node arrives (or library timeout).
     chat_id = update.effective_chat.id
-    def _on_ack(packet, _slot=n, _chat=chat_id):
-        try:
-            decoded = packet.get("decoded") or {}
-            routing = decoded.get("routing") or {}
-            err = routing.get("errorReason") or routing.get("error_reason")
-            delivered = err is None or err == "NONE"
-            _mesh_queue.put({
-                "kind": "ack",
-                "delivered": delivered,
-                "error": err,
-                "slot_n": _slot,
-                "chat_id": _chat,
-            })
-        except Exception:
-            log.exception("ack callback failed")
+    deadline = _now() + (SLOT_STICKY_HOURS if reused else SLOT_TTL_HOURS) * 3600
+    # SOS fast-retry: текст содержит #SOS / срочно / urgent →
+    # короткие интервалы (5/15/30/60/120 сек) и сразу первая попытка.
+    urgent = _is_urgent(text)
+    # Полоса TX-очереди: срочное обгоняет всё остальное.
+    lane = "sos" if urgent else "user"
+
+    if chunked_payloads and MESH_WANT_ACK:
+        await _send_tx_chunks(
+            update, status_task, tg_user_id=u.id, slot_n=n,
+            packets=chunked_payloads, deadline=deadline, urgent=urgent,
+            received_at=received_at, trace_id=trace_id,
+        )
+        return
 
+    # ACK / delivery-receipt callback — fires from the meshtastic bg thread
+    # when the routing-ACK from the pocket node arrives (or library timeout).
     send_failed: Optional[Exception] = None
+    on_ack = _make_ack_cb(n, chat_id, trace_id=trace_id)
+    _tracer.mark(trace_id, "queued")
     try:
-        await send_dm_to_pocket_async(payload, on_ack=_on_ack)
+        if urgent or chunked_payloads:
+            await send_dm_to_pocket_async(payload, on_ack=on_ack, lane=lane, flow=n)
+        else:
+            # Однопакетное — через окно склейки (если включено).
+            await _tx_batcher.send(payload, on_ack=on_ack, flow=n)
     except Exception as exc:
         send_failed = exc
         log.exception("Initial send to pocket failed")
 
-    # Multi-chunk: первый чанк ушёл — досылаем остальные подряд (best-effort,
-    # без retry / ACK). Между ними небольшая пауза чтобы не перегружать LoRa.
+    # Multi-chunk в fast-режиме: первый чанк ушёл — досылаем остальные подряд
+    # (best-effort, без retry / ACK). Пауза между ними — от _pacing, чтобы
+    # не перегружать LoRa.
     if send_failed is None and len(chunked_payloads) > 1:
         for extra in chunked_payloads[1:]:
             try:
-                await asyncio.sleep(0.4)
-                await send_dm_to_pocket_async(extra)
+                await asyncio.sleep(_pacing.gap())
+                await send_dm_to_pocket_async(extra, lane=lane, flow=n)
             except Exception:
                 log.exception("Multi-chunk follow-up send failed (best-effort, continuing)")
+    if send_failed is None:
+        _m_tg_to_mesh.observe(time.monotonic() - received_at)
+        _tracer.mark(trace_id, "sent")
+        if not MESH_WANT_ACK:
+            _tracer.finish(trace_id, "ok")
+    else:
+        _tracer.finish(trace_id, "failed")
 
     # Дожидаемся placeholder для последующих edit'ов. Если он упал
     # (TG NetworkError) — деградируем чисто: без placeholder'а, но
@@ -2663,11 +5035,6 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
 
     if send_failed is not None:
         if status_msg is not None:
-            now = _now()
-            deadline = now + (SLOT_STICKY_HOURS if reused else SLOT_TTL_HOURS) * 3600
-            # SOS fast-retry: текст содержит #SOS / срочно / urgent →
-            # короткие интервалы (5/15/30/60/120 сек) и сразу первая попытка.
-            urgent = _is_urgent(text)
             initial_delay = _RETRY_SOS_BACKOFF_SEC[0] if urgent else RETRY_INITIAL_DELAY_MIN * 60
             retry_id = retry_enqueue(
                 u.id, update.effective_chat.id, status_msg.message_id,
@@ -2714,6 +5081,80 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
         await _show_status(update, status_msg, success_text)
 
 
+async def _send_tx_chunks(update: Update, status_task: asyncio.Task, *,
+                          tg_user_id: int, slot_n: int, packets: list[str],
+                          deadline: int, urgent: bool,
+                          received_at: Optional[float] = None,
+                          trace_id: Optional[int] = None) -> None:
+    """Многопакетная отправка транзакцией send_tx.
+
+    Каждая часть уходит со своим ACK-callback'ом (tx_id + chunk_idx). Часть,
+    которую не удалось даже отправить (нода отвалилась), сразу ложится в
+    retry_queue; NAK'нутые — туда же, уже из _handle_tx_ack. Целиком
+    сообщение никогда не пересылается, статус юзера — «доставлено N/M».
+    """
+    chat_id = update.effective_chat.id
+    tx_id = tx_create(tg_user_id, chat_id, slot_n, packets, deadline, is_sos=urgent)
+    unsent: list[int] = []
+    log.info("tx=%s: %d chunks, pacing %s", tx_id, len(packets), _pacing.describe())
+    _tracer.mark(trace_id, "queued")
+    for i, pkt in enumerate(packets):
+        if i:
+            await asyncio.sleep(_pacing.gap())
+        try:
+            await send_dm_to_pocket_async(
+                pkt, on_ack=_make_ack_cb(slot_n, chat_id, tx_id=tx_id, chunk_idx=i,
+                                         trace_id=trace_id),
+                lane="sos" if urgent else "user", flow=slot_n,
+            )
+        except Exception:
+            log.exception("tx=%s chunk %d/%d send failed", tx_id, i + 1, len(packets))
+            tx_chunk_set_state(tx_id, i, "failed")
+            unsent.append(i)
+        else:
+            tx_chunk_set_state(tx_id, i, "sent")
+    if received_at is not None and len(unsent) < len(packets):
+        _m_tg_to_mesh.observe(time.monotonic() - received_at)
+    if len(unsent) < len(packets):
+        _tracer.mark(trace_id, "sent")
+    else:
+        _tracer.finish(trace_id, "failed")
+
+    try:
+        status_msg = await status_task
+    except Exception:
+        log.exception("status reply_text failed; continuing without placeholder")
+        status_msg = None
+    if status_msg is not None:
+        tx_set_status_msg(tx_id, status_msg.message_id)
+
+    retry_ids = [rid for rid in (tx_chunk_queue_retry(tx_id, i) for i in unsent)
+                 if rid is not None]
+    if status_msg is None:
+        return
+
+    tx = tx_get(tx_id)
+    if tx is None:
+        return  # ACK'и успели прийти и закрыть транзакцию раньше нас
+    if retry_ids and len(unsent) == len(packets):
+        queue_text = (
+            f"⏳ {DISPLAY_NAME} пока вне связи. Сообщение ({len(packets)} частей) "
+            "в очереди — попробую автоматически"
+            + (", повторяю каждые несколько секунд." if urgent else " в ближайшие минуты.")
+        )
+        await _show_status(update, status_msg, queue_text,
+                           reply_markup=_retry_inline_markup(retry_ids[0]))
+        return
+    text = _tx_progress_text(tx)
+    hint = pocket_freshness_hint()
+    if hint:
+        text += "\n" + hint.strip()
+    await _show_status(
+        update, status_msg, text,
+        reply_markup=_retry_inline_markup(retry_ids[0]) if retry_ids else None,
+    )
+
+
 async def _reject_media(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     u = update.effective_user
     if u is None or update.message is None:
@@ -2726,11 +5167,84 @@ async def _reject_media(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     )
 
 
+# ============================================================
+# Live feed для GUI: снимок + периодический stats
+# ============================================================
+_LIVE_FEED_STATS_S = 1.0
+
+
+def _live_feed_stats() -> dict:
+    return {
+        "pocket_last_heard": _pocket_last_heard,
+        "mesh_connected": _mesh_iface is not None,
+        "slots": slot_count_active(),
+        "tx_queue": _mesh_tx.depth(),
+        "rx_queue": _mesh_queue.depth(),
+        "dispatch_pending": _mesh_workers.pending(),
+        "retry_pending": len(_retry_deadlines),
+        "pacing_gap_s": round(_pacing.gap(), 2),
+        "airtime_used_s": round(_airtime.used(), 1),
+        "airtime_budget_s": round(_airtime.budget_s, 1),
+        "airtime_pct": round(_airtime.utilisation() * 100, 1),
+    }
+
+
+def _live_feed_snapshot() -> list[tuple[str, dict]]:
+    """Что получает GUI сразу после подключения."""
+    return [
+        ("hello", {"version": 1, "started_at": _RELAY_STARTED_AT,
+                   "node_id": _my_node_id, "pocket_node_id": POCKET_NODE_ID}),
+        ("slots", {"slots": slot_list_active()}),
+        ("gps", gps_get_latest() or {}),
+        ("stats", _live_feed_stats()),
+    ]
+
+
+async def live_feed_worker() -> None:
+    """Поднять _live_feed и раз в _LIVE_FEED_STATS_S слать очереди / pocket
+    last-heard — он же heartbeat: пропал stats → relay завис или умер."""
+    _live_feed.snapshot = _live_feed_snapshot
+    try:
+        await _live_feed.start()
+    except OSError as e:
+        log.warning("Live feed disabled: cannot listen on 127.0.0.1:%s (%s)",
+                    LIVE_FEED_PORT, e)
+        return
+    log.info("Live feed on 127.0.0.1:%s", _live_feed.port)
+    while True:
+        try:
+            await asyncio.sleep(_LIVE_FEED_STATS_S)
+            if _live_feed.active():
+                _live_feed.publish("stats", **_live_feed_stats())
+        except asyncio.CancelledError:
+            await _live_feed.stop()
+            return
+        except Exception:
+            log.exception("live feed stats failed")
+
+
+async def metrics_worker() -> None:
+    """Отдавать _metrics на 127.0.0.1:METRICS_PORT/metrics."""
+    try:
+        server = await metrics.serve(_metrics, METRICS_PORT)
+    except OSError as e:
+        log.warning("Metrics disabled: cannot listen on 127.0.0.1:%s (%s)",
+                    METRICS_PORT, e)
+        return
+    log.info("Metrics on http://127.0.0.1:%s/metrics", METRICS_PORT)
+    async with server:
+        await server.serve_forever()
+
+
 # ============================================================
 # Post-init / main
 # ============================================================
 async def on_post_init(app: Application) -> None:
     asyncio.create_task(mesh_dispatcher(app))
+    if LIVE_FEED_PORT:
+        asyncio.create_task(live_feed_worker())
+    if METRICS_PORT:
+        asyncio.create_task(metrics_worker())
     asyncio.create_task(expiry_worker(app))
     asyncio.create_task(retry_worker(app))
     asyncio.create_task(mesh_watchdog(app))   # USB-unplug detection
@@ -2782,38 +5296,78 @@ def _register_handlers(app: Application) -> None:
         app.add_handler(MessageHandler(f, _reject_media))
 
 
-def _build_app() -> Application:
+def _build_app(base_url: Optional[str] = None) -> Application:
     """Каждый перезапуск polling требует свежий Application — старый закрыт
     своим event-loop'ом после исключения. Mesh-иntфейс и БД глобальны и
-    переживают перезапуск без изменений."""
-    app = (
-        Application.builder()
-        .token(BOT_TOKEN)
-        .post_init(on_post_init)
-        .build()
-    )
+    переживают перезапуск без изменений.
+
+    base_url — другой Bot API сервер (формат PTB: "http://host:port/bot");
+    нужен нагрузочному стенду benchmarks/bench_load.py."""
+    builder = Application.builder().token(BOT_TOKEN).post_init(on_post_init)
+    if base_url:
+        builder = builder.base_url(base_url)
+    app = builder.build()
     _register_handlers(app)
     return app
 
 
+def _effective_tg_mode() -> str:
+    """TG_MODE с поправкой на окружение. Webhook без https-URL или без
+    tornado (extra python-telegram-bot[webhooks]; в .exe не входит) не
+    поднимется — тогда polling, а не бесконечный цикл рестартов."""
+    if TG_MODE != "webhook":
+        return "polling"
+    if not WEBHOOK_URL.startswith("https://"):
+        log.error("TG_MODE=webhook, но WEBHOOK_URL не https://… — работаю через polling.")
+        return "polling"
+    if importlib.util.find_spec("tornado") is None:
+        log.error("TG_MODE=webhook требует pip install \"python-telegram-bot[webhooks]\" "
+                  "(нет tornado) — работаю через polling.")
+        return "polling"
+    return "webhook"
+
+
+def _run_app(app: Application, mode: str) -> None:
+    if mode == "webhook":
+        # Слушаем только loopback: TLS и публичный порт — у Caddy. Путь
+        # listener'а = путь из WEBHOOK_URL, прокси его не переписывает.
+        # Сетевой сбой здесь не рвёт приём: Telegram сам повторит POST,
+        # Application не пересоздаётся.
+        log.info("Starting Telegram webhook on 127.0.0.1:%d ...", WEBHOOK_PORT)
+        app.run_webhook(
+            listen="127.0.0.1",
+            port=WEBHOOK_PORT,
+            url_path=urlparse(WEBHOOK_URL).path.lstrip("/"),
+            webhook_url=WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET or None,
+        )
+    else:
+        log.info("Starting Telegram polling...")
+        # poll_interval=0.3 — пауза между long-poll'ами, чем меньше тем
+        # быстрее реакция на входящие. timeout=30 — keep-alive long-poll.
+        # Стандартные production-значения PTB. start_polling сам снимает
+        # webhook, если до этого бот работал в режиме webhook.
+        app.run_polling(poll_interval=0.3, timeout=30)
+
+
 def _run_polling_with_retry() -> None:
-    """Бесконечный цикл: запускаем polling, ловим сетевые/конфликтные ошибки
-    Telegram и перезапускаемся с экспоненциальным backoff. Ctrl+C / SIGTERM
-    выходят чисто; нормальный return из run_polling (граceful shutdown)
-    тоже останавливает цикл."""
+    """Бесконечный цикл: запускаем polling (или webhook, см. TG_MODE), ловим
+    сетевые/конфликтные ошибки Telegram и перезапускаемся с экспоненциальным
+    backoff. Ctrl+C / SIGTERM выходят чисто; нормальный return из
+    run_polling / run_webhook (граceful shutdown) тоже останавливает цикл."""
+    mode = _effective_tg_mode()
+    if mode == "webhook" and not WEBHOOK_SECRET:
+        log.warning("WEBHOOK_SECRET пуст — listener примет POST от кого угодно, "
+                    "кто знает путь.")
     delay = POLLING_RESTART_INITIAL_SEC
     while True:
         run_started_at = time.time()
         try:
             app = _build_app()
-            log.info("Starting Telegram polling...")
-            # poll_interval=0.3 — пауза между long-poll'ами, чем меньше тем
-            # быстрее реакция на входящие. timeout=30 — keep-alive long-poll.
-            # Стандартные production-значения PTB.
-            app.run_polling(poll_interval=0.3, timeout=30)
+            _run_app(app, mode)
             # Граceful shutdown (Application.stop() / SIGTERM из PTB) —
             # не ошибка, выходим из цикла.
-            log.info("Polling exited cleanly. Main loop stopping.")
+            log.info("Telegram %s exited cleanly. Main loop stopping.", mode)
             return
         except KeyboardInterrupt:
             log.info("Ctrl+C — shutting down.")
@@ -2841,7 +5395,7 @@ def _run_polling_with_retry() -> None:
             )
         except Exception:
             log.exception(
-                "Unexpected error in run_polling — restart in %ds.", delay,
+                "Unexpected error in run_%s — restart in %ds.", mode, delay,
             )
 
         # Если polling успел проработать стабильно — сбрасываем backoff.
@@ -2895,6 +5449,8 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         log.info("Shutting down...")
     finally:
+        if _db_committer is not None:
+            _db_committer.stop()   # финальный commit отложенных записей
         if _mesh_iface is not None:
             try:
                 _mesh_iface.close()
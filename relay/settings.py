@@ -20,6 +20,7 @@ index without None-checks.
 from __future__ import annotations
 
 import copy
+import re
 import sys
 from pathlib import Path
 from typing import Any
@@ -50,6 +51,14 @@ if getattr(sys, "frozen", False):
 EXAMPLE_PATH: Path = _EXAMPLE_DIR / ".env.example"
 
 
+# Модем-пресеты Meshtastic — тот же набор, что airtime.PRESETS (settings.py
+# самодостаточен и airtime не импортирует).
+LORA_PRESETS: tuple[str, ...] = (
+    "SHORT_TURBO", "SHORT_FAST", "SHORT_SLOW", "MEDIUM_FAST", "MEDIUM_SLOW",
+    "LONG_FAST", "LONG_MODERATE", "LONG_SLOW", "VERY_LONG_SLOW",
+)
+
+
 # ---------------------------------------------------------------------------
 # Schema — every key lives here. Type is inferred from the default value.
 # ---------------------------------------------------------------------------
@@ -88,8 +97,65 @@ DEFAULTS: dict[str, Any] = {
     #     срочных сообщений когда «лишь бы быстрее, а не наверняка».
     "mesh_delivery_mode": "reliable",
 
+    # Компактные заголовки пакетов в pocket: «3>vasya: текст» вместо
+    # «[@3 vasya 16:15] текст», части — «3a> / 3b> / 3C>» (заглавная =
+    # последняя). Экономит 8–15 байт на пакет → меньше частей и эфира.
+    "compact_headers": False,
+
+    # Сжатие длинных (многопакетных) сообщений: deflate со словарём под
+    # ru/en-чат + base85, маркер «~z1». Уходит сжатым только если пакетов
+    # становится меньше. Нужен декодер на стороне pocket — по умолчанию выкл.
+    "mesh_compression": False,
+
+    # Склейка коротких сообщений в один LoRa-пакет: если за это окно (мс)
+    # пришло несколько однопакетных сообщений от разных юзеров, они уходят
+    # одним пакетом через перевод строки (один заголовок эфира вместо N).
+    # 0 = выкл (каждое сообщение — свой пакет, без задержки).
+    "mesh_batch_window_ms": 0,
+
+    # Модем-пресет ноды (как в приложении Meshtastic: LONG_FAST, MEDIUM_SLOW,
+    # SHORT_FAST, …) — по нему relay оценивает эфирное время каждого пакета.
+    "lora_preset": "LONG_FAST",
+    # Лимит duty cycle, % эфира за час. Ближе к лимиту TX-очередь сначала
+    # придерживает служебные ответы и AI, потом retry; SOS — никогда.
+    # 0 = без лимита, эфир только считается (по умолчанию: лимит зависит от
+    # региона). Для EU868 ставь 10.
+    "duty_cycle_pct": 0,
+
+    # Дубли входящих с ноды: пакет с тем же id от той же ноды отбрасывается
+    # всегда (повтор прошивки после потерянного ACK, чужие ретрансляции).
+    # Это окно (сек) — ещё и одинаковый текст от той же ноды, даже с новым
+    # id. 0 = только по id.
+    "mesh_rx_dedup_text_sec": 0,
+
+    # --- Telegram: как бот получает апдейты ---
+    # "polling" — long polling getUpdates (по умолчанию, работает за NAT).
+    # "webhook" — Telegram сам шлёт апдейты POST'ом на WEBHOOK_URL; TLS
+    # снимает reverse proxy (Caddy), relay слушает только 127.0.0.1.
+    "tg_mode":        "polling",
+    # Публичный https-адрес webhook'а, путь в нём — секретная часть URL:
+    # https://relay.example.com/tg/<случайная строка>.
+    "webhook_url":    "",
+    # Локальный порт listener'а, на него проксирует Caddy.
+    "webhook_port":   8443,
+    # secret_token: Telegram кладёт его в заголовок
+    # X-Telegram-Bot-Api-Secret-Token, чужие POST'ы отбрасываются.
+    # 1–256 символов A-Z a-z 0-9 _ -.
+    "webhook_secret": "",
+
     # --- Limits ---
     "max_text_length":        170,
+    # Лимит одного LoRa-пакета в байтах UTF-8 (заголовок «[@N user HH:MM i/N]»
+    # входит). Кириллица — 2 байта/символ. Потолок Meshtastic — 233.
+    "max_packet_bytes":       200,
+    # Ёмкость каждой полосы приоритета в TX-очереди на ноду (SOS / сообщения
+    # юзеров / retry / AI / служебные ответы). Переполнение = отказ сразу,
+    # а не бесконечное ожидание в памяти.
+    "mesh_tx_queue_limit":    64,
+    # Сколько событий с ноды (ответы в слоты, ACK'и, AI-запросы) обрабатываются
+    # одновременно. Порядок внутри одного слота / AI-чата / чата ACK'ов
+    # сохраняется всегда; медленный AI не держит остальных.
+    "mesh_dispatch_concurrency": 8,
     "slot_ttl_hours":         20,
     "slot_sticky_hours":      10,
     "max_username_in_prefix": 10,
@@ -132,6 +198,15 @@ DEFAULTS: dict[str, Any] = {
     "log_file_enabled": True,
     "log_file_max_mb":  5,    # размер одного файла перед ротацией
     "log_file_keep":    5,    # сколько бэкапов хранить (relay.log.1 .. .5)
+    # Push-канал состояния relay → GUI (слоты, ACK'и, RX/TX, очереди, GPS)
+    # на 127.0.0.1:<порт>. GUI подписывается вместо опроса relay.db.
+    # 0 = выкл (по умолчанию): сокет без авторизации, а в потоке тексты
+    # сообщений, username'ы и GPS — любой локальный процесс их прочтёт.
+    # Включать на однопользовательской машине, например 47211.
+    "live_feed_port":   0,
+    # Метрики в формате Prometheus: http://127.0.0.1:<порт>/metrics
+    # (счётчики пакетов / ACK / retry, задержки, очереди). 0 = выкл.
+    "metrics_port":     0,
 
     # --- AI helper (locally via LM Studio / Ollama / любой OpenAI-compatible) ---
     # Использование: с pocket-ноды напиши «@<TRIGGER> <вопрос>» — придёт ответ
@@ -166,8 +241,14 @@ GROUPS: list[tuple[str, list[str]]] = [
     ("Connection", ["bot_token", "owner_id", "pocket_node_id", "last_com_port",
                     "gui_lang",
                     "display_name", "node_model", "mesh_hop_limit",
-                    "mesh_delivery_mode"]),
-    ("Limits", ["max_text_length", "slot_ttl_hours", "slot_sticky_hours",
+                    "mesh_delivery_mode", "compact_headers",
+                    "mesh_compression", "mesh_batch_window_ms",
+                    "lora_preset", "duty_cycle_pct", "mesh_rx_dedup_text_sec"]),
+    ("Telegram (polling / webhook)", ["tg_mode", "webhook_url", "webhook_port",
+                                      "webhook_secret"]),
+    ("Limits", ["max_text_length", "max_packet_bytes", "mesh_tx_queue_limit",
+                "mesh_dispatch_concurrency",
+                "slot_ttl_hours", "slot_sticky_hours",
                 "max_username_in_prefix", "pocket_fresh_min", "pocket_stale_min"]),
     ("GPS (BETA — not tested by author)", [
         "gps_enabled", "gps_fix_fresh_min", "gps_fix_stale_min",
@@ -179,7 +260,8 @@ GROUPS: list[tuple[str, list[str]]] = [
     ("Pocket commands (!ping / !history)", [
         "history_default_hours", "history_max_items", "history_retention_days",
     ]),
-    ("Logging", ["log_file_enabled", "log_file_max_mb", "log_file_keep"]),
+    ("Logging", ["log_file_enabled", "log_file_max_mb", "log_file_keep",
+                 "live_feed_port", "metrics_port"]),
     ("AI helper (LM Studio / Ollama / OpenAI-compatible)", [
         "ai_enabled", "ai_trigger_tag", "ai_base_url", "ai_api_key",
         "ai_model", "ai_system_prompt",
@@ -291,15 +373,18 @@ def validate(data: dict[str, Any]) -> list[str]:
             except (TypeError, ValueError):
                 errs.append(f"SOS recipient '{x}' — не число.")
 
-    for key in ("max_text_length", "slot_ttl_hours", "slot_sticky_hours",
+    for key in ("max_text_length", "max_packet_bytes", "mesh_tx_queue_limit",
+                "mesh_dispatch_concurrency",
+                "slot_ttl_hours", "slot_sticky_hours",
                 "pocket_fresh_min", "pocket_stale_min",
                 "gps_fix_fresh_min", "gps_fix_stale_min", "gps_fix_max_min",
                 "where_rate_limit_min", "retry_initial_delay_min",
                 "retry_max_interval_min",
                 "history_default_hours", "history_max_items",
                 "history_retention_days",
-                "log_file_max_mb", "log_file_keep",
-                "mesh_hop_limit",
+                "log_file_max_mb", "log_file_keep", "live_feed_port", "metrics_port",
+                "mesh_hop_limit", "mesh_batch_window_ms", "duty_cycle_pct",
+                "mesh_rx_dedup_text_sec", "webhook_port",
                 "ai_timeout_sec", "ai_max_history", "ai_ttl_hours"):
         try:
             v = int(s[key])
@@ -308,10 +393,67 @@ def validate(data: dict[str, Any]) -> list[str]:
         except (TypeError, ValueError):
             errs.append(f"{key} должно быть числом.")
 
+    try:
+        if not 40 <= int(s["max_packet_bytes"]) <= 233:
+            errs.append("MAX_PACKET_BYTES должен быть от 40 до 233 (лимит Meshtastic).")
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        if int(s["mesh_tx_queue_limit"]) < 1:
+            errs.append("MESH_TX_QUEUE_LIMIT должен быть не меньше 1.")
+        if int(s["mesh_dispatch_concurrency"]) < 1:
+            errs.append("MESH_DISPATCH_CONCURRENCY должен быть не меньше 1.")
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        if int(s["live_feed_port"]) > 65535:
+            errs.append("LIVE_FEED_PORT — от 0 (выкл) до 65535.")
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        if int(s["metrics_port"]) > 65535:
+            errs.append("METRICS_PORT — от 0 (выкл) до 65535.")
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        if int(s["mesh_batch_window_ms"]) > 2000:
+            errs.append("MESH_BATCH_WINDOW_MS — не больше 2000 мс.")
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        if int(s["duty_cycle_pct"]) > 100:
+            errs.append("DUTY_CYCLE_PCT — от 0 (без лимита) до 100.")
+    except (TypeError, ValueError):
+        pass
+
+    if str(s.get("lora_preset") or "").upper() not in LORA_PRESETS:
+        errs.append("LORA_PRESET — один из: " + ", ".join(LORA_PRESETS) + ".")
+
     mode = str(s.get("mesh_delivery_mode") or "reliable").lower()
     if mode not in ("reliable", "fast"):
         errs.append("MESH_DELIVERY_MODE должен быть 'reliable' или 'fast'.")
 
+    tg_mode = str(s.get("tg_mode") or "polling").lower()
+    if tg_mode not in ("polling", "webhook"):
+        errs.append("TG_MODE должен быть 'polling' или 'webhook'.")
+    elif tg_mode == "webhook":
+        if not str(s.get("webhook_url") or "").startswith("https://"):
+            errs.append("WEBHOOK_URL — публичный https://… адрес "
+                        "(Telegram шлёт webhook только по HTTPS).")
+        try:
+            if not 1 <= int(s["webhook_port"]) <= 65535:
+                errs.append("WEBHOOK_PORT — от 1 до 65535.")
+        except (TypeError, ValueError):
+            pass
+    secret = str(s.get("webhook_secret") or "")
+    if secret and not re.fullmatch(r"[A-Za-z0-9_-]{1,256}", secret):
+        errs.append("WEBHOOK_SECRET — до 256 символов A-Z a-z 0-9 _ -.")
+
     return errs
 
 
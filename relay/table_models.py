@@ -0,0 +1,331 @@
+"""
+Модели таблиц для UsersDialog / SlotsDialog (model/view вместо QTableWidget).
+
+QTableWidget держал по QTableWidgetItem (и по виджету-чекбоксу) на каждую
+ячейку и на каждое «Обновить» / нажатие клавиши в поиске пересоздавал их
+все. Здесь view рисует только видимые строки, а модель:
+
+- UsersModel грузит пользователей страницами (canFetchMore / fetchMore,
+  keyset по last_seen) — фильтр и поиск считает SQLite (db.list_users_page);
+- на обновление перечитывает уже загруженный префикс и применяет разницу
+  (row_diff): вставки / удаления / dataChanged только по изменившимся
+  строкам — выделение и прокрутка не сбрасываются;
+- чекбоксы WL / FAV / BAN — ItemIsUserCheckable, запись через db.set_*.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Any, Optional
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QObject, QRectF, Qt
+from PyQt6.QtGui import QBrush, QColor, QFont
+from PyQt6.QtWidgets import QStyledItemDelegate
+
+import db
+from theme import PALETTE
+
+
+def row_diff(old: list[dict], new: list[dict], key: str) -> list[tuple]:
+    """Разница двух списков строк с уникальным `key` — операции
+    ("remove", i, j) / ("insert", i, rows) / ("change", i, row), которые,
+    применённые по порядку к `old`, дают `new`. Индексы — уже с учётом
+    предыдущих операций (идём с конца, начало списка не сдвигается)."""
+    sm = SequenceMatcher(None, [r[key] for r in old], [r[key] for r in new],
+                         autojunk=False)
+    ops: list[tuple] = []
+    for tag, i1, i2, j1, j2 in reversed(sm.get_opcodes()):
+        if tag == "equal":
+            for k in range(i2 - i1 - 1, -1, -1):
+                if old[i1 + k] != new[j1 + k]:
+                    ops.append(("change", i1 + k, new[j1 + k]))
+            continue
+        if i2 > i1:
+            ops.append(("remove", i1, i2))
+        if j2 > j1:
+            ops.append(("insert", i1, new[j1:j2]))
+    return ops
+
+
+class _DiffModel(QAbstractTableModel):
+    """Список dict'ов + применение row_diff с правильными begin*/end*."""
+
+    KEY = ""
+    HEADERS: list[str] = []
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._rows: list[dict] = []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation,
+                   role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def row(self, r: int) -> dict:
+        return self._rows[r]
+
+    def _apply(self, new: list[dict]) -> None:
+        last_col = self.columnCount() - 1
+        for op, i, arg in row_diff(self._rows, new, self.KEY):
+            if op == "change":
+                self._rows[i] = arg
+                self.dataChanged.emit(self.index(i, 0), self.index(i, last_col))
+            elif op == "remove":
+                self.beginRemoveRows(QModelIndex(), i, arg - 1)
+                del self._rows[i:arg]
+                self.endRemoveRows()
+            else:
+                self.beginInsertRows(QModelIndex(), i, i + len(arg) - 1)
+                self._rows[i:i] = arg
+                self.endInsertRows()
+
+    def _reset(self, rows: list[dict]) -> None:
+        self.beginResetModel()
+        self._rows = rows
+        self.endResetModel()
+
+
+# ===========================================================================
+# Пользователи
+# ===========================================================================
+class UsersModel(_DiffModel):
+    COL_NAME, COL_TG, COL_CAT, COL_WL, COL_FAV, COL_BAN, COL_LAST = range(7)
+    HEADERS = [
+        "Пользователь",
+        "TG ID",
+        "Категория",
+        "Белый список",
+        "Избранный",
+        "Бан",
+        "Последняя активность",
+    ]
+    KEY = "tg_user_id"
+    PAGE = 200
+
+    _FLAG_COLS = {COL_WL: "whitelisted", COL_FAV: "is_fav", COL_BAN: "banned"}
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._filter = "all"
+        self._query = ""
+        self._exhausted = True
+        self.matched = 0
+        self.total = 0
+
+    # --- запросы ---------------------------------------------------------
+    def set_query(self, flt: str, query: str) -> None:
+        """Новый фильтр / поиск — другой набор строк, модель с нуля."""
+        self._filter, self._query = flt, query
+        rows = db.list_users_page(flt, query, self.PAGE)
+        self._exhausted = len(rows) < self.PAGE
+        self._reset(rows)
+        self._count()
+
+    def refresh(self) -> None:
+        """Перечитать уже загруженные строки и применить разницу."""
+        limit = max(len(self._rows), self.PAGE)
+        rows = db.list_users_page(self._filter, self._query, limit)
+        self._exhausted = len(rows) < limit
+        self._apply(rows)
+        self._count()
+
+    def _count(self) -> None:
+        self.matched = db.count_users(self._filter, self._query)
+        self.total = (self.matched if self._filter == "all" and not self._query
+                      else db.count_users())
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if parent.isValid() or self._exhausted or not self._rows:
+            return
+        last = self._rows[-1]
+        rows = db.list_users_page(self._filter, self._query, self.PAGE,
+                                  after=(last["last_seen"], last["tg_user_id"]))
+        self._exhausted = len(rows) < self.PAGE
+        if rows:
+            n = len(self._rows)
+            self.beginInsertRows(QModelIndex(), n, n + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    # --- отображение -----------------------------------------------------
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        f = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() in self._FLAG_COLS:
+            f |= Qt.ItemFlag.ItemIsUserCheckable
+        return f
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        u = self._rows[index.row()]
+        col = index.column()
+        R = Qt.ItemDataRole
+        if role == R.UserRole:
+            return u["tg_user_id"]
+        if col in self._FLAG_COLS:
+            if role == R.CheckStateRole:
+                return (Qt.CheckState.Checked if u.get(self._FLAG_COLS[col])
+                        else Qt.CheckState.Unchecked)
+            return None
+        if role == R.DisplayRole:
+            if col == self.COL_NAME:
+                name = u.get("first_name") or "—"
+                uname = u.get("tg_username") or ""
+                return f"{name}\n@{uname}" if uname else name
+            if col == self.COL_TG:
+                return str(u["tg_user_id"])
+            if col == self.COL_CAT:
+                cat = u.get("entry_tag") or ""
+                return cat.upper() if cat else "—"
+            if col == self.COL_LAST:
+                return datetime.fromtimestamp(u["last_seen"]).strftime("%Y-%m-%d %H:%M")
+        elif role == R.ForegroundRole:
+            if col == self.COL_NAME:
+                return QBrush(QColor(PALETTE["t3" if u.get("banned") else "t1"]))
+            if col == self.COL_TG:
+                return QBrush(QColor(PALETTE["t2"]))
+            if col == self.COL_CAT and u.get("entry_tag"):
+                return QBrush(QColor(PALETTE["info"]))
+            if col == self.COL_LAST:
+                return QBrush(QColor(PALETTE["t3"]))
+        elif role == R.FontRole:
+            if col == self.COL_TG:
+                return QFont("Consolas", 9)
+            if col == self.COL_CAT and u.get("entry_tag"):
+                f = QFont("Consolas", 8)
+                f.setBold(True)
+                return f
+        return None
+
+    def setData(self, index: QModelIndex, value: Any,
+                role: int = Qt.ItemDataRole.EditRole) -> bool:
+        if role != Qt.ItemDataRole.CheckStateRole or index.column() not in self._FLAG_COLS:
+            return False
+        checked = Qt.CheckState(value) == Qt.CheckState.Checked
+        u = self._rows[index.row()]
+        col = index.column()
+        if col == self.COL_FAV:
+            db.set_fav(u["tg_user_id"], checked)
+        else:
+            db.set_flag(u["tg_user_id"], self._FLAG_COLS[col], checked)
+        self._rows[index.row()] = {**u, self._FLAG_COLS[col]: int(checked)}
+        self.dataChanged.emit(self.index(index.row(), self.COL_NAME), index)
+        return True
+
+
+# ===========================================================================
+# Слоты
+# ===========================================================================
+class SlotsModel(_DiffModel):
+    COL_SLOT, COL_USER, COL_MSG, COL_STICKY, COL_PROGRESS, COL_LEFT = range(6)
+    HEADERS = ["Слот", "Пользователь", "Сообщение", "Закреплён", "Прогресс",
+               "Истекает через"]
+    KEY = "slot_n"
+    PROGRESS_ROLE = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._now = int(time.time())
+
+    def refresh(self) -> None:
+        self._now = int(time.time())
+        self._apply(db.list_active_slots())
+        # Оставшееся время тикает у всех строк — перерисовать две колонки.
+        if self._rows:
+            self.dataChanged.emit(self.index(0, self.COL_PROGRESS),
+                                  self.index(len(self._rows) - 1, self.COL_LEFT))
+
+    def _timing(self, s: dict) -> tuple[int, int]:
+        remaining = max(0, s["expires_at"] - self._now)
+        total = s["expires_at"] - s["created_at"] or remaining
+        pct = int(100 * remaining / total) if total > 0 else 0
+        return remaining, pct
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        s = self._rows[index.row()]
+        col = index.column()
+        R = Qt.ItemDataRole
+        sticky = bool(s.get("was_replied"))
+        if role == R.DisplayRole:
+            if col == self.COL_SLOT:
+                return f"@{s['slot_n']}"
+            if col == self.COL_USER:
+                name = s.get("tg_username") or s.get("first_name") or str(s["tg_user_id"])
+                tag = s.get("entry_tag")
+                return f"{tag}:{name}" if tag else name
+            if col == self.COL_MSG:
+                return (s.get("last_message") or "").strip() or "—"
+            if col == self.COL_STICKY:
+                return "★ да" if sticky else "—"
+            if col == self.COL_LEFT:
+                remaining, _ = self._timing(s)
+                return f"{remaining // 3600:02d}ч {(remaining % 3600) // 60:02d}мин"
+        elif role == self.PROGRESS_ROLE and col == self.COL_PROGRESS:
+            return self._timing(s)[1]
+        elif role == R.ToolTipRole and col == self.COL_MSG:
+            return (s.get("last_message") or "").strip() or "—"
+        elif role == R.TextAlignmentRole and col in (self.COL_SLOT, self.COL_STICKY):
+            return int(Qt.AlignmentFlag.AlignCenter)
+        elif role == R.ForegroundRole:
+            if col == self.COL_SLOT:
+                return QBrush(QColor(PALETTE["accent"]))
+            if col == self.COL_MSG:
+                return QBrush(QColor(PALETTE["t2"]))
+            if col == self.COL_STICKY:
+                return QBrush(QColor(PALETTE["warn"] if sticky else PALETTE["t4"]))
+            if col == self.COL_LEFT:
+                pct = self._timing(s)[1]
+                return QBrush(QColor(PALETTE["err" if pct < 10 else "warn" if pct < 20 else "t2"]))
+        elif role == R.FontRole:
+            if col == self.COL_SLOT:
+                return QFont("Consolas", 10, QFont.Weight.Bold)
+            if col in (self.COL_USER, self.COL_LEFT):
+                return QFont("Consolas", 9)
+            if col == self.COL_MSG:
+                f = QFont()
+                f.setItalic(True)
+                f.setPointSize(10)
+                return f
+            if col == self.COL_STICKY and sticky:
+                f = QFont()
+                f.setBold(True)
+                return f
+        return None
+
+
+class ProgressDelegate(QStyledItemDelegate):
+    """Полоска TTL, нарисованная painter'ом — без QProgressBar-виджета
+    в каждой строке (вместо setCellWidget)."""
+
+    def paint(self, painter, option, index) -> None:
+        pct = index.data(SlotsModel.PROGRESS_ROLE)
+        if pct is None:
+            return super().paint(painter, option, index)
+        rect = QRectF(option.rect).adjusted(8, 0, -8, 0)
+        rect.setTop(rect.center().y() - 4)
+        rect.setHeight(8)
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QColor("#0d1115"))        # как QProgressBar в theme.py
+        painter.drawRoundedRect(rect, 3, 3)
+        if pct > 0:
+            fill = QRectF(rect)
+            fill.setWidth(rect.width() * pct / 100)
+            painter.setBrush(QColor(PALETTE["accent"]))
+            painter.drawRoundedRect(fill, 2, 2)
+        painter.restore()
@@ -51,6 +51,13 @@ def relay_with_db(relay_module):
     with relay_module._db_lock:
         db.executescript(relay_module._DB_SCHEMA)
         db.commit()
+    # In-memory индексы поверх БД живут на уровне модуля — сбрасываем,
+    # чтобы строки из прошлого теста не «воскресали».
+    relay_module._retry_deadlines.clear()
+    relay_module._slots.clear()
+    relay_module._expiry_deadlines.clear()
+    relay_module._tracer.clear()
+    relay_module._rx_dedup.clear()
     try:
         yield relay_module
     finally:
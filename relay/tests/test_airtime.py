@@ -0,0 +1,212 @@
+"""
+Тесты airtime.py (оценка airtime, окно duty cycle) и гейта TX-очереди.
+"""
+import asyncio
+import time
+
+import pytest
+
+import airtime
+import settings
+
+
+def test_estimate_by_preset():
+    # LONG_FAST, ~100 байт текста — около секунды в эфире.
+    assert 0.9 < airtime.estimate(100, "LONG_FAST") < 1.3
+    fast = [airtime.estimate(100, p) for p in
+            ("SHORT_TURBO", "SHORT_FAST", "MEDIUM_FAST", "LONG_FAST", "LONG_SLOW")]
+    assert fast == sorted(fast)
+    assert airtime.estimate(200, "LONG_FAST") > airtime.estimate(20, "LONG_FAST")
+    assert airtime.estimate(50, "NOPE") == airtime.estimate(50, airtime.DEFAULT_PRESET)
+
+
+def test_settings_presets_match():
+    assert settings.LORA_PRESETS == tuple(airtime.PRESETS)
+
+
+def test_validate_rejects_bad_airtime_settings():
+    s = dict(settings.DEFAULTS, bot_token="1:x", owner_id="1", pocket_node_id="!abcdef01")
+    base = settings.validate(s)
+    assert not [e for e in base if "LORA" in e or "DUTY" in e]
+    errs = settings.validate(dict(s, lora_preset="TURBO_MAX", duty_cycle_pct=150))
+    assert any("LORA_PRESET" in e for e in errs)
+    assert any("DUTY_CYCLE_PCT" in e for e in errs)
+
+
+def test_ledger_window():
+    led = airtime.DutyCycleLedger(limit_pct=10, window_s=100)   # бюджет 10 с
+    led.record(4, now=0)
+    led.record(4, now=50)
+    assert led.used(now=60) == 8
+    assert led.utilisation(now=60) == pytest.approx(0.8)
+    assert led.seconds_until(0.7, now=60) == pytest.approx(40)   # первая выйдет в t=100
+    assert led.seconds_until(0.9, now=60) == 0
+    assert led.used(now=120) == 4
+    assert led.used(now=200) == 0
+    assert led.total_s == 8
+
+
+def test_ledger_without_limit():
+    led = airtime.DutyCycleLedger(limit_pct=0)
+    led.record(500)
+    assert led.utilisation() == 0
+    assert led.seconds_until(0.5) == 0
+    assert led.used() == 500
+
+
+def test_gate_defers_low_priority_lanes(relay_module):
+    closed = {"status", "ai"}
+    order = []
+
+    async def run():
+        q = relay_module._MeshTxQueue(64, gate=lambda lane: 0.05 if lane in closed else 0.0)
+        low = asyncio.create_task(q.submit(order.append, "status", lane="status"))
+        await asyncio.sleep(0.02)
+        assert not order and q.depth()["status"] == 1
+        await q.submit(order.append, "user", lane="user")
+        assert order == ["user"]          # закрытая полоса не держит открытую
+        closed.clear()
+        await asyncio.wait_for(low, 1)
+        q._executor.shutdown(wait=True)
+        return q
+
+    q = asyncio.run(run())
+    assert order == ["user", "status"]
+    assert q.deferred["status"] >= 1
+
+
+def test_airtime_gate_ceilings(relay_module, monkeypatch):
+    led = airtime.DutyCycleLedger(limit_pct=10, window_s=100)
+    led.record(8, now=0)                  # 80 % бюджета
+    monkeypatch.setattr(relay_module, "_airtime", led)
+    monkeypatch.setattr(airtime.time, "monotonic", lambda: 10.0)
+    assert relay_module._airtime_gate("sos") == 0
+    assert relay_module._airtime_gate("user") == 0
+    assert relay_module._airtime_gate("retry") == 0
+    assert relay_module._airtime_gate("ai") == pytest.approx(90)
+    assert relay_module._airtime_gate("status") == pytest.approx(90)
+
+
+def test_send_records_airtime_and_ping(relay_with_db, monkeypatch):
+    relay = relay_with_db
+
+    class _Iface:
+        def sendText(self, *a, **kw):
+            pass
+
+    led = airtime.DutyCycleLedger(limit_pct=10)
+    monkeypatch.setattr(relay, "_airtime", led)
+    monkeypatch.setattr(relay, "_mesh_iface", _Iface())
+    monkeypatch.setattr(relay, "DUTY_CYCLE_PCT", 10)
+    relay.send_dm_to_pocket("x" * 100)
+    assert led.used() == pytest.approx(airtime.estimate(100, relay.LORA_PRESET))
+    assert " air=0%" in relay._reply_ping_payload()
+
+
+def test_gated_retry_row_does_not_hold_sos(relay_with_db, monkeypatch):
+    """Закрытая полоса retry не держит retry_worker: обычная строка
+    переносится без попытки, SOS-строка за ней уходит сразу."""
+    relay = relay_with_db
+    led = airtime.DutyCycleLedger(limit_pct=10, window_s=100)
+    led.record(9, now=0)                  # 90 % — retry (потолок 85 %) закрыт
+    monkeypatch.setattr(relay, "_airtime", led)
+    monkeypatch.setattr(airtime.time, "monotonic", lambda: 10.0)
+    sent = []
+
+    async def fake_send(row):
+        sent.append(row["payload"])
+
+    class _Bot:
+        async def edit_message_text(self, **kw):
+            pass
+
+    class _App:
+        bot = _Bot()
+
+    monkeypatch.setattr(relay, "_retry_send_row", fake_send)
+    deadline = int(time.time()) + 3600
+    rid = relay.retry_enqueue(1, 1, 1, 1, "обычное", deadline, 0)
+    rid_sos = relay.retry_enqueue(1, 1, 2, 1, "SOS", deadline, 0, is_sos=True)
+
+    async def run():
+        for retry_id in (rid, rid_sos):
+            await asyncio.wait_for(
+                relay._retry_process_row(_App(), relay.retry_get(retry_id)), 1)
+
+    asyncio.run(run())
+    assert sent == ["SOS"]
+    assert relay.retry_get(rid_sos) is None
+    row = relay.retry_get(rid)
+    assert row["attempts"] == 0
+    assert row["next_try_at"] >= time.time() + 80   # ≈ когда 90 % уйдут ниже 85 %
+
+
+def test_dm_and_broadcast_record_airtime(relay_with_db, monkeypatch):
+    """/dm на чужую ноду и /broadcast идут мимо send_dm_to_pocket, но эфир
+    тоже занимают — учитываются."""
+    relay = relay_with_db
+    sent = []
+
+    class _Iface:
+        def sendText(self, text, **kw):
+            sent.append((text, kw.get("destinationId")))
+
+    class _Msg:
+        async def reply_text(self, text):
+            pass
+
+    class _Update:
+        effective_user = type("U", (), {"id": 77})()
+        message = _Msg()
+
+    led = airtime.DutyCycleLedger(limit_pct=10)
+    monkeypatch.setattr(relay, "_airtime", led)
+    monkeypatch.setattr(relay, "_mesh_iface", _Iface())
+    monkeypatch.setattr(relay, "OWNER_ID", 77)
+
+    async def run():
+        ctx = type("C", (), {"args": ["!0000beef", "привет"]})()
+        await relay.cmd_dm(_Update(), ctx)
+        ctx = type("C", (), {"args": ["всем", "привет"]})()
+        await relay.cmd_broadcast(_Update(), ctx)
+
+    asyncio.run(run())
+    assert sent == [("привет", "!0000beef"), ("всем привет", None)]
+    expected = (airtime.estimate(len("привет".encode()), relay.LORA_PRESET)
+                + airtime.estimate(len("всем привет".encode()), relay.LORA_PRESET))
+    assert led.used() == pytest.approx(expected)
+
+
+def test_gated_status_reply_does_not_hold_dispatcher(relay_with_db, monkeypatch):
+    """Служебные ответы при закрытом эфире не держат семафор _mesh_workers:
+    обработчики завершаются сразу, пакеты ждут в TX-очереди."""
+    relay = relay_with_db
+    led = airtime.DutyCycleLedger(limit_pct=10, window_s=100)
+    led.record(8, now=0)                  # 80 % — ai/status (70 %) закрыты
+    monkeypatch.setattr(relay, "_airtime", led)
+    monkeypatch.setattr(airtime.time, "monotonic", lambda: 10.0)
+    done = []
+
+    async def reply(tag):
+        await relay.send_dm_to_pocket_async(f"pong {tag}")
+        done.append(tag)
+
+    async def sos():
+        done.append("sos")
+
+    async def run():
+        tx = relay._MeshTxQueue(64, gate=relay._airtime_gate)
+        monkeypatch.setattr(relay, "_mesh_tx", tx)
+        d = relay._KeyedDispatcher(2)
+        for tag in ("a", "b"):
+            await d.submit(("pocket", tag), reply, tag)
+        await d.submit(("sos",), sos)
+        await asyncio.wait_for(d.join(), 1)
+        assert tx.depth()["status"] == 2      # не потеряны — ждут эфира
+        for task in list(relay._detached_sends):
+            task.cancel()
+        await asyncio.sleep(0)
+        tx._executor.shutdown(wait=True)
+
+    asyncio.run(run())
+    assert sorted(done) == ["a", "b", "sos"]
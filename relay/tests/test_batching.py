@@ -0,0 +1,95 @@
+"""
+Тесты _TxBatcher: склейка коротких сообщений в один LoRa-фрейм.
+"""
+import asyncio
+
+
+def _run(relay, texts, *, window_s=0.05, max_bytes=200, fail=None, gap=0.0):
+    """Отправить texts конкурентно через батчер. Возвращает (фреймы, acks, результаты)."""
+    frames = []
+    acks = []
+
+    async def fake_send(text, on_ack, flow=None):
+        if fail:
+            raise fail
+        frames.append(text)
+        if on_ack is not None:
+            on_ack({"decoded": {"routing": {"errorReason": "NONE"}}})
+
+    async def run():
+        b = relay._TxBatcher(window_s, max_bytes, fake_send)
+        tasks = []
+        for i, t in enumerate(texts):
+            tasks.append(asyncio.create_task(
+                b.send(t, on_ack=lambda pkt, i=i: acks.append(i))
+            ))
+            if gap:
+                await asyncio.sleep(gap)
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(run())
+    return frames, acks, results
+
+
+def test_burst_coalesced_into_one_frame(relay_module):
+    frames, acks, _ = _run(relay_module, ["[@1 a] hi", "[@2 b] yo", "[@3 c] ok"])
+    assert frames == ["[@1 a] hi\n[@2 b] yo\n[@3 c] ok"]
+    assert sorted(acks) == [0, 1, 2]           # ACK раздан каждому
+
+
+def test_overflow_starts_new_frame(relay_module):
+    a, b, c = "x" * 60, "y" * 60, "z" * 60
+    frames, acks, _ = _run(relay_module, [a, b, c], max_bytes=130)
+    assert frames == [a + "\n" + b, c]
+    assert sorted(acks) == [0, 1, 2]
+
+
+def test_window_zero_passthrough(relay_module):
+    frames, _, _ = _run(relay_module, ["one", "two"], window_s=0)
+    assert frames == ["one", "two"]
+
+
+def test_outside_window_separate_frames(relay_module):
+    frames, _, _ = _run(relay_module, ["one", "two"], window_s=0.02, gap=0.06)
+    assert frames == ["one", "two"]
+
+
+def test_failure_reaches_every_sender(relay_module):
+    _, acks, results = _run(relay_module, ["one", "two"],
+                            fail=RuntimeError("Mesh interface not connected"))
+    assert acks == []
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_stats(relay_module):
+    async def fake_send(text, on_ack, flow=None):
+        pass
+
+    async def run():
+        b = relay_module._TxBatcher(0.05, 200, fake_send)
+        await asyncio.gather(b.send("a"), b.send("b"))
+        return b
+
+    b = asyncio.run(run())
+    assert (b.frames, b.messages) == (1, 2)
+
+
+def test_flow_reaches_tx_queue(relay_module):
+    """Сквозная отправка несёт слот отправителя, склеенные фреймы — свой
+    flow на каждую пачку (round-robin полосы user, а не FIFO)."""
+    flows = []
+
+    async def fake_send(text, on_ack, flow=None):
+        flows.append(flow)
+
+    async def run():
+        passthrough = relay_module._TxBatcher(0, 200, fake_send)
+        await passthrough.send("a", flow=3)
+        await passthrough.send("b", flow=5)
+        batched = relay_module._TxBatcher(0.02, 200, fake_send)
+        await asyncio.gather(batched.send("c", flow=3), batched.send("d", flow=5))
+        await batched.send("e", flow=3)
+
+    asyncio.run(run())
+    assert flows[:2] == [3, 5]
+    assert flows[2] != flows[3] and None not in flows[2:]
@@ -13,26 +13,26 @@ class _FakeUser:
 
 def test_chunk_short_text(relay_module):
     """Короткий текст — один чанк, без изменений."""
-    chunks = relay_module._chunk_text("hello world", 100)
+    chunks = relay_module._chunk_text_bytes("hello world", 100)
     assert chunks == ["hello world"]
 
 
 def test_chunk_empty_text(relay_module):
-    chunks = relay_module._chunk_text("", 100)
+    chunks = relay_module._chunk_text_bytes("", 100)
     assert chunks == [""]
 
 
 def test_chunk_exact_fit(relay_module):
-    """Текст ровно в max_chars — один чанк."""
+    """Текст ровно в max_bytes — один чанк."""
     text = "a" * 100
-    chunks = relay_module._chunk_text(text, 100)
+    chunks = relay_module._chunk_text_bytes(text, 100)
     assert chunks == [text]
 
 
 def test_chunk_long_text_no_spaces(relay_module):
-    """Длинный текст без пробелов — режется по символам."""
+    """Длинный текст без пробелов — режется по границе символа."""
     text = "a" * 350
-    chunks = relay_module._chunk_text(text, 100)
+    chunks = relay_module._chunk_text_bytes(text, 100)
     assert len(chunks) == 4
     assert chunks[0] == "a" * 100
     assert chunks[1] == "a" * 100
@@ -43,11 +43,11 @@ def test_chunk_long_text_no_spaces(relay_module):
 def test_chunk_long_text_with_spaces(relay_module):
     """Длинный текст с пробелами — режется по последнему пробелу в окне."""
     text = "слово " * 50  # ≈ 350 символов
-    chunks = relay_module._chunk_text(text, 100)
+    chunks = relay_module._chunk_text_bytes(text, 100)
     assert len(chunks) >= 3
-    # Никакой чанк не превышает max
+    # Никакой чанк не превышает max (кириллица — 2 байта/символ)
     for c in chunks:
-        assert len(c) <= 100
+        assert len(c.encode("utf-8")) <= 100
     # Все слова сохранились (можно склеить с пробелом и сравнить)
     rejoined = " ".join(chunks).replace("  ", " ").strip()
     assert "слово слово слово" in rejoined
@@ -56,7 +56,7 @@ def test_chunk_long_text_with_spaces(relay_module):
 def test_chunk_total_length_preserved(relay_module):
     """Сумма длин чанков ≈ длине оригинала (с поправкой на trim)."""
     text = "Lorem ipsum dolor sit amet, " * 20
-    chunks = relay_module._chunk_text(text, 80)
+    chunks = relay_module._chunk_text_bytes(text, 80)
     total = sum(len(c) for c in chunks)
     # +/- небольшая разница из-за trim'а пробелов
     assert abs(total - len(text.strip())) <= len(chunks) * 2
@@ -118,3 +118,139 @@ def test_format_username_truncated(relay_module):
     # vasyapupki — первые 10 символов
     assert "vasyapupki" in out
     assert "vasyapupkinverylong" not in out
+
+
+# ---------------------- byte-aware packing ----------------------
+
+def test_chunk_bytes_cyrillic_fits_budget(relay_module):
+    """Кириллица — 2 байта/символ: чанки меряются байтами, не символами."""
+    text = "привет " * 40
+    chunks = relay_module._chunk_text_bytes(text, 100)
+    for c in chunks:
+        assert len(c.encode("utf-8")) <= 100
+    assert " ".join(chunks) == text.strip()
+
+
+def test_chunk_bytes_never_splits_grapheme(relay_module):
+    """Эмодзи с модификатором, ZWJ-семья и флаг не рвутся на границе чанка."""
+    family = "\U0001F468\u200d\U0001F469\u200d\U0001F467"
+    thumbs = "\U0001F44D\U0001F3FD"
+    flag = "\U0001F1F7\U0001F1FA"
+    combining = "и\u0306"  # й из двух codepoint'ов
+    text = (family + thumbs + flag + combining) * 12
+    for budget in range(20, 60):
+        chunks = relay_module._chunk_text_bytes(text, budget)
+        assert "".join(chunks) == text
+        for c in chunks:
+            assert len(c.encode("utf-8")) <= budget
+            assert not c.startswith(("\u200d", "\U0001F3FD", "\u0306"))
+            assert not c.endswith("\u200d")
+            # Флаг — пара regional indicator'ов, чётное число в каждом чанке
+            ri = sum(1 for ch in c if "\U0001F1E6" <= ch <= "\U0001F1FF")
+            assert ri % 2 == 0
+
+
+def test_pack_single_packet_when_fits(relay_module):
+    user = _FakeUser(username="vasya")
+    packets = relay_module._pack_lora_payloads(
+        "короткое",
+        lambda part, i, total: relay_module._format_lora_packet(
+            3, user, part, chunk_idx=i, chunks_total=total),
+        200,
+    )
+    assert len(packets) == 1
+    assert packets[0].endswith("] короткое")
+
+
+def test_pack_fills_frames_to_byte_budget(relay_module):
+    """Каждый пакет вместе с заголовком ≤ бюджета, текст не теряется,
+    и пакетов не больше, чем нужно по байтам."""
+    user = _FakeUser(username="vasya")
+    text = "Длинное сообщение на русском языке, много слов подряд. " * 12
+    budget = 200
+
+    def make(part, i, total):
+        return relay_module._format_lora_packet(
+            3, user, part, chunk_idx=i, chunks_total=total)
+
+    packets = relay_module._pack_lora_payloads(text, make, budget)
+    assert len(packets) > 1
+    for i, p in enumerate(packets):
+        assert len(p.encode("utf-8")) <= budget
+        assert f" {i + 1}/{len(packets)}]" in p
+    body = " ".join(p.split("] ", 1)[1] for p in packets)
+    assert body == text.strip()
+    header = len(make("", 0, len(packets)).encode("utf-8"))
+    payload_bytes = len(text.strip().encode("utf-8"))
+    # Не больше чем на один пакет хуже идеальной упаковки (резка по словам)
+    assert len(packets) <= payload_bytes // (budget - header) + 2
+
+
+def test_truncate_packet_respects_bytes(relay_module):
+    msg = relay_module._truncate_packet("ж" * 500)
+    assert len(msg.encode("utf-8")) <= relay_module.MAX_PACKET_BYTES
+    assert msg.endswith("...")
+
+
+# ---------------------- compact headers ----------------------
+
+def test_format_compact_single(relay_module):
+    user = _FakeUser(username="vasya")
+    out = relay_module._format_lora_packet(3, user, "hello", compact=True)
+    assert out == "3>vasya: hello"
+
+
+def test_format_compact_multi_chunk(relay_module):
+    user = _FakeUser(username="vasya")
+    parts = [
+        relay_module._format_lora_packet(
+            3, user, t, entry_tag="work", chunk_idx=i, chunks_total=3, compact=True)
+        for i, t in enumerate(("one", "two", "three"))
+    ]
+    assert parts == ["3a>work:vasya: one", "3b> two", "3C> three"]
+
+
+def test_format_compact_falls_back_beyond_26_chunks(relay_module):
+    user = _FakeUser(username="vasya")
+    out = relay_module._format_lora_packet(
+        3, user, "x", chunk_idx=0, chunks_total=30, compact=True)
+    assert out.startswith("[@3 vasya ") and " 1/30]" in out
+
+
+def test_compact_packs_fewer_frames(relay_module):
+    user = _FakeUser(username="vasya")
+    text = "Проверка компактного заголовка на длинном русском тексте. " * 15
+
+    def pack(compact):
+        return relay_module._pack_lora_payloads(
+            text,
+            lambda part, i, total: relay_module._format_lora_packet(
+                3, user, part, chunk_idx=i, chunks_total=total, compact=compact),
+            120,
+        )
+
+    assert len(pack(True)) < len(pack(False))
+
+
+def test_parse_packet_header_roundtrip(relay_module):
+    user = _FakeUser(username="vasya")
+    parse = relay_module.parse_packet_header
+    for compact in (False, True):
+        packets = [
+            relay_module._format_lora_packet(
+                7, user, t, chunk_idx=i, chunks_total=3, compact=compact)
+            for i, t in enumerate(("раз", "два: с двоеточием", "три"))
+        ]
+        parsed = [parse(p) for p in packets]
+        assert [p["slot_n"] for p in parsed] == [7, 7, 7]
+        assert [p["chunk_idx"] for p in parsed] == [0, 1, 2]
+        assert [p["text"] for p in parsed] == ["раз", "два: с двоеточием", "три"]
+        assert [p["final"] for p in parsed] == [False, False, True]
+        assert parsed[0]["sender"] == "vasya"
+        assert parsed[2]["chunks_total"] == 3
+        assert all(p["compact"] is compact for p in parsed)
+
+    single = parse(relay_module._format_lora_packet(2, user, "hi", compact=False))
+    assert single["chunks_total"] == 1 and single["time"] is not None
+    assert parse("просто текст") is None
+    assert parse("3>без имени") is None
@@ -0,0 +1,101 @@
+"""
+Тесты lora_codec и упаковки со сжатием (_pack_for_pocket).
+"""
+import pytest
+
+import lora_codec
+
+
+LONG_RU = (
+    "Привет! Сегодня вечером будем дома, примерно через два часа. "
+    "Связь в лесу плохая, батарея почти села, поэтому если не отвечу — "
+    "не переживай, всё хорошо. Позвони завтра утром, когда сможешь, "
+    "и напиши как дела. Спасибо что помогаешь, очень выручаешь!"
+)
+
+
+@pytest.mark.parametrize("text", [
+    LONG_RU,
+    "ok, see you tomorrow — I'll be there around 7",
+    "смешанный text с emoji 👍🏽 и 🇷🇺",
+    "",
+])
+def test_roundtrip(text):
+    body = lora_codec.compress_text(text)
+    assert body.startswith(lora_codec.PREFIX)
+    assert body.isascii()
+    assert not any(c.isspace() for c in body)
+    assert lora_codec.decompress_text(body) == text
+
+
+def test_dictionary_helps_on_chat_text():
+    body = lora_codec.compress_text(LONG_RU)
+    assert len(body) < len(LONG_RU.encode("utf-8")) * 0.6
+
+
+def test_is_compressed():
+    assert lora_codec.is_compressed(lora_codec.compress_text("да"))
+    assert not lora_codec.is_compressed("обычный текст")
+
+
+@pytest.mark.parametrize("body", [
+    "обычный текст",
+    "~z9abcdef",                 # незнакомая версия словаря
+    lora_codec.PREFIX + "!!!!",  # битый base85/deflate
+])
+def test_decompress_rejects_garbage(body):
+    with pytest.raises(ValueError):
+        lora_codec.decompress_text(body)
+
+
+class _FakeUser:
+    def __init__(self, username="vasya"):
+        self.username = username
+        self.first_name = None
+        self.id = 1
+
+
+def _packer(relay_module):
+    user = _FakeUser()
+    return lambda part, i, total: relay_module._format_lora_packet(
+        3, user, part, chunk_idx=i, chunks_total=total, compact=False,
+    )
+
+
+def test_pack_off_by_default(relay_module, monkeypatch):
+    monkeypatch.setattr(relay_module, "MESH_COMPRESSION", False)
+    packets = relay_module._pack_for_pocket(LONG_RU * 2, _packer(relay_module))
+    assert not any(lora_codec.MARKER in p for p in packets)
+
+
+def test_pack_compressed_when_fewer_frames(relay_module, monkeypatch):
+    monkeypatch.setattr(relay_module, "MESH_COMPRESSION", True)
+    pack = _packer(relay_module)
+    plain = relay_module._pack_lora_payloads(
+        LONG_RU * 2, pack, relay_module.MAX_PACKET_BYTES,
+    )
+    packets = relay_module._pack_for_pocket(LONG_RU * 2, pack)
+    assert len(packets) < len(plain)
+    assert all(
+        len(p.encode("utf-8")) <= relay_module.MAX_PACKET_BYTES for p in packets
+    )
+    # Pocket-сторона: снять заголовки, склеить тела без разделителя.
+    bodies = [relay_module.parse_packet_header(p)["text"] for p in packets]
+    assert lora_codec.decompress_text("".join(bodies)) == (LONG_RU * 2).strip()
+
+
+def test_pack_single_frame_stays_plain(relay_module, monkeypatch):
+    monkeypatch.setattr(relay_module, "MESH_COMPRESSION", True)
+    packets = relay_module._pack_for_pocket("привет", _packer(relay_module))
+    assert len(packets) == 1
+    assert lora_codec.MARKER not in packets[0]
+
+
+def test_pack_falls_back_when_no_gain(relay_module, monkeypatch):
+    # Случайные символы словарём не сжимаются — base85 только раздувает.
+    import random
+    rnd = random.Random(1)
+    noise = "".join(chr(rnd.randint(0x4E00, 0x9FFF)) for _ in range(120))
+    monkeypatch.setattr(relay_module, "MESH_COMPRESSION", True)
+    packets = relay_module._pack_for_pocket(noise, _packer(relay_module))
+    assert not any(lora_codec.MARKER in p for p in packets)
@@ -0,0 +1,88 @@
+"""
+Тесты group commit (_GroupCommitter / _db_commit / _db_flush): записи видны
+своему соединению сразу, другому — после пачечного commit'а или барьера.
+"""
+import sqlite3
+import time
+
+import pytest
+
+
+@pytest.fixture
+def relay_file_db(relay_module, tmp_path):
+    """relay._db на файловой БД + включённый group commit."""
+    path = tmp_path / "relay.db"
+    orig_db, orig_committer = relay_module._db, relay_module._db_committer
+    db = sqlite3.connect(str(path), check_same_thread=False)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL;")
+    db.executescript(relay_module._DB_SCHEMA)
+    db.commit()
+    relay_module._db = db
+    relay_module._retry_deadlines.clear()
+    committer = relay_module._GroupCommitter(interval_s=0.05, max_ops=5)
+    relay_module._db_committer = committer
+    committer.start()
+    other = sqlite3.connect(str(path))
+    try:
+        yield relay_module, committer, other
+    finally:
+        committer.stop()
+        other.close()
+        db.close()
+        relay_module._db, relay_module._db_committer = orig_db, orig_committer
+
+
+def _count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_read_your_writes_before_commit(relay_file_db):
+    relay, committer, _ = relay_file_db
+    relay.user_upsert(1, "vasya", "Вася")
+    assert relay.user_display(1)          # тот же _db видит сразу
+    assert committer.writes == 1
+
+
+def test_flush_barrier(relay_file_db):
+    relay, committer, other = relay_file_db
+    committer.interval_s = 10               # таймер не успеет
+    relay.messages_log("in", slot_n=1, tg_user_id=1, text="hi")
+    assert _count(other, "messages_recent") == 0
+    relay._db_flush()
+    assert _count(other, "messages_recent") == 1
+
+
+def test_background_commit_after_interval(relay_file_db):
+    relay, committer, other = relay_file_db
+    relay.messages_log("in", slot_n=1, tg_user_id=1, text="hi")
+    deadline = time.time() + 2
+    # commits += 1 идёт после _db.commit(): строка видна чуть раньше счётчика.
+    while (_count(other, "messages_recent") == 0 or committer.commits == 0) \
+            and time.time() < deadline:
+        time.sleep(0.01)
+    assert _count(other, "messages_recent") == 1
+    assert committer.commits >= 1
+
+
+def test_batched_writes_share_commit(relay_file_db):
+    relay, committer, _ = relay_file_db
+    committer.interval_s = 10
+    for i in range(4):
+        relay.messages_log("in", slot_n=1, tg_user_id=1, text=str(i))
+    assert committer.commits == 0
+    relay.messages_log("in", slot_n=1, tg_user_id=1, text="5")   # max_ops=5
+    assert committer.commits == 1
+
+
+def test_durable_write_commits_immediately(relay_file_db):
+    relay, committer, other = relay_file_db
+    committer.interval_s = 10
+    relay.retry_enqueue(1, 2, 3, 4, "payload", int(time.time()) + 60, 60)
+    assert _count(other, "retry_queue") == 1
+
+
+def test_without_committer_commits_each_write(relay_with_db):
+    assert relay_with_db._db_committer is None
+    relay_with_db.user_upsert(1, "vasya", None)
+    assert not relay_with_db._db.in_transaction
@@ -0,0 +1,35 @@
+"""
+Тесты слоя доступа к SQLite: именованные запросы _SQL компилируются
+против схемы, _db_connect применяет PRAGMA'ы, upsert юзера одним запросом.
+"""
+
+
+def test_named_statements_compile(relay_with_db):
+    db = relay_with_db._db
+    for name, sql in relay_with_db._SQL.items():
+        # EXPLAIN компилирует, но не выполняет — схема/опечатки ловятся тут.
+        db.execute("EXPLAIN " + sql, (None,) * sql.count("?")).fetchall()
+
+
+def test_connect_applies_pragmas(relay_module, tmp_path):
+    conn = relay_module._db_connect(tmp_path / "relay.db")
+    try:
+        pragma = lambda name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1        # NORMAL
+        assert pragma("temp_store") == 2         # MEMORY
+        assert pragma("cache_size") == -8192
+        assert pragma("busy_timeout") == 5000
+    finally:
+        conn.close()
+
+
+def test_user_upsert_keeps_known_names(relay_with_db):
+    relay = relay_with_db
+    relay.user_upsert(1, "vasya", "Вася")
+    relay.user_set_banned(1, True)
+    relay.user_upsert(1, None, None)               # апдейт без имён
+    assert relay.user_display(1) == "vasya"
+    assert relay.user_is_banned(1) is True         # флаги upsert не трогает
+    relay.user_upsert(1, "vasya2", None)
+    assert relay.user_display(1) == "vasya2"
@@ -0,0 +1,119 @@
+"""
+Тесты _KeyedDispatcher и _mesh_event_key: параллельность между ключами,
+порядок внутри ключа, лимит одновременных обработчиков.
+"""
+import asyncio
+
+
+def test_order_within_key_parallel_across(relay_module):
+    log = []
+
+    async def handler(key, i, delay):
+        log.append(("start", key, i))
+        await asyncio.sleep(delay)
+        log.append(("end", key, i))
+
+    async def run():
+        d = relay_module._KeyedDispatcher(concurrency=4)
+        await d.submit("ai", handler, "ai", 0, 0.2)      # медленный LLM
+        await d.submit("slot", handler, "slot", 0, 0.01)
+        await d.submit("slot", handler, "slot", 1, 0.01)
+        await d.join()
+
+    asyncio.run(run())
+    # Слот не ждал AI: оба его события закончились раньше AI.
+    assert log.index(("end", "slot", 1)) < log.index(("end", "ai", 0))
+    # Внутри ключа — строго по порядку, без перекрытия.
+    assert log.index(("end", "slot", 0)) < log.index(("start", "slot", 1))
+
+
+def test_concurrency_cap(relay_module):
+    running = 0
+    peak = 0
+
+    async def handler():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    async def run():
+        d = relay_module._KeyedDispatcher(concurrency=2)
+        for k in range(6):
+            await d.submit(k, handler)
+        await d.join()
+        return d
+
+    d = asyncio.run(run())
+    assert peak == 2
+    assert d.pending() == 0
+
+
+def test_handler_error_does_not_block_key(relay_module):
+    done = []
+
+    async def boom():
+        raise RuntimeError("x")
+
+    async def ok():
+        done.append(1)
+
+    async def run():
+        d = relay_module._KeyedDispatcher(concurrency=1)
+        await d.submit("k", boom)
+        await d.submit("k", ok)
+        await d.join()
+
+    asyncio.run(run())
+    assert done == [1]
+
+
+def test_backpressure(relay_module):
+    async def run():
+        d = relay_module._KeyedDispatcher(concurrency=1, max_pending=2)
+        gate = asyncio.Event()
+        await d.submit("a", gate.wait)
+        await d.submit("b", gate.wait)
+        third = asyncio.create_task(d.submit("c", gate.wait))
+        await asyncio.sleep(0.01)
+        assert not third.done()          # ждёт места
+        gate.set()
+        await asyncio.wait_for(third, 1)
+        await d.join()
+
+    asyncio.run(run())
+
+
+def test_event_keys(relay_module):
+    pocket = relay_module.POCKET_NODE_ID
+    key = relay_module._mesh_event_key
+
+    def rx(text):
+        return {"kind": "mesh_rx", "from_id": pocket, "text": text}
+
+    assert key({"kind": "ack", "chat_id": 5}) == ("chat", 5)
+    assert key(rx("@3 привет")) == ("slot", 3)
+    assert key(rx("@3 !ban")) == ("slot", 3)
+    assert key(rx("@ai2 ещё")) == ("ai", 2)
+    assert key(rx("!ping")) == ("pocket",)
+    assert key({"kind": "mesh_rx", "from_id": "!other", "text": "x"}) == ("node", "!other")
+    a, b = rx("@ai вопрос"), rx("@ai вопрос")
+    assert key(a) != key(b)              # новые AI-чаты независимы
+
+
+def test_unbounded_key_skips_semaphore(relay_module):
+    """SOS не ждёт, пока занятые обработчики других ключей отпустят семафор."""
+    done = []
+
+    async def run():
+        d = relay_module._KeyedDispatcher(concurrency=1, unbounded=(("sos",),))
+        gate = asyncio.Event()
+        await d.submit(("pocket",), gate.wait)
+        await d.submit(("sos",), lambda: asyncio.sleep(0, done.append("sos")))
+        await asyncio.sleep(0.05)
+        assert done == ["sos"]
+        gate.set()
+        await d.join()
+
+    asyncio.run(run())
@@ -0,0 +1,69 @@
+"""
+Тесты _MeshEventBridge: thread → asyncio без executor'а, лимит, метрики.
+"""
+import asyncio
+import threading
+
+
+def test_events_from_thread_reach_loop(relay_module):
+    async def run():
+        b = relay_module._MeshEventBridge(maxsize=100)
+        b.bind(asyncio.get_running_loop())
+        t = threading.Thread(
+            target=lambda: [b.put({"kind": "ack", "i": i}) for i in range(5)]
+        )
+        t.start()
+        got = [(await asyncio.wait_for(b.get(), 1))["i"] for _ in range(5)]
+        t.join()
+        return b, got
+
+    b, got = asyncio.run(run())
+    assert got == [0, 1, 2, 3, 4]
+    st = b.stats()
+    assert st["delivered"] == 5 and st["dropped"] == 0
+    assert st["depth"] == 0 and st["max_depth"] >= 1
+
+
+def test_early_events_survive_bind(relay_module):
+    b = relay_module._MeshEventBridge()
+    b.put({"kind": "mesh_rx", "text": "до старта"})
+
+    async def run():
+        b.bind(asyncio.get_running_loop())
+        return await asyncio.wait_for(b.get(), 1)
+
+    assert asyncio.run(run())["text"] == "до старта"
+
+
+def test_bounded_drops_and_counts(relay_module):
+    async def run():
+        b = relay_module._MeshEventBridge(maxsize=2)
+        b.bind(asyncio.get_running_loop())
+        for i in range(4):
+            b.put({"kind": "ack", "i": i})
+        await asyncio.sleep(0.01)   # дать call_soon_threadsafe отработать
+        return b
+
+    b = asyncio.run(run())
+    assert b.depth() == 2
+    assert b.dropped == 2
+
+
+def test_wait_time_measured(relay_module):
+    async def run():
+        b = relay_module._MeshEventBridge()
+        b.bind(asyncio.get_running_loop())
+        b.put({"kind": "ack"})
+        await asyncio.sleep(0.05)
+        await b.get()
+        return b
+
+    b = asyncio.run(run())
+    assert b.wait_max_ms >= 40
+
+
+def test_get_nowait_before_bind(relay_module):
+    b = relay_module._MeshEventBridge()
+    b.put({"kind": "ack"})
+    assert b.get_nowait()["kind"] == "ack"
+    assert b.stats()["delivered"] == 1
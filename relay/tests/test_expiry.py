@@ -0,0 +1,150 @@
+"""
+Тесты event-driven expiry (_expiry_deadlines / _expiry_fire): дедлайн
+ставится при выделении, переносится при продлении TTL, срабатывание
+снимает ровно просроченное.
+"""
+import asyncio
+import time
+
+
+def _due(relay, key):
+    return relay._expiry_deadlines.due_of(key)
+
+
+def _age_slot(relay, n, seconds_ago=100):
+    with relay._db_lock:
+        relay._db.execute("UPDATE slots SET expires_at = ? WHERE slot_n = ?",
+                          (int(time.time()) - seconds_ago, n))
+        relay._db.commit()
+    relay.slot_registry_load()
+
+
+def test_slot_deadline_follows_ttl(relay_with_db):
+    relay = relay_with_db
+    n, _ = relay.slot_allocate_or_reuse(101)
+    expires = relay.slot_list_active()[0]["expires_at"]
+    assert _due(relay, ("slot", n)) == expires + 1
+    relay.slot_mark_replied(n)
+    expires = relay.slot_list_active()[0]["expires_at"]
+    assert _due(relay, ("slot", n)) == expires + 1
+    relay.slot_free(n)
+    assert _due(relay, ("slot", n)) is None
+
+
+def test_fire_expires_slot_and_orphans(relay_with_db):
+    relay = relay_with_db
+    n, _ = relay.slot_allocate_or_reuse(101)
+    relay.retry_enqueue(101, 200, 7, n, "payload", int(time.time()) + 600, 60)
+    _age_slot(relay, n)
+    assert relay._expiry_deadlines.pop_due(time.time()) == [("slot", n)]
+    relay._expiry_fire(("slot", n))
+    assert relay.slot_lookup(n) is None
+    assert relay.slot_list_active() == []
+    with relay._db_lock:
+        left = relay._db.execute("SELECT COUNT(*) FROM retry_queue").fetchone()[0]
+    assert left == 0
+
+
+def test_fire_on_extended_slot_is_noop(relay_with_db):
+    """Ключ сработал, но TTL уже продлён — слот остаётся."""
+    relay = relay_with_db
+    n, _ = relay.slot_allocate_or_reuse(101)
+    relay._expiry_fire(("slot", n))
+    assert relay.slot_lookup(n) == 101
+
+
+def test_ai_touch_reschedules(relay_with_db):
+    relay = relay_with_db
+    slot = relay.ai_alloc_slot()
+    first = _due(relay, ("ai", slot))
+    assert first >= int(time.time()) + relay.AI_TTL_HOURS * 3600
+    with relay._db_lock:
+        relay._db.execute("UPDATE ai_conversations SET last_used_at = 0")
+        relay._db.commit()
+    relay.ai_touch_slot(slot)
+    assert _due(relay, ("ai", slot)) >= first
+    assert relay.ai_expire_slot(slot, relay.AI_TTL_HOURS) is False
+
+
+def test_ai_expire_slot(relay_with_db):
+    relay = relay_with_db
+    slot = relay.ai_alloc_slot()
+    relay.ai_save_message(slot, "user", "q")
+    with relay._db_lock:
+        relay._db.execute("UPDATE ai_conversations SET last_used_at = 0")
+        relay._db.commit()
+    assert relay.ai_expire_slot(slot, 1) is True
+    assert relay.ai_slot_exists(slot) is False
+    assert relay.ai_get_history(slot, 10) == []
+
+
+def test_load_schedule_from_db(relay_with_db):
+    relay = relay_with_db
+    n, _ = relay.slot_allocate_or_reuse(101)
+    slot = relay.ai_alloc_slot()
+    tx_id = relay.tx_create(101, 200, n, ["a"], int(time.time()) + 60)
+    relay._expiry_deadlines.clear()
+    relay._slots.clear()
+
+    relay.expiry_load_schedule()
+    for key in (("slot", n), ("ai", slot), ("tx", tx_id), ("purge",), ("resync",)):
+        assert _due(relay, key) is not None, key
+    assert relay.slot_lookup(n) == 101
+
+
+def test_tx_deadline_cancelled_on_delete(relay_with_db):
+    relay = relay_with_db
+    tx_id = relay.tx_create(101, 200, 1, ["a", "b"], int(time.time()) + 60)
+    assert _due(relay, ("tx", tx_id)) is not None
+    relay.tx_delete(tx_id)
+    assert _due(relay, ("tx", tx_id)) is None
+
+
+def test_worker_wakes_on_schedule(relay_with_db):
+    """Воркер спит до дедлайна; schedule() из другого места будит его."""
+    relay = relay_with_db
+    fired = []
+
+    async def run(monkey_fire):
+        relay._expiry_deadlines.bind(asyncio.get_running_loop())
+        orig = relay._expiry_fire
+        relay._expiry_fire = monkey_fire
+        try:
+            task = asyncio.create_task(relay.expiry_worker(None))
+            await asyncio.sleep(0.05)
+            relay._expiry_deadlines.schedule(("tx", 1), time.time() + 0.05)
+            await asyncio.sleep(0.2)
+            task.cancel()
+        finally:
+            relay._expiry_fire = orig
+
+    asyncio.run(run(fired.append))
+    assert ("tx", 1) in fired
+
+
+def test_worker_reschedules_failed_key(relay_with_db, monkeypatch):
+    """Исключение на одном ключе батча: остальные срабатывают, упавший
+    перепланирован, а не потерян до рестарта."""
+    relay = relay_with_db
+    fired = []
+
+    def flaky(key):
+        fired.append(key)
+        if key == ("ai", 2):
+            raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(relay, "_expiry_fire", flaky)
+
+    async def run():
+        task = asyncio.create_task(relay.expiry_worker(None))
+        await asyncio.sleep(0.05)
+        now = time.time()
+        for key in (("ai", 1), ("ai", 2), ("tx", 3)):    # один батч pop_due
+            relay._expiry_deadlines.schedule(key, now)
+        await asyncio.sleep(0.2)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert fired == [("ai", 1), ("ai", 2), ("tx", 3)]
+    assert _due(relay, ("ai", 2)) > time.time()
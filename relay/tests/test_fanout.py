@@ -0,0 +1,110 @@
+"""
+Тесты _TgFanout (параллельная рассылка в TG с лимитами и RetryAfter) и
+SOS-рассылки через неё.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import Forbidden, RetryAfter
+
+
+class _Bot:
+    def __init__(self, delay=0.0, fail=None):
+        self.delay = delay
+        self.fail = fail or {}          # chat_id → исключение (однократно или всегда)
+        self.calls = []
+        self.in_flight = self.peak = 0
+
+    async def _do(self, kind, chat_id, **kw):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            exc = self.fail.get(chat_id)
+            if isinstance(exc, list):
+                exc = exc.pop(0) if exc else None
+            if exc is not None:
+                raise exc
+            self.calls.append((kind, chat_id, kw))
+        finally:
+            self.in_flight -= 1
+
+    async def send_message(self, chat_id, text, **kw):
+        await self._do("message", chat_id, text=text, **kw)
+
+    async def send_location(self, chat_id, **kw):
+        await self._do("location", chat_id, **kw)
+
+
+def _fanout(relay, **overrides):
+    cls = type("F", (relay._TgFanout,), overrides)
+    return cls()
+
+
+def _calls(bot):
+    return lambda cid: [lambda: bot.send_message(cid, "hi"),
+                        lambda: bot.send_location(cid, latitude=1, longitude=2)]
+
+
+def test_rate_limiter_reserve(relay_module):
+    lim = relay_module._RateLimiter(rate=2, burst=2)
+    assert lim.reserve(now=lim._at) == 0
+    assert lim.reserve(now=lim._at) == 0
+    assert lim.reserve(now=lim._at) == pytest.approx(0.5)
+    assert lim.reserve(now=lim._at) == pytest.approx(1.0)
+
+
+def test_concurrent_and_bounded(relay_module):
+    bot = _Bot(delay=0.05)
+    fan = _fanout(relay_module, CONCURRENCY=5, GLOBAL_RATE=1000.0)
+    t0 = time.monotonic()
+    results = asyncio.run(fan.send(list(range(1, 21)), _calls(bot)))
+    elapsed = time.monotonic() - t0
+    assert [r["chat_id"] for r in results] == list(range(1, 21))
+    assert all(r["ok"] for r in results)
+    assert len(bot.calls) == 40
+    assert elapsed < 0.5                        # последовательно было бы ~2 с
+    assert bot.peak == 10                       # 5 получателей × (текст + гео)
+
+
+def test_global_rate_limit(relay_module):
+    bot = _Bot()
+    fan = _fanout(relay_module, GLOBAL_RATE=20.0)
+    fan._global = relay_module._RateLimiter(20.0, 1)   # без всплеска
+    t0 = time.monotonic()
+    asyncio.run(fan.send(list(range(6)), lambda c: [lambda: bot.send_message(c, "x")]))
+    assert time.monotonic() - t0 >= 0.2         # 6 вызовов при 20/с
+
+
+def test_retry_after_is_per_recipient(relay_module):
+    bot = _Bot(fail={2: [RetryAfter(0)], 3: Forbidden("bot was blocked by the user")})
+    fan = _fanout(relay_module, GLOBAL_RATE=1000.0)
+    results = asyncio.run(fan.send([1, 2, 3], lambda c: [lambda: bot.send_message(c, "x")]))
+    assert [r["ok"] for r in results] == [True, True, False]
+    assert "Forbidden" in results[2]["error"]
+    assert sorted(c for _, c, _ in bot.calls) == [1, 2]
+
+
+def test_sos_fanout_reports_per_recipient(relay_with_db, monkeypatch):
+    relay = relay_with_db
+    bot = _Bot(fail={30: Forbidden("blocked")})
+    pocket = []
+
+    async def fake_pocket(text, *a, **kw):
+        pocket.append(text)
+
+    monkeypatch.setattr(relay, "SOS_ENABLED", True)
+    monkeypatch.setattr(relay, "SOS_RECIPIENTS", [10, 20, 30])
+    monkeypatch.setattr(relay, "SOS_INCLUDE_COORDS", False)
+    monkeypatch.setattr(relay, "OWNER_ID", 1)
+    monkeypatch.setattr(relay, "send_dm_to_pocket_async", fake_pocket)
+    monkeypatch.setattr(relay, "_tg_fanout", relay._TgFanout())
+    relay.user_upsert(30, "vasya", None)
+
+    asyncio.run(relay._handle_sos(SimpleNamespace(bot=bot), "помогите"))
+    assert pocket == ["SOS отправлен 2/3 нет: 30"]
+    owner = [kw["text"] for kind, c, kw in bot.calls if c == 1]
+    assert len(owner) == 1
+    assert "Доставлено: 2/3" in owner[0] and "vasya (30): Forbidden: blocked" in owner[0]
@@ -0,0 +1,139 @@
+"""
+Тесты GUI-стороны db.py: пул read-only соединений переживает тики и
+переоткрывается, если relay.db подменили; поиск / страницы пользователей.
+"""
+import os
+import sqlite3
+import time
+
+import pytest
+
+
+@pytest.fixture
+def gui_db(relay_module, tmp_path, monkeypatch):
+    import db
+    path = tmp_path / "relay.db"
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.executescript(relay_module._DB_SCHEMA)
+    relay_module._users_fts_init(conn)
+    conn.commit()
+    monkeypatch.setattr(db, "DB_PATH", path)
+    monkeypatch.setattr(db, "_pool", db._ReadPool())
+    try:
+        yield db, conn
+    finally:
+        db._pool.close()
+        conn.close()
+
+
+def _add_slot(conn, n, uid):
+    now = int(time.time())
+    conn.execute(
+        "INSERT INTO slots (slot_n, tg_user_id, created_at, expires_at, was_replied) "
+        "VALUES (?, ?, ?, ?, 0)", (n, uid, now, now + 3600),
+    )
+    conn.commit()
+
+
+def test_connections_reused_across_ticks(gui_db):
+    db, conn = gui_db
+    _add_slot(conn, 1, 101)
+    for _ in range(5):
+        assert db.active_slots_count() == 1
+        assert len(db.list_active_slots()) == 1
+        db.gps_summary()
+    assert db._pool.opened == 1
+
+
+def test_sees_new_writes(gui_db):
+    db, conn = gui_db
+    assert db.active_slots_count() == 0
+    _add_slot(conn, 1, 101)
+    assert db.active_slots_count() == 1
+
+
+def test_reconnects_when_file_replaced(gui_db, tmp_path):
+    db, conn = gui_db
+    _add_slot(conn, 1, 101)
+    assert db.active_slots_count() == 1
+
+    other = tmp_path / "restored.db"
+    c2 = sqlite3.connect(other)
+    c2.executescript("CREATE TABLE slots (slot_n INTEGER, tg_user_id INTEGER, "
+                     "created_at INTEGER, expires_at INTEGER);")
+    c2.close()
+    conn.close()
+    os.replace(other, db.DB_PATH)
+    # Восстановление из бэкапа кладёт БД без чужого WAL.
+    for suffix in ("-wal", "-shm"):
+        stale = db.DB_PATH.with_name(db.DB_PATH.name + suffix)
+        if stale.exists():
+            stale.unlink()
+
+    assert db.active_slots_count() == 0
+    assert db._pool.opened == 2
+    # Старая схема без last_message / was_replied — list_active_slots не падает.
+    assert db.list_active_slots() == []
+
+
+def test_failed_connection_not_pooled(gui_db):
+    db, _ = gui_db
+    with pytest.raises(sqlite3.Error):
+        with db._pool.connection() as c:
+            c.execute("SELECT * FROM no_such_table")
+    assert db._pool._idle == []
+
+
+def _add_user(conn, uid, username, first_name, last_seen, **flags):
+    conn.execute(
+        "INSERT INTO users (tg_user_id, tg_username, first_name, banned, "
+        "whitelisted, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (uid, username, first_name, flags.get("banned", 0),
+         flags.get("whitelisted", 0), last_seen, last_seen),
+    )
+    conn.commit()
+
+
+def test_user_search_fts_and_fallback(gui_db):
+    db, conn = gui_db
+    _add_user(conn, 111, "vasya_p", "Вася", 10)
+    _add_user(conn, 222, "petr", "Пётр Васильев", 20)
+    _add_user(conn, 333, None, "Anna", 30)
+
+    def ids(q, flt="all"):
+        return [u["tg_user_id"] for u in db.list_users_page(flt, q)]
+
+    assert ids("") == [333, 222, 111]                # свежие сверху
+    assert ids("ВАСИ") == [222]                      # FTS, регистр кириллицы
+    assert ids("@vasya") == [111]
+    assert ids("ва") == [222, 111]                   # короче 3 — скан с casefold
+    assert ids("22") == [222]                        # по ID
+    assert db.count_users("all", "вас") == 2
+
+
+def test_user_fts_follows_renames(gui_db):
+    db, conn = gui_db
+    _add_user(conn, 1, "old_nick", None, 10)
+    conn.execute("UPDATE users SET tg_username = 'new_nick' WHERE tg_user_id = 1")
+    conn.commit()
+    assert db.list_users_page("all", "old_n") == []
+    assert [u["tg_user_id"] for u in db.list_users_page("all", "new_n")] == [1]
+    conn.execute("DELETE FROM users WHERE tg_user_id = 1")
+    conn.commit()
+    assert db.count_users("all", "new_n") == 0
+
+
+def test_user_pages_keyset_and_filters(gui_db):
+    db, conn = gui_db
+    for uid in range(1, 8):
+        _add_user(conn, uid, f"u{uid}", None, 100 if uid < 4 else uid,
+                  banned=uid % 2)
+    first = db.list_users_page("all", "", limit=3)
+    last = first[-1]
+    rest = db.list_users_page("all", "", limit=10,
+                              after=(last["last_seen"], last["tg_user_id"]))
+    got = [u["tg_user_id"] for u in first + rest]
+    assert got == [3, 2, 1, 7, 6, 5, 4]              # last_seen DESC, ID DESC
+    assert db.count_users("ban") == 4
+    assert db.count_users() == 7
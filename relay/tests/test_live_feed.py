@@ -0,0 +1,125 @@
+"""
+Тесты _LiveFeed: снимок при подключении, события из другого потока,
+slot / slot_free из slot-хелперов, медленный подписчик теряет старое.
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+
+async def _open(feed):
+    reader, writer = await asyncio.open_connection("127.0.0.1", feed.port)
+    return reader, writer
+
+
+async def _read(reader, n=1):
+    return [json.loads(await asyncio.wait_for(reader.readline(), 1)) for _ in range(n)]
+
+
+def _with_feed(relay, body, *, snapshot=None, queue_limit=512):
+    async def run():
+        feed = relay._LiveFeed(0, queue_limit=queue_limit)
+        if snapshot is not None:
+            feed.snapshot = snapshot
+        await feed.start()
+        try:
+            return await body(feed)
+        finally:
+            await feed.stop()
+    return asyncio.run(run())
+
+
+def test_snapshot_then_events(relay_module):
+    async def body(feed):
+        reader, writer = await _open(feed)
+        first = await _read(reader)
+        feed.publish("ack", slot_n=3, delivered=True)
+        second = await _read(reader)
+        writer.close()
+        return first + second
+
+    got = _with_feed(relay_module, body,
+                     snapshot=lambda: [("hello", {"version": 1})])
+    assert [e["kind"] for e in got] == ["hello", "ack"]
+    assert got[1]["slot_n"] == 3 and "ts" in got[1]
+
+
+def test_publish_without_subscribers_is_noop(relay_module):
+    async def body(feed):
+        feed.publish("rx", from_id="!x")
+        return feed.published
+
+    assert _with_feed(relay_module, body) == 0
+
+
+def test_publish_from_thread(relay_module):
+    async def body(feed):
+        reader, writer = await _open(feed)
+        await asyncio.sleep(0.05)          # дать _serve зарегистрировать клиента
+        t = threading.Thread(target=lambda: feed.publish("rx", from_id="!pocket"))
+        t.start()
+        t.join()
+        evt = (await _read(reader))[0]
+        writer.close()
+        return evt
+
+    assert _with_feed(relay_module, body)["from_id"] == "!pocket"
+
+
+def test_slow_subscriber_drops_oldest(relay_module):
+    async def body(feed):
+        reader, writer = await _open(feed)
+        await asyncio.sleep(0.05)
+        q = next(iter(feed._clients))
+        # Синхронно, без await — сокет не успевает разгрести очередь.
+        for i in range(10):
+            feed._fanout(feed.encode("tx", i=i))
+        assert q.qsize() <= 2
+        writer.close()
+        return feed.dropped
+
+    assert _with_feed(relay_module, body, queue_limit=2) >= 7
+
+
+def test_slot_events(relay_with_db, monkeypatch):
+    relay = relay_with_db
+
+    async def body(feed):
+        monkeypatch.setattr(relay, "_live_feed", feed)
+        reader, writer = await _open(feed)
+        await asyncio.sleep(0.05)
+        relay.user_upsert(101, "vasya", None)
+        n, _ = relay.slot_allocate_or_reuse(101)
+        relay.slot_mark_replied(n)
+        relay.slot_free(n)
+        evts = await _read(reader, 3)
+        writer.close()
+        return n, evts
+
+    n, evts = _with_feed(relay, body)
+    assert [e["kind"] for e in evts] == ["slot", "slot", "slot_free"]
+    assert evts[0]["slot"]["tg_username"] == "vasya"
+    assert evts[1]["slot"]["was_replied"] == 1
+    assert evts[2]["slot_n"] == n
+
+
+def test_snapshot_contents(relay_with_db, monkeypatch):
+    relay = relay_with_db
+    monkeypatch.setattr(relay, "_mesh_tx", relay._MeshTxQueue())
+    relay.slot_allocate_or_reuse(101)
+    kinds = dict(relay._live_feed_snapshot())
+    assert kinds["hello"]["version"] == 1
+    assert [s["slot_n"] for s in kinds["slots"]["slots"]] == [1]
+    assert kinds["stats"]["slots"] == 1
+    assert set(kinds["stats"]["tx_queue"]) >= {"sos", "user"}
+
+
+def test_client_decode_line():
+    pytest.importorskip("PyQt6.QtNetwork")
+    import feed_client
+    assert feed_client.decode_line(b'{"kind":"ack","slot_n":1}\n') == {"kind": "ack", "slot_n": 1}
+    assert feed_client.decode_line(b"") is None
+    assert feed_client.decode_line(b"not json") is None
+    assert feed_client.decode_line(b"[1,2]") is None
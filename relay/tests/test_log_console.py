@@ -0,0 +1,99 @@
+"""
+Тесты LogConsole: пачечный flush, кольцо фиксированной ёмкости, пауза.
+"""
+import os
+
+import pytest
+
+pytest.importorskip("PyQt6")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def console(qapp):
+    from widgets import LogConsole
+    c = LogConsole()
+    c._model.capacity = 10
+    yield c
+    c.deleteLater()
+
+
+def _texts(c):
+    return [c._model.data(c._model.index(r)) for r in range(c.line_count())]
+
+
+def test_classify():
+    from theme import PALETTE
+    from widgets import classify_log_line
+    ts, body, color = classify_log_line("12:00:01 [tg] ERROR boom", "99:99:99")
+    assert ts == "12:00:01" and body == " [tg] ERROR boom"
+    assert color == PALETTE["log_tg"]            # [tag] важнее уровня
+    assert classify_log_line("WARNING x", "10:00:00") == (
+        "10:00:00", "  WARNING x", PALETTE["log_warn"])
+    assert classify_log_line("   ", "10:00:00")[:2] == ("", "")
+
+
+def test_append_is_deferred_until_flush(console):
+    console.append_raw("a\nb\n")
+    assert console.line_count() == 0           # вставка — только по таймеру
+    console._flush()
+    texts = _texts(console)
+    assert len(texts) == 2
+    assert texts[0].endswith("  a") and texts[1].endswith("  b")
+
+
+def test_ring_keeps_last_lines(console):
+    for i in range(25):
+        console.append_raw(f"line {i}\n")
+        if i % 7 == 0:
+            console._flush()
+    console._flush()
+    assert console.line_count() == 10
+    assert _texts(console)[-1].endswith("line 24")
+    assert _texts(console)[0].endswith("line 15")
+
+
+def test_pause_stops_rendering(console):
+    console.append_raw("before\n")
+    console._flush()
+    console.set_paused(True)
+    console.append_raw("during\n")
+    console._flush()
+    assert console.line_count() == 1
+    console.set_paused(False)
+    assert _texts(console)[-1].endswith("during")
+
+
+def test_clear(console):
+    console.append_raw("x\n")
+    console._flush()
+    console.append_raw("pending\n")
+    console.clear_log()
+    console._flush()
+    assert console.line_count() == 0
+
+
+def test_long_line_stays_reachable(qapp, console):
+    """Короткая первая строка не задаёт ширину: длинная (traceback, JSON)
+    прокручивается по горизонтали и целиком видна в подсказке."""
+    from PyQt6.QtCore import Qt
+    console.resize(300, 200)
+    console.show()
+    console.append_raw("short\n")
+    console._flush()
+    long_line = "{" + ", ".join(f'"k{i}": {i}' for i in range(100)) + "}"
+    console.append_raw(long_line + "\n")
+    console._flush()
+    qapp.processEvents()
+    assert console.horizontalScrollBar().maximum() > 0
+    row = console._model.index(1)
+    assert console.visualRect(row).width() >= console._delegate.line_width("", long_line)
+    assert console._model.data(row, Qt.ItemDataRole.ToolTipRole).endswith(long_line)
+    console.clear_log()
+    assert console._delegate.row_width == 0
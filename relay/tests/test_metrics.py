@@ -0,0 +1,110 @@
+"""
+Тесты metrics.py (реестр, формат Prometheus, /metrics) и точек съёма
+в relay.py (очередь TX, ACK RTT, !ping).
+"""
+import asyncio
+import time
+
+import pytest
+
+import metrics
+
+
+def test_render_prometheus_text():
+    reg = metrics.Registry()
+    c = reg.counter("x_total", "Things.", ("kind",))
+    c.inc(kind="a")
+    c.inc(2, kind='b"q')
+    reg.gauge("depth", "Depth.", fn=lambda: 7)
+    reg.gauge("lanes", "Per lane.", ("lane",), fn=lambda: {"sos": 1, "user": 0})
+    h = reg.histogram("lat_seconds", "Latency.", buckets=(0.1, 1.0))
+    h.observe(0.05)
+    h.observe(0.5)
+    h.observe(3)
+    text = reg.render()
+    assert "# TYPE x_total counter" in text
+    assert 'x_total{kind="a"} 1' in text
+    assert 'x_total{kind="b\\"q"} 2' in text
+    assert "depth 7" in text and 'lanes{lane="sos"} 1' in text
+    assert 'lat_seconds_bucket{le="0.1"} 1' in text
+    assert 'lat_seconds_bucket{le="1"} 2' in text
+    assert 'lat_seconds_bucket{le="+Inf"} 3' in text
+    assert "lat_seconds_count 3" in text and "lat_seconds_sum 3.55" in text
+
+
+def test_labels_checked_and_failing_gauge_skipped():
+    reg = metrics.Registry()
+    c = reg.counter("y_total", "Y.", ("kind",))
+    with pytest.raises(ValueError):
+        c.inc(lane="x")
+    reg.gauge("broken", "Broken.", fn=lambda: 1 / 0)
+    assert "# TYPE broken gauge" in reg.render()
+
+
+def test_histogram_quantile():
+    h = metrics.Histogram("h", "H.", buckets=(1.0, 2.0, 4.0))
+    assert h.quantile(0.5) is None
+    for v in (0.5, 1.5, 1.5, 3.0):
+        h.observe(v)
+    assert 1.0 <= h.quantile(0.5) <= 2.0
+    assert h.quantile(1.0) <= 4.0
+
+
+def test_http_endpoint():
+    reg = metrics.Registry()
+    reg.counter("hits_total", "Hits.").inc()
+
+    async def run():
+        server = await metrics.serve(reg, 0)
+        port = server.sockets[0].getsockname()[1]
+        out = []
+        for path in ("/metrics", "/nope"):
+            r, w = await asyncio.open_connection("127.0.0.1", port)
+            w.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+            await w.drain()
+            out.append((await r.read()).decode())
+            w.close()
+        server.close()
+        await server.wait_closed()
+        return out
+
+    ok, missing = asyncio.run(run())
+    assert ok.startswith("HTTP/1.0 200") and "text/plain; version=0.0.4" in ok
+    assert "hits_total 1" in ok
+    assert missing.startswith("HTTP/1.0 404")
+
+
+def test_tx_queue_counts_packets_and_errors(relay_module):
+    m = relay_module
+    sent0 = m._m_packets.value(direction="tx", kind="user")
+    err0 = m._m_tx_errors.value(lane="ai")
+
+    def boom():
+        raise RuntimeError("Mesh interface not connected")
+
+    async def run():
+        q = m._MeshTxQueue()
+        await q.submit(lambda: None, lane="user")
+        with pytest.raises(RuntimeError):
+            await q.submit(boom, lane="ai")
+        q._executor.shutdown(wait=True)
+
+    asyncio.run(run())
+    assert m._m_packets.value(direction="tx", kind="user") == sent0 + 1
+    assert m._m_tx_errors.value(lane="ai") == err0 + 1
+
+
+def test_ack_rtt_observed(relay_module, monkeypatch):
+    m = relay_module
+    monkeypatch.setattr(m, "_pacing", m._PacingController())
+    n0, nak0 = m._m_ack_rtt.count(), m._m_acks.value(result="nak")
+    cb = m._paced_ack_cb(lambda pkt: None, sent_at=time.monotonic() - 1.5)
+    cb({"decoded": {"routing": {"errorReason": "MAX_RETRANSMIT"}}})
+    assert m._m_ack_rtt.count() == n0 + 1
+    assert m._m_acks.value(result="nak") == nak0 + 1
+
+
+def test_ping_includes_summary(relay_with_db):
+    msg = relay_with_db._reply_ping_payload()
+    assert " tx=" in msg and " rx=" in msg and " re=" in msg
+    assert "relay_slots_active 0" in relay_with_db._metrics.render()
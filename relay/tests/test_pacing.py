@@ -0,0 +1,71 @@
+"""
+Тесты _PacingController: адаптивная пауза между LoRa-пакетами.
+"""
+
+
+def _ctl(relay, **kw):
+    return relay._PacingController(**kw)
+
+
+def test_initial_gap_until_first_ack(relay_module):
+    ctl = _ctl(relay_module, initial_gap=0.4)
+    assert ctl.gap() == 0.4
+    ctl.observe(None, delivered=False)   # NAK без ACK'ов RTT не даёт
+    assert ctl.gap() == 0.4
+
+
+def test_clear_link_converges_to_min_gap(relay_module):
+    ctl = _ctl(relay_module, min_gap=0.15)
+    for _ in range(60):
+        ctl.observe(0.9, delivered=True)
+    assert ctl.gap() == 0.15
+    st = ctl.snapshot()
+    assert abs(st["srtt"] - 0.9) < 1e-6
+    assert st["window"] == ctl.max_window
+
+
+def test_congested_link_backs_off(relay_module):
+    ctl = _ctl(relay_module, max_gap=5.0)
+    for _ in range(10):
+        ctl.observe(1.0, delivered=True)
+    fast = ctl.gap()
+    for _ in range(5):
+        ctl.observe(8.0, delivered=True)
+        ctl.observe(None, delivered=False)
+    slow = ctl.gap()
+    assert slow > fast
+    assert ctl.snapshot()["window"] < 2
+    assert slow <= 5.0
+
+
+def test_nak_halves_window(relay_module):
+    ctl = _ctl(relay_module)
+    for _ in range(20):
+        ctl.observe(1.0, delivered=True)
+    w = ctl.snapshot()["window"]
+    ctl.observe(None, delivered=False)
+    assert ctl.snapshot()["window"] == max(1.0, w / 2)
+
+
+def test_describe(relay_module):
+    ctl = _ctl(relay_module)
+    assert "rtt=?" in ctl.describe()
+    ctl.observe(1.5, delivered=True)
+    ctl.observe(None, delivered=False)
+    d = ctl.describe()
+    assert "rtt=1.5s" in d and "nak=1/2" in d
+
+
+def test_paced_ack_cb_observes_and_forwards(relay_module, monkeypatch):
+    ctl = _ctl(relay_module)
+    monkeypatch.setattr(relay_module, "_pacing", ctl)
+    seen = []
+    cb = relay_module._paced_ack_cb(seen.append, relay_module.time.monotonic())
+    pkt = {"decoded": {"routing": {"errorReason": "NONE"}}}
+    cb(pkt)
+    assert seen == [pkt]
+    assert ctl.snapshot()["acks"] == 1
+
+
+def test_ping_shows_pacing(relay_with_db):
+    assert "gap=" in relay_with_db._reply_ping_payload()
@@ -106,3 +106,28 @@ def test_parse_empty(relay_module):
     r = relay_module.parse_mesh_text("")
     assert r["kind"] == "raw"
     assert r["text"] == ""
+
+
+def test_parse_compact_slot_token_reply(relay_module, monkeypatch):
+    """Компактный токен «3> текст» (COMPACT_HEADERS) — тот же slot_reply."""
+    monkeypatch.setattr(relay_module, "COMPACT_HEADERS", True)
+    r = relay_module.parse_mesh_text("3> привет")
+    assert r == {"kind": "slot_reply", "n": 3, "text": "привет"}
+    r = relay_module.parse_mesh_text("12>ок")
+    assert r == {"kind": "slot_reply", "n": 12, "text": "ок"}
+
+
+def test_parse_compact_slot_token_cmd(relay_module, monkeypatch):
+    monkeypatch.setattr(relay_module, "COMPACT_HEADERS", True)
+    r = relay_module.parse_mesh_text("3> !ban")
+    assert r["kind"] == "slot_cmd"
+    assert r["n"] == 3
+    assert r["cmd"] == "ban"
+
+
+def test_parse_compact_slot_token_off_is_raw(relay_module, monkeypatch):
+    """Без COMPACT_HEADERS «5> …» — обычный текст, а не ответ в слот 5."""
+    monkeypatch.setattr(relay_module, "COMPACT_HEADERS", False)
+    r = relay_module.parse_mesh_text("5> привет")
+    assert r == {"kind": "raw", "text": "5> привет"}
+    assert relay_module.parse_mesh_text("@5 привет")["kind"] == "slot_reply"
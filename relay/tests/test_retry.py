@@ -92,3 +92,110 @@ def test_delete_for_slot(relay_with_db):
 def test_sos_backoff_constant_present(relay_module):
     """v0.6: _RETRY_SOS_BACKOFF_SEC = (5, 15, 30, 60, 120)."""
     assert relay_module._RETRY_SOS_BACKOFF_SEC == (5, 15, 30, 60, 120)
+
+
+# ── _retry_deadlines: in-memory расписание retry_worker'а ────────────────────
+
+
+def test_enqueue_schedules_wakeup(relay_with_db):
+    rid = _enqueue(relay_with_db, initial_delay_s=60)
+    row = relay_with_db.retry_get(rid)
+    assert relay_with_db._retry_deadlines.due_of(rid) == row["next_try_at"]
+
+
+def test_wakeup_at_deadline_when_next_try_is_later(relay_with_db):
+    """next_try_at за дедлайном → будим сразу после deadline (чтобы сдаться)."""
+    rid = _enqueue(relay_with_db, initial_delay_s=600, deadline_offset=60)
+    row = relay_with_db.retry_get(rid)
+    assert relay_with_db._retry_deadlines.due_of(rid) == row["deadline"] + 1
+
+
+def test_reschedule_moves_wakeup(relay_with_db):
+    rid = _enqueue(relay_with_db, initial_delay_s=0)
+    new_at = int(time.time()) + 300
+    relay_with_db.retry_reschedule(rid, new_at)
+    sched = relay_with_db._retry_deadlines
+    assert sched.due_of(rid) == new_at
+    # Старая запись (due=now) больше не считается «пора»
+    assert sched.pop_due(time.time()) == []
+    assert sched.pop_due(new_at) == [rid]
+
+
+def test_delete_cancels_wakeup(relay_with_db):
+    rid_a = _enqueue(relay_with_db, slot_n=5, initial_delay_s=0)
+    _enqueue(relay_with_db, slot_n=6, initial_delay_s=0)
+    relay_with_db.retry_delete(rid_a)
+    relay_with_db.retry_delete_for_slot(6)
+    sched = relay_with_db._retry_deadlines
+    assert len(sched) == 0
+    assert sched.next_due() is None
+    assert sched.pop_due(time.time() + 10) == []
+
+
+def test_pop_due_orders_by_deadline(relay_with_db):
+    rid_late = _enqueue(relay_with_db, payload="late", initial_delay_s=30)
+    rid_sos = _enqueue(relay_with_db, payload="sos", initial_delay_s=5, is_sos=True)
+    sched = relay_with_db._retry_deadlines
+    assert sched.next_due() == relay_with_db.retry_get(rid_sos)["next_try_at"]
+    assert sched.pop_due(time.time() + 60) == [rid_sos, rid_late]
+
+
+def test_load_schedule_rebuilds_from_table(relay_with_db):
+    """Рестарт: heap пустой, строки в БД — retry_load_schedule их поднимает."""
+    rid_a = _enqueue(relay_with_db, payload="A", initial_delay_s=10)
+    rid_b = _enqueue(relay_with_db, payload="B", initial_delay_s=20)
+    relay_with_db._retry_deadlines.clear()
+
+    assert relay_with_db.retry_load_schedule() == 2
+    sched = relay_with_db._retry_deadlines
+    assert sched.due_of(rid_a) == relay_with_db.retry_get(rid_a)["next_try_at"]
+    assert sched.due_of(rid_b) == relay_with_db.retry_get(rid_b)["next_try_at"]
+
+
+def test_deadline_queue_wait_wakes_on_schedule(relay_module):
+    """wait() без дедлайнов спит, пока schedule() его не разбудит."""
+    import asyncio
+
+    async def scenario():
+        q = relay_module._DeadlineQueue()
+        q.bind(asyncio.get_running_loop())
+        waiter = asyncio.create_task(q.wait())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        q.schedule("k", time.time() + 3600)
+        await asyncio.wait_for(waiter, 1.0)
+
+    asyncio.run(scenario())
+
+
+def test_worker_reschedules_failed_row_and_finishes_batch(relay_with_db, monkeypatch):
+    """Исключение на одной строке батча не теряет ни её, ни остальные."""
+    import asyncio
+
+    relay = relay_with_db
+    rid_a = _enqueue(relay, payload="A", initial_delay_s=0)
+    rid_b = _enqueue(relay, payload="B", initial_delay_s=0)
+    rid_c = _enqueue(relay, payload="C", initial_delay_s=0)
+    seen = []
+
+    async def flaky(app, row):
+        seen.append(row["id"])
+        if row["id"] == rid_b:
+            raise RuntimeError("database is locked")
+        relay.retry_delete(row["id"])
+
+    monkeypatch.setattr(relay, "_retry_process_row", flaky)
+
+    async def scenario():
+        worker = asyncio.create_task(relay.retry_worker(None))
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(seen) >= 3:
+                break
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert seen == [rid_a, rid_b, rid_c]
+    assert relay.retry_get(rid_b) is not None
+    assert relay._retry_deadlines.due_of(rid_b) > time.time()
@@ -0,0 +1,65 @@
+"""
+Тесты _RxDedup и отсева дублей в on_mesh_receive до _mesh_queue.
+"""
+import pytest
+
+
+def _pkt(relay, text, pid, sender=None):
+    return {
+        "id": pid, "fromId": sender or relay.POCKET_NODE_ID, "from": 0xBEEF,
+        "decoded": {"portnum": "TEXT_MESSAGE_APP", "text": text},
+    }
+
+
+def test_same_id_is_duplicate_until_ttl(relay_module):
+    d = relay_module._RxDedup(ttl_s=60)
+    pkt = {"id": 7, "fromId": "!a"}
+    assert not d.is_duplicate(pkt, "hi", now=0)
+    assert d.is_duplicate(pkt, "hi", now=30)
+    assert d.is_duplicate(pkt, "другой текст", now=59)      # id решает
+    assert not d.is_duplicate(pkt, "hi", now=61)            # повтор не продлил
+
+
+def test_sender_is_part_of_key(relay_module):
+    d = relay_module._RxDedup()
+    assert not d.is_duplicate({"id": 7, "fromId": "!a"}, "x", now=0)
+    assert not d.is_duplicate({"id": 7, "fromId": "!b"}, "x", now=0)
+
+
+def test_text_window(relay_module):
+    d = relay_module._RxDedup(text_ttl_s=30)
+    assert not d.is_duplicate({"id": 1, "fromId": "!a"}, "@3 да", now=0)
+    assert d.is_duplicate({"id": 2, "fromId": "!a"}, "@3 да", now=10)
+    assert not d.is_duplicate({"id": 3, "fromId": "!a"}, "@3 нет", now=10)
+    assert not d.is_duplicate({"id": 4, "fromId": "!a"}, "@3 да", now=31)
+    # Без окна по тексту новый id — новое сообщение.
+    plain = relay_module._RxDedup()
+    assert not plain.is_duplicate({"id": 1, "fromId": "!a"}, "@3 да", now=0)
+    assert not plain.is_duplicate({"id": 2, "fromId": "!a"}, "@3 да", now=1)
+
+
+def test_bounded_lru(relay_module):
+    d = relay_module._RxDedup(max_size=3, ttl_s=600)
+    for pid in range(1, 5):
+        assert not d.is_duplicate({"id": pid, "fromId": "!a"}, "x", now=pid)
+    assert len(d) == 3
+    assert not d.is_duplicate({"id": 1, "fromId": "!a"}, "x", now=5)   # вытеснен
+    assert d.is_duplicate({"id": 4, "fromId": "!a"}, "x", now=5)
+
+
+def test_packet_without_id_passes(relay_module):
+    d = relay_module._RxDedup()
+    assert not d.is_duplicate({"fromId": "!a"}, "x", now=0)
+    assert not d.is_duplicate({"fromId": "!a"}, "x", now=0)
+
+
+def test_on_mesh_receive_drops_retransmit(relay_with_db, monkeypatch):
+    relay = relay_with_db
+    queued = []
+    monkeypatch.setattr(relay._mesh_queue, "put", queued.append)
+    before = relay._m_rx_duplicates.value()
+    relay.on_mesh_receive(_pkt(relay, "@1 привет", 1001), None)
+    relay.on_mesh_receive(_pkt(relay, "@1 привет", 1001), None)   # повтор прошивки
+    relay.on_mesh_receive(_pkt(relay, "@1 привет", 1002), None)   # новое сообщение
+    assert [e["text"] for e in queued] == ["@1 привет", "@1 привет"]
+    assert relay._m_rx_duplicates.value() == before + 1
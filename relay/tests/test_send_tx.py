@@ -0,0 +1,151 @@
+"""
+Тесты многопакетной отправки send_tx: ACK по частям, retry только
+недошедших частей, статус «доставлено N/M».
+"""
+import asyncio
+import time
+
+
+class _FakeBot:
+    def __init__(self):
+        self.edits = []
+        self.sent = []
+
+    async def edit_message_text(self, chat_id, message_id, text, **kw):
+        self.edits.append((chat_id, message_id, text))
+
+    async def send_message(self, chat_id, text, **kw):
+        self.sent.append((chat_id, text))
+
+
+class _FakeApp:
+    def __init__(self):
+        self.bot = _FakeBot()
+
+
+def _tx(relay, n_chunks=3, *, deadline_offset=3600, status_msg_id=77):
+    payloads = [f"part {i}" for i in range(n_chunks)]
+    tx_id = relay.tx_create(
+        101, 200, 5, payloads, int(time.time()) + deadline_offset,
+    )
+    if status_msg_id:
+        relay.tx_set_status_msg(tx_id, status_msg_id)
+    return tx_id
+
+
+def _ack(relay, app, tx_id, idx, delivered=True):
+    evt = {"kind": "ack", "delivered": delivered, "error": None if delivered else "MAX_RETRANSMIT",
+           "slot_n": 5, "chat_id": 200, "tx_id": tx_id, "chunk_idx": idx}
+    asyncio.run(relay._handle_ack_event(app, evt))
+
+
+def test_create_and_counts(relay_with_db):
+    tx_id = _tx(relay_with_db)
+    tx = relay_with_db.tx_get(tx_id)
+    assert tx["chunks_total"] == 3
+    assert tx["acked"] == 0 and tx["failed"] == 0
+    assert relay_with_db.tx_chunk_get(tx_id, 2)["payload"] == "part 2"
+
+
+def test_acked_is_final(relay_with_db):
+    tx_id = _tx(relay_with_db)
+    assert relay_with_db.tx_chunk_set_state(tx_id, 0, "acked")
+    # Поздний «sent» от send-цикла не откатывает ACK.
+    assert not relay_with_db.tx_chunk_set_state(tx_id, 0, "sent")
+    assert relay_with_db.tx_chunk_get(tx_id, 0)["state"] == "acked"
+
+
+def test_ack_progress_and_completion(relay_with_db):
+    app = _FakeApp()
+    tx_id = _tx(relay_with_db)
+    _ack(relay_with_db, app, tx_id, 0)
+    assert app.bot.edits[-1][2].endswith("доставлено 1/3.")
+    _ack(relay_with_db, app, tx_id, 0)          # дубль ACK — без лишнего edit
+    assert len(app.bot.edits) == 1
+    _ack(relay_with_db, app, tx_id, 1)
+    _ack(relay_with_db, app, tx_id, 2)
+    assert "3/3" in app.bot.edits[-1][2]
+    assert relay_with_db.tx_get(tx_id) is None   # доставленная tx удалена
+
+
+def test_nak_queues_only_that_chunk(relay_with_db):
+    app = _FakeApp()
+    tx_id = _tx(relay_with_db)
+    _ack(relay_with_db, app, tx_id, 0)
+    _ack(relay_with_db, app, tx_id, 1, delivered=False)
+
+    rows = relay_with_db.tx_retry_rows(tx_id)
+    assert [(r["chunk_idx"], r["payload"]) for r in rows] == [(1, "part 1")]
+    assert rows[0]["status_msg_id"] == 77
+    assert "Недошедшие части (1)" in app.bot.edits[-1][2]
+
+    # Повторный NAK не плодит строки.
+    _ack(relay_with_db, app, tx_id, 1, delivered=False)
+    assert len(relay_with_db.tx_retry_rows(tx_id)) == 1
+
+    # ACK после ретрая снимает строку из retry_queue.
+    _ack(relay_with_db, app, tx_id, 1)
+    assert relay_with_db.tx_retry_rows(tx_id) == []
+    assert relay_with_db.tx_get(tx_id)["acked"] == 2
+
+
+def test_nak_backoff_grows_per_chunk(relay_with_db):
+    tx_id = _tx(relay_with_db)
+    rid = relay_with_db.tx_chunk_queue_retry(tx_id, 0)
+    first = relay_with_db.retry_get(rid)["next_try_at"]
+    relay_with_db.tx_chunk_drop_retry(tx_id, 0)
+    rid = relay_with_db.tx_chunk_queue_retry(tx_id, 0)
+    second = relay_with_db.retry_get(rid)["next_try_at"]
+    assert second - first >= relay_with_db.retry_delay_s(0, False)
+
+
+def test_retry_worker_resends_single_chunk(relay_with_db, monkeypatch):
+    sent = []
+
+    async def fake_send(text, on_ack=None, **kw):
+        sent.append(text)
+
+    monkeypatch.setattr(relay_with_db, "send_dm_to_pocket_async", fake_send)
+    app = _FakeApp()
+    tx_id = _tx(relay_with_db)
+    rid = relay_with_db.tx_chunk_queue_retry(tx_id, 1)
+    row = relay_with_db.retry_get(rid)
+    row["next_try_at"] = 0
+    asyncio.run(relay_with_db._retry_process_row(app, row))
+
+    assert sent == ["part 1"]
+    assert relay_with_db.retry_get(rid) is None
+    assert relay_with_db.tx_chunk_get(tx_id, 1)["state"] == "sent"
+    # Статус правит ACK, а не retry_worker.
+    assert app.bot.edits == []
+
+
+def test_expired_chunk_drops_whole_tx(relay_with_db):
+    app = _FakeApp()
+    tx_id = _tx(relay_with_db, deadline_offset=-10)
+    relay_with_db.tx_chunk_set_state(tx_id, 0, "acked")
+    r1 = relay_with_db.tx_chunk_queue_retry(tx_id, 1)
+    r2 = relay_with_db.tx_chunk_queue_retry(tx_id, 2)
+    asyncio.run(relay_with_db._retry_process_row(app, relay_with_db.retry_get(r1)))
+
+    assert "1/3" in app.bot.edits[-1][2]
+    assert relay_with_db.tx_get(tx_id) is None
+    assert relay_with_db.retry_get(r2) is None
+
+
+def test_delete_for_slot_and_expire(relay_with_db):
+    alive = _tx(relay_with_db)
+    dead = _tx(relay_with_db, deadline_offset=-10)
+    assert relay_with_db.tx_expire_old() == [dead]
+    relay_with_db.tx_chunk_queue_retry(alive, 0)
+    relay_with_db.tx_delete_for_slot(5)
+    assert relay_with_db.tx_get(alive) is None
+    assert relay_with_db.tx_retry_rows(alive) == []
+
+
+def test_make_ack_cb_carries_tx(relay_module):
+    cb = relay_module._make_ack_cb(5, 200, tx_id=9, chunk_idx=2)
+    cb({"decoded": {"routing": {"errorReason": "NONE"}}})
+    evt = relay_module._mesh_queue.get_nowait()
+    assert evt["delivered"] is True
+    assert (evt["tx_id"], evt["chunk_idx"], evt["slot_n"]) == (9, 2, 5)
@@ -59,6 +59,7 @@ def test_lookup_expired(relay_with_db):
             (int(time.time()) - 100,),
         )
         relay_with_db._db.commit()
+    relay_with_db.slot_registry_load()   # правка мимо реестра
     assert relay_with_db.slot_lookup(1) is None
 
 
@@ -95,6 +96,7 @@ def test_expire_old_removes_only_expired(relay_with_db):
             (int(time.time()) - 100,),
         )
         relay_with_db._db.commit()
+    relay_with_db.slot_registry_load()
 
     freed = relay_with_db.slot_expire_old()
     assert freed == [1]
@@ -108,3 +110,71 @@ def test_free_all_for_user(relay_with_db):
     relay_with_db.slot_free_all_for_user(101)
     rows = relay_with_db.slot_list_active()
     assert rows == []
+
+
+# ---------- in-memory реестр (_slots) ----------
+def _db_slots(relay):
+    with relay._db_lock:
+        cur = relay._db.execute(
+            "SELECT slot_n, tg_user_id, was_replied, last_message FROM slots "
+            "ORDER BY slot_n"
+        )
+        return [tuple(r) for r in cur.fetchall()]
+
+
+def test_registry_write_through(relay_with_db):
+    """Каждая операция попадает в таблицу slots."""
+    relay_with_db.slot_allocate_or_reuse(101)
+    relay_with_db.slot_allocate_or_reuse(102)
+    relay_with_db.slot_set_last_message(2, "hi")
+    relay_with_db.slot_mark_replied(2)
+    relay_with_db.slot_free(1)
+    assert _db_slots(relay_with_db) == [(2, 102, 1, "hi")]
+
+
+def test_registry_reload_matches(relay_with_db):
+    """После перезагрузки из БД — то же состояние и тот же lowest-free."""
+    for uid in (101, 102, 103):
+        relay_with_db.slot_allocate_or_reuse(uid)
+    relay_with_db.slot_free(2)
+    relay_with_db.slot_registry_load()
+    assert relay_with_db.slot_lookup(3) == 103
+    assert relay_with_db.slot_allocate_or_reuse(103) == (3, True)
+    assert relay_with_db.slot_allocate_or_reuse(104) == (2, False)
+    assert relay_with_db.slot_allocate_or_reuse(105) == (4, False)
+
+
+def test_row_deleted_outside_registry(relay_with_db):
+    """GUI удалил строку напрямую — sticky-reuse не оживляет призрак."""
+    relay_with_db.slot_allocate_or_reuse(101)
+    with relay_with_db._db_lock:
+        relay_with_db._db.execute("DELETE FROM slots")
+        relay_with_db._db.commit()
+    n, reused = relay_with_db.slot_allocate_or_reuse(101)
+    assert reused is False
+    assert _db_slots(relay_with_db) == [(n, 101, 0, None)]
+
+
+def test_expired_slot_number_not_reused_until_freed(relay_with_db):
+    """Просроченный, но ещё не удалённый слот держит номер, как и раньше."""
+    relay_with_db.slot_allocate_or_reuse(101)
+    with relay_with_db._db_lock:
+        relay_with_db._db.execute(
+            "UPDATE slots SET expires_at = ? WHERE slot_n = 1",
+            (int(time.time()) - 100,),
+        )
+        relay_with_db._db.commit()
+    relay_with_db.slot_registry_load()
+    assert relay_with_db.slot_allocate_or_reuse(101) == (2, False)
+    assert relay_with_db.slot_expire_old() == [1]
+    assert relay_with_db.slot_lookup(2) == 101
+    assert relay_with_db.slot_allocate_or_reuse(102) == (1, False)
+
+
+def test_list_active_joins_users(relay_with_db):
+    relay_with_db.user_upsert(101, "vasya", "Вася")
+    relay_with_db.slot_allocate_or_reuse(101)
+    relay_with_db.slot_allocate_or_reuse(202)      # без записи в users
+    rows = relay_with_db.slot_list_active()
+    assert [(r["slot_n"], r["tg_username"]) for r in rows] == [(1, "vasya"), (2, None)]
+    assert relay_with_db.slot_count_active() == 2
@@ -0,0 +1,75 @@
+"""
+Тесты table_models: row_diff даёт из старого списка новый, модель
+применяет разницу вставками/удалениями, а не сбросом.
+"""
+import random
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+
+def _apply(old, ops):
+    rows = list(old)
+    for op, i, arg in ops:
+        if op == "change":
+            rows[i] = arg
+        elif op == "remove":
+            del rows[i:arg]
+        else:
+            rows[i:i] = arg
+    return rows
+
+
+def _rows(*keys, v=0):
+    return [{"k": k, "v": v} for k in keys]
+
+
+def test_row_diff_roundtrip():
+    import table_models
+    rnd = random.Random(7)
+    for _ in range(200):
+        old = [{"k": k, "v": rnd.randint(0, 2)}
+               for k in rnd.sample(range(30), rnd.randint(0, 15))]
+        new = [{"k": k, "v": rnd.randint(0, 2)}
+               for k in rnd.sample(range(30), rnd.randint(0, 15))]
+        assert _apply(old, table_models.row_diff(old, new, "k")) == new
+
+
+def test_row_diff_minimal_ops():
+    import table_models
+    old = _rows(1, 2, 3, 4)
+    assert table_models.row_diff(old, old, "k") == []
+    new = _rows(1, 2, 3, 4)
+    new[2] = {"k": 3, "v": 9}
+    assert table_models.row_diff(old, new, "k") == [("change", 2, {"k": 3, "v": 9})]
+    ops = table_models.row_diff(old, _rows(5, 1, 2, 3, 4), "k")
+    assert ops == [("insert", 0, _rows(5))]
+
+
+def test_model_applies_incremental_changes(monkeypatch):
+    import db
+    import table_models
+    data = {"rows": [dict(u, tg_user_id=u["k"], last_seen=0) for u in _rows(3, 2, 1)]}
+    monkeypatch.setattr(db, "list_users_page",
+                        lambda flt, q, limit, after=None: list(data["rows"][:limit]))
+    monkeypatch.setattr(db, "count_users", lambda flt="all", q="": len(data["rows"]))
+
+    m = table_models.UsersModel()
+    m.set_query("all", "")
+    events = []
+    m.modelReset.connect(lambda: events.append("reset"))
+    m.rowsInserted.connect(lambda _p, a, b: events.append(("ins", a, b)))
+    m.rowsRemoved.connect(lambda _p, a, b: events.append(("rm", a, b)))
+    m.dataChanged.connect(lambda a, b: events.append(("chg", a.row())))
+
+    data["rows"] = [dict(r) for r in data["rows"]]
+    data["rows"].insert(0, dict(tg_user_id=4, k=4, v=0, last_seen=1))
+    data["rows"][2]["v"] = 5                       # строка tg_user_id=2
+    del data["rows"][3]                            # tg_user_id=1 ушёл
+    m.refresh()
+
+    # С конца списка: индексы начала ещё не сдвинуты вставкой сверху.
+    assert events == [("rm", 2, 2), ("chg", 1), ("ins", 0, 0)]
+    assert [m.row(i)["tg_user_id"] for i in range(m.rowCount())] == [4, 3, 2]
+    assert m.matched == m.total == 3
@@ -0,0 +1,71 @@
+"""
+Тесты трассировки задержки (_Tracer → traces) и отчёта trace_report.py.
+"""
+import json
+import time
+
+import trace_report
+
+
+def _traces(relay):
+    rows = relay._db.execute("SELECT kind, status, stages FROM traces ORDER BY id").fetchall()
+    return [(r["kind"], r["status"], json.loads(r["stages"])) for r in rows]
+
+
+def test_trace_lifecycle_writes_row(relay_with_db):
+    relay = relay_with_db
+    tid = relay._tracer.start("tg", time.monotonic() - 0.2)
+    relay._tracer.mark(tid, "slot")
+    relay._tracer.mark(tid, "sent")
+    assert _traces(relay) == []              # пока открыта — в БД ничего
+    relay._tracer.finish(tid, "nak")
+    [(kind, status, stages)] = _traces(relay)
+    assert (kind, status) == ("tg", "nak")
+    assert list(stages) == ["received", "slot", "sent"]
+    assert stages["received"] == 0 and stages["slot"] >= 200
+    relay._tracer.finish(tid, "ok")          # повторный finish — no-op
+    relay._tracer.mark(None, "slot")
+    assert len(_traces(relay)) == 1 and len(relay._tracer) == 0
+
+
+def test_stale_traces_flushed_as_timeout(relay_with_db, monkeypatch):
+    relay = relay_with_db
+    monkeypatch.setattr(relay._tracer, "MAX_AGE_S", 60)
+    old = relay._tracer.start("tg", time.monotonic() - 120)
+    fresh = relay._tracer.start("pocket")
+    assert [t[:2] for t in _traces(relay)] == [("tg", "timeout")]
+    relay._tracer.finish(old, "ok")          # уже выгружена
+    relay._tracer.finish(fresh)
+    assert [t[:2] for t in _traces(relay)] == [("tg", "timeout"), ("pocket", "ok")]
+
+
+def test_ack_callback_marks_and_forwards_trace(relay_with_db, monkeypatch):
+    relay = relay_with_db
+    events = []
+    monkeypatch.setattr(relay._mesh_queue, "put", events.append)
+    tid = relay._tracer.start("tg")
+    relay._make_ack_cb(3, 42, trace_id=tid)({"decoded": {"routing": {"errorReason": "NONE"}}})
+    assert events[0]["trace_id"] == tid
+    relay._tracer.finish(tid)
+    assert "ack" in _traces(relay)[0][2]
+
+
+def test_purge_old_traces(relay_with_db):
+    relay = relay_with_db
+    relay.trace_store("tg", relay._now() - 40 * 86400, "ok", {"received": 0})
+    relay.trace_store("tg", relay._now(), "ok", {"received": 0})
+    assert relay.traces_purge_old(30) == 1
+    assert len(_traces(relay)) == 1
+
+
+def test_report_percentiles_and_render():
+    assert trace_report.percentile([10, 20, 30, 40], 0.5) == 25
+    assert trace_report.percentile([5], 0.99) == 5
+    rows = [("tg", "ok", json.dumps({"received": 0, "sent": ms, "ack": ms * 10}))
+            for ms in range(1, 101)]
+    rows.append(("tg", "timeout", json.dumps({"received": 0, "sent": 3})))
+    summary = trace_report.summarize(rows)
+    assert summary["tg"]["count"] == 101
+    out = trace_report.render(summary)
+    assert "ok=100 timeout=1" in out
+    assert out.index("sent") < out.index("ack")
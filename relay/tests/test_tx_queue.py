@@ -0,0 +1,118 @@
+"""
+Тесты _MeshTxQueue: приоритет полос, round-robin внутри полосы, лимит,
+проброс исключений.
+"""
+import asyncio
+import threading
+
+import pytest
+
+
+def _scenario(relay, jobs, *, lane_limit=64):
+    """Первый job держит воркер (ждёт gate), остальные встают в очередь.
+    Возвращает порядок выполнения меток."""
+    order = []
+    gate = threading.Event()
+
+    async def run():
+        q = relay._MeshTxQueue(lane_limit)
+
+        def blocker():
+            gate.wait(2)
+            order.append("blocker")
+
+        first = asyncio.create_task(q.submit(blocker, lane="status"))
+        await asyncio.sleep(0.05)   # воркер взял blocker и висит в потоке
+        tasks = [
+            asyncio.create_task(q.submit(order.append, tag, lane=lane, flow=flow))
+            for tag, lane, flow in jobs
+        ]
+        await asyncio.sleep(0.05)
+        gate.set()
+        await asyncio.gather(first, *tasks)
+        q._executor.shutdown(wait=True)
+
+    asyncio.run(run())
+    return order[1:]
+
+
+def test_lanes_by_priority(relay_module):
+    order = _scenario(relay_module, [
+        ("status", "status", None),
+        ("ai", "ai", 1),
+        ("retry", "retry", 2),
+        ("user", "user", 3),
+        ("sos", "sos", None),
+    ])
+    assert order == ["sos", "user", "retry", "ai", "status"]
+
+
+def test_round_robin_within_lane(relay_module):
+    order = _scenario(relay_module, [
+        ("a1", "ai", "A"), ("a2", "ai", "A"), ("a3", "ai", "A"),
+        ("b1", "ai", "B"),
+        ("c1", "ai", "C"),
+    ])
+    assert order == ["a1", "b1", "c1", "a2", "a3"]
+
+
+def test_fifo_within_flow(relay_module):
+    order = _scenario(relay_module, [(f"m{i}", "user", 7) for i in range(5)])
+    assert order == [f"m{i}" for i in range(5)]
+
+
+def test_lane_limit(relay_module):
+    async def run():
+        q = relay_module._MeshTxQueue(lane_limit=1)
+        gate = threading.Event()
+        first = asyncio.create_task(q.submit(gate.wait, 2, lane="ai"))
+        await asyncio.sleep(0.05)          # ушёл в поток, полоса снова пуста
+        queued = asyncio.create_task(q.submit(lambda: None, lane="ai"))
+        await asyncio.sleep(0)
+        assert q.depth()["ai"] == 1
+        with pytest.raises(relay_module.MeshTxQueueFull):
+            await q.submit(lambda: None, lane="ai")
+        gate.set()
+        await asyncio.gather(first, queued)
+        assert q.sent["ai"] == 2
+        q._executor.shutdown(wait=True)
+
+    asyncio.run(run())
+
+
+def test_exception_propagates(relay_module):
+    async def run():
+        q = relay_module._MeshTxQueue()
+
+        def boom():
+            raise RuntimeError("Mesh interface not connected")
+
+        with pytest.raises(RuntimeError, match="not connected"):
+            await q.submit(boom, lane="user")
+        # Воркер жив после ошибки.
+        assert await q.submit(lambda: 42, lane="user") == 42
+        q._executor.shutdown(wait=True)
+
+    asyncio.run(run())
+
+
+def test_unknown_lane(relay_module):
+    async def run():
+        with pytest.raises(ValueError):
+            await relay_module._MeshTxQueue().submit(lambda: None, lane="bulk")
+
+    asyncio.run(run())
+
+
+def test_send_dm_async_goes_through_queue(relay_module, monkeypatch):
+    calls = []
+
+    def fake_send(text, on_ack=None):
+        calls.append((text, threading.current_thread().name))
+
+    monkeypatch.setattr(relay_module, "send_dm_to_pocket", fake_send)
+    monkeypatch.setattr(relay_module, "_mesh_tx", relay_module._MeshTxQueue())
+    asyncio.run(relay_module.send_dm_to_pocket_async("hi", lane="sos"))
+    assert calls[0][0] == "hi"
+    assert calls[0][1].startswith("mesh-tx")
+    assert relay_module._mesh_tx.sent["sos"] == 1
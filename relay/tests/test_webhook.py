@@ -0,0 +1,91 @@
+"""
+Тесты режима webhook: валидация настроек, выбор режима с откатом на polling
+и инжектор фейковых апдейтов webhook_inject.py.
+"""
+import http.client
+import http.server
+import json
+import threading
+
+import pytest
+from telegram import Bot, Update
+
+import settings
+import webhook_inject
+
+
+def _webhook_settings(**over):
+    data = dict(settings.DEFAULTS, bot_token="123456:" + "A" * 30, owner_id=1,
+                pocket_node_id="!deadbeef", tg_mode="webhook",
+                webhook_url="https://relay.example.com/tg/abc", webhook_secret="s3cr_et-1")
+    data.update(over)
+    return data
+
+
+def test_validate_webhook_settings():
+    assert settings.validate(_webhook_settings()) == []
+    assert any("WEBHOOK_URL" in e for e in settings.validate(_webhook_settings(webhook_url="http://x/tg")))
+    assert any("WEBHOOK_PORT" in e for e in settings.validate(_webhook_settings(webhook_port=70000)))
+    assert any("WEBHOOK_SECRET" in e for e in settings.validate(_webhook_settings(webhook_secret="a b")))
+    assert any("TG_MODE" in e for e in settings.validate(_webhook_settings(tg_mode="push")))
+    # В polling URL не нужен.
+    assert settings.validate(_webhook_settings(tg_mode="polling", webhook_url="")) == []
+
+
+@pytest.mark.parametrize("mode,url,tornado,expected", [
+    ("polling", "https://h/tg", True, "polling"),
+    ("webhook", "https://h/tg", True, "webhook"),
+    ("webhook", "http://h/tg", True, "polling"),      # Telegram шлёт только на https
+    ("webhook", "https://h/tg", False, "polling"),    # нет extra [webhooks]
+])
+def test_effective_mode_falls_back_to_polling(relay_module, monkeypatch, mode, url, tornado, expected):
+    monkeypatch.setattr(relay_module, "TG_MODE", mode)
+    monkeypatch.setattr(relay_module, "WEBHOOK_URL", url)
+    find_spec = relay_module.importlib.util.find_spec
+    monkeypatch.setattr(relay_module.importlib.util, "find_spec",
+                        lambda name: (object() if tornado else None) if name == "tornado" else find_spec(name))
+    assert relay_module._effective_tg_mode() == expected
+
+
+def test_build_update_parses_as_ptb_update():
+    bot = Bot("123456:" + "A" * 30)
+    upd = Update.de_json(webhook_inject.build_update(42, "/start arg", username="vasya"), bot)
+    assert upd.effective_user.id == 42 and upd.effective_user.username == "vasya"
+    assert upd.effective_chat.type == "private"
+    assert upd.message.text == "/start arg"
+    assert upd.message.entities[0].type == "bot_command" and upd.message.entities[0].length == 6
+    plain = webhook_inject.build_update(42, "привет")
+    assert "entities" not in plain["message"]
+    assert plain["update_id"] != webhook_inject.build_update(42, "привет")["update_id"]
+
+
+def test_post_update_sends_secret_header():
+    seen = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            seen.append((self.path, self.headers.get(webhook_inject.SECRET_HEADER), json.loads(body)))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    srv = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", srv.server_port, timeout=5)
+    try:
+        for text in ("раз", "два"):       # оба по одному keep-alive соединению
+            status, ms = webhook_inject.post_update(
+                conn, "/tg/abc", webhook_inject.build_update(7, text), "tok")
+            assert status == 200 and ms >= 0
+    finally:
+        conn.close()
+        srv.shutdown()
+        srv.server_close()
+    assert [(p, s, u["message"]["text"]) for p, s, u in seen] == [
+        ("/tg/abc", "tok", "раз"), ("/tg/abc", "tok", "два")]
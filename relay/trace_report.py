@@ -0,0 +1,112 @@
+"""
+Отчёт по трассам задержки из relay.db (таблица traces, пишет _Tracer).
+
+Для каждого направления — p50 / p95 / p99 по каждому этапу (мс от приёма
+сообщения) и разбивка по статусам: где именно копится задержка — в SQLite,
+в TX-очереди, в эфире или на стороне Telegram.
+
+Запуск из relay/ (БД открывается только на чтение, relay может работать):
+    python trace_report.py
+    python trace_report.py --hours 6 --kind tg
+    python trace_report.py --db /path/to/relay.db
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import paths
+
+# Порядок этапов в отчёте; неизвестные (если появятся) — в конце по алфавиту.
+STAGES = {
+    "tg":     ("received", "slot", "db", "queued", "sent", "ack", "status"),
+    "pocket": ("received", "parsed", "slot", "tg_sent", "db", "owner"),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Квантиль с линейной интерполяцией между соседними (как numpy)."""
+    if not values:
+        raise ValueError("empty")
+    xs = sorted(values)
+    pos = (len(xs) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
+
+
+def load(conn: sqlite3.Connection, since: float, kind: str | None) -> list[tuple]:
+    sql = "SELECT kind, status, stages FROM traces WHERE started_at >= ?"
+    args: list = [since]
+    if kind:
+        sql += " AND kind = ?"
+        args.append(kind)
+    return conn.execute(sql, args).fetchall()
+
+
+def summarize(rows: list[tuple]) -> dict:
+    """kind → {"count", "status": Counter, "stages": {этап: [мс, ...]}}."""
+    out: dict = {}
+    for kind, status, stages_json in rows:
+        s = out.setdefault(kind, {"count": 0, "status": Counter(), "stages": {}})
+        s["count"] += 1
+        s["status"][status] += 1
+        try:
+            stages = json.loads(stages_json)
+        except ValueError:
+            continue
+        for stage, ms in stages.items():
+            s["stages"].setdefault(stage, []).append(ms)
+    return out
+
+
+def render(summary: dict) -> str:
+    lines: list[str] = []
+    for kind in sorted(summary):
+        s = summary[kind]
+        statuses = " ".join(f"{k}={v}" for k, v in s["status"].most_common())
+        lines.append(f"{kind}: {s['count']} traces ({statuses})")
+        lines.append(f"  {'stage':<10} {'n':>6} " + " ".join(f"{f'p{int(q * 100)}':>8}" for q in QUANTILES))
+        known = STAGES.get(kind, ())
+        order = [st for st in known if st in s["stages"]]
+        order += sorted(set(s["stages"]) - set(known))
+        for stage in order:
+            vals = s["stages"][stage]
+            qs = " ".join(f"{percentile(vals, q):>8.0f}" for q in QUANTILES)
+            lines.append(f"  {stage:<10} {len(vals):>6} {qs}")
+        lines.append("")
+    return "\n".join(lines) if lines else "нет трасс за период\n"
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    ap.add_argument("--db", type=Path, default=paths.APP_DATA_DIR / "relay.db")
+    ap.add_argument("--hours", type=float, default=24, help="окно, часов назад")
+    ap.add_argument("--kind", choices=sorted(STAGES), help="только одно направление")
+    args = ap.parse_args(argv)
+
+    if not args.db.exists():
+        print(f"нет БД: {args.db}", file=sys.stderr)
+        return 1
+    conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True, timeout=2.0)
+    try:
+        rows = load(conn, time.time() - args.hours * 3600, args.kind)
+    except sqlite3.OperationalError as e:
+        print(f"нет таблицы traces ({e}) — relay ещё не запускался с трассировкой",
+              file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+    print(f"{args.db}  последние {args.hours:g} ч, мс от приёма сообщения\n")
+    print(render(summarize(rows)), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Инжектор фейковых апдейтов в локальный webhook-listener relay (TG_MODE=webhook).
+
+Шлёт POST с Update JSON прямо на 127.0.0.1:WEBHOOK_PORT — мимо Telegram и
+Caddy, с тем же заголовком X-Telegram-Bot-Api-Secret-Token. Так проверяется
+путь webhook → handlers → mesh без реального бота, а время ответа listener'а
+(он отвечает 200, как только апдейт в очереди PTB) — нижняя граница задержки
+входящих. Полный путь до эфира — в trace_report.py --kind tg.
+
+Запуск из relay/ (порт, путь и secret по умолчанию берутся из .env):
+    python webhook_inject.py --text "привет"
+    python webhook_inject.py --count 50 --interval 0.1 --user 123456
+    python webhook_inject.py --text /start
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import itertools
+import json
+import sys
+import time
+from urllib.parse import urlparse
+
+import settings
+import trace_report
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+_ids = itertools.count(int(time.time()) % 1_000_000 * 1000)
+
+
+def build_update(user_id: int, text: str, name: str = "Тест",
+                 username: str | None = None) -> dict:
+    """Минимальный Update с личным сообщением от `user_id`. Текст с «/» в
+    начале размечается как bot_command — иначе CommandHandler его не видит."""
+    uid = next(_ids)
+    user = {"id": user_id, "is_bot": False, "first_name": name}
+    if username:
+        user["username"] = username
+    message = {
+        "message_id": uid,
+        "date": int(time.time()),
+        "chat": {"id": user_id, "type": "private", "first_name": name},
+        "from": user,
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0,
+                                "length": len(text.split()[0])}]
+    return {"update_id": uid, "message": message}
+
+
+def post_update(conn: http.client.HTTPConnection, path: str, update: dict,
+                secret: str = "") -> tuple[int, float]:
+    """POST одного апдейта по keep-alive соединению → (HTTP-статус, мс)."""
+    body = json.dumps(update, ensure_ascii=False).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        headers[SECRET_HEADER] = secret
+    t0 = time.perf_counter()
+    conn.request("POST", path, body, headers)
+    resp = conn.getresponse()
+    resp.read()
+    return resp.status, (time.perf_counter() - t0) * 1000
+
+
+def main(argv: list[str] | None = None) -> int:
+    s = settings.load()
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    ap.add_argument("--port", type=int, default=int(s.get("webhook_port") or 8443))
+    ap.add_argument("--path", default=urlparse(str(s.get("webhook_url") or "")).path or "/",
+                    help="путь listener'а (по умолчанию — из WEBHOOK_URL)")
+    ap.add_argument("--secret", default=str(s.get("webhook_secret") or ""))
+    ap.add_argument("--user", type=int, default=1_000_001, help="Telegram user id отправителя")
+    ap.add_argument("--name", default="Тест")
+    ap.add_argument("--username", default="webhook_test")
+    ap.add_argument("--text", default="тест {i}", help="{i} — номер апдейта")
+    ap.add_argument("--count", type=int, default=1)
+    ap.add_argument("--interval", type=float, default=0.0, help="пауза между POST, сек")
+    args = ap.parse_args(argv)
+
+    path = "/" + args.path.lstrip("/")
+    conn = http.client.HTTPConnection("127.0.0.1", args.port, timeout=10)
+    rtts: list[float] = []
+    bad: dict[int, int] = {}
+    try:
+        for i in range(1, args.count + 1):
+            update = build_update(args.user, args.text.format(i=i),
+                                  args.name, args.username or None)
+            try:
+                status, ms = post_update(conn, path, update, args.secret)
+            except OSError as e:
+                print(f"127.0.0.1:{args.port}{path}: {e} — relay запущен с TG_MODE=webhook?",
+                      file=sys.stderr)
+                return 1
+            if status == 200:
+                rtts.append(ms)
+            else:
+                bad[status] = bad.get(status, 0) + 1
+            if args.interval:
+                time.sleep(args.interval)
+    finally:
+        conn.close()
+
+    print(f"127.0.0.1:{args.port}{path}: {len(rtts)}/{args.count} приняты")
+    for status, n in sorted(bad.items()):
+        hint = " (secret token не совпал)" if status == 403 else ""
+        print(f"  HTTP {status}: {n}{hint}")
+    if rtts:
+        qs = "  ".join(f"p{int(q * 100)}={trace_report.percentile(rtts, q):.1f}"
+                       for q in trace_report.QUANTILES)
+        print(f"  ответ listener'а, мс: {qs}")
+    return 0 if not bad else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,11 +6,14 @@ GlowDot, StatusCell, NodePanel, ToolBtn, LogConsole.
 from __future__ import annotations
 
 import re
+from collections import deque
 from datetime import datetime
 from typing import Optional
 
 from PyQt6.QtCore import (
+    QAbstractListModel,
     QByteArray,
+    QModelIndex,
     QPoint,
     QPropertyAnimation,
     QRect,
@@ -26,24 +29,27 @@ from PyQt6.QtGui import (
     QColor,
     QFont,
     QFontMetrics,
+    QKeySequence,
     QLinearGradient,
     QPainter,
     QPainterPath,
     QPalette,
     QPen,
     QPixmap,
-    QTextCharFormat,
-    QTextCursor,
 )
 from PyQt6.QtSvg import QSvgRenderer
 from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QApplication,
     QFrame,
     QGraphicsDropShadowEffect,
     QHBoxLayout,
     QLabel,
+    QListView,
     QPushButton,
     QSizePolicy,
-    QTextEdit,
+    QStyle,
+    QStyledItemDelegate,
     QToolButton,
     QVBoxLayout,
     QWidget,
@@ -363,6 +369,10 @@ class NodePanel(QFrame):
         self._dot.setLive(running)
         self._render_pic(model_id)
 
+    def set_slots(self, slots: int) -> None:
+        """Точечное обновление KPI «слоты» (live feed без полного update_state)."""
+        self._stats["slots"].setText(str(slots))
+
 
 # ---------------------------------------------------------------------------
 # LogConsole — colored log view
@@ -398,74 +408,204 @@ _TAG_TINTS = {
 }
 
 
-class LogConsole(QTextEdit):
-    """Read-only text edit with per-line tag colouring + grid background."""
+def classify_log_line(line: str, ts: str) -> tuple[str, str, str]:
+    """Строка лога → (время, текст, цвет). Явный уровень важнее [tag],
+    иначе info. Строка без своего времени получает `ts` (момент приёма)."""
+    if not line.strip():
+        return ("", "", PALETTE["log_info"])
+    tone_color = PALETTE["log_info"]
+    upper = line.upper()
+    for kw, t in _LOG_LEVEL_KEYWORDS.items():
+        if kw in upper:
+            tone_color = _TAG_TINTS.get(t, tone_color)
+            break
+    m_tag = _LOG_TAG_RE.search(line)
+    if m_tag:
+        tone_color = _TAG_TINTS.get(m_tag.group("tag").lower(), tone_color)
+    m_ts = _LOG_TIME_RE.match(line)
+    if m_ts:
+        return (m_ts.group("ts"), line[m_ts.end():], tone_color)
+    return (ts, "  " + line, tone_color)
+
+
+class _LogModel(QAbstractListModel):
+    """Кольцо уже разобранных строк (время, текст, цвет) фиксированной
+    ёмкости; вытесненные сверху строки снимаются одним beginRemoveRows."""
+
+    LINE_ROLE = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, capacity: int, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self._lines: deque[tuple[str, str, str]] = deque(maxlen=capacity)
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._lines)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        ts, body, color = self._lines[index.row()]
+        if role == self.LINE_ROLE:
+            return (ts, body, color)
+        if role == Qt.ItemDataRole.DisplayRole:
+            return ts + body
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return (ts + body).strip() or None   # вся строка, даже за краем
+        return None
+
+    def extend(self, lines: list[tuple[str, str, str]]) -> None:
+        if not lines:
+            return
+        if len(lines) >= self.capacity:
+            self.beginResetModel()
+            self._lines.clear()
+            self._lines.extend(lines[-self.capacity:])
+            self.endResetModel()
+            return
+        overflow = len(self._lines) + len(lines) - self.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._lines.popleft()
+            self.endRemoveRows()
+        n = len(self._lines)
+        self.beginInsertRows(QModelIndex(), n, n + len(lines) - 1)
+        self._lines.extend(lines)
+        self.endInsertRows()
+
+    def clear(self) -> None:
+        self.beginResetModel()
+        self._lines.clear()
+        self.endResetModel()
+
+
+class _LogDelegate(QStyledItemDelegate):
+    """Время серым, текст цветом тона — две drawText на видимую строку.
+
+    Ширина строки у всех одна — `row_width`, по самой длинной строке в
+    кольце (её ведёт LogConsole): при uniformItemSizes list view меряет
+    только одну строку, и без этого длинные строки обрезались бы без
+    горизонтальной прокрутки."""
+
+    def __init__(self, font: QFont, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self._fm = QFontMetrics(font)
+        self.row_width = 0
+        self._ts_color = QColor(PALETTE["log_time"])
+        self._colors: dict[str, QColor] = {}
+
+    def paint(self, painter, option, index) -> None:
+        ts, body, color = index.data(_LogModel.LINE_ROLE)
+        painter.save()
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, QColor(PALETTE["hl2"]))
+        r = option.rect
+        flags = int(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
+        x = r.left()
+        if ts:
+            painter.setPen(self._ts_color)
+            painter.drawText(QRect(x, r.top(), r.width(), r.height()), flags, ts)
+            x += self._fm.horizontalAdvance(ts)
+        qc = self._colors.get(color)
+        if qc is None:
+            qc = self._colors[color] = QColor(color)
+        painter.setPen(qc)
+        painter.drawText(QRect(x, r.top(), r.right() - x, r.height()), flags, body)
+        painter.restore()
+
+    def line_width(self, ts: str, body: str) -> int:
+        return self._fm.horizontalAdvance(ts + body) + 4
+
+    def sizeHint(self, option, index) -> QSize:
+        return QSize(self.row_width, self._fm.height() + 2)
+
+
+class LogConsole(QListView):
+    """Лог процесса relay: кольцо разобранных строк + лёгкий list view.
+
+    append_raw() только кладёт строки в очередь (с отметкой времени приёма);
+    разбор по тонам и вставка в модель — пачкой раз в FLUSH_MS, так что
+    шквал логов (retry-шторм, debug) стоит GUI одной перерисовки на кадр, а
+    не вставки и прокрутки на каждую строку. Разбираются только строки,
+    которые поместятся в кольцо. На паузе рисование стоит целиком: строки
+    копятся в очереди (не больше CAPACITY) и появляются после снятия паузы.
+    """
+
+    CAPACITY = 5000
+    FLUSH_MS = 50
 
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
-        self.setReadOnly(True)
-        self.setLineWrapMode(QTextEdit.LineWrapMode.WidgetWidth)
-        self.setFont(QFont("Consolas", 9))
+        font = QFont("Consolas", 9)
+        self.setFont(font)
+        self._model = _LogModel(self.CAPACITY, self)
+        self.setModel(self._model)
+        self._delegate = _LogDelegate(font, self)
+        self.setItemDelegate(self._delegate)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
         self.setStyleSheet(
-            f"QTextEdit {{ background: {PALETTE['console']}; color: #c8cdd4; "
+            f"QListView {{ background: {PALETTE['console']}; color: #c8cdd4; "
             "border: 1px solid #050608; border-radius: 3px; "
-            "padding: 8px 12px; }}"
+            "padding: 8px 12px; }"
         )
-        self.document().setMaximumBlockCount(2000)  # cap memory
+        self._pending: deque[tuple[str, str]] = deque(maxlen=self.CAPACITY)
+        self._paused = False
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.FLUSH_MS)
+        self._timer.timeout.connect(self._flush)
 
     def append_raw(self, text: str) -> None:
-        """Append a chunk of stdout/stderr (may contain newlines).
-        Each line is parsed for [tag] / level keywords and tinted accordingly.
-        """
+        """Append a chunk of stdout/stderr (may contain newlines)."""
         if not text:
             return
-        for line in text.splitlines():
-            self._append_line(line)
+        ts = datetime.now().strftime("%H:%M:%S")
+        self._pending.extend((ts, line) for line in text.splitlines())
+        if not self._paused and not self._timer.isActive():
+            self._timer.start()
 
-    def _append_line(self, line: str) -> None:
-        cursor = self.textCursor()
-        cursor.movePosition(QTextCursor.MoveOperation.End)
-
-        if not line.strip():
-            cursor.insertText("\n")
-            return
-
-        # Tone heuristic: explicit level keyword wins, then [tag], then info default.
-        tone_color = PALETTE["log_info"]
-        upper = line.upper()
-        for kw, t in _LOG_LEVEL_KEYWORDS.items():
-            if kw in upper:
-                tone_color = _TAG_TINTS.get(t, tone_color)
-                break
-        m_tag = _LOG_TAG_RE.search(line)
-        if m_tag:
-            tag = m_tag.group("tag").lower()
-            tone_color = _TAG_TINTS.get(tag, tone_color)
-
-        ts_fmt = QTextCharFormat()
-        ts_fmt.setForeground(QColor(PALETTE["log_time"]))
-        body_fmt = QTextCharFormat()
-        body_fmt.setForeground(QColor(tone_color if line.strip() else "#c8cdd4"))
-
-        # Prepend timestamp if line doesn't already start with one.
-        m_ts = _LOG_TIME_RE.match(line)
-        if not m_ts:
-            ts = datetime.now().strftime("%H:%M:%S")
-            cursor.setCharFormat(ts_fmt)
-            cursor.insertText(f"{ts}  ")
-            cursor.setCharFormat(body_fmt)
-            cursor.insertText(line + "\n")
+    def _flush(self) -> None:
+        if self._paused or not self._pending:
             return
-
-        cursor.setCharFormat(ts_fmt)
-        cursor.insertText(m_ts.group("ts"))
-        cursor.setCharFormat(body_fmt)
-        cursor.insertText(line[m_ts.end():] + "\n")
-        # Auto-scroll
-        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        lines = [classify_log_line(line, ts) for ts, line in self._pending]
+        self._pending.clear()
+        # Ширина прокрутки — по самой длинной строке; растёт только вширь
+        # (вытеснение из кольца её не пересчитывает, сброс — clear_log).
+        widest = max(self._delegate.line_width(ts, body) for ts, body, _ in lines)
+        if widest > self._delegate.row_width:
+            self._delegate.row_width = widest
+            self.scheduleDelayedItemsLayout()
+        self._model.extend(lines)
+        self.scrollToBottom()
+
+    def set_paused(self, paused: bool) -> None:
+        self._paused = paused
+        if not paused:
+            self._flush()
+
+    def is_paused(self) -> bool:
+        return self._paused
+
+    def line_count(self) -> int:
+        return self._model.rowCount()
 
     def clear_log(self) -> None:
-        self.clear()
+        self._pending.clear()
+        self._model.clear()
+        self._delegate.row_width = 0
+
+    def keyPressEvent(self, event) -> None:
+        if event.matches(QKeySequence.StandardKey.Copy):
+            rows = sorted(i.row() for i in self.selectedIndexes())
+            QApplication.clipboard().setText(
+                "\n".join(self._model.data(self._model.index(r)) for r in rows)
+            )
+            return
+        super().keyPressEvent(event)
 
 
 # ---------------------------------------------------------------------------